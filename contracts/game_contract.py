@@ -75,23 +75,25 @@ def approval_program():
     
     # Slash function (when player loses)
     def slash():
+        commission = ScratchVar(TealType.uint64)
+        slash_amount = ScratchVar(TealType.uint64)
         return Seq([
             # Check if player has staked
             Assert(App.localGet(Int(0), PLAYER_STAKE) > Int(0)),
             
             # Calculate slash amount (transaction fee + commission)
-            commission = App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000),
-            slash_amount = TRANSACTION_FEE + commission,
+            commission.store(App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)),
+            slash_amount.store(TRANSACTION_FEE + commission.load()),
             
             # Check if slash amount doesn't exceed stake
-            Assert(slash_amount <= App.localGet(Int(0), PLAYER_STAKE)),
+            Assert(slash_amount.load() <= App.localGet(Int(0), PLAYER_STAKE)),
             
             # Update player stake
-            App.localPut(Int(0), PLAYER_STAKE, App.localGet(Int(0), PLAYER_STAKE) - slash_amount),
+            App.localPut(Int(0), PLAYER_STAKE, App.localGet(Int(0), PLAYER_STAKE) - slash_amount.load()),
             
             # Update global state
-            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - slash_amount),
-            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + commission),
+            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - slash_amount.load()),
+            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + commission.load()),
             
             # Return remaining stake to player
             InnerTxnBuilder.Begin(),
@@ -111,12 +113,13 @@ def approval_program():
     
     # Reward function (when player wins)
     def reward():
+        reward_amount = ScratchVar(TealType.uint64)
         return Seq([
             # Check if player has staked
             Assert(App.localGet(Int(0), PLAYER_STAKE) > Int(0)),
             
             # Calculate reward (return stake + bonus)
-            reward_amount = App.localGet(Int(0), PLAYER_STAKE) + (App.localGet(Int(0), PLAYER_STAKE) / Int(10)),  # 10% bonus
+            reward_amount.store(App.localGet(Int(0), PLAYER_STAKE) + (App.localGet(Int(0), PLAYER_STAKE) / Int(10))),  # 10% bonus
             
             # Update player score
             App.localPut(Int(0), PLAYER_SCORE, App.localGet(Int(0), PLAYER_SCORE) + Int(1)),
@@ -129,7 +132,7 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: reward_amount,
+                TxnField.amount: reward_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
@@ -15,6 +15,7 @@ def main():
         print("  deploy     - Deploy the smart contract")
         print("  verify     - Verify deployment")
         print("  test       - Run tests")
+        print("  watch      - Rebuild contracts on save [variant ...] [--peephole] [--no-sourcemaps]")
         return
     
     command = sys.argv[1]
@@ -58,9 +59,17 @@ def main():
         print("�� Running tests...")
         os.system("python -m pytest tests/ -v")
     
+    elif command == "watch":
+        # The build tools import each other by module name from smart_gem/
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "smart_gem"))
+        from contract_watch import watch
+        
+        variants = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+        watch(variants, peephole="--peephole" in sys.argv, sourcemaps="--no-sourcemaps" not in sys.argv)
+    
     else:
         print(f"❌ Unknown command: {command}")
-        print("Available commands: compile, deploy, verify, test")
+        print("Available commands: compile, deploy, verify, test, watch")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Account Factory
+Derives, funds and opts in batches of test accounts
+
+Accounts are derived deterministically from a seed phrase and an index, so
+the same N players come back every run and only their addresses need to be
+remembered. Funding goes out as atomic groups of 16 faucet payments and
+opt-ins as groups of 16 opt-in calls, both pushed through the pipelined
+SubmissionEngine after a preflight simulation. What has been funded and opted in is cached on disk per
+network, app and seed; a later run re-checks a sample on chain and only
+handles the accounts the cache does not cover.
+
+Run `python account_factory.py [count]` to build a set opted into a freshly
+deployed enhanced contract on a local stand-in network (local_network.py).
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sys
+import time
+
+from algosdk import account, constants, encoding, transaction
+from nacl.signing import SigningKey
+
+from contract_registry import SMART_GEM_DIR
+from preflight import preflight_for
+from submission_engine import SubmissionEngine
+
+DEFAULT_SEED = "chronicles-of-leisure-test"
+DEFAULT_FUNDING = 10_000_000  # 10 ALGO per account
+CACHE_DIR = os.path.join(SMART_GEM_DIR, ".accounts")
+BATCH_SIZE = constants.tx_group_limit  # Transactions per atomic group
+SUBMIT_WINDOW = 64  # Groups in flight
+
+
+def derive_account(seed, index):
+    """(address, private key) number index of a seed phrase"""
+    signing_key = SigningKey(hashlib.sha256(f"{seed}:{index}".encode()).digest())
+    public_key = signing_key.verify_key.encode()
+    private_key = base64.b64encode(signing_key.encode() + public_key).decode()
+    return encoding.encode_address(public_key), private_key
+
+
+def _batches(items, size=BATCH_SIZE):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _flat_params(algod_client):
+    # Without congestion the fee is the minimum; setting it flat skips the
+    # per-transaction size estimate, which costs a throwaway signature
+    sp = algod_client.suggested_params()
+    if not sp.flat_fee and not sp.fee:
+        sp.fee = sp.min_fee or constants.MIN_TXN_FEE
+        sp.flat_fee = True
+    return sp
+
+
+class AccountFactory:
+    """Builds funded (and optionally opted-in) player sets from a faucet account"""
+
+    def __init__(self, algod_client, faucet_key, seed=DEFAULT_SEED, cache_dir=CACHE_DIR):
+        self.algod_client = algod_client
+        self.faucet_key = faucet_key
+        self.faucet = account.address_from_private_key(faucet_key)
+        self.seed = seed
+        self.cache_dir = cache_dir
+        self.preflight = preflight_for(algod_client)
+
+    def accounts(self, count, start=0):
+        """[(address, private key)] for indexes start..start+count-1"""
+        return [derive_account(self.seed, index) for index in range(start, start + count)]
+
+    # -- cache ----------------------------------------------------------------
+
+    def cache_path(self, app_id=None):
+        """Cache file for this network, app and seed"""
+        sp = self.algod_client.suggested_params()
+        network = f"{sp.gen}-{hashlib.sha256(sp.gh.encode()).hexdigest()[:8]}"
+        seed = hashlib.sha256(self.seed.encode()).hexdigest()[:8]
+        return os.path.join(self.cache_dir, f"{network}-app{app_id or 0}-{seed}.json")
+
+    def load_cache(self, app_id=None):
+        try:
+            with open(self.cache_path(app_id), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"funded": [], "opted_in": [], "amount": 0}
+
+    def save_cache(self, cache, app_id=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.cache_path(app_id), "w") as f:
+            json.dump(cache, f)
+
+    def verify_cache(self, cache, app_id=None, sample=3):
+        """Spot-check the first and last cached accounts still exist on chain"""
+        funded = cache["funded"]
+        picks = {funded[0], funded[-1], funded[len(funded) // 2]} if funded else set()
+        for address in list(picks)[:sample]:
+            info = self.algod_client.account_info(address)
+            if info.get("amount", 0) == 0:
+                return False
+            if app_id and address in cache["opted_in"]:
+                if not any(app["id"] == app_id for app in info.get("apps-local-state", [])):
+                    return False
+        return True
+
+    # -- batches --------------------------------------------------------------
+
+    def _submit(self, groups, keys):
+        """Run groups through a SubmissionEngine; returns the ones that confirmed"""
+        engine = SubmissionEngine(self.algod_client, keys, window=SUBMIT_WINDOW, preflight=self.preflight)
+        tickets = engine.run(groups)
+        for ticket in tickets:
+            if ticket.status == "failed":
+                print(f"   ❌ Batch {ticket.index}: {ticket.error}")
+        return [ticket.group for ticket in tickets if ticket.status == "confirmed"]
+
+    def fund(self, addresses, amount=DEFAULT_FUNDING):
+        """Pay amount to every address, 16 payments per group; returns the funded addresses"""
+        sp = _flat_params(self.algod_client)
+        groups = [
+            transaction.assign_group_id([
+                transaction.PaymentTxn(self.faucet, sp, address, amount) for address in batch
+            ]) if len(batch) > 1 else [transaction.PaymentTxn(self.faucet, sp, batch[0], amount)]
+            for batch in _batches(list(addresses))
+        ]
+        confirmed = self._submit(groups, self.faucet_key)
+        return [txn.receiver for group in confirmed for txn in group]
+
+    def opt_in(self, accounts, app_id):
+        """Opt every (address, key) into app_id, 16 per group; returns the opted-in addresses"""
+        sp = _flat_params(self.algod_client)
+        keys = dict(accounts)
+        groups = [
+            transaction.assign_group_id([
+                transaction.ApplicationOptInTxn(address, sp, app_id) for address, _ in batch
+            ]) if len(batch) > 1 else [transaction.ApplicationOptInTxn(batch[0][0], sp, app_id)]
+            for batch in _batches(list(accounts))
+        ]
+        confirmed = self._submit(groups, keys)
+        return [txn.sender for group in confirmed for txn in group]
+
+    def prepare(self, count, amount=DEFAULT_FUNDING, app_id=None):
+        """count funded accounts (opted into app_id if given), reusing the on-disk cache"""
+        started = time.time()
+        accounts = self.accounts(count)
+        cache = self.load_cache(app_id)
+        if cache["amount"] != amount or not self.verify_cache(cache, app_id):
+            cache = {"funded": [], "opted_in": [], "amount": amount}
+
+        funded = set(cache["funded"])
+        missing = [address for address, _ in accounts if address not in funded]
+        if missing:
+            print(f"💸 Funding {len(missing)} account(s) with {amount / 1_000_000} ALGO each...")
+            cache["funded"] += self.fund(missing, amount)
+
+        if app_id:
+            funded = set(cache["funded"])
+            opted = set(cache["opted_in"])
+            pending = [(a, k) for a, k in accounts if a in funded and a not in opted]
+            if pending:
+                print(f"📝 Opting {len(pending)} account(s) into app {app_id}...")
+                cache["opted_in"] += self.opt_in(pending, app_id)
+
+        self.save_cache(cache, app_id)
+        ready = set(cache["opted_in"] if app_id else cache["funded"])
+        accounts = [(a, k) for a, k in accounts if a in ready]
+        print(f"✅ {len(accounts)}/{count} account(s) ready in {time.time() - started:.2f}s")
+        return accounts
+
+
+def local_factory(faucet_funds=10 ** 15):
+    """(LocalAlgodClient, AccountFactory) with a freshly funded local faucet"""
+    from local_network import LocalAlgodClient
+
+    algod_client = LocalAlgodClient()
+    faucet_key, faucet = account.generate_account()
+    algod_client.fund(faucet, faucet_funds)
+    return algod_client, AccountFactory(algod_client, faucet_key)
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    from local_network import deploy_game
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    try:
+        algod_client, factory = local_factory()
+        factory.prepare(count, app_id=deploy_game(algod_client, factory.faucet_key))
+    except Exception as e:
+        print(f"❌ Error: {e}")
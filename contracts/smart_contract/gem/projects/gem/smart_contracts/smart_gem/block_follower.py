@@ -0,0 +1,360 @@
+"""
+Block Follower
+Streams our apps' state deltas, logs and inner transactions block by block
+
+Instead of re-polling application_info/account_info, the follower reads
+each new block once and pulls out every call to the watched apps: the
+global and local EvalDeltas, the logs (decoded into contract events) and
+the inner transactions. Each round becomes one RoundDeltas, delivered in
+order to every subscriber as an async stream.
+
+Subscribers are named and each keeps its own round cursor in a
+CursorStore (a JSON file, or memory). A round counts as handled once the
+subscriber asks for the next one (or acks it), so a consumer that stops
+resumes where it left off and never misses a round; the follower starts
+from the oldest cursor, reads the shared blocks once, and gives each
+subscriber only the rounds past its own cursor.
+
+Run `python block_follower.py [app id ...]` to print events as they land.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import msgpack
+from algosdk import transaction
+
+from enhanced_contract_client import decode_logs
+from local_evaluator import address_bytes, address_string
+
+DEFAULT_CURSORS = "follower_cursors.json"
+_END = object()
+
+
+# ============================================================================
+# BLOCKS
+# ============================================================================
+
+def raw_bytes(value):
+    """Bytes of a msgpack str that algod used for arbitrary bytes (keys, values, logs)"""
+    if isinstance(value, str):
+        return value.encode("utf-8", "surrogateescape")
+    return bytes(value)
+
+
+def decode_state_delta(delta):
+    """algod StateDelta -> {key: value}, None for deleted keys"""
+    decoded = {}
+    for key, change in (delta or {}).items():
+        action = change.get("at")
+        if action == 1:
+            decoded[raw_bytes(key)] = raw_bytes(change.get("bs", b""))
+        elif action == 2:
+            decoded[raw_bytes(key)] = change.get("ui", 0)
+        else:
+            decoded[raw_bytes(key)] = None
+    return decoded
+
+
+def decode_local_deltas(txn, eval_delta):
+    """{address bytes: {key: value}} of an app call's EvalDelta"""
+    # Positions index [sender] + accounts, then the shared accounts ("sa")
+    accounts = [address_bytes(txn.sender)] + [address_bytes(a) for a in txn.accounts or []]
+    accounts += [bytes(a) for a in eval_delta.get("sa", [])]
+    deltas = {}
+    for position, changes in (eval_delta.get("ld") or {}).items():
+        deltas.setdefault(accounts[int(position)], {}).update(decode_state_delta(changes))
+    return deltas
+
+
+def fetch_block(algod_client, round_num):
+    """Block header dict with "txns" as [(SignedTransaction, ApplyData)]"""
+    raw = algod_client.block_info(round_num, response_format="msgpack")
+    block = msgpack.unpackb(raw, raw=False, strict_map_key=False, unicode_errors="surrogateescape")["block"]
+    txns = []
+    for entry in block.get("txns", []):
+        fields = dict(entry["txn"])
+        # Genesis fields are elided in blocks; they are needed to rebuild the txn
+        fields["gh"] = block.get("gh")
+        if entry.get("hgi"):
+            fields["gen"] = block.get("gen")
+        stxn = transaction.SignedTransaction.undictify(dict(entry, txn=fields))
+        txns.append((stxn, entry))
+    block["txns"] = txns
+    return block
+
+
+def block_groups(block):
+    """Split a block's transactions into their groups, in block order"""
+    groups = []
+    for stxn, entry in block["txns"]:
+        group_id = stxn.transaction.group
+        if group_id and groups and groups[-1][0] == group_id:
+            groups[-1][1].append((stxn, entry))
+        else:
+            groups.append((group_id, [(stxn, entry)]))
+    return [members for _, members in groups]
+
+
+# Fields of a raw transaction dict that name an account whose holdings it can change
+ACCOUNT_FIELDS = ("snd", "rcv", "close", "arcv", "asnd", "aclose")
+
+
+def touched_addresses(stxn, entry):
+    """Addresses a confirmed transaction (inner transactions included) may have changed"""
+    txn = stxn.transaction
+    found = {txn.sender}
+    for field in ("receiver", "close_remainder_to", "close_assets_to", "revocation_target"):
+        if getattr(txn, field, None):
+            found.add(getattr(txn, field))
+    if txn.type == "appl":
+        found.update(txn.accounts or [])
+    inner_entries = list(entry.get("dt", {}).get("itx", []))
+    while inner_entries:
+        inner = inner_entries.pop()
+        found.update(address_string(bytes(inner["txn"][field])) for field in ACCOUNT_FIELDS if field in inner["txn"])
+        inner_entries += inner.get("dt", {}).get("itx", [])
+    return found
+
+
+def _inner_txn(inner):
+    txn = inner["txn"]
+    return {
+        "type": txn.get("type"),
+        "sender": address_string(bytes(txn["snd"])),
+        "receiver": address_string(bytes(txn["rcv"])) if "rcv" in txn else None,
+        "amount": txn.get("amt", 0),
+        "fee": txn.get("fee", 0),
+        "app_id": txn.get("apid", 0),
+        "logs": [raw_bytes(log) for log in inner.get("dt", {}).get("lg", [])],
+    }
+
+
+# ============================================================================
+# EVENTS
+# ============================================================================
+
+class AppCall:
+    """One confirmed call to a watched app and what it changed"""
+
+    def __init__(self, round_num, timestamp, index, txn, eval_delta):
+        self.round = round_num
+        self.timestamp = timestamp
+        self.index = index  # Position in the block
+        self.txid = txn.get_txid()
+        self.group_id = txn.group
+        self.app_id = txn.index
+        self.sender = txn.sender
+        self.on_complete = int(txn.on_complete or 0)
+        self.method = bytes(txn.app_args[0]).decode(errors="replace") if txn.app_args else None
+        self.global_delta = decode_state_delta(eval_delta.get("gd"))
+        self.local_delta = {address_string(address): changes
+                            for address, changes in decode_local_deltas(txn, eval_delta).items()}
+        self.logs = [raw_bytes(log) for log in eval_delta.get("lg", [])]
+        self.inner_txns = [_inner_txn(inner) for inner in eval_delta.get("itx", [])]
+
+    @property
+    def events(self):
+        """Logs decoded as contract events: [(name, fields)]"""
+        return decode_logs(self.logs)
+
+    def __repr__(self):
+        return f"AppCall({self.method or self.on_complete} on {self.app_id} @{self.round}, {len(self.logs)} log(s))"
+
+
+class RoundDeltas:
+    """Every watched app call of one round, in block order"""
+
+    def __init__(self, round_num, timestamp, calls, addresses=()):
+        self.round = round_num
+        self.timestamp = timestamp
+        self.calls = calls
+        self.addresses = set(addresses)  # Every account the round touched, watched app or not
+
+    @property
+    def cursor(self):
+        """Where to resume once this round is handled"""
+        return self.round + 1
+
+    def __repr__(self):
+        return f"RoundDeltas({self.round}, {len(self.calls)} call(s))"
+
+
+def round_deltas(block, app_ids):
+    """RoundDeltas of a fetched block for the given app ids"""
+    calls, addresses = [], set()
+    for index, (stxn, entry) in enumerate(block["txns"]):
+        txn = stxn.transaction
+        addresses |= touched_addresses(stxn, entry)
+        if txn.type == "appl" and txn.index in app_ids:
+            calls.append(AppCall(block["rnd"], block.get("ts", 0), index, txn, entry.get("dt", {})))
+    return RoundDeltas(block["rnd"], block.get("ts", 0), calls, addresses)
+
+
+# ============================================================================
+# CURSORS AND SUBSCRIPTIONS
+# ============================================================================
+
+class CursorStore:
+    """Next round to deliver, per subscriber name; saved to a JSON file when given one"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.cursors = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.cursors = json.load(f)
+
+    def get(self, name):
+        return self.cursors.get(name)
+
+    def set(self, name, cursor):
+        self.cursors[name] = cursor
+        if self.path:
+            # Written aside and renamed, so a crash never leaves half a file
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(self.cursors, f)
+            os.replace(self.path + ".tmp", self.path)
+
+
+class Subscription:
+    """One consumer's stream of RoundDeltas; iterating acks the previous round"""
+
+    def __init__(self, name, cursors, include_empty=False):
+        self.name = name
+        self.cursors = cursors
+        self.include_empty = include_empty
+        self.queue = asyncio.Queue()
+        self.closed = False
+        self._pending = None
+
+    @property
+    def cursor(self):
+        return self.cursors.get(self.name)
+
+    def wants(self, deltas):
+        if self.closed or (self.cursor is not None and deltas.round < self.cursor):
+            return False
+        return bool(deltas.calls) or self.include_empty
+
+    def ack(self, deltas):
+        """Mark a round (and every quiet round before it) handled"""
+        if self.cursor is None or deltas.cursor > self.cursor:
+            self.cursors.set(self.name, deltas.cursor)
+
+    def close(self):
+        self.closed = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._pending is not None:
+            self.ack(self._pending)
+            self._pending = None
+        item = await self.queue.get()
+        if item is _END:
+            raise StopAsyncIteration
+        self._pending = item
+        return item
+
+
+class BlockFollower:
+    """Reads each block once and fans its app deltas out to every subscriber"""
+
+    def __init__(self, algod_client, app_ids, cursors=None):
+        self.algod_client = algod_client
+        self.app_ids = set(app_ids)
+        self.cursors = cursors or CursorStore()
+        self.subscriptions = []
+        self.round = None  # Next round to read
+        self.blocks_read = 0
+
+    def subscribe(self, name, include_empty=False):
+        """Stream for name, resuming from its stored cursor (or the tip for a new name)"""
+        subscription = Subscription(name, self.cursors, include_empty)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def _start_round(self):
+        tip = self.algod_client.status()["last-round"]
+        cursors = [s.cursor for s in self.subscriptions if s.cursor is not None]
+        if len(cursors) < len(self.subscriptions):
+            cursors.append(tip + 1)
+        return min(cursors, default=tip + 1)
+
+    async def _wait_for(self, round_num):
+        status = await asyncio.to_thread(self.algod_client.status)
+        if status["last-round"] < round_num:
+            await asyncio.to_thread(self.algod_client.status_after_block, round_num - 1)
+
+    def _publish(self, deltas):
+        for subscription in self.subscriptions:
+            if subscription.wants(deltas):
+                subscription.queue.put_nowait(deltas)
+            elif not subscription.closed and (subscription.cursor is None or deltas.round >= subscription.cursor):
+                # Quiet round nobody needs to see: move the cursor straight past it
+                if subscription.queue.empty() and subscription._pending is None:
+                    subscription.ack(deltas)
+
+    async def run(self, stop_round=None):
+        """Follow blocks until stop_round (forever without one), then end every stream"""
+        if self.round is None:
+            self.round = await asyncio.to_thread(self._start_round)
+        try:
+            while stop_round is None or self.round <= stop_round:
+                if all(s.closed for s in self.subscriptions):
+                    break
+                await self._wait_for(self.round)
+                block = await asyncio.to_thread(fetch_block, self.algod_client, self.round)
+                self.blocks_read += 1
+                self._publish(round_deltas(block, self.app_ids))
+                self.round += 1
+        finally:
+            for subscription in self.subscriptions:
+                subscription.queue.put_nowait(_END)
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def _describe(call):
+    changes = ", ".join(f"{key.decode(errors='replace')}={value}" for key, value in call.global_delta.items())
+    events = ", ".join(name or "?" for name, _ in call.events)
+    return f"   {call.method or 'on_complete ' + str(call.on_complete)} by {call.sender[:8]}… " \
+           f"[{events}] {changes}"
+
+
+async def _print_events(follower):
+    subscription = follower.subscribe("console")
+    task = asyncio.ensure_future(follower.run())
+    async for deltas in subscription:
+        print(f"🧱 Round {deltas.round}: {len(deltas.calls)} call(s)")
+        for call in deltas.calls:
+            print(_describe(call))
+    await task
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from algosdk.v2client import algod
+
+    from trace_recorder import ALGOD_ADDRESS
+
+    try:
+        app_ids = [int(arg) for arg in sys.argv[1:]]
+        if not app_ids:
+            with open("application_info.json") as f:
+                app_ids = [json.load(f)["application_id"]]
+        follower = BlockFollower(algod.AlgodClient("", ALGOD_ADDRESS), app_ids, CursorStore(DEFAULT_CURSORS))
+        print(f"👀 Following app(s) {', '.join(map(str, app_ids))} (Ctrl+C to stop)")
+        asyncio.run(_print_events(follower))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"❌ Follower failed: {e}")
+        sys.exit(1)
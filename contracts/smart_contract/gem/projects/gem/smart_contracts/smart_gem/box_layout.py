@@ -0,0 +1,123 @@
+"""
+Box Layout
+Names and sizes of the boxes the enhanced contract keeps admins, rooms and seats in
+
+Admins are one box each, named b"admin" + the 32-byte address, so a
+membership test is a single box_len no matter how many admins exist.
+Game rooms are one box each, named b"room" + the 8-byte room id, holding
+fixed-offset uint64 fields followed by the creator's address.
+A seated player also has a seat box, named b"seat" + the address, holding
+the room id and stake; unlike local state it survives a clear-state call
+whose program fails, so the seat can still be reclaimed afterwards.
+Callers must list every box a transaction touches in its box references.
+"""
+
+import struct
+
+from algosdk import encoding
+
+ADMIN_BOX_PREFIX = b"admin"
+ADMIN_BOX_SIZE = 1  # Presence is what matters; the byte is unused
+
+ROOM_BOX_PREFIX = b"room"
+
+# field -> byte offset of its uint64 in a room box
+ROOM_FIELDS = {
+    "state": 0,       # GAME_IDLE / GAME_STAKED
+    "pot": 8,         # microAlgos staked by seated players
+    "players": 16,    # seated players
+    "round": 24,      # completed rounds; bumps when the room empties
+    "commission": 32, # commission kept from losses, swept on close
+}
+ROOM_CREATOR_OFFSET = 40
+ROOM_BOX_SIZE = ROOM_CREATOR_OFFSET + 32
+
+SEAT_BOX_PREFIX = b"seat"
+
+# field -> byte offset of its uint64 in a seat box
+SEAT_FIELDS = {
+    "room": 0,   # room the stake is seated in
+    "stake": 8,  # microAlgos staked
+}
+SEAT_BOX_SIZE = 16
+
+# Minimum balance the app account must hold per box (see box_min_balance)
+BOX_FLAT_MIN_BALANCE = 2500
+BOX_BYTE_MIN_BALANCE = 400
+
+
+def _address_bytes(address):
+    if isinstance(address, (bytes, bytearray)):
+        return bytes(address)
+    return encoding.decode_address(address)
+
+
+def admin_box_name(address):
+    """Box name marking an address as admin"""
+    return ADMIN_BOX_PREFIX + _address_bytes(address)
+
+
+def admin_box_ref(address, app_id=0):
+    """(app index, name) box reference for an admin check on address"""
+    return (app_id, admin_box_name(address))
+
+
+def box_min_balance(name, size):
+    """microAlgos the app account must hold for one box"""
+    return BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * (len(name) + size)
+
+
+def admin_box_min_balance():
+    """microAlgos locked in the app account per admin"""
+    return box_min_balance(ADMIN_BOX_PREFIX + bytes(32), ADMIN_BOX_SIZE)
+
+
+def room_box_name(room_id):
+    """Box name of a game room"""
+    return ROOM_BOX_PREFIX + room_id.to_bytes(8, "big")
+
+
+def room_box_ref(room_id, app_id=0):
+    """(app index, name) box reference for a game room"""
+    return (app_id, room_box_name(room_id))
+
+
+def room_box_min_balance():
+    """microAlgos the room creator deposits for the box"""
+    return box_min_balance(room_box_name(0), ROOM_BOX_SIZE)
+
+
+def seat_box_name(address):
+    """Box name of a player's seat"""
+    return SEAT_BOX_PREFIX + _address_bytes(address)
+
+
+def seat_box_ref(address, app_id=0):
+    """(app index, name) box reference for a player's seat"""
+    return (app_id, seat_box_name(address))
+
+
+def seat_box_min_balance():
+    """microAlgos locked in the app account per seated player (out of the stake)"""
+    return box_min_balance(SEAT_BOX_PREFIX + bytes(32), SEAT_BOX_SIZE)
+
+
+def decode_room(value):
+    """Room box contents -> dict of fields plus the creator address"""
+    value = bytes(value)
+    if len(value) != ROOM_BOX_SIZE:
+        raise ValueError(f"Room box must be {ROOM_BOX_SIZE} bytes, got {len(value)}")
+    room = {
+        field: struct.unpack_from(">Q", value, offset)[0]
+        for field, offset in ROOM_FIELDS.items()
+    }
+    room["creator"] = encoding.encode_address(value[ROOM_CREATOR_OFFSET:])
+    return room
+
+
+def decode_seat(value):
+    """Seat box contents -> dict of fields"""
+    value = bytes(value)
+    if len(value) != SEAT_BOX_SIZE:
+        raise ValueError(f"Seat box must be {SEAT_BOX_SIZE} bytes, got {len(value)}")
+    return {field: struct.unpack_from(">Q", value, offset)[0] for field, offset in SEAT_FIELDS.items()}
@@ -0,0 +1,243 @@
+"""
+Client Generator
+Emits a typed Python client for a contract variant from its get_abi()
+
+The generated module has the method selectors (the raw app_args[0] names
+these contracts dispatch on), argument encoders, box and foreign-account
+references and the pooled fee (from the worst-case inner transaction count
+of the compiled program) baked into one method per contract method, plus
+precompiled struct decoders for every logged event.
+
+Run `python client_generator.py [variant ...]` to (re)write
+<variant>_client.py next to this file.
+"""
+
+import keyword
+import os
+import re
+import struct
+import sys
+
+from contract_registry import SMART_GEM_DIR, build_variant, get_variant
+from fee_pooling import inner_txn_counts
+
+TYPE_HINTS = {"uint64": "int", "bytes": "bytes", "account": "str", "pay": "int"}
+EVENT_FORMATS = {"uint64": "Q", "address": "32s"}
+
+
+def load_contract(name):
+    """Contract instance of a registry variant (must define get_abi)"""
+    import importlib
+
+    entry = get_variant(name)
+    if entry["class"] is None:
+        raise ValueError(f"{name} has no contract class")
+    contract = getattr(importlib.import_module(entry["module"]), entry["class"])()
+    if not hasattr(contract, "get_abi"):
+        raise ValueError(f"{entry['class']} has no get_abi()")
+    return contract
+
+
+def client_class_name(contract):
+    return contract.__class__.__name__.replace("Contract", "") + "Client"
+
+
+def client_path(name):
+    return os.path.join(SMART_GEM_DIR, f"{name}_client.py")
+
+
+def _identifier(name):
+    return name + "_" if keyword.iskeyword(name) else name
+
+
+def _event_arg(arg):
+    # Older ABIs list event args as bare names of uint64 fields
+    return arg if isinstance(arg, dict) else {"name": arg, "type": "uint64"}
+
+
+def _encode_arg(arg):
+    name = _identifier(arg["name"])
+    if arg["type"] == "uint64":
+        return f"{name}.to_bytes(8, \"big\")"
+    return name
+
+
+def _box_key(method, key):
+    if key == "sender":
+        return "encoding.decode_address(sender)"
+    params = {a["name"]: a for a in method.get("args", []) + method.get("refs", [])}
+    arg = params[key]
+    name = _identifier(key)
+    if arg["type"] == "uint64":
+        return f"{name}.to_bytes(8, \"big\")"
+    if arg.get("optional"):
+        return f"encoding.decode_address({name} or sender)"
+    return f"encoding.decode_address({name})"
+
+
+def _method_source(method):
+    name = method["name"]
+    args = method.get("args", [])
+    refs = method.get("refs", [])
+    on_complete = method.get("on_complete", ["NoOp"])
+
+    params = ["self", "sp", "sender: str"]
+    required = [a for a in args + refs if not a.get("optional")]
+    optional = [a for a in args + refs if a.get("optional")]
+    params += [f"{_identifier(a['name'])}: {TYPE_HINTS[a['type']]}" for a in required]
+    params += [f"{_identifier(a['name'])}: {TYPE_HINTS[a['type']]} = None" for a in optional]
+    if "OptIn" in on_complete:
+        params.append("opt_in: bool = False")
+
+    app_args = [_encode_arg(a) for a in args if a["type"] in ("uint64", "bytes")]
+    accounts = [a for a in args if a["type"] == "account"]
+    payments = [a for a in args if a["type"] == "pay"]
+    boxes = [f"(0, b\"{box['prefix']}\" + {_box_key(method, box['key'])})" for box in method.get("boxes", [])]
+
+    lines = [f"    def {name}({', '.join(params)}) -> list:"]
+    lines.append(f"        \"\"\"{method.get('description', name)}\"\"\"")
+    call_args = [f"\"{name}\"", f"[{', '.join(app_args)}]"]
+    if accounts:
+        names = [_identifier(a["name"]) for a in accounts]
+        if any(a.get("optional") for a in accounts):
+            lines.append(f"        accounts = [a for a in ({', '.join(names)},) if a is not None]")
+            call_args.append("accounts=accounts")
+        else:
+            call_args.append(f"accounts=[{', '.join(names)}]")
+    if boxes:
+        call_args.append(f"boxes=[{', '.join(boxes)}]")
+    if payments:
+        call_args.append(f"payment={_identifier(payments[0]['name'])}")
+    if "OptIn" in on_complete:
+        call_args.append("opt_in=opt_in")
+    lines.append(f"        return self._call(sp, sender, {', '.join(call_args)})")
+    return "\n".join(lines)
+
+
+def generate_client(name):
+    """Source of the typed client module for a variant"""
+    contract = load_contract(name)
+    abi = contract.get_abi()
+    approval_teal, _ = build_variant(name)
+    counts = inner_txn_counts(approval_teal)
+    class_name = client_class_name(contract)
+    methods = abi["methods"]
+
+    selectors = "\n".join(f"    \"{m['name']}\": b\"{m['name']}\"," for m in methods)
+    inner = "\n".join(f"    \"{m['name']}\": {counts.get(m['name'], 0)}," for m in methods)
+
+    events = []
+    for event in sorted(abi.get("events", []), key=lambda e: -len(e["name"])):
+        fields = [_event_arg(arg) for arg in event["args"]]
+        layout = "".join(EVENT_FORMATS[f["type"]] for f in fields)
+        addresses = tuple(f["name"] for f in fields if f["type"] == "address")
+        struct.calcsize(">" + layout)  # Fail at generation time on a bad layout
+        events.append(
+            f"    (b\"{event['name']}\", struct.Struct(\">{layout}\"), "
+            f"{tuple(f['name'] for f in fields)!r}, {addresses!r}),"
+        )
+
+    body = "\n\n".join(_method_source(m) for m in methods)
+    title = re.sub(r"(?<!^)(?=[A-Z])", " ", contract.__class__.__name__) + " Client"
+
+    return f'''"""
+{title}
+Generated by client_generator.py from {contract.__class__.__name__}.get_abi(); do not edit
+
+Regenerate with `python client_generator.py {name}`. Every method returns the
+unsigned transactions of its group (payment first when the method takes
+one), with box/account references and the pooled fee already set.
+"""
+
+import base64
+import struct
+
+from algosdk import encoding, transaction
+
+from fee_pooling import pooled_fee
+from status_word import decode_global_state
+
+# app_args[0] of each method
+SELECTORS = {{
+{selectors}
+}}
+
+# Worst-case inner transactions per method (from the compiled program)
+INNER_TXNS = {{
+{inner}
+}}
+
+# (prefix, layout, fields, address fields), longest prefix first
+EVENTS = [
+{chr(10).join(events)}
+]
+
+
+def decode_event(log):
+    """(event name, {{field: value}}) for one log entry, or (None, log) if unknown"""
+    for prefix, layout, fields, addresses in EVENTS:
+        if log.startswith(prefix) and len(log) - len(prefix) == layout.size:
+            values = dict(zip(fields, layout.unpack_from(log, len(prefix))))
+            for field in addresses:
+                values[field] = encoding.encode_address(values[field])
+            return prefix.decode(), values
+    return None, log
+
+
+def decode_logs(logs):
+    """Decode a list of raw or base64 log entries"""
+    return [decode_event(base64.b64decode(log) if isinstance(log, str) else log) for log in logs]
+
+
+class {class_name}:
+    """Typed calls for {contract.__class__.__name__}"""
+
+    def __init__(self, app_id):
+        self.app_id = app_id
+        self.app_address = encoding.encode_address(encoding.checksum(b"appID" + app_id.to_bytes(8, "big")))
+
+    def _call(self, sp, sender, method, app_args, accounts=(), boxes=(), payment=None, opt_in=False):
+        call = transaction.ApplicationCallTxn(
+            sender=sender,
+            sp=sp,
+            index=self.app_id,
+            on_complete=transaction.OnComplete.OptInOC if opt_in else transaction.OnComplete.NoOpOC,
+            app_args=[SELECTORS[method]] + app_args,
+            accounts=list(accounts) or None,
+            boxes=list(boxes) or None
+        )
+        call.fee = pooled_fee(sp, call, INNER_TXNS[method])
+        if payment is None:
+            return [call]
+        pay = transaction.PaymentTxn(sender=sender, sp=sp, receiver=self.app_address, amt=payment)
+        return transaction.assign_group_id([pay, call])
+
+    def global_state(self, algod_client):
+        """Decoded global state (STATUS unpacked into its legacy keys)"""
+        info = algod_client.application_info(self.app_id)
+        return decode_global_state(info["params"].get("global-state", []))
+
+    def opt_in(self, sp, sender: str) -> list:
+        """Plain opt-in"""
+        return [transaction.ApplicationOptInTxn(sender, sp, self.app_id)]
+
+{body}
+'''
+
+
+def write_client(name):
+    """Generate and write <variant>_client.py; returns its path"""
+    source = generate_client(name)
+    path = client_path(name)
+    with open(path, "w") as f:
+        f.write(source)
+    return path
+
+
+if __name__ == "__main__":
+    for variant in sys.argv[1:] or ["enhanced_contract"]:
+        try:
+            path = write_client(variant)
+            print(f"✅ {variant}: {os.path.basename(path)}")
+        except Exception as e:
+            print(f"❌ {variant}: {e}")
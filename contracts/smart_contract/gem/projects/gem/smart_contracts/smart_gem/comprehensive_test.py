@@ -10,6 +10,9 @@ from algosdk import account, mnemonic, encoding
 from algosdk.v2client import algod
 from algosdk.transaction import ApplicationCallTxn, PaymentTxn, assign_group_id
 
+from fee_pooling import FeePooler
+from preflight import preflight_for
+
 def comprehensive_test():
     """Comprehensive test of your smart contract"""
     
@@ -47,6 +50,8 @@ def comprehensive_test():
     
     try:
         client = algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
+        # Every group is simulated first; doomed ones are never submitted
+        preflight = preflight_for(client)
         
         # Get account info
         account_info = client.account_info(sender)
@@ -99,7 +104,9 @@ def comprehensive_test():
         signed_app_call = grouped_txns[1].sign(private_key)
         
         print(f"📝 Sending stake transaction (0.2 ALGO)...")
-        txid = client.send_transactions([signed_payment, signed_app_call])
+        txid, _ = preflight.send([signed_payment, signed_app_call])
+        if txid is None:
+            return False
         print(f"✅ Stake transaction sent: {txid}")
         print(f"🔍 View: https://algoexplorer.io/tx/{txid}")
         
@@ -120,18 +127,15 @@ def comprehensive_test():
         
         # Test 4: Win function
         print(f"\n🔧 Test 4: Testing Win Function")
+        # The win payout is an inner payment, so its fee is pooled on this call
         params = client.suggested_params()
-        win_txn = ApplicationCallTxn(
-            sender=sender,
-            sp=params,
-            index=app_id,
-            app_args=[b"win"],
-            on_complete=0  # NoOp
-        )
+        win_txn = FeePooler.from_variant("final_working").call(params, sender, app_id, "win")
         
         signed_win = win_txn.sign(private_key)
         print(f"📝 Sending win transaction...")
-        win_txid = client.send_transaction(signed_win)
+        win_txid, _ = preflight.send([signed_win])
+        if win_txid is None:
+            return False
         print(f"✅ Win transaction sent: {win_txid}")
         print(f"🔍 View: https://algoexplorer.io/tx/{win_txid}")
         
@@ -165,7 +169,9 @@ def comprehensive_test():
         
         signed_pause = pause_txn.sign(private_key)
         print(f"📝 Sending toggle_pause transaction...")
-        pause_txid = client.send_transaction(signed_pause)
+        pause_txid, _ = preflight.send([signed_pause])
+        if pause_txid is None:
+            return False
         print(f"✅ Pause transaction sent: {pause_txid}")
         print(f"🔍 View: https://algoexplorer.io/tx/{pause_txid}")
         
@@ -0,0 +1,546 @@
+"""
+Contract Fuzzer
+Property-based fuzzing of the enhanced contract on the local TEAL evaluator
+
+Random sequences of player, oracle and admin calls (opt-in, stakes, results,
+rewards, pause and config changes, close-out and clear-state) with random
+amounts and senders are run in-process against a bootstrapped contract.
+Besides single calls, steps build multi-call groups (a batch of
+settlements, two stakes in one group) and adversarial ones: a payment
+reused by two calls, or a call paid for by someone else's payment.
+After every step the invariants are checked:
+
+- no account (players, admins, the app) is below zero or its min balance
+- every room's pot and player count equal the stakes of the players seated
+  in it (the contract has no TOTAL_STAKED global; the room pots replace it)
+- the app account covers what it owes: its min balance (boxes included),
+  room pots and commission, the commission pool and the liquidity pool
+- a stake only grows when its player paid at least as much in that step
+- config, pause flags, the oracle and the admin set only change when an
+  admin sent the call
+
+A failing sequence is shrunk by dropping steps and simplifying arguments
+until nothing more can be removed, and printed as a reproduction.
+
+Run `python contract_fuzzer.py [runs] [steps] [seed]`.
+"""
+
+import copy
+import random
+import sys
+import time
+
+from algosdk import transaction
+
+from account_factory import derive_account
+from box_layout import (ADMIN_BOX_PREFIX, ROOM_BOX_PREFIX, decode_room, room_box_min_balance, room_box_name,
+                        seat_box_name)
+from enhanced_contract import MAX_STAKE_AMOUNT, MIN_STAKE_AMOUNT, EnhancedGameContract
+from enhanced_contract_client import EnhancedGameClient
+from game_factory import SHARD_GLOBAL_BYTES, SHARD_GLOBAL_UINTS, SHARD_LOCAL_BYTES, SHARD_LOCAL_UINTS
+from local_evaluator import (
+    LedgerState,
+    address_bytes,
+    address_string,
+    application_address,
+    evaluate_group,
+    make_payment,
+    txn_from_algosdk,
+)
+import status_word
+
+# Flat fee: a per-byte fee would size every transaction with a throwaway signature
+SP = transaction.SuggestedParams(1000, 1, 1000, "A" * 43 + "=", "localnet-v1", flat_fee=True, min_fee=1000)
+ACCOUNT_SEED = "contract-fuzzer"
+ACCOUNT_FUNDS = 1_000_000_000
+APP_FUNDS = 10_000_000
+ROOMS = (1, 2, 3)
+
+# method -> relative weight when drawing a step
+WEIGHTS = {
+    "opt_in": 4,
+    "stake": 10,
+    "result": 10,
+    "stake_rewards": 4,
+    "claim": 4,
+    "unstake": 4,
+    "create_room": 4,
+    "close_room": 3,
+    "settle_batch": 2,
+    "stake_pair": 1,
+    "reused_payment": 1,
+    "foreign_payment": 1,
+    "wait": 4,
+    "close_out": 1,
+    "clear_state": 1,
+    "toggle_pause": 1,
+    "emergency_stop": 0.05,  # Permanent, so rare
+    "withdraw_commission": 1,
+    "update_config": 2,
+    "set_oracle": 1,
+    "add_admin": 1,
+    "remove_admin": 1,
+}
+ADMIN_METHODS = ("toggle_pause", "emergency_stop", "withdraw_commission",
+                 "update_config", "set_oracle", "add_admin", "remove_admin")
+
+# Calls that carry a payment, as the adversarial shapes pair them
+PAID_CALLS = ("stake", "create_room", "stake_rewards")
+
+# Globals only an admin may change
+CONFIG_KEYS = (b"MIN_STAKE", b"MAX_STAKE", b"ORACLE_ADDR", b"ADMIN_COUNT", b"REWARD_RATE", b"STAKING_PERIOD")
+
+
+def _amounts(rng, low=MIN_STAKE_AMOUNT.value, high=MAX_STAKE_AMOUNT.value):
+    """Stake-sized amount: in the limits more often than not, otherwise on or just past them"""
+    if rng.random() < 0.6:
+        return rng.randint(low, high)
+    return rng.choice([0, 1, low - 1, low, high, high + 1, 10 * high])
+
+
+class Step:
+    """One call in a sequence: method, index of the sending actor and its arguments"""
+
+    def __init__(self, method, actor, **params):
+        self.method = method
+        self.actor = actor
+        self.params = params
+
+    def replace(self, **params):
+        return Step(self.method, self.actor, **dict(self.params, **params))
+
+    def __eq__(self, other):
+        return (self.method, self.actor, self.params) == (other.method, other.actor, other.params)
+
+    def __repr__(self):
+        args = "".join(f", {name}={value!r}" for name, value in self.params.items())
+        return f"Step({self.method!r}, {self.actor}{args})"
+
+
+class Failure:
+    """An invariant broken by steps[index]"""
+
+    def __init__(self, invariant, message, steps, index):
+        self.invariant = invariant
+        self.message = message
+        self.steps = steps
+        self.index = index
+
+    def __repr__(self):
+        return f"Failure({self.invariant!r} at step {self.index}: {self.message})"
+
+
+# ============================================================================
+# INVARIANTS
+# ============================================================================
+# Each takes the fuzzer, the snapshots before and after a step and the step,
+# and returns a message when it is broken.
+
+def no_negative_balances(fuzzer, before, after, step):
+    for address, (balance, min_balance) in after["balances"].items():
+        if balance < 0:
+            return f"{fuzzer.name(address)} balance is {balance}"
+        if 0 < balance < min_balance:
+            return f"{fuzzer.name(address)} balance {balance} is below its min balance {min_balance}"
+
+
+def room_pots_match_stakes(fuzzer, before, after, step):
+    seated = {}
+    for address, (stake, room_id) in after["stakes"].items():
+        if stake:
+            pot, players = seated.get(room_id, (0, 0))
+            seated[room_id] = (pot + stake, players + 1)
+    for room_id in set(seated) | set(after["rooms"]):
+        room = after["rooms"].get(room_id, {"pot": 0, "players": 0})
+        if (room["pot"], room["players"]) != seated.get(room_id, (0, 0)):
+            return (f"room {room_id} holds pot {room['pot']} for {room['players']} player(s), "
+                    f"seated stakes are {seated.get(room_id, (0, 0))}")
+
+
+def app_covers_obligations(fuzzer, before, after, step):
+    balance, min_balance = after["balances"][fuzzer.app_account]
+    rooms = after["rooms"].values()
+    owed = (sum(room["pot"] + room["commission"] for room in rooms)
+            + after["pools"][b"COMMISSION_POOL"] + after["pools"][b"LIQUIDITY_POOL"])
+    if balance < min_balance + owed:
+        return f"app balance {balance} is short of min balance {min_balance} plus {owed} owed"
+
+
+def stakes_paid_by_staker(fuzzer, before, after, step):
+    for address, (stake, _) in after["stakes"].items():
+        grew = stake - before["stakes"].get(address, (0, 0))[0]
+        grew += after["reward_stakes"][address] - before["reward_stakes"].get(address, 0)
+        spent = before["balances"][address][0] - after["balances"][address][0]
+        if grew > 0 and spent < grew:
+            return f"{fuzzer.name(address)} stake grew by {grew} but they paid {spent}"
+
+
+def only_admins_change_config(fuzzer, before, after, step):
+    if before["config"] != after["config"] or before["admins"] != after["admins"]:
+        sender = fuzzer.raw_actors[step.actor]
+        if sender not in before["admins"]:
+            changed = [key for key in after["config"] if before["config"].get(key) != after["config"][key]]
+            return f"non-admin actor {step.actor} changed {changed or 'the admin set'}"
+
+
+INVARIANTS = {
+    "no_negative_balances": no_negative_balances,
+    "room_pots_match_stakes": room_pots_match_stakes,
+    "app_covers_obligations": app_covers_obligations,
+    "stakes_paid_by_staker": stakes_paid_by_staker,
+    "only_admins_change_config": only_admins_change_config,
+}
+
+
+# ============================================================================
+# FUZZER
+# ============================================================================
+
+def _fork(ledger):
+    """Copy of a ledger's state; apps and parsed programs are shared, never written"""
+    fork = copy.copy(ledger)
+    fork.apps = dict(ledger.apps)
+    fork.globals = {app_id: dict(state) for app_id, state in ledger.globals.items()}
+    fork.locals = {key: dict(state) for key, state in ledger.locals.items()}
+    fork.boxes = {app_id: dict(boxes) for app_id, boxes in ledger.boxes.items()}
+    fork.balances = dict(ledger.balances)
+    return fork
+
+
+class ContractFuzzer:
+    """Generates, runs and shrinks call sequences against the enhanced contract"""
+
+    def __init__(self, players=4, shared_guards=True, invariants=None, programs=None):
+        # Actor 0 created and bootstrapped the app, so it is the first admin and the oracle
+        self.actors = [derive_account(ACCOUNT_SEED, index) for index in range(players + 1)]
+        self.raw_actors = [address_bytes(address) for address, _ in self.actors]
+        self.invariants = {name: INVARIANTS[name] for name in (invariants or INVARIANTS)}
+        self.approval, self.clear = programs or EnhancedGameContract(shared_guards).compile()
+        self.base, self.app_id = self._deploy()
+        self.client = EnhancedGameClient(self.app_id)
+        self.app_account = application_address(self.app_id)
+        self.stats = {}  # method -> [accepted, rejected]
+
+    def _deploy(self):
+        ledger = LedgerState()
+        for address, _ in self.actors:
+            ledger.fund(address, ACCOUNT_FUNDS)
+        admin = self.actors[0][0]
+        app_id = ledger.create_app(admin, self.approval, self.clear,
+                                   global_schema=(SHARD_GLOBAL_UINTS, SHARD_GLOBAL_BYTES),
+                                   local_schema=(SHARD_LOCAL_UINTS, SHARD_LOCAL_BYTES))
+        client = EnhancedGameClient(app_id)
+        group = [make_payment(admin, application_address(app_id), APP_FUNDS)]
+        group += [txn_from_algosdk(txn) for txn in client.bootstrap(SP, admin)]
+        result = evaluate_group(ledger, group)
+        if not result.ok:
+            raise RuntimeError(f"Bootstrap failed: {result.error}")
+        return ledger, app_id
+
+    def name(self, address):
+        address = address_string(address)
+        for index, (actor, _) in enumerate(self.actors):
+            if actor == address:
+                return f"actor {index}"
+        return "app account" if address == self.client.app_address else address
+
+    # -- generation -----------------------------------------------------------
+
+    def _indexes(self, addresses):
+        wanted = set(addresses)
+        return [index for index, address in enumerate(self.raw_actors) if address in wanted]
+
+    def random_step(self, rng, snapshot=None):
+        """Random step; given a snapshot, senders and targets lean towards ones that can succeed"""
+        method = rng.choices(list(WEIGHTS), weights=list(WEIGHTS.values()))[0]
+        admins = self._indexes(snapshot["admins"]) if snapshot else [0]
+        actor = rng.randrange(len(self.actors))
+        other = rng.randrange(len(self.actors))
+        # Admin calls come from an admin half of the time, anyone otherwise
+        if method in ADMIN_METHODS and admins and rng.random() < 0.5:
+            actor = rng.choice(admins)
+
+        limits = (snapshot["config"][b"MIN_STAKE"], snapshot["config"][b"MAX_STAKE"]) if snapshot else ()
+
+        if method == "stake":
+            rooms = list(snapshot["rooms"]) if snapshot else []
+            room = rng.choice(rooms) if rooms and rng.random() < 0.8 else rng.choice(ROOMS)
+            # wrong_opt_in sends the opt-in flag the sender's state does not call for
+            return Step(method, actor, room=room, amount=_amounts(rng, *limits), wrong_opt_in=rng.random() < 0.1)
+        if method == "result":
+            # Mostly from the oracle, mostly for a seated player
+            oracle = self._indexes([snapshot["config"][b"ORACLE_ADDR"]]) if snapshot else [0]
+            seated = self._indexes([a for a, (stake, _) in snapshot["stakes"].items() if stake]) if snapshot else []
+            if oracle and rng.random() < 0.8:
+                actor = oracle[0]
+            if seated and rng.random() < 0.8:
+                other = rng.choice(seated)
+            return Step(method, actor, player=other, win=rng.randrange(2))
+        if method == "settle_batch":
+            seated = self._indexes([a for a, (stake, _) in snapshot["stakes"].items() if stake]) if snapshot else []
+            players = rng.sample(seated, min(len(seated), rng.randint(2, 3))) if seated else [other]
+            return Step(method, actor, players=players, win=rng.randrange(2))
+        if method == "stake_pair":
+            return Step(method, actor, target=other, room=rng.choice(ROOMS), amount=_amounts(rng, *limits))
+        if method in ("reused_payment", "foreign_payment"):
+            # reused: actor's one payment ahead of two calls (the second for target);
+            # foreign: target pays and actor calls
+            return Step(method, actor, target=other, call=rng.choice(PAID_CALLS), room=rng.choice(ROOMS),
+                        amount=_amounts(rng, *limits))
+        if method == "stake_rewards":
+            return Step(method, actor, amount=_amounts(rng, *limits[:1]))
+        if method == "unstake":
+            return Step(method, actor, amount=rng.choice([0, 1, MIN_STAKE_AMOUNT.value, -1]))  # -1: everything
+        if method in ("create_room", "close_room"):
+            return Step(method, actor, room=rng.choice(ROOMS))
+        if method == "wait":
+            return Step(method, actor, seconds=rng.choice([1, 60, 3600, 86400]))
+        if method == "update_config":
+            low = rng.choice([0, 1, MIN_STAKE_AMOUNT.value, MAX_STAKE_AMOUNT.value])
+            return Step(method, actor, min_stake=low, max_stake=rng.choice([low, low + 1, MAX_STAKE_AMOUNT.value]))
+        if method in ("set_oracle", "add_admin", "remove_admin"):
+            return Step(method, actor, target=other)
+        return Step(method, actor)
+
+    # -- execution ------------------------------------------------------------
+
+    def _paid_call(self, ledger, call, address, amount, room):
+        """[payment, call] of one of PAID_CALLS"""
+        if call == "stake":
+            opt_in = not ledger.opted_in(address, self.app_id)
+            return self.client.stake_game(SP, address, amount, room, opt_in=opt_in)
+        if call == "create_room":
+            return self.client.create_room(SP, address, room_box_min_balance(), room)
+        return self.client.stake_rewards(SP, address, amount)
+
+    def _shaped_group(self, ledger, step):
+        """Multi-call and adversarial groups, built from single calls and regrouped"""
+        address = self.actors[step.actor][0]
+        params = step.params
+        if step.method == "settle_batch":
+            txns = []
+            for index in params["players"]:
+                player = self.actors[index][0]
+                room_id = ledger.local_state(player, self.app_id).get(b"PLAYER_ROOM") or ROOMS[0]
+                txns += self.client.process_result(SP, address, params["win"], b"fuzz", player, room_id)
+        else:
+            target = self.actors[params["target"]][0]
+            call, amount, room = params.get("call", "stake"), params["amount"], params["room"]
+            own = self._paid_call(ledger, call, address, amount, room)
+            if step.method == "stake_pair":
+                txns = own + self._paid_call(ledger, call, target, amount, room)
+            elif step.method == "reused_payment":
+                second_room = room % len(ROOMS) + 1  # The next of ROOMS (1, 2, 3)
+                second = target if call == "stake" else address
+                txns = own + self._paid_call(ledger, call, second, amount, second_room)[1:]
+            else:
+                txns = self._paid_call(ledger, call, target, amount, room)[:1] + own[1:]
+        for txn in txns:
+            txn.group = None
+        return transaction.assign_group_id(txns) if len(txns) > 1 else txns
+
+    def _group(self, ledger, step):
+        """Unsigned group for a step (None for steps that only move time)"""
+        address = self.actors[step.actor][0]
+        params = step.params
+        client = self.client
+        opted_in = ledger.opted_in(address, self.app_id)
+        if step.method in ("settle_batch", "stake_pair", "reused_payment", "foreign_payment"):
+            return self._shaped_group(ledger, step)
+        if step.method == "opt_in":
+            return client.opt_in(SP, address)
+        if step.method == "stake":
+            opt_in = opted_in == params["wrong_opt_in"]
+            return client.stake_game(SP, address, params["amount"], params["room"], opt_in=opt_in)
+        if step.method == "result":
+            player = self.actors[params["player"]][0]
+            room_id = ledger.local_state(player, self.app_id).get(b"PLAYER_ROOM") or ROOMS[0]
+            return client.process_result(SP, address, params["win"], b"fuzz", player, room_id)
+        if step.method == "stake_rewards":
+            return client.stake_rewards(SP, address, params["amount"])
+        if step.method == "claim":
+            return client.claim_rewards(SP, address)
+        if step.method == "unstake":
+            amount = params["amount"]
+            if amount < 0:
+                amount = ledger.local_state(address, self.app_id).get(b"PLAYER_STAKE_AMOUNT", 0)
+            return client.unstake(SP, address, amount)
+        if step.method == "create_room":
+            return client.create_room(SP, address, room_box_min_balance(), params["room"])
+        if step.method == "close_room":
+            return client.close_room(SP, address, params["room"])
+        if step.method in ("close_out", "clear_state"):
+            if not opted_in:
+                return None
+            # Leaving frees the seat, so the call needs the player's room and seat boxes
+            room_id = ledger.local_state(address, self.app_id).get(b"PLAYER_ROOM") or ROOMS[0]
+            leave = (transaction.ApplicationCloseOutTxn if step.method == "close_out"
+                     else transaction.ApplicationClearStateTxn)
+            return [leave(address, SP, self.app_id, boxes=[(0, room_box_name(room_id)), (0, seat_box_name(address))])]
+        if step.method == "update_config":
+            return client.update_config(SP, address, params["min_stake"], params["max_stake"])
+        if step.method in ("set_oracle", "add_admin", "remove_admin"):
+            return getattr(client, step.method)(SP, address, self.actors[params["target"]][0])
+        if step.method == "wait":
+            return None
+        return getattr(client, step.method)(SP, address)
+
+    def snapshot(self, ledger):
+        """What the invariants look at: balances, stakes, rooms, pools, config and admins"""
+        accounts = self.raw_actors + [self.app_account]
+        globals_ = ledger.globals.get(self.app_id, {})
+        boxes = ledger.boxes.get(self.app_id, {})
+        config = {key: globals_.get(key) for key in CONFIG_KEYS}
+        config[b"STATUS"] = globals_.get(b"STATUS", 0) & status_word.HALTED_MASK
+        stakes, reward_stakes = {}, {}
+        for address in self.raw_actors:
+            state = ledger.locals.get((address, self.app_id))
+            if state is not None:
+                stakes[address] = (state.get(b"PLAYER_STAKE", 0), state.get(b"PLAYER_ROOM", 0))
+                reward_stakes[address] = state.get(b"PLAYER_STAKE_AMOUNT", 0)
+        return {
+            "balances": {address: (ledger.balances.get(address, 0), ledger.min_balance(address))
+                         for address in accounts},
+            "stakes": stakes,
+            "reward_stakes": reward_stakes,
+            "pools": {key: globals_.get(key, 0) for key in (b"COMMISSION_POOL", b"LIQUIDITY_POOL")},
+            "rooms": {int.from_bytes(name[len(ROOM_BOX_PREFIX):], "big"): decode_room(value)
+                      for name, value in boxes.items() if name.startswith(ROOM_BOX_PREFIX)},
+            "config": config,
+            "admins": {name[len(ADMIN_BOX_PREFIX):] for name in boxes if name.startswith(ADMIN_BOX_PREFIX)},
+        }
+
+    def _apply(self, ledger, step):
+        if step.method == "wait":
+            ledger.timestamp += step.params["seconds"]
+            return
+        group = self._group(ledger, step)
+        if group is not None:
+            result = evaluate_group(ledger, [txn_from_algosdk(txn) for txn in group])
+            counts = self.stats.setdefault(step.method, [0, 0])
+            counts[0 if result.ok else 1] += 1
+            ledger.timestamp += 3
+
+    def _play(self, next_step):
+        """Apply next_step(snapshot, index) until it returns None, checking invariants after each"""
+        ledger = _fork(self.base)
+        before = self.snapshot(ledger)
+        steps = []
+        while True:
+            step = next_step(before, len(steps))
+            if step is None:
+                return None
+            steps.append(step)
+            self._apply(ledger, step)
+            after = self.snapshot(ledger)
+            for name, check in self.invariants.items():
+                message = check(self, before, after, step)
+                if message:
+                    return Failure(name, message, steps, len(steps) - 1)
+            before = after
+
+    def run_sequence(self, steps):
+        """Run steps on a fresh copy of the deployed app; returns the first Failure or None"""
+        return self._play(lambda snapshot, index: steps[index] if index < len(steps) else None)
+
+    # -- shrinking ------------------------------------------------------------
+
+    def _reproduces(self, steps, invariant):
+        failure = self.run_sequence(steps)
+        if failure is not None and failure.invariant == invariant:
+            return failure
+        return None
+
+    def _simpler_steps(self, step):
+        """Variants of a step with smaller or more ordinary arguments"""
+        if step.actor > 1:
+            yield Step(step.method, 1, **step.params)
+        for name, value in step.params.items():
+            if isinstance(value, bool):
+                if value:
+                    yield step.replace(**{name: False})
+            elif isinstance(value, int) and value > 0:
+                for simpler in (0, 1, value // 2):
+                    if simpler < value:
+                        yield step.replace(**{name: simpler})
+
+    def shrink(self, failure, max_runs=5000):
+        """Smallest sequence found that still breaks the same invariant"""
+        runs = 0
+        steps = failure.steps[:failure.index + 1]
+
+        # Drop chunks of steps, halving the chunk size when nothing more goes
+        size = max(1, len(steps) // 2)
+        while size >= 1 and runs < max_runs:
+            index, removed = 0, False
+            while index < len(steps) and runs < max_runs:
+                runs += 1
+                found = self._reproduces(steps[:index] + steps[index + size:], failure.invariant)
+                if found is not None:
+                    steps, failure, removed = found.steps[:found.index + 1], found, True
+                else:
+                    index += size
+            if not removed:
+                size //= 2
+
+        # Then simplify what is left, one argument at a time
+        changed = True
+        while changed and runs < max_runs:
+            changed = False
+            for index, step in enumerate(steps):
+                for simpler in self._simpler_steps(step):
+                    runs += 1
+                    found = self._reproduces(steps[:index] + [simpler] + steps[index + 1:], failure.invariant)
+                    if found is not None:
+                        steps, failure, changed = found.steps[:found.index + 1], found, True
+                        break
+                if changed:
+                    break
+        return failure
+
+    # -- driver ---------------------------------------------------------------
+
+    def fuzz(self, runs=100, steps=50, seed=0):
+        """Run random sequences until one breaks an invariant; returns it shrunk, or None"""
+        rng = random.Random(seed)
+        for _ in range(runs):
+            failure = self._play(lambda snapshot, index: self.random_step(rng, snapshot) if index < steps else None)
+            if failure is not None:
+                return self.shrink(failure)
+        return None
+
+
+def format_reproduction(failure):
+    """Failing sequence as Python that replays it"""
+    lines = [f"# Breaks {failure.invariant}: {failure.message}", "steps = ["]
+    lines += [f"    {step!r}," for step in failure.steps]
+    lines += ["]", "ContractFuzzer().run_sequence(steps)"]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    try:
+        fuzzer = ContractFuzzer()
+        print(f"🎲 Fuzzing {runs} sequence(s) of {steps} steps (seed {seed})...")
+        started = time.time()
+        failure = fuzzer.fuzz(runs, steps, seed)
+        elapsed = time.time() - started
+        calls = sum(sum(counts) for counts in fuzzer.stats.values())
+        print(f"⏱️  {calls} calls in {elapsed:.2f}s ({calls / elapsed:.0f}/s)")
+        for method, (accepted, rejected) in sorted(fuzzer.stats.items()):
+            print(f"   {method:<20} {accepted:>6} accepted {rejected:>6} rejected")
+        if failure is None:
+            print("✅ All invariants held")
+        else:
+            print(f"\n❌ {failure.invariant} broken, shrunk to {len(failure.steps)} step(s):")
+            print(format_reproduction(failure))
+            sys.exit(1)
+    except Exception as e:
+        print(f"❌ Fuzzer error: {e}")
+        sys.exit(1)
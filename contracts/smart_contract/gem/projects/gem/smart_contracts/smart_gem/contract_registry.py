@@ -0,0 +1,94 @@
+"""
+Contract Registry
+Every PyTeal contract variant in the repo and how to build it
+"""
+
+import importlib
+import os
+import sys
+
+SMART_GEM_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SMART_GEM_DIR, *[".."] * 7))
+ARTIFACTS_DIR = os.path.join(SMART_GEM_DIR, "artifacts")
+
+# name -> module, contract class (None for module-level program functions),
+# artifact prefix and the directories the module lives in / writes to
+VARIANTS = {
+    "contract": {"module": "contract", "class": "GameContract", "prefix": "game_contract"},
+    "contract_simple": {"module": "contract_simple", "class": "GameContract", "prefix": "contract_simple"},
+    "enhanced_contract": {"module": "enhanced_contract", "class": "EnhancedGameContract", "prefix": "enhanced_contract"},
+    "final_contract": {"module": "final_contract", "class": "FinalGameContract", "prefix": "final_contract"},
+    "final_working": {"module": "final_working", "class": "FinalWorkingContract", "prefix": "final_working"},
+    "game_factory": {"module": "game_factory", "class": "GameFactoryContract", "prefix": "game_factory"},
+    "run_contract": {"module": "run_contract", "class": "WorkingContract", "prefix": "working"},
+    "runnable_contract": {"module": "runnable_contract", "class": "RunnableContract", "prefix": "runnable"},
+    "working_contract": {"module": "working_contract", "class": "WorkingGameContract", "prefix": "working_contract"},
+    "working_simple": {"module": "working_simple", "class": "SimpleContract", "prefix": "simple"},
+    # Built by scripts/compile_contract.py
+    "game_contract": {
+        "module": "game_contract",
+        "class": None,
+        "prefix": "game_contract",
+        "source_dir": os.path.join(REPO_ROOT, "contracts"),
+        "artifacts_dir": os.path.join(REPO_ROOT, "contracts"),
+    },
+}
+
+
+def get_variant(name):
+    """Registry entry with defaults filled in"""
+    if name not in VARIANTS:
+        raise KeyError(f"Unknown contract variant: {name}")
+    entry = dict(VARIANTS[name])
+    entry["name"] = name
+    entry.setdefault("source_dir", SMART_GEM_DIR)
+    entry.setdefault("artifacts_dir", ARTIFACTS_DIR)
+    entry["path"] = os.path.join(entry["source_dir"], entry["module"] + ".py")
+    return entry
+
+
+def variant_names():
+    return list(VARIANTS)
+
+
+def artifact_paths(name):
+    """(approval, clear) artifact paths for a variant"""
+    entry = get_variant(name)
+    base = os.path.join(entry["artifacts_dir"], entry["prefix"])
+    return base + "_approval.teal", base + "_clear.teal"
+
+
+def compile_contract(contract, peephole=False):
+    """contract.compile(), then the verified peephole rewrites (see teal_optimizer.py) when asked"""
+    approval_teal, clear_teal = contract.compile()
+    if peephole:
+        from teal_optimizer import optimize_compiled
+        approval_teal, clear_teal = optimize_compiled(approval_teal, clear_teal)
+    return approval_teal, clear_teal
+
+
+class ModuleContract:
+    """compile() for a module that only defines approval_program/clear_state_program"""
+
+    def __init__(self, module):
+        self.module = module
+
+    def compile(self):
+        from pyteal import compileTeal, Mode
+
+        approval_teal = compileTeal(self.module.approval_program(), mode=Mode.Application, version=8)
+        clear_teal = compileTeal(self.module.clear_state_program(), mode=Mode.Application, version=8)
+        return approval_teal, clear_teal
+
+
+def build_variant(name, peephole=False):
+    """Import a variant and compile it; returns (approval_teal, clear_teal)"""
+    entry = get_variant(name)
+    if entry["source_dir"] not in sys.path:
+        sys.path.append(entry["source_dir"])
+    module = importlib.import_module(entry["module"])
+    if entry["class"] is not None:
+        contract = getattr(module, entry["class"])()
+    else:
+        contract = ModuleContract(module)
+    return compile_contract(contract, peephole)
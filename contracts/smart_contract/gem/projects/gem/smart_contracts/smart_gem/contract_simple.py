@@ -126,6 +126,8 @@ def approval_program():
     
     # Enhanced slash function with comprehensive validation
     def slash():
+        commission = ScratchVar(TealType.uint64)
+        slash_amount = ScratchVar(TealType.uint64)
         return Seq([
             # Security checks
             Assert(App.globalGet(PAUSED) == Int(0)),  # Contract not paused
@@ -138,22 +140,22 @@ def approval_program():
             App.localPut(Int(0), PLAYER_LOSSES, App.localGet(Int(0), PLAYER_LOSSES) + Int(1)),
             
             # Calculate commission and slash amount
-            commission = App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)
-            slash_amount = TRANSACTION_FEE + commission
+            commission.store(App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)),
+            slash_amount.store(TRANSACTION_FEE + commission.load()),
             
             # Validate slash amount doesn't exceed stake
-            Assert(slash_amount <= App.localGet(Int(0), PLAYER_STAKE)),
+            Assert(slash_amount.load() <= App.localGet(Int(0), PLAYER_STAKE)),
             
             # Update global state
-            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - slash_amount),
-            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + commission),
+            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - slash_amount.load()),
+            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + commission.load()),
             
             # Return remaining stake to player
             InnerTxnBuilder.Begin(),
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: App.localGet(Int(0), PLAYER_STAKE) - slash_amount,
+                TxnField.amount: App.localGet(Int(0), PLAYER_STAKE) - slash_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
@@ -166,6 +168,8 @@ def approval_program():
     
     # Enhanced reward function with comprehensive validation
     def reward():
+        bonus = ScratchVar(TealType.uint64)
+        reward_amount = ScratchVar(TealType.uint64)
         return Seq([
             # Security checks
             Assert(App.globalGet(PAUSED) == Int(0)),  # Contract not paused
@@ -175,13 +179,13 @@ def approval_program():
             Assert(App.localGet(Int(0), PLAYER_STAKE) > Int(0)),  # Player must have staked
             
             # Calculate reward with overflow protection
-            bonus = App.localGet(Int(0), PLAYER_STAKE) * BONUS_RATE / Int(1000000)
-            reward_amount = App.localGet(Int(0), PLAYER_STAKE) + bonus
+            bonus.store(App.localGet(Int(0), PLAYER_STAKE) * BONUS_RATE / Int(1000000)),
+            reward_amount.store(App.localGet(Int(0), PLAYER_STAKE) + bonus.load()),
             
             # Update player stats
             App.localPut(Int(0), PLAYER_WINS, App.localGet(Int(0), PLAYER_WINS) + Int(1)),
             App.localPut(Int(0), PLAYER_SCORE, App.localGet(Int(0), PLAYER_SCORE) + Int(1)),
-            App.localPut(Int(0), PLAYER_TOTAL_EARNED, App.localGet(Int(0), PLAYER_TOTAL_EARNED) + bonus),
+            App.localPut(Int(0), PLAYER_TOTAL_EARNED, App.localGet(Int(0), PLAYER_TOTAL_EARNED) + bonus.load()),
             
             # Update global state
             App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - App.localGet(Int(0), PLAYER_STAKE)),
@@ -192,7 +196,7 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: reward_amount,
+                TxnField.amount: reward_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
@@ -205,13 +209,14 @@ def approval_program():
     
     # Enhanced admin function to withdraw commission
     def withdraw_commission():
+        commission_amount = ScratchVar(TealType.uint64)
         return Seq([
             # Check if caller is admin
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
             
             # Check if there's commission to withdraw
-            commission_amount = App.globalGet(COMMISSION_POOL),
-            Assert(commission_amount > Int(0)),
+            commission_amount.store(App.globalGet(COMMISSION_POOL)),
+            Assert(commission_amount.load() > Int(0)),
             
             # Reset commission pool
             App.globalPut(COMMISSION_POOL, Int(0)),
@@ -221,7 +226,7 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: commission_amount,
+                TxnField.amount: commission_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
@@ -231,17 +236,19 @@ def approval_program():
     
     # Admin function to pause/unpause contract
     def toggle_pause():
+        current_pause = ScratchVar(TealType.uint64)
+        new_pause = ScratchVar(TealType.uint64)
         return Seq([
             # Check if caller is admin
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
             
             # Toggle pause state
-            current_pause = App.globalGet(PAUSED),
-            new_pause = If(current_pause == Int(0), Int(1), Int(0)),
-            App.globalPut(PAUSED, new_pause),
+            current_pause.store(App.globalGet(PAUSED)),
+            new_pause.store(If(current_pause.load() == Int(0), Int(1), Int(0))),
+            App.globalPut(PAUSED, new_pause.load()),
             
             # Update game state if pausing
-            If(And(new_pause == Int(1), App.globalGet(GAME_STATE) != GAME_IDLE)).Then(
+            If(And(new_pause.load() == Int(1), App.globalGet(GAME_STATE) != GAME_IDLE)).Then(
                 App.globalPut(GAME_STATE, GAME_PAUSED)
             ),
             
@@ -250,24 +257,26 @@ def approval_program():
     
     # Admin function to update stake limits
     def update_stake_limits():
+        new_min_stake = ScratchVar(TealType.uint64)
+        new_max_stake = ScratchVar(TealType.uint64)
         return Seq([
             # Check if caller is admin
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
             
             # Validate new limits from application args
-            new_min_stake = Btoi(Txn.application_args[1]),
-            new_max_stake = Btoi(Txn.application_args[2]),
+            new_min_stake.store(Btoi(Txn.application_args[1])),
+            new_max_stake.store(Btoi(Txn.application_args[2])),
             
             # Validate limits
             Assert(And(
-                new_min_stake > Int(0),
-                new_max_stake > new_min_stake,
-                new_max_stake <= Int(100000000)  # Max 100 ALGO
+                new_min_stake.load() > Int(0),
+                new_max_stake.load() > new_min_stake.load(),
+                new_max_stake.load() <= Int(100000000)  # Max 100 ALGO
             )),
             
             # Update limits
-            App.globalPut(MIN_STAKE, new_min_stake),
-            App.globalPut(MAX_STAKE, new_max_stake),
+            App.globalPut(MIN_STAKE, new_min_stake.load()),
+            App.globalPut(MAX_STAKE, new_max_stake.load()),
             
             Approve()
         ])
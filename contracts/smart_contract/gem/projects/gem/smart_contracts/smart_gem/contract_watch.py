@@ -0,0 +1,319 @@
+"""
+Contract Watch Mode
+Rebuilds only the contract variants affected by a saved file
+
+A long-lived worker process keeps PyTeal imported; on every change the
+watcher works out which variants import the edited module (directly or
+transitively), asks the worker to rebuild just those, writes the artifacts
+and prints the size/cost delta against the previous build. A TEAL-to-PyTeal
+source map is then written next to the approval artifact (skipped with
+--no-sourcemaps). PyTeal's sourcemap gate makes every compile several times
+slower, so maps come from a second worker, after the delta is out.
+"""
+
+import ast
+import multiprocessing
+import os
+import sys
+import time
+
+from contract_registry import artifact_paths, get_variant, variant_names
+from teal_metrics import format_delta, program_metrics
+from teal_sourcemap import write_sourcemap
+
+POLL_INTERVAL = 0.2  # seconds between mtime scans
+
+
+# ============================================================================
+# IMPORT GRAPH
+# ============================================================================
+
+def local_imports(path, local_modules):
+    """Local modules imported by a python file"""
+    try:
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError):
+        return set()
+    found = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name.split(".")[0] for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module.split(".")[0]]
+        else:
+            continue
+        found.update(name for name in names if name in local_modules)
+    return found
+
+
+class ImportGraph:
+    """Which local modules each contract variant depends on"""
+
+    def __init__(self, variants):
+        self.variants = variants
+        self.source_dirs = list(dict.fromkeys(get_variant(name)["source_dir"] for name in variants))
+        self.modules = {}  # module name -> file path
+        self.edges = {}
+        self.scan()
+        self.refresh()
+
+    def scan(self):
+        """Re-list the source directories; returns the modules added or removed since the last scan"""
+        modules = {}
+        for directory in self.source_dirs:
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith(".py"):
+                    modules.setdefault(filename[:-3], os.path.join(directory, filename))
+        moved = set(modules) ^ set(self.modules)
+        self.modules = modules
+        for module in set(self.edges) - set(modules):
+            del self.edges[module]
+        return moved
+
+    def refresh(self, modules=None):
+        """Re-read the imports of the given modules (all when None)"""
+        for module in modules or self.modules:
+            if module in self.modules:
+                self.edges[module] = local_imports(self.modules[module], self.modules)
+
+    def dependencies(self, module):
+        """Transitive local dependencies of a module, itself included"""
+        seen = set()
+        pending = [module]
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            pending.extend(self.edges.get(current, ()))
+        return seen
+
+    def affected(self, changed_modules):
+        """Variants that must be rebuilt after the given modules changed"""
+        changed = set(changed_modules)
+        return [
+            name for name in self.variants
+            if self.dependencies(get_variant(name)["module"]) & changed
+        ]
+
+    def dependents(self, changed_modules):
+        """Every local module that (transitively) imports a changed module"""
+        changed = set(changed_modules)
+        return {module for module in self.modules if self.dependencies(module) & changed}
+
+    def mtimes(self):
+        stamps = {}
+        for module, path in self.modules.items():
+            try:
+                stamps[module] = os.stat(path).st_mtime_ns
+            except OSError:
+                stamps[module] = None
+        return stamps
+
+
+# ============================================================================
+# WARM BUILD WORKER
+# ============================================================================
+
+def _worker_main(connection, source_dirs, sourcemaps):
+    """Build loop run inside the worker process"""
+    for directory in source_dirs:
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+    if sourcemaps:
+        from teal_sourcemap import enable_sourcemaps
+        sourcemaps = enable_sourcemaps()  # must precede the first pyteal import
+    import pyteal  # noqa: F401 - imported once, kept warm
+
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        stale, names, peephole = request
+        for module in stale:
+            sys.modules.pop(module, None)
+        from contract_registry import build_variant
+        from teal_sourcemap import build_variant_sourcemap
+        results = {}
+        for name in names:
+            started = time.perf_counter()
+            try:
+                if sourcemaps:
+                    # One compile yields both the TEAL and its map
+                    approval_teal, clear_teal, lines = build_variant_sourcemap(name)
+                    results[name] = {"approval": approval_teal, "clear": clear_teal}
+                    if lines:
+                        results[name]["sourcemap"] = lines
+                else:
+                    approval_teal, clear_teal = build_variant(name, peephole=peephole)
+                    results[name] = {"approval": approval_teal, "clear": clear_teal}
+            except BaseException as e:  # SyntaxError etc. must not kill the worker
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+            results[name]["seconds"] = time.perf_counter() - started
+        connection.send(results)
+
+
+class BuildWorker:
+    """Keeps a PyTeal process alive between rebuilds; a sourcemaps worker returns mapped builds"""
+
+    def __init__(self, source_dirs, sourcemaps=False):
+        self.source_dirs = list(source_dirs)
+        self.sourcemaps = sourcemaps
+        self.process = None
+        self.connection = None
+        self.start()
+
+    def start(self):
+        parent, child = multiprocessing.Pipe()
+        self.connection = parent
+        # A fresh interpreter, so the source map gate is set before pyteal loads
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=_worker_main, args=(child, self.source_dirs, self.sourcemaps), daemon=True
+        )
+        self.process.start()
+
+    def build(self, names, stale=(), peephole=False):
+        """Rebuild variants; restarts the worker if it died"""
+        if not self.process.is_alive():
+            self.start()
+        try:
+            self.connection.send((list(stale), list(names), peephole))
+            return self.connection.recv()
+        except (EOFError, BrokenPipeError):
+            self.start()
+            return {name: {"error": "build worker crashed"} for name in names}
+
+    def close(self):
+        if self.process is not None and self.process.is_alive():
+            self.connection.send(None)
+            self.process.join(timeout=2)
+
+
+# ============================================================================
+# WATCHER
+# ============================================================================
+
+class ContractWatcher:
+    """Polls contract sources and rebuilds affected variants"""
+
+    def __init__(self, variants=None, peephole=False, write_artifacts=True, sourcemaps=True):
+        self.variants = list(variants or variant_names())
+        self.peephole = peephole
+        self.write_artifacts = write_artifacts
+        # Maps describe PyTeal's own output, not the peephole pass
+        self.sourcemaps = sourcemaps and not peephole
+        self.graph = ImportGraph(self.variants)
+        self.source_dirs = {get_variant(name)["source_dir"] for name in self.variants}
+        self.worker = BuildWorker(self.source_dirs)
+        self.mapper = None  # started on the first map, so a failing first build costs nothing
+        self.mapped_stale = set()
+        self.metrics = {}
+        self.stamps = self.graph.mtimes()
+
+    def rebuild(self, names, stale=()):
+        """Build the given variants and report their deltas"""
+        if not names:
+            return {}
+        started = time.perf_counter()
+        results = self.worker.build(names, stale=stale, peephole=self.peephole)
+        for name in names:
+            self._report(name, results[name])
+        print(f"⏱️  Rebuilt {len(names)} variant(s) in {time.perf_counter() - started:.2f}s")
+        self.mapped_stale |= set(stale)
+        built = [name for name in names if "error" not in results[name]]
+        if self.sourcemaps and built:
+            self.map(built)
+        return results
+
+    def map(self, names):
+        """Build and write source maps once the deltas are out"""
+        started = time.perf_counter()
+        if self.mapper is None:
+            self.mapper = BuildWorker(self.source_dirs, sourcemaps=True)
+        results = self.mapper.build(names, stale=self.mapped_stale)
+        self.mapped_stale = set()
+        for name in names:
+            result = results[name]
+            if "sourcemap" not in result:
+                print(f"⚠️  {name}: no source map ({result.get('error', 'not compiled through compileTeal()')})")
+            elif self.write_artifacts:
+                # The mapped TEAL differs from the plain build in scratch slot numbers at most
+                approval_path, _ = artifact_paths(name)
+                with open(approval_path, "w") as f:
+                    f.write(result["approval"])
+                write_sourcemap(approval_path, result["approval"], result["sourcemap"])
+        print(f"🗺️  Mapped {len(names)} variant(s) in {time.perf_counter() - started:.2f}s")
+        return results
+
+    def _report(self, name, result):
+        if "error" in result:
+            print(f"❌ {name}: {result['error']}")
+            return
+        approval = program_metrics(result["approval"])
+        clear = program_metrics(result["clear"])
+        previous = self.metrics.get(name)
+        print(f"✅ {name}: approval {format_delta(previous and previous[0], approval)}"
+              f" | clear {format_delta(previous and previous[1], clear)}")
+        self.metrics[name] = (approval, clear)
+        if self.write_artifacts:
+            approval_path, clear_path = artifact_paths(name)
+            os.makedirs(os.path.dirname(approval_path), exist_ok=True)
+            with open(approval_path, "w") as f:
+                f.write(result["approval"])
+            with open(clear_path, "w") as f:
+                f.write(result["clear"])
+
+    def poll(self):
+        """Check for edits once; rebuild and return affected variant names"""
+        moved = self.graph.scan()
+        stamps = self.graph.mtimes()
+        changed = {module for module, stamp in stamps.items() if stamp != self.stamps.get(module)} | moved
+        self.stamps = stamps
+        if not changed:
+            return []
+        # Importers of a removed module are found through the edges read before it went away
+        affected = set(self.graph.affected(changed))
+        stale = self.graph.dependents(changed)
+        # An added or removed file can change what any import resolves to, so re-read them all
+        self.graph.refresh(None if moved else changed)
+        affected.update(self.graph.affected(changed))
+        stale |= self.graph.dependents(changed)
+        names = [name for name in self.variants if name in affected]
+        if names:
+            print(f"📝 Changed: {', '.join(sorted(changed))}")
+            self.rebuild(names, stale=stale)
+        return names
+
+    def run(self):
+        print(f"👀 Watching {len(self.variants)} contract variant(s) (Ctrl+C to stop)")
+        self.rebuild(self.variants, stale=self.graph.modules)
+        try:
+            while True:
+                time.sleep(POLL_INTERVAL)
+                self.poll()
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+        finally:
+            self.close()
+
+    def close(self):
+        self.worker.close()
+        if self.mapper is not None:
+            self.mapper.close()
+
+
+def watch(variants=None, peephole=False, sourcemaps=True):
+    """Entry point used by the smart_contracts CLI"""
+    unknown = [name for name in variants or [] if name not in variant_names()]
+    if unknown:
+        print(f"❌ Unknown contract variant(s): {', '.join(unknown)}")
+        print(f"Available variants: {', '.join(variant_names())}")
+        return False
+    ContractWatcher(variants, peephole=peephole, sourcemaps=sourcemaps).run()
+    return True
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    watch(args, peephole="--peephole" in sys.argv, sourcemaps="--no-sourcemaps" not in sys.argv)
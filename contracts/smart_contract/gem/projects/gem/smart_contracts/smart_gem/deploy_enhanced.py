@@ -32,6 +32,11 @@ from algokit_utils import (
 )
 
 from enhanced_contract import EnhancedGameContract
+from box_layout import admin_box_min_balance
+from enhanced_contract_client import EnhancedGameClient
+from preflight import preflight_for
+from status_word import decode_global_state
+from teal_metrics import program_metrics
 
 class EnhancedDeploymentManager:
     """Enhanced deployment manager with comprehensive features"""
@@ -44,6 +49,7 @@ class EnhancedDeploymentManager:
         # Initialize clients
         self.algod_client = get_algod_client(network)
         self.indexer_client = get_indexer_client(network)
+        self.preflight = preflight_for(self.algod_client)
         
         # Get account
         if network == "localnet":
@@ -76,8 +82,8 @@ class EnhancedDeploymentManager:
             
             # Check for required patterns
             required_patterns = [
-                "GAME_STATE", "TOTAL_STAKED", "ADMIN_COUNT",
-                "EMERGENCY_STOP", "PAUSED", "ORACLE_ADDRESS"
+                "STATUS", "COMMISSION_POOL", "ADMIN_COUNT",
+                "EMERGENCY_STOP", "ORACLE_ADDR"
             ]
             
             for pattern in required_patterns:
@@ -133,9 +139,9 @@ class EnhancedDeploymentManager:
             },
             "local_state_schema": {
                 "num_byte_slices": 8,   # Optimized for all local state keys
-                "num_ints": 8
+                "num_ints": 11
             },
-            "extra_pages": 0,  # No extra pages needed
+            "extra_pages": program_metrics(approval_teal)["pages"] - 1,
             "approval_program_size": len(approval_teal),
             "clear_state_program_size": len(clear_teal)
         })
@@ -198,6 +204,39 @@ class EnhancedDeploymentManager:
             print(f"❌ Deployment failed: {e}")
             raise
     
+    def bootstrap_admin(self) -> bool:
+        """Fund the app account and register the deployer as first admin"""
+        print("🔑 Bootstrapping admin set...")
+        
+        try:
+            app_id = self.deployment_info["app_id"]
+            app_address = self.deployment_info["app_address"]
+            params = self.algod_client.suggested_params()
+            
+            # The admin box is held against the app account's minimum balance
+            fund_txn = transaction.PaymentTxn(
+                sender=self.account.address,
+                sp=params,
+                receiver=app_address,
+                amt=100000 + admin_box_min_balance()
+            )
+            bootstrap_txn, = EnhancedGameClient(app_id).bootstrap(params, self.account.address)
+            transaction.assign_group_id([fund_txn, bootstrap_txn])
+            signed = [
+                fund_txn.sign(self.account.private_key),
+                bootstrap_txn.sign(self.account.private_key)
+            ]
+            tx_id, result = self.preflight.send(signed, wait_rounds=4)
+            if tx_id is None:
+                raise RuntimeError(result.reason() or "bootstrap group was not sent")
+            
+            print(f"✅ Admin bootstrapped: {self.account.address}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Admin bootstrap failed: {e}")
+            return False
+    
     def verify_deployment(self) -> bool:
         """Verify deployment by checking contract state"""
         print("🔍 Verifying deployment...")
@@ -220,11 +259,12 @@ class EnhancedDeploymentManager:
             # Verify global state
             global_state = app_info.get('params', {}).get('global-state', [])
             expected_keys = [
-                "GAME_STATE", "TOTAL_STAKED", "COMMISSION_POOL",
+                "GAME_STATE", "COMMISSION_POOL",
                 "ADMIN_COUNT", "PAUSED", "EMERGENCY_STOP"
             ]
             
-            found_keys = [key['key'] for key in global_state]
+            # Pause/emergency/game state are unpacked from the STATUS word
+            found_keys = list(decode_global_state(global_state))
             for expected_key in expected_keys:
                 if expected_key not in found_keys:
                     print(f"❌ Missing global state key: {expected_key}")
@@ -290,14 +330,14 @@ class EnhancedDeploymentManager:
             
             # Check global state initialization
             global_state = app_info.get('params', {}).get('global-state', [])
-            state_dict = {key['key']: key['value'] for key in global_state}
+            state_dict = decode_global_state(global_state)
             
             # Verify initial state
-            if state_dict.get('GAME_STATE', {}).get('uint', 0) != 0:  # Should be GAME_IDLE
+            if state_dict.get('GAME_STATE', 0) != 0:  # Should be GAME_IDLE
                 print("❌ Game state not properly initialized")
                 return False
             
-            if state_dict.get('ADMIN_COUNT', {}).get('uint', 0) != 1:
+            if state_dict.get('ADMIN_COUNT', 0) != 1:
                 print("❌ Admin count not properly initialized")
                 return False
             
@@ -324,6 +364,9 @@ class EnhancedDeploymentManager:
             # Deploy contract
             deployment_info = self.deploy_contract()
             
+            if not self.bootstrap_admin():
+                return False
+            
             # Post-deployment verification
             if not self.verify_deployment():
                 return False
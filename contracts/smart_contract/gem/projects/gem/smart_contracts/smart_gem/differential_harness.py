@@ -0,0 +1,263 @@
+"""
+Differential Harness
+Runs identical randomized games through every contract variant and diffs them
+
+The variants share one set of business rules: a player stakes, the game is
+won or lost, a win pays the stake plus a bonus and a loss keeps a commission.
+They spell it differently (contract.py `slash`/`reward`, runnable_contract.py
+`win`/`lose`, final_contract.py `process_win`/`process_loss`, the enhanced
+contract's oracle-called `process_result` in a room), so METHODS maps each
+variant's calls onto the shared rules. A scenario is a seeded list of games
+(player, stake, win); every variant runs the whole list in one pass on its
+own local ledger, and each game records whether the stake and the result
+were accepted, what the player was paid, the commission kept and how much
+of the stake the contract still accounts for once the game is settled. Everything is compared against the
+reference variant, and each difference is reported per game and field.
+
+Variants that do not build are reported as such, since they cannot be
+compared until they do.
+
+Run `python differential_harness.py [games] [seed]`.
+"""
+
+import random
+import sys
+
+from account_factory import derive_account
+from box_layout import (ROOM_BOX_PREFIX, admin_box_ref, decode_room, room_box_min_balance, room_box_name,
+                        seat_box_name)
+from contract_registry import build_variant, get_variant
+from enhanced_contract import MAX_STAKE_AMOUNT, MIN_STAKE_AMOUNT, STAKE_AMOUNT
+from local_evaluator import (
+    LedgerState,
+    address_bytes,
+    application_address,
+    evaluate_group,
+    make_app_call,
+    make_payment,
+)
+
+REFERENCE = "enhanced_contract"
+ACCOUNT_SEED = "differential-harness"
+ACCOUNT_FUNDS = 1_000_000_000
+APP_FUNDS = 100_000_000  # Pays win bonuses
+ROOM_ID = 1
+GLOBAL_SCHEMA = (32, 32)  # Room for every variant's globals
+LOCAL_SCHEMA = (11, 5)
+
+# variant -> its calls for the shared rules. "result" variants take the outcome
+# as an argument from the oracle; the others have the player call win or loss.
+METHODS = {
+    "contract": {"stake": "stake", "win": "reward", "loss": "slash"},
+    "contract_simple": {"stake": "stake", "win": "reward", "loss": "slash"},
+    "game_contract": {"stake": "stake", "win": "reward", "loss": "slash"},
+    "run_contract": {"stake": "stake", "win": "win", "loss": "lose"},
+    "runnable_contract": {"stake": "stake", "win": "win", "loss": "lose"},
+    "working_simple": {"stake": "stake", "win": "win", "loss": "lose"},
+    "final_working": {"stake": "stake", "win": "win", "loss": "lose"},
+    "working_contract": {"stake": "stake_game", "win": "process_win", "loss": "process_loss"},
+    "final_contract": {"stake": "stake_game", "win": "process_win", "loss": "process_loss"},
+    "enhanced_contract": {"stake": "stake_game", "result": "process_result", "rooms": True, "bootstrap": True},
+}
+
+FIELDS = ("stake_ok", "result_ok", "payout", "commission", "staked")
+
+
+def random_games(count, players, seed=0):
+    """[(player index, stake, win)]; stakes are mostly in range, sometimes on or past the limits"""
+    rng = random.Random(seed)
+    low, high = MIN_STAKE_AMOUNT.value, MAX_STAKE_AMOUNT.value
+    games = []
+    for _ in range(count):
+        if rng.random() < 0.8:
+            stake = rng.choice([STAKE_AMOUNT.value, rng.randint(low, high)])
+        else:
+            stake = rng.choice([low - 1, low, high, high + 1])
+        games.append((rng.randrange(players), stake, rng.random() < 0.5))
+    return games
+
+
+class VariantRun:
+    """One variant deployed on its own ledger, driven through the shared rules"""
+
+    def __init__(self, name, approval, clear, players):
+        self.name = name
+        self.methods = METHODS[name]
+        self.ledger = LedgerState()
+        self.admin = derive_account(ACCOUNT_SEED, 0)[0]
+        self.players = [derive_account(ACCOUNT_SEED, index)[0] for index in range(1, players + 1)]
+        for address in [self.admin] + self.players:
+            self.ledger.fund(address, ACCOUNT_FUNDS)
+
+        self.app_id = self.ledger.create_app(self.admin, approval, clear,
+                                             global_schema=GLOBAL_SCHEMA, local_schema=LOCAL_SCHEMA)
+        self.app_address = application_address(self.app_id)
+        setup = [make_payment(self.admin, self.app_address, APP_FUNDS)]
+        if self.methods.get("bootstrap"):
+            setup.append(make_app_call(self.admin, self.app_id, ["bootstrap"],
+                                       Boxes=[admin_box_ref(self.admin)]))
+        self._require(setup, "funding")
+        if self.methods.get("rooms"):
+            self._require([make_payment(self.admin, self.app_address, room_box_min_balance()),
+                           make_app_call(self.admin, self.app_id, ["create_room", ROOM_ID],
+                                         Boxes=[(0, room_box_name(ROOM_ID))])], "room")
+        for player in self.players:
+            self._require([make_app_call(player, self.app_id, on_complete=1)], "opt-in")
+
+    def _require(self, group, what):
+        result = evaluate_group(self.ledger, group)
+        if not result.ok:
+            raise RuntimeError(f"{self.name} {what} failed: {result.error}")
+
+    def observe(self):
+        """(commission kept, stake still accounted for) in this variant's globals"""
+        state = self.ledger.globals.get(self.app_id, {})
+        commission = state.get(b"COMMISSION_POOL", 0)
+        if self.methods.get("rooms"):
+            # Commission waits in the room until it is closed; stakes live in room pots
+            rooms = [decode_room(value) for name, value in self.ledger.boxes.get(self.app_id, {}).items()
+                     if name.startswith(ROOM_BOX_PREFIX)]
+            return commission + sum(room["commission"] for room in rooms), sum(room["pot"] for room in rooms)
+        return commission, state.get(b"TOTAL_STAKED")
+
+    def _room_refs(self, player):
+        """Room and seat boxes a stake or settlement of player touches"""
+        return [(0, room_box_name(ROOM_ID)), (0, seat_box_name(player))] if self.methods.get("rooms") else []
+
+    def _stake(self, player, stake):
+        args = [self.methods["stake"]] + ([ROOM_ID] if self.methods.get("rooms") else [])
+        return [make_payment(player, self.app_address, stake),
+                make_app_call(player, self.app_id, args, Boxes=self._room_refs(player))]
+
+    def _result(self, player, win):
+        # One inner payment to the player, paid for by the caller
+        if "result" in self.methods:
+            return [make_app_call(self.admin, self.app_id, [self.methods["result"], int(win), b"seed"],
+                                  accounts=[player], fee=2000, Boxes=self._room_refs(player))]
+        return [make_app_call(player, self.app_id, [self.methods["win" if win else "loss"]], fee=2000)]
+
+    def play(self, player_index, stake, win):
+        """Stake then settle one game; returns its FIELDS"""
+        player = self.players[player_index]
+        raw = address_bytes(player)
+        commission_before, staked_before = self.observe()
+
+        stake_ok = evaluate_group(self.ledger, self._stake(player, stake)).ok
+        group = self._result(player, win)
+        balance = self.ledger.balances.get(raw, 0)
+        result_ok = evaluate_group(self.ledger, group).ok
+        # What the player received, before any fee it paid for the call
+        fees = sum(txn["Fee"] for txn in group if txn["Sender"] == raw) if result_ok else 0
+        payout = self.ledger.balances.get(raw, 0) - balance + fees
+
+        commission, staked = self.observe()
+        return {
+            "stake_ok": stake_ok,
+            "result_ok": result_ok,
+            "payout": payout,
+            "commission": commission - commission_before,
+            "staked": (staked or 0) - (staked_before or 0) if staked is not None else None,
+        }
+
+
+class DifferentialReport:
+    """Per-variant game outcomes and their differences from the reference"""
+
+    def __init__(self, games, reference=REFERENCE):
+        self.games = games
+        self.reference = reference
+        self.outcomes = {}  # variant -> [FIELDS per game]
+        self.build_errors = {}  # variant -> message
+        self.divergences = {}  # variant -> [(game index, field, reference value, variant value)]
+
+    def compare(self):
+        expected = self.outcomes[self.reference]
+        for name, outcomes in self.outcomes.items():
+            if name == self.reference:
+                continue
+            self.divergences[name] = [
+                (index, field, want[field], got[field])
+                for index, (want, got) in enumerate(zip(expected, outcomes))
+                for field in FIELDS
+                if want[field] != got[field]
+            ]
+        return self
+
+    def fields_diverging(self, name):
+        """{field: number of games where it differs}"""
+        counts = {}
+        for _, field, _, _ in self.divergences.get(name, []):
+            counts[field] = counts.get(field, 0) + 1
+        return counts
+
+    def totals(self, name):
+        outcomes = self.outcomes[name]
+        return {
+            "paid": sum(o["payout"] for o in outcomes),
+            "commission": sum(o["commission"] for o in outcomes),
+            "staked": sum(o["staked"] or 0 for o in outcomes),
+        }
+
+    @property
+    def equivalent(self):
+        """Variants that matched the reference on every game"""
+        return [name for name, found in self.divergences.items() if not found]
+
+
+def run_differential(games, variants=None, players=4, reference=REFERENCE):
+    """Run games through each variant (all with entries in METHODS by default); returns the compared report"""
+    variants = list(variants or METHODS)
+    if reference not in variants:
+        variants.insert(0, reference)
+    report = DifferentialReport(games, reference)
+    for name in variants:
+        try:
+            # game_contract lives outside smart_gem
+            source_dir = get_variant(name)["source_dir"]
+            if source_dir not in sys.path:
+                sys.path.append(source_dir)
+            approval, clear = build_variant(name)
+            run = VariantRun(name, approval, clear, players)
+        except BaseException as e:  # SyntaxError in a variant's source must not stop the rest
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            report.build_errors[name] = f"{type(e).__name__}: {e}"
+            continue
+        report.outcomes[name] = [run.play(*game) for game in games]
+    if reference not in report.outcomes:
+        raise RuntimeError(f"Reference variant {reference} failed: {report.build_errors[reference]}")
+    return report.compare()
+
+
+def print_report(report, examples=3):
+    reference = report.totals(report.reference)
+    print(f"📐 {len(report.games)} game(s), reference {report.reference}: paid {reference['paid']}, "
+          f"commission {reference['commission']}, still staked {reference['staked']}")
+    for name, found in report.divergences.items():
+        totals = report.totals(name)
+        if not found:
+            print(f"\n✅ {name}: identical on every game")
+            continue
+        print(f"\n❌ {name}: {len(found)} difference(s) "
+              f"(paid {totals['paid']}, commission {totals['commission']}, still staked {totals['staked']})")
+        for field, count in report.fields_diverging(name).items():
+            print(f"   {field}: {count} game(s)")
+        for index, field, want, got in found[:examples]:
+            player, stake, win = report.games[index]
+            outcome = "win" if win else "loss"
+            print(f"   game {index} ({outcome}, stake {stake}): {field} {got} vs {want}")
+    for name, error in report.build_errors.items():
+        print(f"\n⚠️  {name}: not compared, does not build ({error})")
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    try:
+        print_report(run_differential(random_games(count, 4, seed)))
+    except Exception as e:
+        print(f"❌ Differential run failed: {e}")
+        sys.exit(1)
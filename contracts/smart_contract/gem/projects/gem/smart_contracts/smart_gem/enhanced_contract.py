@@ -15,6 +15,10 @@ from algokit_utils import ApplicationClient
 import hashlib
 import json
 
+import box_layout
+import status_word
+from method_guards import MethodGuards
+
 # ============================================================================
 # CONSTANTS AND CONFIGURATION
 # ============================================================================
@@ -24,7 +28,7 @@ STAKE_AMOUNT = Int(1000000)  # 1 ALGO in microAlgos
 COMMISSION_RATE = Int(50000)  # 5% in basis points
 TRANSACTION_FEE = Int(1000)  # 0.001 ALGO
 BONUS_RATE = Int(100000)  # 10% bonus
-MAX_PLAYERS_PER_ROUND = Int(100)
+MAX_PLAYERS_PER_ROUND = Int(100)  # Per room
 MIN_STAKE_AMOUNT = Int(100000)  # 0.1 ALGO
 MAX_STAKE_AMOUNT = Int(10000000)  # 10 ALGO
 
@@ -37,18 +41,13 @@ ORACLE_TIMEOUT = Int(300)  # 5 minutes
 # GLOBAL STATE KEYS
 # ============================================================================
 
-# Game State
-GAME_STATE = Bytes("GAME_STATE")
-TOTAL_STAKED = Bytes("TOTAL_STAKED")
+# Game State (pause/emergency flags and the contract-wide game state are packed
+# in STATUS; per-room state, pot, players and round live in room boxes, see ROOMS below)
+STATUS = Bytes(status_word.STATUS_KEY)
 COMMISSION_POOL = Bytes("COMMISSION_POOL")
-TOTAL_PLAYERS = Bytes("TOTAL_PLAYERS")
-GAME_ROUND = Bytes("GAME_ROUND")
-TOTAL_GAMES_PLAYED = Bytes("TOTAL_GAMES")
 
 # Security & Admin
 ADMIN_COUNT = Bytes("ADMIN_COUNT")
-PAUSED = Bytes("PAUSED")
-EMERGENCY_STOP = Bytes("EMERGENCY_STOP")
 
 # Configuration
 MIN_STAKE = Bytes("MIN_STAKE")
@@ -72,6 +71,7 @@ PLAYER_LOSSES = Bytes("PLAYER_LOSSES")
 PLAYER_LAST_GAME = Bytes("PLAYER_LAST_GAME")
 PLAYER_TOTAL_EARNED = Bytes("PLAYER_EARNED")
 PLAYER_OPTED_IN = Bytes("PLAYER_OPTED_IN")
+PLAYER_ROOM = Bytes("PLAYER_ROOM")
 
 # Staking Data
 PLAYER_STAKE_AMOUNT = Bytes("PLAYER_STAKE_AMOUNT")
@@ -89,11 +89,183 @@ GAME_COMPLETED = Int(3)
 GAME_PAUSED = Int(4)
 GAME_EMERGENCY = Int(5)
 
+# ============================================================================
+# STATUS WORD
+# ============================================================================
+# See status_word.py for the bit layout.
+
+def status_halted(status):
+    """Paused or emergency bits of a STATUS value (zero when running)"""
+    return BitwiseAnd(status, Int(status_word.HALTED_MASK))
+
+def status_game_state(status):
+    """Game state field of a STATUS value"""
+    return ShiftRight(BitwiseAnd(status, Int(status_word.STATE_MASK)), Int(status_word.STATE_SHIFT))
+
+def status_with_game_state(status, game_state):
+    """STATUS value with its game state field replaced"""
+    return BitwiseOr(
+        BitwiseAnd(status, BitwiseNot(Int(status_word.STATE_MASK))),
+        ShiftLeft(game_state, Int(status_word.STATE_SHIFT))
+    )
+
+# ============================================================================
+# ROOMS
+# ============================================================================
+# Each game room is a box (layout in box_layout.py), so stakes and
+# settlements in different rooms never write the same state.
+
+def room_box(room_id):
+    """Name of the box holding a room"""
+    return Concat(Bytes(box_layout.ROOM_BOX_PREFIX), Itob(room_id))
+
+def read_room_field(room_id, offset):
+    """uint64 at offset in a room box"""
+    return Btoi(App.box_extract(room_box(room_id), offset, Int(8)))
+
+def write_room_field(room_id, offset, value):
+    """Store a uint64 at offset in a room box"""
+    return App.box_replace(room_box(room_id), offset, Itob(value))
+
+# Shared like the guards: room fields are touched in almost every method
+load_room_field = Subroutine(TealType.uint64, name="room_get")(read_room_field)
+store_room_field = Subroutine(TealType.none, name="room_put")(write_room_field)
+
+def room_get(room_id, field):
+    """Read a uint64 field of a room box"""
+    return load_room_field(room_id, Int(box_layout.ROOM_FIELDS[field]))
+
+def room_put(room_id, field, value):
+    """Write a uint64 field of a room box"""
+    return store_room_field(room_id, Int(box_layout.ROOM_FIELDS[field]), value)
+
+def room_creator(room_id):
+    """Address that created (and may close) a room"""
+    return App.box_extract(room_box(room_id), Int(box_layout.ROOM_CREATOR_OFFSET), Int(32))
+
+# ============================================================================
+# SEATS
+# ============================================================================
+# A seated stake is recorded twice: in local state (PLAYER_STAKE/PLAYER_ROOM)
+# and in a seat box, which survives a clear-state call whose program fails
+# (local state is wiped either way), so reclaim_seat can still free the seat.
+
+def seat_box(account):
+    """Name of the box holding an account's seat"""
+    return Concat(Bytes(box_layout.SEAT_BOX_PREFIX), account)
+
+def take_seat(account, room_id, stake):
+    """Record a stake's seat; fails if the account still holds one"""
+    return Seq([
+        Assert(App.box_create(seat_box(account), Int(box_layout.SEAT_BOX_SIZE))),
+        App.box_replace(seat_box(account), Int(box_layout.SEAT_FIELDS["room"]), Concat(Itob(room_id), Itob(stake)))
+    ])
+
+def release_seat(account, room_id, stake):
+    """Take a settled or refunded stake out of its room"""
+    return Seq([
+        Assert(App.box_delete(seat_box(account))),
+        room_put(room_id, "pot", room_get(room_id, "pot") - stake),
+        room_put(room_id, "players", room_get(room_id, "players") - Int(1)),
+        
+        # Last player out ends the room's round
+        If(room_get(room_id, "players") == Int(0)).Then(Seq([
+            room_put(room_id, "state", GAME_IDLE),
+            room_put(room_id, "round", room_get(room_id, "round") + Int(1))
+        ]))
+    ])
+
+def refund_stake(account):
+    """Return an unsettled stake and free its room seat"""
+    return If(App.localGet(account, PLAYER_STAKE) > Int(0)).Then(
+        Seq([
+            release_seat(account, App.localGet(account, PLAYER_ROOM), App.localGet(account, PLAYER_STAKE)),
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: account,
+                TxnField.amount: App.localGet(account, PLAYER_STAKE),
+                TxnField.fee: Int(0)
+            }),
+            InnerTxnBuilder.Submit()
+        ])
+    )
+
+# ============================================================================
+# PAYMENTS
+# ============================================================================
+# Methods taking a payment run as [payment, call]: the payment right before
+# the call, from the caller, and no other transactions that could claim it.
+
+def paired_payment():
+    """The payment placed right before this call in its group"""
+    return Gtxn[Txn.group_index() - Int(1)]
+
+def check_paired_payment():
+    """Require a [payment, call] group paying the app from the caller"""
+    return Seq([
+        Assert(Global.group_size() == Int(2)),
+        Assert(paired_payment().type_enum() == TxnType.Payment),
+        Assert(paired_payment().sender() == Txn.sender()),
+        Assert(paired_payment().receiver() == Global.current_application_address())
+    ])
+
+require_paired_payment = Subroutine(TealType.none, name="require_payment")(check_paired_payment)
+
+# ============================================================================
+# SHARED GUARDS
+# ============================================================================
+# Which guards each method runs (see method_guards.py)
+
+METHOD_GUARDS = {
+    # Gaming
+    "stake_game": {"not_paused": True, "opted_in": True},
+    "process_result": {"not_paused": True},  # Oracle call; the player is accounts[1]
+    "create_room": {"not_paused": True},
+    "close_room": {},  # Room creator only
+    "reclaim_seat": {},  # Anyone, for a seat local state no longer records
+    # DeFi
+    "stake_rewards": {"not_paused": True, "opted_in": True},
+    "claim_rewards": {"not_paused": True, "opted_in": True},
+    "unstake": {"not_paused": True, "opted_in": True},
+    # Admin ("bootstrap" checks the creator itself)
+    "add_admin": {"admin": True},
+    "remove_admin": {"admin": True},
+    "toggle_pause": {"admin": True},
+    "emergency_stop": {"admin": True},
+    "withdraw_commission": {"admin": True},
+    "update_config": {"admin": True},
+    "set_oracle": {"admin": True},
+}
+
+def admin_box(account):
+    """Name of the box marking account as admin (see box_layout.py)"""
+    return Concat(Bytes(box_layout.ADMIN_BOX_PREFIX), account)
+
+def admin_matches(account):
+    """Check if account has an admin box"""
+    length = App.box_length(admin_box(account))
+    return Seq(length, length.hasValue())
+
+def check_admin():
+    """Require admin access"""
+    return Assert(admin_matches(Txn.sender()))
+
+def check_not_paused():
+    """Require contract not to be paused"""
+    return Assert(status_halted(App.globalGet(STATUS)) == Int(0))
+
+def check_opted_in():
+    """Require the sender to have opted in"""
+    return Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1))
+
+GUARDS = MethodGuards(METHOD_GUARDS, admin=check_admin, not_paused=check_not_paused, opted_in=check_opted_in)
+
 # ============================================================================
 # MAIN APPROVAL PROGRAM
 # ============================================================================
 
-def approval_program():
+def approval_program(shared_guards=True):
     """Enhanced approval program following Algorand best practices"""
     
     # ========================================================================
@@ -102,17 +274,11 @@ def approval_program():
     
     handle_creation = Seq([
         # Initialize game state
-        App.globalPut(GAME_STATE, GAME_IDLE),
-        App.globalPut(TOTAL_STAKED, Int(0)),
+        App.globalPut(STATUS, Int(status_word.pack_status(game_state=GAME_IDLE.value))),
         App.globalPut(COMMISSION_POOL, Int(0)),
-        App.globalPut(TOTAL_PLAYERS, Int(0)),
-        App.globalPut(GAME_ROUND, Int(0)),
-        App.globalPut(TOTAL_GAMES_PLAYED, Int(0)),
         
         # Initialize security
-        App.globalPut(ADMIN_COUNT, Int(1)),
-        App.globalPut(PAUSED, Int(0)),
-        App.globalPut(EMERGENCY_STOP, Int(0)),
+        App.globalPut(ADMIN_COUNT, Int(0)),  # Set by bootstrap
         
         # Initialize configuration
         App.globalPut(MIN_STAKE, MIN_STAKE_AMOUNT),
@@ -124,15 +290,12 @@ def approval_program():
         App.globalPut(REWARD_RATE, Int(10000)),  # 1% daily
         App.globalPut(STAKING_PERIOD, Int(86400)),  # 24 hours
         
-        # Set first admin
-        App.globalPut(Bytes("ADMIN_0"), Txn.sender()),
-        
         Approve()
     ])
     
-    handle_optin = Seq([
+    init_player = Seq([
         # Security check
-        Assert(App.globalGet(EMERGENCY_STOP) == Int(0)),
+        Assert(BitwiseAnd(App.globalGet(STATUS), Int(status_word.EMERGENCY_BIT)) == Int(0)),
         
         # Initialize player state
         App.localPut(Int(0), PLAYER_STAKE, Int(0)),
@@ -142,129 +305,170 @@ def approval_program():
         App.localPut(Int(0), PLAYER_LAST_GAME, Int(0)),
         App.localPut(Int(0), PLAYER_TOTAL_EARNED, Int(0)),
         App.localPut(Int(0), PLAYER_OPTED_IN, Int(1)),
+        App.localPut(Int(0), PLAYER_ROOM, Int(0)),
         
         # Initialize staking state
         App.localPut(Int(0), PLAYER_STAKE_AMOUNT, Int(0)),
         App.localPut(Int(0), PLAYER_STAKE_TIME, Int(0)),
-        App.localPut(Int(0), PLAYER_REWARDS_CLAIMED, Int(0)),
-        
-        Approve()
+        App.localPut(Int(0), PLAYER_REWARDS_CLAIMED, Int(0))
     ])
     
     handle_closeout = Seq([
         # Return any remaining stake
-        If(App.localGet(Int(0), PLAYER_STAKE) > Int(0)).Then(
-            Seq([
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.Payment,
-                    TxnField.receiver: Txn.sender(),
-                    TxnField.amount: App.localGet(Int(0), PLAYER_STAKE),
-                    TxnField.fee: Int(0)
-                }),
-                InnerTxnBuilder.Submit()
-            ])
-        ),
+        refund_stake(Txn.sender()),
         Approve()
     ])
     
     # ========================================================================
-    # SECURITY FUNCTIONS
+    # GAMING FUNCTIONS
     # ========================================================================
     
-    def is_admin():
-        """Check if sender is an admin"""
-        admin_count = App.globalGet(ADMIN_COUNT)
-        return Or(*[
-            Txn.sender() == App.globalGet(Bytes(f"ADMIN_{i}"))
-            for i in range(MAX_ADMINS)
+    def create_room():
+        """Open a new game room; the caller deposits the box's minimum balance"""
+        room_id = Btoi(Txn.application_args[1])
+        
+        return Seq([
+            require_paired_payment(),
+            Assert(paired_payment().amount() >= Int(box_layout.room_box_min_balance())),
+            
+            # box_create returns 0 if the room id is taken
+            Assert(App.box_create(room_box(room_id), Int(box_layout.ROOM_BOX_SIZE))),
+            App.box_replace(room_box(room_id), Int(box_layout.ROOM_CREATOR_OFFSET), Txn.sender()),
+            
+            Log(Concat(Bytes("ROOM_CREATED"), Itob(room_id))),
+            
+            Approve()
         ])
     
-    def require_admin():
-        """Require admin access"""
-        return Assert(is_admin())
-    
-    def require_not_paused():
-        """Require contract not to be paused"""
-        return Assert(And(
-            App.globalGet(PAUSED) == Int(0),
-            App.globalGet(EMERGENCY_STOP) == Int(0)
-        ))
+    def close_room():
+        """Reclaim an empty room and refund its deposit to the creator"""
+        room_id = Btoi(Txn.application_args[1])
+        
+        return Seq([
+            Assert(room_creator(room_id) == Txn.sender()),
+            Assert(room_get(room_id, "players") == Int(0)),
+            
+            # Commission is swept into the pool only when the room closes
+            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + room_get(room_id, "commission")),
+            Assert(App.box_delete(room_box(room_id))),
+            
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: Txn.sender(),
+                TxnField.amount: Int(box_layout.room_box_min_balance()),
+                TxnField.fee: Int(0)
+            }),
+            InnerTxnBuilder.Submit(),
+            
+            Log(Concat(Bytes("ROOM_CLOSED"), Itob(room_id))),
+            
+            Approve()
+        ])
     
-    # ========================================================================
-    # GAMING FUNCTIONS
-    # ========================================================================
+    def reclaim_seat():
+        """Free the seat of accounts[1] once local state no longer records it, refunding the stake"""
+        player = Txn.accounts[1]
+        seat = App.box_get(seat_box(player))
+        room_id = ExtractUint64(seat.value(), Int(box_layout.SEAT_FIELDS["room"]))
+        stake = ExtractUint64(seat.value(), Int(box_layout.SEAT_FIELDS["stake"]))
+        
+        return Seq([
+            seat,
+            Assert(seat.hasValue()),
+            
+            # The player cleared their local state (and may have opted in again since)
+            If(App.optedIn(player, Global.current_application_id())).Then(
+                Assert(App.localGet(player, PLAYER_STAKE) == Int(0))
+            ),
+            
+            release_seat(player, room_id, stake),
+            
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: player,
+                TxnField.amount: stake,
+                TxnField.fee: Int(0)
+            }),
+            InnerTxnBuilder.Submit(),
+            
+            Log(Concat(Bytes("SEAT_RECLAIMED"), Itob(room_id), Itob(stake))),
+            
+            Approve()
+        ])
     
     def stake_for_game():
         """Enhanced staking with comprehensive validation"""
+        room_id = Btoi(Txn.application_args[1])
+        
         return Seq([
-            # Security checks
-            require_not_paused(),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
-            
-            # Game state validation
-            Assert(Or(
-                App.globalGet(GAME_STATE) == GAME_IDLE,
-                App.globalGet(GAME_STATE) == GAME_STAKED
-            )),
+            # Room state validation (GAME_IDLE or GAME_STAKED)
+            Assert(room_get(room_id, "state") <= GAME_STAKED),
             
             # Player validation
             Assert(App.localGet(Int(0), PLAYER_STAKE) == Int(0)),
             
             # Payment validation
+            require_paired_payment(),
             Assert(And(
-                Gtxn[0].amount() >= App.globalGet(MIN_STAKE),
-                Gtxn[0].amount() <= App.globalGet(MAX_STAKE)
+                paired_payment().amount() >= App.globalGet(MIN_STAKE),
+                paired_payment().amount() <= App.globalGet(MAX_STAKE)
             )),
-            Assert(Gtxn[0].receiver() == Global.current_application_address()),
             
             # Player limit check
-            Assert(App.globalGet(TOTAL_PLAYERS) < MAX_PLAYERS_PER_ROUND),
+            Assert(room_get(room_id, "players") < MAX_PLAYERS_PER_ROUND),
             
             # Update state
-            App.localPut(Int(0), PLAYER_STAKE, Gtxn[0].amount()),
-            App.localPut(Int(0), PLAYER_LAST_GAME, App.globalGet(GAME_ROUND)),
+            take_seat(Txn.sender(), room_id, paired_payment().amount()),
+            App.localPut(Int(0), PLAYER_STAKE, paired_payment().amount()),
+            App.localPut(Int(0), PLAYER_ROOM, room_id),
+            App.localPut(Int(0), PLAYER_LAST_GAME, room_get(room_id, "round")),
             
-            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) + Gtxn[0].amount()),
-            App.globalPut(GAME_STATE, GAME_STAKED),
-            App.globalPut(TOTAL_PLAYERS, App.globalGet(TOTAL_PLAYERS) + Int(1)),
+            room_put(room_id, "pot", room_get(room_id, "pot") + paired_payment().amount()),
+            room_put(room_id, "players", room_get(room_id, "players") + Int(1)),
+            room_put(room_id, "state", GAME_STAKED),
             
             # Log event
-            Log(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount()), Itob(App.globalGet(GAME_ROUND))),
+            Log(Concat(Bytes("GAME_STAKE"), Itob(paired_payment().amount()), Itob(room_get(room_id, "round")), Itob(room_id))),
             
             Approve()
         ])
     
     def process_game_result():
         """Process game result with oracle validation"""
+        player = Txn.accounts[1]
+        stake = App.localGet(player, PLAYER_STAKE)
+        room_id = App.localGet(player, PLAYER_ROOM)
+        bonus = stake * BONUS_RATE / Int(1000000)
+        commission = stake * COMMISSION_RATE / Int(1000000)
+        
         return Seq([
-            require_not_paused(),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
-            Assert(App.localGet(Int(0), PLAYER_STAKE) > Int(0)),
+            Assert(App.localGet(player, PLAYER_OPTED_IN) == Int(1)),
+            Assert(stake > Int(0)),
             
             # Oracle validation (simplified - in real implementation, verify oracle signature)
             Assert(Txn.sender() == App.globalGet(ORACLE_ADDRESS)),
             
+            # Free the player's seat first, so its box minimum balance is released before the payout
+            release_seat(player, room_id, stake),
+            
             # Process result based on game outcome
             If(Btoi(Txn.application_args[1]) == Int(1)).Then(
                 # Player wins
                 Seq([
-                    App.localPut(Int(0), PLAYER_WINS, App.localGet(Int(0), PLAYER_WINS) + Int(1)),
-                    App.localPut(Int(0), PLAYER_SCORE, App.localGet(Int(0), PLAYER_SCORE) + Int(1)),
+                    App.localPut(player, PLAYER_WINS, App.localGet(player, PLAYER_WINS) + Int(1)),
+                    App.localPut(player, PLAYER_SCORE, App.localGet(player, PLAYER_SCORE) + Int(1)),
                     
                     # Calculate and send reward
-                    App.localPut(Int(0), PLAYER_TOTAL_EARNED, App.localGet(Int(0), PLAYER_TOTAL_EARNED) + (App.localGet(Int(0), PLAYER_STAKE) * BONUS_RATE / Int(1000000))),
-                    
-                    # Update global state
-                    App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - App.localGet(Int(0), PLAYER_STAKE)),
-                    App.globalPut(TOTAL_GAMES_PLAYED, App.globalGet(TOTAL_GAMES_PLAYED) + Int(1)),
+                    App.localPut(player, PLAYER_TOTAL_EARNED, App.localGet(player, PLAYER_TOTAL_EARNED) + bonus),
                     
                     # Send reward
                     InnerTxnBuilder.Begin(),
                     InnerTxnBuilder.SetFields({
                         TxnField.type_enum: TxnType.Payment,
-                        TxnField.receiver: Txn.sender(),
-                        TxnField.amount: App.localGet(Int(0), PLAYER_STAKE) + (App.localGet(Int(0), PLAYER_STAKE) * BONUS_RATE / Int(1000000)),
+                        TxnField.receiver: player,
+                        TxnField.amount: stake + bonus,
                         TxnField.fee: Int(0)
                     }),
                     InnerTxnBuilder.Submit(),
@@ -275,20 +479,19 @@ def approval_program():
             ).Else(
                 # Player loses
                 Seq([
-                    App.localPut(Int(0), PLAYER_LOSSES, App.localGet(Int(0), PLAYER_LOSSES) + Int(1)),
+                    App.localPut(player, PLAYER_LOSSES, App.localGet(player, PLAYER_LOSSES) + Int(1)),
                     
-                    # Update global state with commission
-                    App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - (App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)) - TRANSACTION_FEE),
-                    App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + (App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000))),
+                    # Commission stays with the room until it is closed
+                    room_put(room_id, "commission", room_get(room_id, "commission") + commission),
                     
                     # Return remaining stake
-                    If((App.localGet(Int(0), PLAYER_STAKE) - (App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)) - TRANSACTION_FEE) > Int(0)).Then(
+                    If((stake - commission - TRANSACTION_FEE) > Int(0)).Then(
                         Seq([
                             InnerTxnBuilder.Begin(),
                             InnerTxnBuilder.SetFields({
                                 TxnField.type_enum: TxnType.Payment,
-                                TxnField.receiver: Txn.sender(),
-                                TxnField.amount: App.localGet(Int(0), PLAYER_STAKE) - (App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)) - TRANSACTION_FEE,
+                                TxnField.receiver: player,
+                                TxnField.amount: stake - commission - TRANSACTION_FEE,
                                 TxnField.fee: Int(0)
                             }),
                             InnerTxnBuilder.Submit()
@@ -300,8 +503,8 @@ def approval_program():
                 ])
             ),
             
-            # Reset player stake
-            App.localPut(Int(0), PLAYER_STAKE, Int(0)),
+            # Reset their stake
+            App.localPut(player, PLAYER_STAKE, Int(0)),
             
             Approve()
         ])
@@ -312,14 +515,12 @@ def approval_program():
     
     def stake_for_rewards():
         """Stake ALGO for daily rewards (DeFi primitive)"""
+        stake_amount = paired_payment().amount()
+        
         return Seq([
-            require_not_paused(),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
-            
             # Check payment
-            stake_amount = Gtxn[0].amount()
+            require_paired_payment(),
             Assert(stake_amount >= App.globalGet(MIN_STAKE)),
-            Assert(Gtxn[0].receiver() == Global.current_application_address()),
             
             # Update staking state
             App.localPut(Int(0), PLAYER_STAKE_AMOUNT, App.localGet(Int(0), PLAYER_STAKE_AMOUNT) + stake_amount),
@@ -328,35 +529,37 @@ def approval_program():
             # Update liquidity pool
             App.globalPut(LIQUIDITY_POOL, App.globalGet(LIQUIDITY_POOL) + stake_amount),
             
-            Log(Bytes("STAKE_REWARDS"), Itob(stake_amount)),
+            Log(Concat(Bytes("STAKE_REWARDS"), Itob(stake_amount))),
             
             Approve()
         ])
     
     def claim_rewards():
         """Claim accumulated staking rewards"""
+        stake_amount = App.localGet(Int(0), PLAYER_STAKE_AMOUNT)
+        stake_time = App.localGet(Int(0), PLAYER_STAKE_TIME)
+        current_time = Global.latest_timestamp()
+        time_elapsed = current_time - stake_time
+        
+        # Calculate daily rewards
+        reward_rate = App.globalGet(REWARD_RATE)
+        daily_rewards = stake_amount * reward_rate / Int(1000000)
+        
+        # Stored once: PLAYER_STAKE_TIME is reset before the payment is sent
+        total_rewards = ScratchVar(TealType.uint64)
+        
         return Seq([
-            require_not_paused(),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
             Assert(App.localGet(Int(0), PLAYER_STAKE_AMOUNT) > Int(0)),
             
             # Calculate rewards
-            stake_amount = App.localGet(Int(0), PLAYER_STAKE_AMOUNT)
-            stake_time = App.localGet(Int(0), PLAYER_STAKE_TIME)
-            current_time = Global.latest_timestamp()
-            time_elapsed = current_time - stake_time
-            
-            # Calculate daily rewards
-            reward_rate = App.globalGet(REWARD_RATE)
-            daily_rewards = stake_amount * reward_rate / Int(1000000)
-            total_rewards = daily_rewards * time_elapsed / App.globalGet(STAKING_PERIOD)
+            total_rewards.store(daily_rewards * time_elapsed / App.globalGet(STAKING_PERIOD)),
             
             # Ensure we have enough liquidity
-            Assert(total_rewards <= App.globalGet(LIQUIDITY_POOL)),
+            Assert(total_rewards.load() <= App.globalGet(LIQUIDITY_POOL)),
             
             # Update state
-            App.localPut(Int(0), PLAYER_REWARDS_CLAIMED, App.localGet(Int(0), PLAYER_REWARDS_CLAIMED) + total_rewards),
-            App.globalPut(LIQUIDITY_POOL, App.globalGet(LIQUIDITY_POOL) - total_rewards),
+            App.localPut(Int(0), PLAYER_REWARDS_CLAIMED, App.localGet(Int(0), PLAYER_REWARDS_CLAIMED) + total_rewards.load()),
+            App.globalPut(LIQUIDITY_POOL, App.globalGet(LIQUIDITY_POOL) - total_rewards.load()),
             App.localPut(Int(0), PLAYER_STAKE_TIME, current_time),
             
             # Send rewards
@@ -364,26 +567,23 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: total_rewards,
+                TxnField.amount: total_rewards.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
-            Log(Bytes("CLAIM_REWARDS"), Itob(total_rewards)),
+            Log(Concat(Bytes("CLAIM_REWARDS"), Itob(total_rewards.load()))),
             
             Approve()
         ])
     
     def unstake():
         """Unstake ALGO from rewards pool"""
+        # Get unstake amount from args
+        unstake_amount = Btoi(Txn.application_args[1])
+        current_stake = App.localGet(Int(0), PLAYER_STAKE_AMOUNT)
+        
         return Seq([
-            require_not_paused(),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
-            
-            # Get unstake amount from args
-            unstake_amount = Btoi(Txn.application_args[1])
-            current_stake = App.localGet(Int(0), PLAYER_STAKE_AMOUNT)
-            
             Assert(unstake_amount <= current_stake),
             Assert(unstake_amount <= App.globalGet(LIQUIDITY_POOL)),
             
@@ -401,7 +601,7 @@ def approval_program():
             }),
             InnerTxnBuilder.Submit(),
             
-            Log(Bytes("UNSTAKE"), Itob(unstake_amount)),
+            Log(Concat(Bytes("UNSTAKE"), Itob(unstake_amount))),
             
             Approve()
         ])
@@ -410,59 +610,77 @@ def approval_program():
     # ADMIN FUNCTIONS
     # ========================================================================
     
+    def bootstrap():
+        """Register the first admin and oracle (app account must be funded)"""
+        # The creator itself, or accounts[1] when a factory app is the creator
+        first_admin = ScratchVar(TealType.bytes)
+        
+        return Seq([
+            Assert(Txn.sender() == Global.creator_address()),
+            Assert(App.globalGet(ADMIN_COUNT) == Int(0)),
+            
+            first_admin.store(Txn.sender()),
+            If(Txn.accounts.length() > Int(0)).Then(first_admin.store(Txn.accounts[1])),
+            
+            Assert(App.box_create(admin_box(first_admin.load()), Int(box_layout.ADMIN_BOX_SIZE))),
+            App.globalPut(ADMIN_COUNT, Int(1)),
+            App.globalPut(ORACLE_ADDRESS, first_admin.load()),
+            
+            Log(Concat(Bytes("ADMIN_ADDED"), first_admin.load())),
+            
+            Approve()
+        ])
+    
     def add_admin():
         """Add new admin (multi-signature pattern)"""
+        new_admin = Txn.accounts[1]
+        admin_count = App.globalGet(ADMIN_COUNT)
+        
         return Seq([
-            require_admin(),
-            Assert(App.globalGet(ADMIN_COUNT) < MAX_ADMINS),
+            Assert(admin_count < MAX_ADMINS),
             
-            new_admin = Txn.accounts[1],
-            admin_count = App.globalGet(ADMIN_COUNT),
-            
-            App.globalPut(Bytes(f"ADMIN_{admin_count}"), new_admin),
+            # box_create returns 0 if new_admin already has a box
+            Assert(App.box_create(admin_box(new_admin), Int(box_layout.ADMIN_BOX_SIZE))),
             App.globalPut(ADMIN_COUNT, admin_count + Int(1)),
             
-            Log(Bytes("ADMIN_ADDED"), new_admin),
+            Log(Concat(Bytes("ADMIN_ADDED"), new_admin)),
             
             Approve()
         ])
     
     def remove_admin():
         """Remove admin"""
+        admin_to_remove = Txn.accounts[1]
+        admin_count = App.globalGet(ADMIN_COUNT)
+        
         return Seq([
-            require_admin(),
-            Assert(App.globalGet(ADMIN_COUNT) > Int(1)),  # Keep at least one admin
+            Assert(admin_count > Int(1)),  # Keep at least one admin
             
-            admin_to_remove = Txn.accounts[1],
-            admin_count = App.globalGet(ADMIN_COUNT),
+            # box_del returns 0 if admin_to_remove has no box
+            Assert(App.box_delete(admin_box(admin_to_remove))),
+            App.globalPut(ADMIN_COUNT, admin_count - Int(1)),
             
-            # Find and remove admin
-            For(Int(0), Int(MAX_ADMINS), Int(1), lambda i: Seq([
-                If(App.globalGet(Bytes(f"ADMIN_{i}")) == admin_to_remove).Then(
-                    App.globalPut(Bytes(f"ADMIN_{i}"), Bytes("")),
-                    App.globalPut(ADMIN_COUNT, admin_count - Int(1))
-                )
-            ])),
-            
-            Log(Bytes("ADMIN_REMOVED"), admin_to_remove),
+            Log(Concat(Bytes("ADMIN_REMOVED"), admin_to_remove)),
             
             Approve()
         ])
     
     def toggle_pause():
         """Toggle contract pause state"""
+        status = ScratchVar(TealType.uint64)
+        
         return Seq([
-            require_admin(),
-            
-            current_pause = App.globalGet(PAUSED),
-            new_pause = If(current_pause == Int(0), Int(1), Int(0)),
-            App.globalPut(PAUSED, new_pause),
-            
-            If(new_pause == Int(1)).Then(
-                App.globalPut(GAME_STATE, GAME_PAUSED)
+            # Flip the pause bit; the game state follows it unless an emergency stop outranks both
+            status.store(BitwiseXor(App.globalGet(STATUS), Int(status_word.PAUSED_BIT))),
+            If(BitwiseAnd(status.load(), Int(status_word.EMERGENCY_BIT)) == Int(0)).Then(
+                status.store(status_with_game_state(
+                    status.load(),
+                    If(BitwiseAnd(status.load(), Int(status_word.PAUSED_BIT)), GAME_PAUSED, GAME_IDLE)
+                ))
             ),
+            App.globalPut(STATUS, status.load()),
             
-            Log(Bytes("PAUSE_TOGGLED"), Itob(new_pause)),
+            Log(Concat(Bytes("PAUSE_TOGGLED"), Itob(BitwiseAnd(status.load(), Int(status_word.PAUSED_BIT))))),
             
             Approve()
         ])
@@ -470,10 +688,10 @@ def approval_program():
     def emergency_stop():
         """Emergency stop (can only be called by admin)"""
         return Seq([
-            require_admin(),
-            
-            App.globalPut(EMERGENCY_STOP, Int(1)),
-            App.globalPut(GAME_STATE, GAME_EMERGENCY),
+            App.globalPut(STATUS, status_with_game_state(
+                BitwiseOr(App.globalGet(STATUS), Int(status_word.EMERGENCY_BIT)),
+                GAME_EMERGENCY
+            )),
             
             Log(Bytes("EMERGENCY_STOP")),
             
@@ -482,11 +700,11 @@ def approval_program():
     
     def withdraw_commission():
         """Withdraw accumulated commission"""
+        commission_amount = ScratchVar(TealType.uint64)
+        
         return Seq([
-            require_admin(),
-            
-            commission_amount = App.globalGet(COMMISSION_POOL),
-            Assert(commission_amount > Int(0)),
+            commission_amount.store(App.globalGet(COMMISSION_POOL)),
+            Assert(commission_amount.load() > Int(0)),
             
             App.globalPut(COMMISSION_POOL, Int(0)),
             
@@ -494,27 +712,25 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: commission_amount,
+                TxnField.amount: commission_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
-            Log(Bytes("COMMISSION_WITHDRAWN"), Itob(commission_amount)),
+            Log(Concat(Bytes("COMMISSION_WITHDRAWN"), Itob(commission_amount.load()))),
             
             Approve()
         ])
     
     def update_config():
         """Update contract configuration"""
+        # Update stake limits
+        new_min_stake = Btoi(Txn.application_args[1])
+        new_max_stake = Btoi(Txn.application_args[2])
+        
         return Seq([
-            require_admin(),
-            
-            # Update stake limits
-            new_min_stake = Btoi(Txn.application_args[1]),
-            new_max_stake = Btoi(Txn.application_args[2]),
-            
             Assert(And(
-                new_min_stake > Int(0),
+                new_min_stake >= Int(box_layout.seat_box_min_balance()),  # A stake pays for its seat box
                 new_max_stake > new_min_stake,
                 new_max_stake <= Int(100000000)  # Max 100 ALGO
             )),
@@ -522,20 +738,19 @@ def approval_program():
             App.globalPut(MIN_STAKE, new_min_stake),
             App.globalPut(MAX_STAKE, new_max_stake),
             
-            Log(Bytes("CONFIG_UPDATED"), Itob(new_min_stake), Itob(new_max_stake)),
+            Log(Concat(Bytes("CONFIG_UPDATED"), Itob(new_min_stake), Itob(new_max_stake))),
             
             Approve()
         ])
     
     def set_oracle():
         """Set oracle address"""
+        new_oracle = Txn.accounts[1]
+        
         return Seq([
-            require_admin(),
-            
-            new_oracle = Txn.accounts[1],
             App.globalPut(ORACLE_ADDRESS, new_oracle),
             
-            Log(Bytes("ORACLE_SET"), new_oracle),
+            Log(Concat(Bytes("ORACLE_SET"), new_oracle)),
             
             Approve()
         ])
@@ -569,6 +784,18 @@ def approval_program():
     # MAIN PROGRAM LOGIC
     # ========================================================================
     
+    def method(name, body):
+        """Dispatch branch for a named method, with its guards attached"""
+        return [Txn.application_args[0] == Bytes(name), GUARDS.wrap(name, body, shared_guards)]
+    
+    # Opt-in can carry the first stake: [payment, OptIn "stake_game" room_id]
+    handle_optin = Seq([
+        init_player,
+        If(Txn.application_args.length() == Int(0)).Then(Approve()),
+        Assert(Txn.application_args[0] == Bytes("stake_game")),
+        GUARDS.wrap("stake_game", stake_for_game(), shared_guards)
+    ])
+    
     program = Cond(
         # Application lifecycle
         [Txn.application_id() == Int(0), handle_creation],
@@ -578,27 +805,31 @@ def approval_program():
         [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
         
         # Gaming functions
-        [Txn.application_args[0] == Bytes("stake_game"), stake_for_game()],
-        [Txn.application_args[0] == Bytes("process_result"), process_game_result()],
+        method("create_room", create_room()),
+        method("close_room", close_room()),
+        method("reclaim_seat", reclaim_seat()),
+        method("stake_game", stake_for_game()),
+        method("process_result", process_game_result()),
         
         # DeFi functions
-        [Txn.application_args[0] == Bytes("stake_rewards"), stake_for_rewards()],
-        [Txn.application_args[0] == Bytes("claim_rewards"), claim_rewards()],
-        [Txn.application_args[0] == Bytes("unstake"), unstake()],
+        method("stake_rewards", stake_for_rewards()),
+        method("claim_rewards", claim_rewards()),
+        method("unstake", unstake()),
         
         # Admin functions
-        [Txn.application_args[0] == Bytes("add_admin"), add_admin()],
-        [Txn.application_args[0] == Bytes("remove_admin"), remove_admin()],
-        [Txn.application_args[0] == Bytes("toggle_pause"), toggle_pause()],
-        [Txn.application_args[0] == Bytes("emergency_stop"), emergency_stop()],
-        [Txn.application_args[0] == Bytes("withdraw_commission"), withdraw_commission()],
-        [Txn.application_args[0] == Bytes("update_config"), update_config()],
-        [Txn.application_args[0] == Bytes("set_oracle"), set_oracle()],
+        method("bootstrap", bootstrap()),
+        method("add_admin", add_admin()),
+        method("remove_admin", remove_admin()),
+        method("toggle_pause", toggle_pause()),
+        method("emergency_stop", emergency_stop()),
+        method("withdraw_commission", withdraw_commission()),
+        method("update_config", update_config()),
+        method("set_oracle", set_oracle()),
         
         # View functions
-        [Txn.application_args[0] == Bytes("get_player_stats"), get_player_stats()],
-        [Txn.application_args[0] == Bytes("get_game_state"), get_game_state()],
-        [Txn.application_args[0] == Bytes("get_balance"), get_contract_balance()],
+        method("get_player_stats", get_player_stats()),
+        method("get_game_state", get_game_state()),
+        method("get_balance", get_contract_balance()),
         
         [Int(1), Reject()]
     )
@@ -609,18 +840,7 @@ def clear_state_program():
     """Clear state program with proper cleanup"""
     return Seq([
         # Return any remaining stake
-        If(App.localGet(Int(0), PLAYER_STAKE) > Int(0)).Then(
-            Seq([
-                InnerTxnBuilder.Begin(),
-                InnerTxnBuilder.SetFields({
-                    TxnField.type_enum: TxnType.Payment,
-                    TxnField.receiver: Txn.sender(),
-                    TxnField.amount: App.localGet(Int(0), PLAYER_STAKE),
-                    TxnField.fee: Int(0)
-                }),
-                InnerTxnBuilder.Submit()
-            ])
-        ),
+        refund_stake(Txn.sender()),
         
         # Return any staked rewards
         If(App.localGet(Int(0), PLAYER_STAKE_AMOUNT) > Int(0)).Then(
@@ -646,8 +866,9 @@ def clear_state_program():
 class EnhancedGameContract:
     """Enhanced game contract following Algorand best practices"""
     
-    def __init__(self):
-        self.approval_program = approval_program()
+    def __init__(self, shared_guards=True):
+        self.shared_guards = shared_guards
+        self.approval_program = approval_program(shared_guards)
         self.clear_state_program = clear_state_program()
     
     def compile(self):
@@ -668,79 +889,183 @@ class EnhancedGameContract:
         
         return approval_teal, clear_teal
     
+    def guard_size_report(self):
+        """Approval size with guards inlined vs shared as subroutines"""
+        from teal_metrics import estimate_program_size
+        
+        inline_teal, _ = EnhancedGameContract(shared_guards=False).compile()
+        shared_teal, _ = EnhancedGameContract(shared_guards=True).compile()
+        inline_size = estimate_program_size(inline_teal)
+        shared_size = estimate_program_size(shared_teal)
+        return {
+            "inline": inline_size,
+            "shared": shared_size,
+            "saved": inline_size - shared_size,
+        }
+    
     def get_abi(self):
-        """Get Application Binary Interface for the contract"""
+        """Get Application Binary Interface for the contract
+
+        Besides names and args, methods carry what a client needs to build the
+        call: "pay" args are a payment to the app placed first in the group,
+        "account" args go in the foreign accounts (accounts[1]), "boxes" name
+        the box references by prefix and the arg (or "sender") keying them,
+        and "refs" are params used only for references.
+        """
+        room_box = {"prefix": "room", "key": "room_id"}
+        seat_box = {"prefix": "seat", "key": "player"}
+        methods = [
+            {
+                "name": "create_room",
+                "description": "Open a game room (pay the room box minimum balance first)",
+                "args": [
+                    {"name": "deposit", "type": "pay"},
+                    {"name": "room_id", "type": "uint64"}
+                ],
+                "boxes": [room_box],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "close_room",
+                "description": "Close an empty room and refund its deposit (room creator only)",
+                "args": [{"name": "room_id", "type": "uint64"}],
+                "boxes": [room_box],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "reclaim_seat",
+                "description": "Free and refund the seat of accounts[1] after they cleared their local state (anyone)",
+                "args": [{"name": "player", "type": "account"}],
+                "refs": [{"name": "room_id", "type": "uint64"}],  # The seat's room
+                "boxes": [room_box, seat_box],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "stake_game",
+                "description": "Stake ALGO to participate in a room's game (also accepted on the OptIn call)",
+                "args": [
+                    {"name": "stake", "type": "pay"},
+                    {"name": "room_id", "type": "uint64"}
+                ],
+                "boxes": [room_box, {"prefix": "seat", "key": "sender"}],
+                "on_complete": ["NoOp", "OptIn"],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "process_result",
+                "description": "Process game result for accounts[1] (oracle only)",
+                "args": [
+                    {"name": "result", "type": "uint64"},
+                    {"name": "random_seed", "type": "bytes"},
+                    {"name": "player", "type": "account"}
+                ],
+                "refs": [{"name": "room_id", "type": "uint64"}],  # The player's PLAYER_ROOM
+                "boxes": [room_box, seat_box],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "stake_rewards",
+                "description": "Stake ALGO for daily rewards",
+                "args": [{"name": "stake", "type": "pay"}],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "claim_rewards",
+                "description": "Claim accumulated staking rewards",
+                "args": [],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "unstake",
+                "description": "Unstake ALGO from rewards pool",
+                "args": [{"name": "amount", "type": "uint64"}],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "bootstrap",
+                "description": "Register the first admin and oracle: the creator, or accounts[1] (creator only, app account funded)",
+                "args": [{"name": "first_admin", "type": "account", "optional": True}],
+                "boxes": [{"prefix": "admin", "key": "first_admin"}],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "add_admin",
+                "description": "Add an admin (admin only)",
+                "args": [{"name": "new_admin", "type": "account"}],
+                "boxes": [{"prefix": "admin", "key": "new_admin"}],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "remove_admin",
+                "description": "Remove an admin, keeping at least one (admin only)",
+                "args": [{"name": "admin", "type": "account"}],
+                "boxes": [{"prefix": "admin", "key": "admin"}],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "toggle_pause",
+                "description": "Toggle contract pause state (admin only)",
+                "args": [],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "emergency_stop",
+                "description": "Emergency stop contract (admin only)",
+                "args": [],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "withdraw_commission",
+                "description": "Withdraw accumulated commission (admin only)",
+                "args": [],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "update_config",
+                "description": "Set the stake limits (admin only)",
+                "args": [
+                    {"name": "min_stake", "type": "uint64"},
+                    {"name": "max_stake", "type": "uint64"}
+                ],
+                "returns": {"type": "void"}
+            },
+            {
+                "name": "set_oracle",
+                "description": "Set the oracle address (admin only)",
+                "args": [{"name": "oracle", "type": "account"}],
+                "returns": {"type": "void"}
+            }
+        ]
+        # Admin-guarded methods read the sender's admin box
+        for method in methods:
+            if GUARDS.flags(method["name"]).get("admin"):
+                method["boxes"] = [{"prefix": "admin", "key": "sender"}] + method.get("boxes", [])
+        
+        def event(name, *args):
+            return {"name": name, "args": [{"name": arg, "type": kind} for arg, kind in args]}
+        
         return {
             "name": "ChronicleOfTheLedger",
             "version": "2.0.0",
             "description": "Enhanced gaming contract with DeFi features",
-            "methods": [
-                {
-                    "name": "stake_game",
-                    "description": "Stake ALGO to participate in games",
-                    "args": [],
-                    "returns": {"type": "void"}
-                },
-                {
-                    "name": "process_result",
-                    "description": "Process game result (oracle only)",
-                    "args": [
-                        {"name": "result", "type": "uint64"},
-                        {"name": "random_seed", "type": "bytes"}
-                    ],
-                    "returns": {"type": "void"}
-                },
-                {
-                    "name": "stake_rewards",
-                    "description": "Stake ALGO for daily rewards",
-                    "args": [],
-                    "returns": {"type": "void"}
-                },
-                {
-                    "name": "claim_rewards",
-                    "description": "Claim accumulated staking rewards",
-                    "args": [],
-                    "returns": {"type": "void"}
-                },
-                {
-                    "name": "unstake",
-                    "description": "Unstake ALGO from rewards pool",
-                    "args": [{"name": "amount", "type": "uint64"}],
-                    "returns": {"type": "void"}
-                },
-                {
-                    "name": "toggle_pause",
-                    "description": "Toggle contract pause state (admin only)",
-                    "args": [],
-                    "returns": {"type": "void"}
-                },
-                {
-                    "name": "emergency_stop",
-                    "description": "Emergency stop contract (admin only)",
-                    "args": [],
-                    "returns": {"type": "void"}
-                },
-                {
-                    "name": "withdraw_commission",
-                    "description": "Withdraw accumulated commission (admin only)",
-                    "args": [],
-                    "returns": {"type": "void"}
-                }
-            ],
+            "methods": methods,
             "events": [
-                {"name": "GAME_STAKE", "args": ["amount", "round"]},
-                {"name": "GAME_WIN", "args": ["reward", "seed"]},
-                {"name": "GAME_LOSS", "args": ["slash", "seed"]},
-                {"name": "STAKE_REWARDS", "args": ["amount"]},
-                {"name": "CLAIM_REWARDS", "args": ["amount"]},
-                {"name": "UNSTAKE", "args": ["amount"]},
-                {"name": "PAUSE_TOGGLED", "args": ["paused"]},
-                {"name": "EMERGENCY_STOP", "args": []},
-                {"name": "COMMISSION_WITHDRAWN", "args": ["amount"]},
-                {"name": "ADMIN_ADDED", "args": ["admin"]},
-                {"name": "ADMIN_REMOVED", "args": ["admin"]},
-                {"name": "ORACLE_SET", "args": ["oracle"]},
-                {"name": "CONFIG_UPDATED", "args": ["min_stake", "max_stake"]}
+                event("ROOM_CREATED", ("room_id", "uint64")),
+                event("ROOM_CLOSED", ("room_id", "uint64")),
+                event("SEAT_RECLAIMED", ("room_id", "uint64"), ("stake", "uint64")),
+                event("GAME_STAKE", ("amount", "uint64"), ("round", "uint64"), ("room_id", "uint64")),
+                event("GAME_WIN"),
+                event("GAME_LOSS"),
+                event("STAKE_REWARDS", ("amount", "uint64")),
+                event("CLAIM_REWARDS", ("amount", "uint64")),
+                event("UNSTAKE", ("amount", "uint64")),
+                event("PAUSE_TOGGLED", ("paused", "uint64")),
+                event("EMERGENCY_STOP"),
+                event("COMMISSION_WITHDRAWN", ("amount", "uint64")),
+                event("ADMIN_ADDED", ("admin", "address")),
+                event("ADMIN_REMOVED", ("admin", "address")),
+                event("ORACLE_SET", ("oracle", "address")),
+                event("CONFIG_UPDATED", ("min_stake", "uint64"), ("max_stake", "uint64"))
             ]
         }
 
@@ -765,6 +1090,8 @@ if __name__ == "__main__":
         json.dump(contract.get_abi(), f, indent=2)
     
     print("✅ Enhanced smart contract compiled successfully!")
+    report = contract.guard_size_report()
+    print(f"📉 Shared guards: {report['inline']} -> {report['shared']} bytes ({report['saved']} saved)")
     print("📁 Files created:")
     print("   - artifacts/enhanced_contract_approval.teal")
     print("   - artifacts/enhanced_contract_clear.teal")
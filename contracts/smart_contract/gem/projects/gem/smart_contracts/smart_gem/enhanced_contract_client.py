@@ -0,0 +1,190 @@
+"""
+Enhanced Game Contract Client
+Generated by client_generator.py from EnhancedGameContract.get_abi(); do not edit
+
+Regenerate with `python client_generator.py enhanced_contract`. Every method returns the
+unsigned transactions of its group (payment first when the method takes
+one), with box/account references and the pooled fee already set.
+"""
+
+import base64
+import struct
+
+from algosdk import encoding, transaction
+
+from fee_pooling import pooled_fee
+from status_word import decode_global_state
+
+# app_args[0] of each method
+SELECTORS = {
+    "create_room": b"create_room",
+    "close_room": b"close_room",
+    "reclaim_seat": b"reclaim_seat",
+    "stake_game": b"stake_game",
+    "process_result": b"process_result",
+    "stake_rewards": b"stake_rewards",
+    "claim_rewards": b"claim_rewards",
+    "unstake": b"unstake",
+    "bootstrap": b"bootstrap",
+    "add_admin": b"add_admin",
+    "remove_admin": b"remove_admin",
+    "toggle_pause": b"toggle_pause",
+    "emergency_stop": b"emergency_stop",
+    "withdraw_commission": b"withdraw_commission",
+    "update_config": b"update_config",
+    "set_oracle": b"set_oracle",
+}
+
+# Worst-case inner transactions per method (from the compiled program)
+INNER_TXNS = {
+    "create_room": 0,
+    "close_room": 1,
+    "reclaim_seat": 1,
+    "stake_game": 0,
+    "process_result": 1,
+    "stake_rewards": 0,
+    "claim_rewards": 1,
+    "unstake": 1,
+    "bootstrap": 0,
+    "add_admin": 0,
+    "remove_admin": 0,
+    "toggle_pause": 0,
+    "emergency_stop": 0,
+    "withdraw_commission": 1,
+    "update_config": 0,
+    "set_oracle": 0,
+}
+
+# (prefix, layout, fields, address fields), longest prefix first
+EVENTS = [
+    (b"COMMISSION_WITHDRAWN", struct.Struct(">Q"), ('amount',), ()),
+    (b"SEAT_RECLAIMED", struct.Struct(">QQ"), ('room_id', 'stake'), ()),
+    (b"EMERGENCY_STOP", struct.Struct(">"), (), ()),
+    (b"CONFIG_UPDATED", struct.Struct(">QQ"), ('min_stake', 'max_stake'), ()),
+    (b"STAKE_REWARDS", struct.Struct(">Q"), ('amount',), ()),
+    (b"CLAIM_REWARDS", struct.Struct(">Q"), ('amount',), ()),
+    (b"PAUSE_TOGGLED", struct.Struct(">Q"), ('paused',), ()),
+    (b"ADMIN_REMOVED", struct.Struct(">32s"), ('admin',), ('admin',)),
+    (b"ROOM_CREATED", struct.Struct(">Q"), ('room_id',), ()),
+    (b"ROOM_CLOSED", struct.Struct(">Q"), ('room_id',), ()),
+    (b"ADMIN_ADDED", struct.Struct(">32s"), ('admin',), ('admin',)),
+    (b"GAME_STAKE", struct.Struct(">QQQ"), ('amount', 'round', 'room_id'), ()),
+    (b"ORACLE_SET", struct.Struct(">32s"), ('oracle',), ('oracle',)),
+    (b"GAME_LOSS", struct.Struct(">"), (), ()),
+    (b"GAME_WIN", struct.Struct(">"), (), ()),
+    (b"UNSTAKE", struct.Struct(">Q"), ('amount',), ()),
+]
+
+
+def decode_event(log):
+    """(event name, {field: value}) for one log entry, or (None, log) if unknown"""
+    for prefix, layout, fields, addresses in EVENTS:
+        if log.startswith(prefix) and len(log) - len(prefix) == layout.size:
+            values = dict(zip(fields, layout.unpack_from(log, len(prefix))))
+            for field in addresses:
+                values[field] = encoding.encode_address(values[field])
+            return prefix.decode(), values
+    return None, log
+
+
+def decode_logs(logs):
+    """Decode a list of raw or base64 log entries"""
+    return [decode_event(base64.b64decode(log) if isinstance(log, str) else log) for log in logs]
+
+
+class EnhancedGameClient:
+    """Typed calls for EnhancedGameContract"""
+
+    def __init__(self, app_id):
+        self.app_id = app_id
+        self.app_address = encoding.encode_address(encoding.checksum(b"appID" + app_id.to_bytes(8, "big")))
+
+    def _call(self, sp, sender, method, app_args, accounts=(), boxes=(), payment=None, opt_in=False):
+        call = transaction.ApplicationCallTxn(
+            sender=sender,
+            sp=sp,
+            index=self.app_id,
+            on_complete=transaction.OnComplete.OptInOC if opt_in else transaction.OnComplete.NoOpOC,
+            app_args=[SELECTORS[method]] + app_args,
+            accounts=list(accounts) or None,
+            boxes=list(boxes) or None
+        )
+        call.fee = pooled_fee(sp, call, INNER_TXNS[method])
+        if payment is None:
+            return [call]
+        pay = transaction.PaymentTxn(sender=sender, sp=sp, receiver=self.app_address, amt=payment)
+        return transaction.assign_group_id([pay, call])
+
+    def global_state(self, algod_client):
+        """Decoded global state (STATUS unpacked into its legacy keys)"""
+        info = algod_client.application_info(self.app_id)
+        return decode_global_state(info["params"].get("global-state", []))
+
+    def opt_in(self, sp, sender: str) -> list:
+        """Plain opt-in"""
+        return [transaction.ApplicationOptInTxn(sender, sp, self.app_id)]
+
+    def create_room(self, sp, sender: str, deposit: int, room_id: int) -> list:
+        """Open a game room (pay the room box minimum balance first)"""
+        return self._call(sp, sender, "create_room", [room_id.to_bytes(8, "big")], boxes=[(0, b"room" + room_id.to_bytes(8, "big"))], payment=deposit)
+
+    def close_room(self, sp, sender: str, room_id: int) -> list:
+        """Close an empty room and refund its deposit (room creator only)"""
+        return self._call(sp, sender, "close_room", [room_id.to_bytes(8, "big")], boxes=[(0, b"room" + room_id.to_bytes(8, "big"))])
+
+    def reclaim_seat(self, sp, sender: str, player: str, room_id: int) -> list:
+        """Free and refund the seat of accounts[1] after they cleared their local state (anyone)"""
+        return self._call(sp, sender, "reclaim_seat", [], accounts=[player], boxes=[(0, b"room" + room_id.to_bytes(8, "big")), (0, b"seat" + encoding.decode_address(player))])
+
+    def stake_game(self, sp, sender: str, stake: int, room_id: int, opt_in: bool = False) -> list:
+        """Stake ALGO to participate in a room's game (also accepted on the OptIn call)"""
+        return self._call(sp, sender, "stake_game", [room_id.to_bytes(8, "big")], boxes=[(0, b"room" + room_id.to_bytes(8, "big")), (0, b"seat" + encoding.decode_address(sender))], payment=stake, opt_in=opt_in)
+
+    def process_result(self, sp, sender: str, result: int, random_seed: bytes, player: str, room_id: int) -> list:
+        """Process game result for accounts[1] (oracle only)"""
+        return self._call(sp, sender, "process_result", [result.to_bytes(8, "big"), random_seed], accounts=[player], boxes=[(0, b"room" + room_id.to_bytes(8, "big")), (0, b"seat" + encoding.decode_address(player))])
+
+    def stake_rewards(self, sp, sender: str, stake: int) -> list:
+        """Stake ALGO for daily rewards"""
+        return self._call(sp, sender, "stake_rewards", [], payment=stake)
+
+    def claim_rewards(self, sp, sender: str) -> list:
+        """Claim accumulated staking rewards"""
+        return self._call(sp, sender, "claim_rewards", [])
+
+    def unstake(self, sp, sender: str, amount: int) -> list:
+        """Unstake ALGO from rewards pool"""
+        return self._call(sp, sender, "unstake", [amount.to_bytes(8, "big")])
+
+    def bootstrap(self, sp, sender: str, first_admin: str = None) -> list:
+        """Register the first admin and oracle: the creator, or accounts[1] (creator only, app account funded)"""
+        accounts = [a for a in (first_admin,) if a is not None]
+        return self._call(sp, sender, "bootstrap", [], accounts=accounts, boxes=[(0, b"admin" + encoding.decode_address(first_admin or sender))])
+
+    def add_admin(self, sp, sender: str, new_admin: str) -> list:
+        """Add an admin (admin only)"""
+        return self._call(sp, sender, "add_admin", [], accounts=[new_admin], boxes=[(0, b"admin" + encoding.decode_address(sender)), (0, b"admin" + encoding.decode_address(new_admin))])
+
+    def remove_admin(self, sp, sender: str, admin: str) -> list:
+        """Remove an admin, keeping at least one (admin only)"""
+        return self._call(sp, sender, "remove_admin", [], accounts=[admin], boxes=[(0, b"admin" + encoding.decode_address(sender)), (0, b"admin" + encoding.decode_address(admin))])
+
+    def toggle_pause(self, sp, sender: str) -> list:
+        """Toggle contract pause state (admin only)"""
+        return self._call(sp, sender, "toggle_pause", [], boxes=[(0, b"admin" + encoding.decode_address(sender))])
+
+    def emergency_stop(self, sp, sender: str) -> list:
+        """Emergency stop contract (admin only)"""
+        return self._call(sp, sender, "emergency_stop", [], boxes=[(0, b"admin" + encoding.decode_address(sender))])
+
+    def withdraw_commission(self, sp, sender: str) -> list:
+        """Withdraw accumulated commission (admin only)"""
+        return self._call(sp, sender, "withdraw_commission", [], boxes=[(0, b"admin" + encoding.decode_address(sender))])
+
+    def update_config(self, sp, sender: str, min_stake: int, max_stake: int) -> list:
+        """Set the stake limits (admin only)"""
+        return self._call(sp, sender, "update_config", [min_stake.to_bytes(8, "big"), max_stake.to_bytes(8, "big")], boxes=[(0, b"admin" + encoding.decode_address(sender))])
+
+    def set_oracle(self, sp, sender: str, oracle: str) -> list:
+        """Set the oracle address (admin only)"""
+        return self._call(sp, sender, "set_oracle", [], accounts=[oracle], boxes=[(0, b"admin" + encoding.decode_address(sender))])
@@ -0,0 +1,141 @@
+"""
+Fee Pooling
+Exact outer fees for app calls whose inner transactions are sent with fee 0
+
+Every inner transaction in these contracts sets TxnField.fee to 0, so its
+minimum fee has to be pooled onto the outer call. The worst-case number of
+inner transactions per method is read straight from the compiled approval
+program (longest path from the method's dispatch branch), and the outer fee
+is recomputed from fresh suggested params on every call, so the per-byte
+congestion fee is picked up automatically.
+"""
+
+import copy
+import sys
+
+from algosdk import constants, transaction
+
+from local_evaluator import parse_teal
+from teal_metrics import max_path_weight
+
+# Each of these starts one more inner transaction
+INNER_TXN_OPS = ("itxn_begin", "itxn_next")
+
+
+def _inner_weight(instr):
+    return 1 if instr.op in INNER_TXN_OPS else 0
+
+
+def method_entry_points(teal):
+    """{method or OnCompletion name: pc of its branch} from the approval dispatch"""
+    program = parse_teal(teal)
+    instructions = program.instructions
+    entries = {}
+    for pc in range(len(instructions) - 3):
+        load, const, compare, branch = instructions[pc:pc + 4]
+        if compare.op != "==" or branch.op != "bnz":
+            continue
+        if load.op == "txna" and load.args == ["ApplicationArgs", "0"] and const.op in ("byte", "pushbytes"):
+            name = const.imm.decode()
+        elif load.op == "txn" and load.args == ["OnCompletion"] and const.op in ("int", "pushint"):
+            name = const.args[0]
+        else:
+            continue
+        entries.setdefault(name, program.labels[branch.args[0]])
+    return entries
+
+
+def inner_txn_counts(teal):
+    """{method: worst-case number of inner transactions it sends}"""
+    program = parse_teal(teal)
+    return {
+        name: max_path_weight(program, _inner_weight, start=pc)
+        for name, pc in method_entry_points(program).items()
+    }
+
+
+def _min_fee(sp):
+    return sp.min_fee or constants.MIN_TXN_FEE
+
+
+def outer_fee(sp, txn):
+    """Fee txn must pay for itself under sp (per-byte fee when congested)"""
+    min_fee = _min_fee(sp)
+    if sp.flat_fee or not sp.fee:
+        return min_fee
+    # The fee is part of the encoding, so size it with the fee it will carry
+    fee = min_fee
+    for _ in range(2):
+        txn.fee = fee
+        fee = max(min_fee, sp.fee * txn.estimate_size())
+    return fee
+
+
+def pooled_fee(sp, txn, inner_count):
+    """Exact fee for txn when it also covers inner_count zero-fee inner transactions"""
+    return outer_fee(sp, txn) + inner_count * _min_fee(sp)
+
+
+class FeePooler:
+    """Builds calls and groups whose fees exactly cover their inner transactions"""
+
+    def __init__(self, approval_teal):
+        self.inner_counts = inner_txn_counts(approval_teal)
+
+    @classmethod
+    def from_variant(cls, name):
+        """Pooler for a contract variant in contract_registry.py"""
+        from contract_registry import build_variant
+        return cls(build_variant(name)[0])
+
+    def inner_count(self, method):
+        """Worst-case inner transactions of a method (0 if it sends none)"""
+        return self.inner_counts.get(method, 0)
+
+    def _flat(self, sp):
+        sp = copy.copy(sp)
+        sp.flat_fee = True
+        sp.fee = _min_fee(sp)
+        return sp
+
+    def set_fees(self, sp, txns, method, payer=-1):
+        """Set exact flat fees on txns; txns[payer] also pays for method's inner transactions"""
+        fees = [outer_fee(sp, txn) for txn in txns]
+        fees[payer] += self.inner_count(method) * _min_fee(sp)
+        for txn, fee in zip(txns, fees):
+            txn.fee = fee
+        return txns
+
+    def call(self, sp, sender, app_id, method, args=(), on_complete=transaction.OnComplete.NoOpOC, **kwargs):
+        """Single app call to method with its pooled fee set"""
+        txn = transaction.ApplicationCallTxn(
+            sender=sender,
+            sp=self._flat(sp),
+            index=app_id,
+            on_complete=on_complete,
+            app_args=[method.encode()] + list(args),
+            **kwargs
+        )
+        return self.set_fees(sp, [txn], method)[0]
+
+    def group(self, sp, txns, method, payer=-1):
+        """Set pooled fees on a group calling method, then assign its group id"""
+        return transaction.assign_group_id(self.set_fees(sp, txns, method, payer))
+
+
+def fee_report(name):
+    """Worst-case inner transactions and pooled min fee per method of a variant"""
+    pooler = FeePooler.from_variant(name)
+    print(f"💸 Pooled fees for {name} (at min fee {constants.MIN_TXN_FEE}):")
+    for method, count in sorted(pooler.inner_counts.items()):
+        fee = (1 + count) * constants.MIN_TXN_FEE
+        print(f"   {method:22s} {count} inner -> {fee} microALGO")
+    return pooler.inner_counts
+
+
+if __name__ == "__main__":
+    for variant in sys.argv[1:] or ["enhanced_contract"]:
+        try:
+            fee_report(variant)
+        except Exception as e:
+            print(f"❌ Error: {e}")
@@ -12,6 +12,8 @@ This contract implements:
 from pyteal import *
 from algokit_utils import ApplicationClient
 
+from method_guards import MethodGuards
+
 # ============================================================================
 # CONSTANTS
 # ============================================================================
@@ -66,11 +68,44 @@ GAME_ACTIVE = Int(2)
 GAME_COMPLETED = Int(3)
 GAME_PAUSED = Int(4)
 
+# ============================================================================
+# SHARED GUARDS
+# ============================================================================
+# Which guards each method runs (see method_guards.py)
+
+METHOD_GUARDS = {
+    # Gaming
+    "stake_game": {"not_paused": True, "opted_in": True},
+    "process_win": {"not_paused": True, "opted_in": True},
+    "process_loss": {"not_paused": True, "opted_in": True},
+    # DeFi
+    "stake_rewards": {"not_paused": True, "opted_in": True},
+    "claim_rewards": {"not_paused": True, "opted_in": True},
+    # Admin
+    "toggle_pause": {"admin": True},
+    "withdraw_commission": {"admin": True},
+    "update_config": {"admin": True},
+}
+
+def check_admin():
+    """Require the caller to be the admin"""
+    return Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS))
+
+def check_not_paused():
+    """Require contract not to be paused"""
+    return Assert(App.globalGet(PAUSED) == Int(0))
+
+def check_opted_in():
+    """Require the sender to have opted in"""
+    return Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1))
+
+GUARDS = MethodGuards(METHOD_GUARDS, admin=check_admin, not_paused=check_not_paused, opted_in=check_opted_in)
+
 # ============================================================================
 # MAIN APPROVAL PROGRAM
 # ============================================================================
 
-def approval_program():
+def approval_program(shared_guards=True):
     """Main approval program following Algorand best practices"""
     
     # ========================================================================
@@ -135,10 +170,6 @@ def approval_program():
     def stake_for_game():
         """Stake ALGO to participate in games"""
         return Seq([
-            # Security checks
-            Assert(App.globalGet(PAUSED) == Int(0)),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
-            
             # Game state validation
             Assert(Or(
                 App.globalGet(GAME_STATE) == GAME_IDLE,
@@ -167,7 +198,7 @@ def approval_program():
             App.globalPut(TOTAL_PLAYERS, App.globalGet(TOTAL_PLAYERS) + Int(1)),
             
             # Log event
-            Log(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount()), Itob(App.globalGet(GAME_ROUND))),
+            Log(Concat(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount()), Itob(App.globalGet(GAME_ROUND)))),
             
             Approve()
         ])
@@ -175,9 +206,6 @@ def approval_program():
     def process_win():
         """Process player win"""
         return Seq([
-            # Security checks
-            Assert(App.globalGet(PAUSED) == Int(0)),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
             Assert(App.localGet(Int(0), PLAYER_STAKE) > Int(0)),
             
             # Update player stats
@@ -199,7 +227,7 @@ def approval_program():
             App.globalPut(TOTAL_GAMES_PLAYED, App.globalGet(TOTAL_GAMES_PLAYED) + Int(1)),
             
             # Log event
-            Log(Bytes("GAME_WIN"), Itob(App.localGet(Int(0), PLAYER_STAKE))),
+            Log(Concat(Bytes("GAME_WIN"), Itob(App.localGet(Int(0), PLAYER_STAKE)))),
             
             # Reset player stake
             App.localPut(Int(0), PLAYER_STAKE, Int(0)),
@@ -209,19 +237,16 @@ def approval_program():
     
     def process_loss():
         """Process player loss"""
+        # Calculate commission and slash amount
+        commission = App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)
+        slash_amount = TRANSACTION_FEE + commission
+        
         return Seq([
-            # Security checks
-            Assert(App.globalGet(PAUSED) == Int(0)),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
             Assert(App.localGet(Int(0), PLAYER_STAKE) > Int(0)),
             
             # Update player stats
             App.localPut(Int(0), PLAYER_LOSSES, App.localGet(Int(0), PLAYER_LOSSES) + Int(1)),
             
-            # Calculate commission and slash amount
-            commission = App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)
-            slash_amount = TRANSACTION_FEE + commission
-            
             # Validate slash amount doesn't exceed stake
             Assert(slash_amount <= App.localGet(Int(0), PLAYER_STAKE)),
             
@@ -240,7 +265,7 @@ def approval_program():
             InnerTxnBuilder.Submit(),
             
             # Log event
-            Log(Bytes("GAME_LOSS"), Itob(slash_amount)),
+            Log(Concat(Bytes("GAME_LOSS"), Itob(slash_amount))),
             
             # Reset player stake
             App.localPut(Int(0), PLAYER_STAKE, Int(0)),
@@ -255,9 +280,6 @@ def approval_program():
     def stake_for_rewards():
         """Stake ALGO for daily rewards"""
         return Seq([
-            Assert(App.globalGet(PAUSED) == Int(0)),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
-            
             # Check payment
             Assert(Gtxn[0].amount() >= App.globalGet(MIN_STAKE)),
             Assert(Gtxn[0].receiver() == Global.current_application_address()),
@@ -269,21 +291,19 @@ def approval_program():
             # Update liquidity pool
             App.globalPut(LIQUIDITY_POOL, App.globalGet(LIQUIDITY_POOL) + Gtxn[0].amount()),
             
-            Log(Bytes("STAKE_REWARDS"), Itob(Gtxn[0].amount())),
+            Log(Concat(Bytes("STAKE_REWARDS"), Itob(Gtxn[0].amount()))),
             
             Approve()
         ])
     
     def claim_rewards():
         """Claim accumulated staking rewards"""
+        # Calculate rewards (simplified)
+        total_rewards = App.localGet(Int(0), PLAYER_STAKE_AMOUNT) * App.globalGet(REWARD_RATE) / Int(1000000)
+        
         return Seq([
-            Assert(App.globalGet(PAUSED) == Int(0)),
-            Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
             Assert(App.localGet(Int(0), PLAYER_STAKE_AMOUNT) > Int(0)),
             
-            # Calculate rewards (simplified)
-            total_rewards = App.localGet(Int(0), PLAYER_STAKE_AMOUNT) * App.globalGet(REWARD_RATE) / Int(1000000)
-            
             # Ensure we have enough liquidity
             Assert(total_rewards <= App.globalGet(LIQUIDITY_POOL)),
             
@@ -301,7 +321,7 @@ def approval_program():
             }),
             InnerTxnBuilder.Submit(),
             
-            Log(Bytes("CLAIM_REWARDS"), Itob(total_rewards)),
+            Log(Concat(Bytes("CLAIM_REWARDS"), Itob(total_rewards))),
             
             Approve()
         ])
@@ -312,34 +332,31 @@ def approval_program():
     
     def toggle_pause():
         """Toggle contract pause state"""
+        new_pause = ScratchVar(TealType.uint64)
+        
         return Seq([
-            # Check if caller is admin
-            Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
-            
             # Toggle pause state
-            current_pause = App.globalGet(PAUSED)
-            new_pause = If(current_pause == Int(0), Int(1), Int(0))
-            App.globalPut(PAUSED, new_pause),
+            new_pause.store(If(App.globalGet(PAUSED) == Int(0), Int(1), Int(0))),
+            App.globalPut(PAUSED, new_pause.load()),
             
             # Update game state if pausing
-            If(new_pause == Int(1)).Then(
+            If(new_pause.load() == Int(1)).Then(
                 App.globalPut(GAME_STATE, GAME_PAUSED)
             ),
             
-            Log(Bytes("PAUSE_TOGGLED"), Itob(new_pause)),
+            Log(Concat(Bytes("PAUSE_TOGGLED"), Itob(new_pause.load()))),
             
             Approve()
         ])
     
     def withdraw_commission():
         """Withdraw accumulated commission"""
+        commission_amount = ScratchVar(TealType.uint64)
+        
         return Seq([
-            # Check if caller is admin
-            Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
-            
             # Check if there's commission to withdraw
-            commission_amount = App.globalGet(COMMISSION_POOL),
-            Assert(commission_amount > Int(0)),
+            commission_amount.store(App.globalGet(COMMISSION_POOL)),
+            Assert(commission_amount.load() > Int(0)),
             
             # Reset commission pool
             App.globalPut(COMMISSION_POOL, Int(0)),
@@ -349,26 +366,23 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: commission_amount,
+                TxnField.amount: commission_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
-            Log(Bytes("COMMISSION_WITHDRAWN"), Itob(commission_amount)),
+            Log(Concat(Bytes("COMMISSION_WITHDRAWN"), Itob(commission_amount.load()))),
             
             Approve()
         ])
     
     def update_config():
         """Update contract configuration"""
+        # Update stake limits
+        new_min_stake = Btoi(Txn.application_args[1])
+        new_max_stake = Btoi(Txn.application_args[2])
+        
         return Seq([
-            # Check if caller is admin
-            Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
-            
-            # Update stake limits
-            new_min_stake = Btoi(Txn.application_args[1])
-            new_max_stake = Btoi(Txn.application_args[2])
-            
             # Validate limits
             Assert(And(
                 new_min_stake > Int(0),
@@ -379,7 +393,7 @@ def approval_program():
             App.globalPut(MIN_STAKE, new_min_stake),
             App.globalPut(MAX_STAKE, new_max_stake),
             
-            Log(Bytes("CONFIG_UPDATED"), Itob(new_min_stake), Itob(new_max_stake)),
+            Log(Concat(Bytes("CONFIG_UPDATED"), Itob(new_min_stake), Itob(new_max_stake))),
             
             Approve()
         ])
@@ -406,6 +420,10 @@ def approval_program():
     # MAIN PROGRAM LOGIC
     # ========================================================================
     
+    def method(name, body):
+        """Dispatch branch for a named method, with its guards attached"""
+        return [Txn.application_args[0] == Bytes(name), GUARDS.wrap(name, body, shared_guards)]
+    
     program = Cond(
         # Application lifecycle
         [Txn.application_id() == Int(0), handle_creation],
@@ -415,22 +433,22 @@ def approval_program():
         [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
         
         # Gaming functions
-        [Txn.application_args[0] == Bytes("stake_game"), stake_for_game()],
-        [Txn.application_args[0] == Bytes("process_win"), process_win()],
-        [Txn.application_args[0] == Bytes("process_loss"), process_loss()],
+        method("stake_game", stake_for_game()),
+        method("process_win", process_win()),
+        method("process_loss", process_loss()),
         
         # DeFi functions
-        [Txn.application_args[0] == Bytes("stake_rewards"), stake_for_rewards()],
-        [Txn.application_args[0] == Bytes("claim_rewards"), claim_rewards()],
+        method("stake_rewards", stake_for_rewards()),
+        method("claim_rewards", claim_rewards()),
         
         # Admin functions
-        [Txn.application_args[0] == Bytes("toggle_pause"), toggle_pause()],
-        [Txn.application_args[0] == Bytes("withdraw_commission"), withdraw_commission()],
-        [Txn.application_args[0] == Bytes("update_config"), update_config()],
+        method("toggle_pause", toggle_pause()),
+        method("withdraw_commission", withdraw_commission()),
+        method("update_config", update_config()),
         
         # View functions
-        [Txn.application_args[0] == Bytes("get_player_stats"), get_player_stats()],
-        [Txn.application_args[0] == Bytes("get_game_state"), get_game_state()],
+        method("get_player_stats", get_player_stats()),
+        method("get_game_state", get_game_state()),
         
         [Int(1), Reject()]
     )
@@ -478,8 +496,9 @@ def clear_state_program():
 class FinalGameContract:
     """Final working game contract following Algorand best practices"""
     
-    def __init__(self):
-        self.approval_program = approval_program()
+    def __init__(self, shared_guards=True):
+        self.shared_guards = shared_guards
+        self.approval_program = approval_program(shared_guards)
         self.clear_state_program = clear_state_program()
     
     def compile(self):
@@ -499,6 +518,20 @@ class FinalGameContract:
         
         return approval_teal, clear_teal
     
+    def guard_size_report(self):
+        """Approval size with guards inlined vs shared as subroutines"""
+        from teal_metrics import estimate_program_size
+        
+        inline_teal, _ = FinalGameContract(shared_guards=False).compile()
+        shared_teal, _ = FinalGameContract(shared_guards=True).compile()
+        inline_size = estimate_program_size(inline_teal)
+        shared_size = estimate_program_size(shared_teal)
+        return {
+            "inline": inline_size,
+            "shared": shared_size,
+            "saved": inline_size - shared_size,
+        }
+    
     def get_abi(self):
         """Get Application Binary Interface for the contract"""
         return {
@@ -583,6 +616,8 @@ if __name__ == "__main__":
         json.dump(contract.get_abi(), f, indent=2)
     
     print("✅ Final smart contract compiled successfully!")
+    report = contract.guard_size_report()
+    print(f"📉 Shared guards: {report['inline']} -> {report['shared']} bytes ({report['saved']} saved)")
     print("📁 Files created:")
     print("   - artifacts/final_contract_approval.teal")
     print("   - artifacts/final_contract_clear.teal")
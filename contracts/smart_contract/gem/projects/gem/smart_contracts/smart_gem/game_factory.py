@@ -0,0 +1,205 @@
+"""
+Game Factory Smart Contract
+Deploys identical game shards by inner app-create and records them in a registry box
+
+The admin uploads the shard's compiled approval/clear programs into the
+"approval" and "clear" boxes (load_program, in chunks), then calls
+deploy_shard once per shard. Each shard is funded for its first admin box;
+bootstrap_shard relays the shard's bootstrap call so the operator, not the
+factory, becomes its admin and oracle. shard_router.py maps players onto
+the shards listed in the "shards" box.
+"""
+
+from pyteal import *
+
+import box_layout
+
+# Constants
+MAX_SHARDS = 64
+MAX_PROGRAM_BYTES = 4096  # One program page per inner-create field
+SHARD_ID_BYTES = 8
+
+# Shard schema (matches deploy_enhanced.py)
+SHARD_GLOBAL_UINTS = 10
+SHARD_GLOBAL_BYTES = 10
+SHARD_LOCAL_UINTS = 11
+SHARD_LOCAL_BYTES = 8
+
+# Min balance for the shard account plus its first admin box
+SHARD_FUNDING = 100000 + box_layout.admin_box_min_balance()
+
+# Global state keys
+ADMIN = Bytes("ADMIN")
+SHARD_COUNT = Bytes("SHARD_COUNT")
+
+# Boxes
+APPROVAL_BOX = Bytes("approval")
+CLEAR_BOX = Bytes("clear")
+REGISTRY_BOX = Bytes("shards")  # SHARD_COUNT uint64 app ids
+
+def app_address(app_id):
+    """Address of an application account"""
+    return Sha512_256(Concat(Bytes("appID"), Itob(app_id)))
+
+def registry_entry(index):
+    """App id of the shard at a registry index"""
+    return Btoi(App.box_extract(REGISTRY_BOX, index * Int(SHARD_ID_BYTES), Int(SHARD_ID_BYTES)))
+
+def approval_program():
+    """Factory approval program"""
+
+    handle_creation = Seq([
+        App.globalPut(ADMIN, Txn.sender()),
+        App.globalPut(SHARD_COUNT, Int(0)),
+        Approve()
+    ])
+
+    is_admin = Txn.sender() == App.globalGet(ADMIN)
+
+    # Upload a shard program into its box
+    def load_program():
+        name = Txn.application_args[1]
+        size = Btoi(Txn.application_args[2])
+        offset = Btoi(Txn.application_args[3])
+        chunk = Txn.application_args[4]
+
+        return Seq([
+            Assert(is_admin),
+            Assert(Or(name == APPROVAL_BOX, name == CLEAR_BOX)),
+            Assert(size <= Int(MAX_PROGRAM_BYTES)),
+
+            # The first chunk (re)creates the box at the full program size
+            If(offset == Int(0)).Then(Seq([
+                Pop(App.box_delete(name)),
+                Assert(App.box_create(name, size))
+            ])),
+            App.box_replace(name, offset, chunk),
+
+            Approve()
+        ])
+
+    # Create, fund and register one shard
+    def deploy_shard():
+        approval = App.box_get(APPROVAL_BOX)
+        clear = App.box_get(CLEAR_BOX)
+        shard_id = ScratchVar(TealType.uint64)
+        count = App.globalGet(SHARD_COUNT)
+
+        return Seq([
+            Assert(is_admin),
+            Assert(count < Int(MAX_SHARDS)),
+            approval,
+            clear,
+            Assert(And(approval.hasValue(), clear.hasValue())),
+
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.ApplicationCall,
+                TxnField.approval_program: approval.value(),
+                TxnField.clear_state_program: clear.value(),
+                TxnField.global_num_uints: Int(SHARD_GLOBAL_UINTS),
+                TxnField.global_num_byte_slices: Int(SHARD_GLOBAL_BYTES),
+                TxnField.local_num_uints: Int(SHARD_LOCAL_UINTS),
+                TxnField.local_num_byte_slices: Int(SHARD_LOCAL_BYTES),
+                TxnField.extra_program_pages: (Len(approval.value()) + Len(clear.value()) - Int(1)) / Int(2048),
+                TxnField.fee: Int(0)
+            }),
+            InnerTxnBuilder.Submit(),
+            shard_id.store(InnerTxn.created_application_id()),
+
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: app_address(shard_id.load()),
+                TxnField.amount: Int(SHARD_FUNDING),
+                TxnField.fee: Int(0)
+            }),
+            InnerTxnBuilder.Submit(),
+
+            # Registry box is created on the first deploy (box_create is a no-op after)
+            Pop(App.box_create(REGISTRY_BOX, Int(MAX_SHARDS * SHARD_ID_BYTES))),
+            App.box_replace(REGISTRY_BOX, count * Int(SHARD_ID_BYTES), Itob(shard_id.load())),
+
+            Log(Concat(Bytes("SHARD_DEPLOYED"), Itob(count), Itob(shard_id.load()))),
+            App.globalPut(SHARD_COUNT, count + Int(1)),
+
+            Approve()
+        ])
+
+    # Make the caller the first admin of a shard the factory created
+    def bootstrap_shard():
+        index = Btoi(Txn.application_args[1])
+
+        return Seq([
+            Assert(is_admin),
+            Assert(index < App.globalGet(SHARD_COUNT)),
+
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.ApplicationCall,
+                TxnField.application_id: registry_entry(index),
+                TxnField.application_args: [Bytes("bootstrap")],
+                TxnField.accounts: [Txn.sender()],
+                TxnField.fee: Int(0)
+            }),
+            InnerTxnBuilder.Submit(),
+
+            Approve()
+        ])
+
+    program = Cond(
+        [Txn.application_id() == Int(0), handle_creation],
+        [Txn.on_completion() == OnComplete.UpdateApplication, Reject()],
+        [Txn.on_completion() == OnComplete.DeleteApplication, Reject()],
+        [Txn.on_completion() != OnComplete.NoOp, Reject()],
+        [Txn.application_args[0] == Bytes("load_program"), load_program()],
+        [Txn.application_args[0] == Bytes("deploy_shard"), deploy_shard()],
+        [Txn.application_args[0] == Bytes("bootstrap_shard"), bootstrap_shard()],
+        [Int(1), Reject()]
+    )
+
+    return program
+
+def clear_state_program():
+    """Clear state program"""
+    return Approve()
+
+class GameFactoryContract:
+    """Factory that deploys and registers game shards"""
+
+    def __init__(self):
+        self.approval_program = approval_program()
+        self.clear_state_program = clear_state_program()
+
+    def compile(self):
+        """Compile the contract"""
+        from pyteal import compileTeal, Mode
+
+        approval_teal = compileTeal(self.approval_program, mode=Mode.Application, version=8)
+        clear_teal = compileTeal(self.clear_state_program, mode=Mode.Application, version=8)
+
+        return approval_teal, clear_teal
+
+if __name__ == "__main__":
+    print("🏭 Compiling Game Factory Contract...")
+
+    try:
+        contract = GameFactoryContract()
+        approval_teal, clear_teal = contract.compile()
+
+        import os
+        os.makedirs("artifacts", exist_ok=True)
+
+        with open("artifacts/game_factory_approval.teal", "w") as f:
+            f.write(approval_teal)
+
+        with open("artifacts/game_factory_clear.teal", "w") as f:
+            f.write(clear_teal)
+
+        print("✅ Factory compiled successfully!")
+        print("📁 Files created:")
+        print("   - artifacts/game_factory_approval.teal")
+        print("   - artifacts/game_factory_clear.teal")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
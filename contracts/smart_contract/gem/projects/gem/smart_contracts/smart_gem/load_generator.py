@@ -0,0 +1,275 @@
+"""
+Load Generator
+Soak-tests the staking game with a modelled player population
+
+Each simulated player stakes a random amount, plays for a random number of
+rounds, wins with the configured probability (the oracle settles it) and
+now and then claims staking rewards, for a number of games. Players run
+concurrently on the ScenarioRunner machinery, so the final-state assertions
+still apply. The report has p50/p95/p99 confirm latency and failed-assert
+rates per contract method, fee totals, and how the app's state grew.
+
+A run is driven by a JSON profile (see load_profile.json). Each entry in
+its "variants" is deployed to a fresh local stand-in network and driven by
+the same seeded load, so builds can be compared like for like. With a
+"network" section the load runs against that algod and app instead.
+
+Run `python load_generator.py [profile.json]`.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from algosdk import mnemonic
+from algosdk.v2client import algod
+
+from contract_registry import SMART_GEM_DIR
+from local_evaluator import address_string, application_address
+from scenario_runner import ScenarioRunner, StepStats
+
+DEFAULT_PROFILE_PATH = os.path.join(SMART_GEM_DIR, "load_profile.json")
+
+DEFAULT_PROFILE = {
+    "players": 1000,
+    "games_per_player": 3,
+    "stake": {"min": 200_000, "max": 2_000_000},
+    "play_rounds": {"min": 1, "max": 4},  # Rounds between a stake and its result
+    "win_probability": 0.45,
+    "claim_probability": 0.25,  # Chance of a rewards claim after each game
+    "reward_stake": 1_000_000,  # Staked once by players who may claim
+    "player_funding": 20_000_000,
+    "concurrency": 128,
+    "sample_seconds": 1.0,
+    "seed": 7,
+    "variants": [{"name": "enhanced_contract"}],
+}
+
+# Steps as reported -> the contract method each one calls
+METHODS = {
+    "opt_in": "opt_in",
+    "stake": "stake_game",
+    "settle": "process_result",
+    "stake_rewards": "stake_rewards",
+    "claim": "claim_rewards",
+    "unstake": "unstake",
+    "create_room": "create_room",
+    "fund_rewards": "stake_rewards",
+    "close_room": "close_room",
+}
+GROWTH_FIELDS = ("globals", "boxes", "box_bytes", "balance", "min_balance")
+ASSERT_ERRORS = ("assert failed", "err opcode", "rejected by ApprovalProgram")
+
+
+def load_profile(profile=None):
+    """Load profile from a dict or a JSON file path, with defaults filled in"""
+    if isinstance(profile, str):
+        with open(profile, "r") as f:
+            profile = json.load(f)
+    return dict(DEFAULT_PROFILE, **(profile or {}))
+
+
+def _between(rng, bounds):
+    return rng.randint(bounds["min"], bounds["max"])
+
+
+class LoadGenerator(ScenarioRunner):
+    """ScenarioRunner whose players follow the load profile's behaviour model"""
+
+    def __init__(self, algod_client, app_id, oracle_key, players, profile=None):
+        self.profile = load_profile(profile)
+        scenario = {
+            "stake": self.profile["stake"]["max"],
+            "reward_stake": self.profile["reward_stake"],
+            "reward_funding": self.profile["reward_stake"] * 10,
+            "concurrency": self.profile["concurrency"],
+            "seed": self.profile["seed"],
+            "wait_rounds": 20,
+            "steps": ["opt_in", "stake_rewards", "stake", "settle", "claim", "unstake"],
+        }
+        super().__init__(algod_client, app_id, oracle_key, players, scenario)
+        self.samples = []
+
+    async def _player_flow(self, player):
+        """Stake, play, settle and maybe claim for each game, then leave the rewards pool"""
+        rng = random.Random(f"{self.profile['seed']}:{player.index}")
+        steps = self.report.steps
+        claims = self.profile["claim_probability"] > 0
+        if claims:
+            # stake_rewards needs local state, which only the first stake would create
+            if not await self.step_opt_in(steps["opt_in"], player):
+                return False
+            if not await self.step_stake_rewards(steps["stake_rewards"], player):
+                return False
+
+        for _ in range(self.profile["games_per_player"]):
+            if not await self.step_stake(steps["stake"], player, _between(rng, self.profile["stake"])):
+                return False
+            for _ in range(_between(rng, self.profile["play_rounds"])):
+                await self.watcher.next_round()
+            player.wins = rng.random() < self.profile["win_probability"]
+            if not await self.step_settle(steps["settle"], player):
+                return False
+            if claims and rng.random() < self.profile["claim_probability"]:
+                await self.step_claim(steps["claim"], player)
+
+        if player.reward_stake:
+            return await self.step_unstake(steps["unstake"], player)
+        return True
+
+    async def sample_state(self):
+        """Snapshot of the app's size: globals, boxes and its account's balances"""
+        globals_, _ = await self.read_state()
+        info = await asyncio.to_thread(
+            self.algod_client.account_info, address_string(application_address(self.app_id)))
+        self.samples.append({
+            "elapsed": round(time.perf_counter() - self._started, 3),
+            "round": self.watcher.round,
+            "globals": len(globals_),
+            "boxes": info.get("total-boxes", 0),
+            "box_bytes": info.get("total-box-bytes", 0),
+            "balance": info.get("amount", 0),
+            "min_balance": info.get("min-balance", 0),
+            "liquidity_pool": globals_.get("LIQUIDITY_POOL", 0),
+            "commission_pool": globals_.get("COMMISSION_POOL", 0),
+        })
+
+    async def _assert_rooms(self):
+        # Rooms are still open here, so this sample catches the state at its largest
+        await self.sample_state()
+        await super()._assert_rooms()
+
+    async def _sampler(self):
+        while True:
+            await asyncio.sleep(self.profile["sample_seconds"])
+            await self.sample_state()
+
+    async def run_async(self):
+        self._started = time.perf_counter()
+        await self.watcher.start()
+        await self.sample_state()
+        sampler = asyncio.ensure_future(self._sampler())
+        try:
+            report = await super().run_async()
+        finally:
+            sampler.cancel()
+        await self.sample_state()
+        return report
+
+    def summary(self):
+        """Per-method latency, assert-failure rate and fees, plus totals and state growth"""
+        methods = {}
+        latencies = {}  # method -> StepStats over every step that calls it
+        for step, stats in self.report.steps.items():
+            summary = stats.summary()
+            attempts = summary["count"] + summary["failed"]
+            asserts = sum(count for message, count in stats.failures.items()
+                          if any(text in message for text in ASSERT_ERRORS))
+            entry = methods.setdefault(METHODS[step], {"count": 0, "failed": 0, "failed_asserts": 0, "fees": 0})
+            entry["count"] += summary["count"]
+            entry["failed"] += summary["failed"]
+            entry["failed_asserts"] += asserts
+            entry["fees"] += stats.fees
+            latencies.setdefault(METHODS[step], StepStats(METHODS[step])).latencies += stats.latencies
+            entry["attempts"] = entry.get("attempts", 0) + attempts
+
+        for method, entry in methods.items():
+            for p in (50, 95, 99):
+                entry[f"p{p}"] = round(latencies[method].percentile(p), 4)
+            attempts = entry.pop("attempts")
+            entry["assert_rate"] = round(entry["failed_asserts"] / attempts, 4) if attempts else 0.0
+
+        first, last = self.samples[0], self.samples[-1]
+        confirmed = sum(m["count"] for m in methods.values())
+        return {
+            "methods": methods,
+            "confirmed": confirmed,
+            "failed": sum(m["failed"] for m in methods.values()),
+            "fees": sum(m["fees"] for m in methods.values()),
+            "elapsed": round(self.report.elapsed, 3),
+            "rounds": self.report.rounds,
+            "groups_per_second": round(confirmed / self.report.elapsed, 1) if self.report.elapsed else 0.0,
+            "growth": {key: last[key] - first[key] for key in GROWTH_FIELDS},
+            "peak": {key: max(sample[key] for sample in self.samples) for key in GROWTH_FIELDS},
+            "samples": self.samples,
+            "assertions_passed": not self.report.failed_assertions,
+        }
+
+
+# ============================================================================
+# RUNS
+# ============================================================================
+
+def _programs(variant):
+    """(approval, clear) TEAL of an enhanced-contract variant entry"""
+    from contract_registry import compile_contract
+    from enhanced_contract import EnhancedGameContract
+
+    contract = EnhancedGameContract(shared_guards=variant.get("shared_guards", True))
+    return compile_contract(contract, peephole=variant.get("peephole", False))
+
+
+def run_local(profile, variant):
+    """Deploy one variant on a fresh local stand-in and drive the profile's load at it"""
+    from account_factory import local_factory
+    from local_network import deploy_game
+
+    algod_client, factory = local_factory()
+    app_id = deploy_game(algod_client, factory.faucet_key, funding=10 ** 10, programs=_programs(variant))
+    players = factory.prepare(profile["players"], amount=profile["player_funding"])
+    generator = LoadGenerator(algod_client, app_id, factory.faucet_key, players, profile)
+    generator.run()
+    return generator.summary()
+
+
+def run_network(profile):
+    """Drive the profile's load at the deployed app in its "network" section"""
+    from account_factory import AccountFactory
+
+    network = profile["network"]
+    algod_client = algod.AlgodClient(network.get("algod_token", ""), network["algod_address"])
+    # The faucet also has to be the app's oracle and funds the rewards pool
+    faucet_key = mnemonic.to_private_key(os.environ[network.get("faucet_env", "FAUCET_MNEMONIC")])
+    factory = AccountFactory(algod_client, faucet_key)
+    players = factory.prepare(profile["players"], amount=profile["player_funding"])
+    generator = LoadGenerator(algod_client, network["app_id"], faucet_key, players, profile)
+    generator.run()
+    return generator.summary()
+
+
+def print_summary(name, summary):
+    print(f"\n📊 {name}: {summary['confirmed']} groups confirmed, {summary['failed']} failed "
+          f"in {summary['elapsed']}s ({summary['groups_per_second']} groups/s, {summary['rounds']} rounds)")
+    print(f"   {'method':<16}{'ok':>7}{'asserts':>9}{'rate':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'fees':>12}")
+    for method, m in summary["methods"].items():
+        print(f"   {method:<16}{m['count']:>7}{m['failed_asserts']:>9}{m['assert_rate']:>8}"
+              f"{m['p50']:>9}{m['p95']:>9}{m['p99']:>9}{m['fees']:>12}")
+    print(f"   💸 Fees: {summary['fees'] / 1_000_000} ALGO")
+    growth, peak = summary["growth"], summary["peak"]
+    print(f"   📈 Growth: {growth['boxes']:+} boxes ({growth['box_bytes']:+} bytes), "
+          f"min balance {growth['min_balance']:+}, balance {growth['balance']:+}")
+    print(f"   🔝 Peak: {peak['boxes']} boxes ({peak['box_bytes']} bytes), min balance {peak['min_balance']}")
+    print("   ✅ Final state matches" if summary["assertions_passed"] else "   ❌ Final state mismatch")
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PROFILE_PATH
+    try:
+        profile = load_profile(path)
+        print(f"🏋️  Load profile: {profile['players']} players x {profile['games_per_player']} games")
+        if "network" in profile:
+            print_summary(profile["network"]["algod_address"], run_network(profile))
+        else:
+            for variant in profile["variants"]:
+                name = variant.get("name", "enhanced_contract")
+                print(f"\n🚀 Running {name} on a local network...")
+                print_summary(name, run_local(profile, variant))
+    except Exception as e:
+        print(f"❌ Load run failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,2185 @@
+"""
+Local TEAL Evaluator
+Runs the TEAL produced by our contracts in-process, without an algod node
+
+The evaluator understands the TEAL assembly text that compileTeal() emits
+(labels, pseudo-ops such as `int pay` and `byte "KEY"`) and models the parts
+of the ledger our contracts touch: global/local state, boxes, balances,
+inner payments and application calls, and fee pooling.
+
+Resource limits are enforced the way algod does for version 8 programs:
+an account or app is only available when the transaction references it
+(its sender, Accounts, Applications, the current app, apps created earlier
+in the group and their addresses), a box only when some call in the group lists it in Boxes, and
+each box reference adds BOX_IO_BUDGET bytes to the group's box quota.
+"""
+
+import copy
+import hashlib
+import re
+
+from algosdk import encoding
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+MAX_UINT64 = 2 ** 64 - 1
+MAX_STACK_DEPTH = 1000
+MAX_BYTES_LENGTH = 4096
+MAX_LOG_CALLS = 32
+MAX_LOG_SIZE = 1024
+MAX_INNER_TXNS = 256
+MAX_CALL_DEPTH = 8  # Nested inner application calls
+MAX_GROUP_SIZE = 16
+
+DEFAULT_BUDGET = 700  # Opcode budget per application call
+MIN_TXN_FEE = 1000
+MIN_BALANCE = 100000
+APP_OPTIN_MIN_BALANCE = 100000
+SCHEMA_UINT_MIN_BALANCE = 28500
+SCHEMA_BYTES_MIN_BALANCE = 50000
+BOX_FLAT_MIN_BALANCE = 2500
+BOX_BYTE_MIN_BALANCE = 400
+BOX_IO_BUDGET = 1024  # Box bytes each box reference lets the group touch
+
+ZERO_ADDRESS = bytes(32)
+
+TXN_TYPES = {
+    "unknown": 0,
+    "pay": 1,
+    "keyreg": 2,
+    "acfg": 3,
+    "axfer": 4,
+    "afrz": 5,
+    "appl": 6,
+}
+TXN_TYPE_NAMES = {value: name for name, value in TXN_TYPES.items()}
+
+ON_COMPLETE = {
+    "NoOp": 0,
+    "OptIn": 1,
+    "CloseOut": 2,
+    "ClearState": 3,
+    "UpdateApplication": 4,
+    "DeleteApplication": 5,
+}
+
+# Opcodes that cost more than 1 unit of budget
+OPCODE_COSTS = {
+    "sha256": 35,
+    "keccak256": 130,
+    "sha512_256": 45,
+    "sha3_256": 130,
+    "ed25519verify": 1900,
+    "ed25519verify_bare": 1900,
+}
+
+# Transaction fields that hold 32-byte addresses
+ADDRESS_FIELDS = {
+    "Sender", "Receiver", "CloseRemainderTo", "RekeyTo", "AssetSender",
+    "AssetReceiver", "AssetCloseTo", "Lease", "GroupID", "FreezeAccount",
+    "ConfigAssetManager", "ConfigAssetReserve", "ConfigAssetFreeze",
+    "ConfigAssetClawback",
+}
+
+# Transaction fields that hold byte strings
+BYTES_FIELDS = {
+    "Note", "Type", "ApprovalProgram", "ClearStateProgram", "TxID",
+    "ConfigAssetName", "ConfigAssetUnitName", "ConfigAssetURL",
+    "ConfigAssetMetadataHash", "VotePK", "SelectionPK",
+}
+
+# Transaction fields that hold arrays
+ARRAY_FIELDS = {
+    "ApplicationArgs": "NumAppArgs",
+    "Accounts": "NumAccounts",
+    "Applications": "NumApplications",
+    "Assets": "NumAssets",
+    "Logs": "NumLogs",
+    "ApprovalProgramPages": "NumApprovalProgramPages",
+    "ClearStateProgramPages": "NumClearStateProgramPages",
+}
+
+BRANCH_OPS = {"b", "bz", "bnz", "callsub"}
+TERMINAL_OPS = {"b", "return", "err", "retsub"}
+
+
+class TealError(Exception):
+    """Raised when a TEAL program fails during evaluation"""
+
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+    def __str__(self):
+        if self.line is None:
+            return self.message
+        return f"{self.message} (line {self.line})"
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\S+')
+
+
+class Label:
+    """A branch target inside a TEAL program"""
+
+    __slots__ = ("name", "line")
+
+    def __init__(self, name, line=None):
+        self.name = name
+        self.line = line
+
+    def render(self):
+        return f"{self.name}:"
+
+    def __repr__(self):
+        return f"Label({self.name!r})"
+
+
+class Instruction:
+    """A single TEAL instruction with its parsed immediate"""
+
+    __slots__ = ("op", "args", "line", "imm", "text")
+
+    def __init__(self, op, args=(), line=None, text=None):
+        self.op = op
+        self.args = list(args)
+        self.line = line
+        self.imm = _parse_immediate(op, self.args)
+        self.text = text
+
+    @classmethod
+    def make(cls, op, *args, line=None):
+        """Build a new instruction from python values"""
+        rendered = [_render_arg(op, arg) for arg in args]
+        return cls(op, rendered, line=line)
+
+    def key(self):
+        """Comparable identity (opcode plus immediates)"""
+        if self.imm is not None:
+            return (self.op, self.imm)
+        return (self.op, tuple(self.args))
+
+    def render(self):
+        if self.text is not None:
+            return self.text
+        return " ".join([self.op] + self.args)
+
+    def __repr__(self):
+        return f"Instruction({self.render()!r})"
+
+
+def _decode_string_literal(token):
+    """Decode a TEAL "..." literal into bytes"""
+    body = token[1:-1]
+    out = bytearray()
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char != "\\":
+            out.extend(char.encode("utf-8"))
+            i += 1
+            continue
+        nxt = body[i + 1]
+        if nxt == "x":
+            out.append(int(body[i + 2:i + 4], 16))
+            i += 4
+            continue
+        out.append({"n": 10, "r": 13, "t": 9, "\\": 92, '"': 34}[nxt])
+        i += 2
+    return bytes(out)
+
+
+def parse_bytes(args):
+    """Parse the immediate of a `byte`/`pushbytes` instruction"""
+    first = args[0]
+    if first.startswith('"'):
+        return _decode_string_literal(first)
+    if first.startswith("0x"):
+        return bytes.fromhex(first[2:])
+    if first in ("base64", "b64"):
+        import base64
+        return base64.b64decode(args[1])
+    if first.startswith("base64(") or first.startswith("b64("):
+        import base64
+        return base64.b64decode(first[first.index("(") + 1:-1])
+    if first in ("base32", "b32"):
+        import base64
+        data = args[1]
+        return base64.b32decode(data + "=" * (-len(data) % 8))
+    raise TealError(f"cannot parse byte constant {' '.join(args)}")
+
+
+def parse_int(token):
+    """Parse the immediate of an `int`/`pushint` instruction"""
+    if token in TXN_TYPES:
+        return TXN_TYPES[token]
+    if token in ON_COMPLETE:
+        return ON_COMPLETE[token]
+    if token.startswith("0x"):
+        return int(token, 16)
+    if len(token) > 1 and token.startswith("0"):
+        return int(token, 8)
+    return int(token)
+
+
+def _parse_immediate(op, args):
+    if op in ("int", "pushint"):
+        return parse_int(args[0])
+    if op in ("byte", "pushbytes"):
+        return parse_bytes(args)
+    if op == "addr":
+        return encoding.decode_address(args[0])
+    if op == "method":
+        signature = _decode_string_literal(args[0])
+        return hashlib.new("sha512_256", signature).digest()[:4]
+    return None
+
+
+def _render_arg(op, arg):
+    if op in ("byte", "pushbytes") and isinstance(arg, (bytes, bytearray)):
+        return format_bytes(arg)
+    return str(arg)
+
+
+def format_bytes(value):
+    """Render bytes the way PyTeal does: quoted when printable, hex otherwise"""
+    try:
+        text = value.decode("ascii")
+    except UnicodeDecodeError:
+        text = None
+    if text is not None and all(32 <= ord(c) < 127 for c in text):
+        escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+    return "0x" + value.hex()
+
+
+class TealProgram:
+    """Parsed TEAL program (labels and instructions)"""
+
+    def __init__(self, items, version=8):
+        self.items = list(items)
+        self.version = version
+        self.instructions = []
+        self.labels = {}
+        for item in self.items:
+            if isinstance(item, Label):
+                self.labels[item.name] = len(self.instructions)
+            else:
+                self.instructions.append(item)
+        for instr in self.instructions:
+            for target in branch_targets(instr):
+                if target not in self.labels:
+                    raise TealError(f"unknown label {target}", instr.line)
+
+    def to_teal(self):
+        """Render the program back to TEAL assembly"""
+        lines = [f"#pragma version {self.version}"]
+        lines.extend(item.render() for item in self.items)
+        return "\n".join(lines)
+
+    def byte_constants(self):
+        """All byte constants pushed by the program"""
+        return [i.imm for i in self.instructions
+                if i.op in ("byte", "pushbytes", "addr", "method")]
+
+    def int_constants(self):
+        """All int constants pushed by the program"""
+        return [i.imm for i in self.instructions if i.op in ("int", "pushint")]
+
+
+def branch_targets(instr):
+    """Labels an instruction may jump to"""
+    if instr.op in BRANCH_OPS:
+        return [instr.args[0]]
+    if instr.op in ("switch", "match"):
+        return list(instr.args)
+    return []
+
+
+def parse_teal(source):
+    """Parse TEAL assembly text into a TealProgram"""
+    if isinstance(source, TealProgram):
+        return source
+    items = []
+    version = 1
+    for number, raw in enumerate(source.splitlines(), start=1):
+        tokens = _TOKEN_RE.findall(raw)
+        # Strip trailing comments (outside of string literals)
+        for position, token in enumerate(tokens):
+            if token.startswith("//"):
+                tokens = tokens[:position]
+                break
+        if not tokens:
+            continue
+        if tokens[0] == "#pragma":
+            if len(tokens) >= 3 and tokens[1] == "version":
+                version = int(tokens[2])
+            continue
+        if len(tokens) == 1 and tokens[0].endswith(":"):
+            items.append(Label(tokens[0][:-1], number))
+            continue
+        items.append(Instruction(tokens[0], tokens[1:], line=number, text=raw.strip()))
+    return TealProgram(items, version)
+
+
+# ============================================================================
+# ADDRESSES AND TRANSACTIONS
+# ============================================================================
+
+def application_address(app_id):
+    """32-byte address of an application account"""
+    return encoding.checksum(b"appID" + app_id.to_bytes(8, "big"))
+
+
+def address_bytes(address):
+    """Accept a base32 address or raw 32 bytes and return raw bytes"""
+    if isinstance(address, (bytes, bytearray)):
+        return bytes(address)
+    return encoding.decode_address(address)
+
+
+def address_string(raw):
+    """Convert raw 32 bytes into a base32 address"""
+    if isinstance(raw, str):
+        return raw
+    return encoding.encode_address(bytes(raw))
+
+
+def make_txn(**fields):
+    """Build a transaction dict keyed by TEAL field names"""
+    txn = {
+        "Sender": ZERO_ADDRESS,
+        "Fee": MIN_TXN_FEE,
+        "FirstValid": 1,
+        "LastValid": 1001,
+        "Note": b"",
+        "TypeEnum": TXN_TYPES["appl"],
+        "ApplicationArgs": [],
+        "Accounts": [],
+        "Applications": [],
+        "Assets": [],
+        "Boxes": [],
+    }
+    txn.update(fields)
+    for field in ADDRESS_FIELDS:
+        if field in txn:
+            txn[field] = address_bytes(txn[field])
+    txn["Accounts"] = [address_bytes(a) for a in txn["Accounts"]]
+    return txn
+
+
+def make_payment(sender, receiver, amount, fee=MIN_TXN_FEE, **fields):
+    """Build a payment transaction dict"""
+    return make_txn(
+        TypeEnum=TXN_TYPES["pay"], Sender=sender, Receiver=receiver,
+        Amount=amount, Fee=fee, **fields
+    )
+
+
+def make_app_call(sender, app_id, args=(), on_complete=0, accounts=(),
+                  fee=MIN_TXN_FEE, **fields):
+    """Build an application call transaction dict"""
+    return make_txn(
+        TypeEnum=TXN_TYPES["appl"], Sender=sender, ApplicationID=app_id,
+        ApplicationArgs=[_arg_bytes(a) for a in args], OnCompletion=on_complete,
+        Accounts=list(accounts), Fee=fee, **fields
+    )
+
+
+def _arg_bytes(value):
+    if isinstance(value, int):
+        return value.to_bytes(8, "big")
+    if isinstance(value, str):
+        return value.encode()
+    return bytes(value)
+
+
+def txn_from_algosdk(txn):
+    """Convert an algosdk Transaction (or SignedTransaction) into a txn dict"""
+    txn = getattr(txn, "transaction", txn)
+    fields = {
+        "Sender": txn.sender,
+        "Fee": txn.fee,
+        "FirstValid": txn.first_valid_round,
+        "LastValid": txn.last_valid_round,
+        "Note": txn.note or b"",
+        "GroupID": txn.group or ZERO_ADDRESS,
+        "TypeEnum": TXN_TYPES.get(txn.type, 0),
+    }
+    if txn.type == "pay":
+        fields.update(Receiver=txn.receiver, Amount=txn.amt or 0)
+        if txn.close_remainder_to:
+            fields["CloseRemainderTo"] = txn.close_remainder_to
+    elif txn.type == "appl":
+        fields.update(
+            ApplicationID=txn.index or 0,
+            OnCompletion=int(txn.on_complete or 0),
+            ApplicationArgs=[_arg_bytes(a) for a in (txn.app_args or [])],
+            Accounts=list(txn.accounts or []),
+            Applications=list(txn.foreign_apps or []),
+            Assets=list(txn.foreign_assets or []),
+            Boxes=[(ref.app_index, ref.name) for ref in (txn.boxes or [])],
+        )
+        if txn.approval_program:
+            fields["ApprovalProgram"] = txn.approval_program
+            fields["ClearStateProgram"] = txn.clear_program or b""
+        if txn.global_schema is not None:
+            fields["GlobalNumUint"] = txn.global_schema.num_uints or 0
+            fields["GlobalNumByteSlice"] = txn.global_schema.num_byte_slices or 0
+        if txn.local_schema is not None:
+            fields["LocalNumUint"] = txn.local_schema.num_uints or 0
+            fields["LocalNumByteSlice"] = txn.local_schema.num_byte_slices or 0
+    return make_txn(**fields)
+
+
+# ============================================================================
+# LEDGER STATE
+# ============================================================================
+
+class AppRecord:
+    """An application known to the local ledger"""
+
+    def __init__(self, app_id, creator, approval, clear, global_schema=None,
+                 local_schema=None):
+        self.app_id = app_id
+        self.creator = creator
+        self.approval = parse_teal(approval)
+        self.clear = parse_teal(clear)
+        self.global_schema = global_schema  # (num_uints, num_byte_slices)
+        self.local_schema = local_schema
+
+
+class LedgerState:
+    """In-memory ledger: apps, state, boxes and balances"""
+
+    def __init__(self, round=1, timestamp=1700000000):
+        self.round = round
+        self.timestamp = timestamp
+        self.apps = {}
+        self.globals = {}
+        self.locals = {}
+        self.boxes = {}
+        self.balances = {}
+        self.programs = {}
+        self.next_app_id = 1001
+
+    def copy(self):
+        """Independent copy for what-if runs"""
+        return copy.deepcopy(self)
+
+    def fund(self, address, amount):
+        """Credit an account out of thin air"""
+        address = address_bytes(address)
+        self.balances[address] = self.balances.get(address, 0) + amount
+
+    def register_program(self, teal):
+        """Return a stand-in program blob that resolves back to this TEAL"""
+        blob = b"LOCALTEAL:" + hashlib.sha256(teal.encode()).digest()
+        self.programs[blob] = teal
+        return blob
+
+    def resolve_program(self, program):
+        if isinstance(program, str):
+            return program
+        if program in self.programs:
+            return self.programs[program]
+        raise TealError("program bytecode is not registered with the local ledger")
+
+    def install_app(self, creator, approval, clear, app_id=None,
+                    global_schema=None, local_schema=None):
+        """Register an app without running its creation branch"""
+        if app_id is None:
+            app_id = self.next_app_id
+        self.next_app_id = max(self.next_app_id, app_id + 1)
+        self.apps[app_id] = AppRecord(
+            app_id, address_bytes(creator), approval, clear,
+            global_schema, local_schema
+        )
+        self.globals.setdefault(app_id, {})
+        return app_id
+
+    def create_app(self, creator, approval, clear, global_schema=(64, 0),
+                   local_schema=(16, 0), args=()):
+        """Deploy an app by evaluating its creation call; return the app id"""
+        txn = make_app_call(
+            creator, 0, args=args,
+            ApprovalProgram=approval, ClearStateProgram=clear,
+            GlobalNumUint=global_schema[0], GlobalNumByteSlice=global_schema[1],
+            LocalNumUint=local_schema[0], LocalNumByteSlice=local_schema[1],
+        )
+        result = evaluate_group(self, [txn])
+        if not result.ok:
+            raise TealError(f"app creation failed: {result.error}", result.error_line)
+        return result.created_apps[0]
+
+    def opted_in(self, address, app_id):
+        return (address_bytes(address), app_id) in self.locals
+
+    def global_state(self, app_id):
+        return dict(self.globals.get(app_id, {}))
+
+    def local_state(self, address, app_id):
+        return dict(self.locals.get((address_bytes(address), app_id), {}))
+
+    def min_balance(self, address):
+        """Minimum balance an account must keep"""
+        address = address_bytes(address)
+        total = MIN_BALANCE
+        # Look up each known app rather than scanning every account's local state
+        for app_id, record in self.apps.items():
+            if (address, app_id) in self.locals:
+                total += _optin_cost(record)
+        for app_id, record in self.apps.items():
+            if application_address(app_id) == address:
+                for name, value in self.boxes.get(app_id, {}).items():
+                    total += box_min_balance(name, len(value))
+        return total
+
+
+def _optin_cost(record):
+    cost = APP_OPTIN_MIN_BALANCE
+    if record is not None and record.local_schema:
+        cost += SCHEMA_UINT_MIN_BALANCE * record.local_schema[0]
+        cost += SCHEMA_BYTES_MIN_BALANCE * record.local_schema[1]
+    return cost
+
+
+def box_min_balance(name, size):
+    """Minimum balance required to hold a box"""
+    return BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * (len(name) + size)
+
+
+_DELETED = object()
+
+
+class StateDelta:
+    """Staged writes on top of a LedgerState, applied only on success"""
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.global_writes = {}
+        self.local_writes = {}
+        self.local_keys = {}  # (address, app) -> keys written, to avoid scanning local_writes
+        self.box_writes = {}
+        self.balance_deltas = {}
+        self.optins = set()
+        self.closeouts = set()
+        self.created_apps = {}
+        self.deleted_apps = set()
+
+    # -- applications --------------------------------------------------------
+
+    def app(self, app_id):
+        if app_id in self.deleted_apps:
+            return None
+        if app_id in self.created_apps:
+            return self.created_apps[app_id]
+        return self.ledger.apps.get(app_id)
+
+    def new_app_id(self):
+        """Id for an app created in this group; the ledger's counter only moves on commit"""
+        return max([self.ledger.next_app_id] + [app_id + 1 for app_id in self.created_apps])
+
+    # -- global state --------------------------------------------------------
+
+    def get_global(self, app_id, key):
+        value = self.global_writes.get((app_id, key))
+        if value is _DELETED:
+            return None
+        if value is not None:
+            return value
+        return self.ledger.globals.get(app_id, {}).get(key)
+
+    def put_global(self, app_id, key, value):
+        record = self.app(app_id)
+        if record is not None and record.global_schema and self.get_global(app_id, key) is None:
+            _check_schema(self._merged_globals(app_id), record.global_schema, value, "global")
+        self.global_writes[(app_id, key)] = value
+
+    def del_global(self, app_id, key):
+        self.global_writes[(app_id, key)] = _DELETED
+
+    def _merged_globals(self, app_id):
+        merged = dict(self.ledger.globals.get(app_id, {}))
+        for (app, key), value in self.global_writes.items():
+            if app == app_id:
+                if value is _DELETED:
+                    merged.pop(key, None)
+                else:
+                    merged[key] = value
+        return merged
+
+    # -- local state ---------------------------------------------------------
+
+    def is_opted_in(self, address, app_id):
+        pair = (address, app_id)
+        if pair in self.closeouts:
+            return False
+        return pair in self.optins or pair in self.ledger.locals
+
+    def opt_in(self, address, app_id):
+        pair = (address, app_id)
+        if self.is_opted_in(address, app_id):
+            raise TealError("account already opted in to app")
+        self.closeouts.discard(pair)
+        self.optins.add(pair)
+
+    def close_out(self, address, app_id):
+        pair = (address, app_id)
+        self.optins.discard(pair)
+        self.closeouts.add(pair)
+        for key in self.local_keys.pop(pair, ()):
+            del self.local_writes[pair + (key,)]
+
+    def get_local(self, address, app_id, key):
+        if not self.is_opted_in(address, app_id):
+            raise TealError("account is not opted in to app")
+        value = self.local_writes.get((address, app_id, key))
+        if value is _DELETED:
+            return None
+        if value is not None:
+            return value
+        if (address, app_id) in self.optins:
+            return None
+        return self.ledger.locals.get((address, app_id), {}).get(key)
+
+    def put_local(self, address, app_id, key, value):
+        if not self.is_opted_in(address, app_id):
+            raise TealError("account is not opted in to app")
+        record = self.app(app_id)
+        if record is not None and record.local_schema and self.get_local(address, app_id, key) is None:
+            merged = dict(self.ledger.locals.get((address, app_id), {}))
+            if (address, app_id) in self.optins:
+                merged = {}
+            for k in self.local_keys.get((address, app_id), ()):
+                v = self.local_writes[(address, app_id, k)]
+                if v is _DELETED:
+                    merged.pop(k, None)
+                else:
+                    merged[k] = v
+            _check_schema(merged, record.local_schema, value, "local")
+        self.local_writes[(address, app_id, key)] = value
+        self.local_keys.setdefault((address, app_id), set()).add(key)
+
+    def del_local(self, address, app_id, key):
+        if not self.is_opted_in(address, app_id):
+            raise TealError("account is not opted in to app")
+        self.local_writes[(address, app_id, key)] = _DELETED
+        self.local_keys.setdefault((address, app_id), set()).add(key)
+
+    # -- boxes ---------------------------------------------------------------
+
+    def get_box(self, app_id, name):
+        value = self.box_writes.get((app_id, name))
+        if value is _DELETED:
+            return None
+        if value is not None:
+            return value
+        return self.ledger.boxes.get(app_id, {}).get(name)
+
+    def put_box(self, app_id, name, value):
+        self.box_writes[(app_id, name)] = bytes(value)
+
+    def del_box(self, app_id, name):
+        self.box_writes[(app_id, name)] = _DELETED
+
+    # -- balances ------------------------------------------------------------
+
+    def balance(self, address):
+        return self.ledger.balances.get(address, 0) + self.balance_deltas.get(address, 0)
+
+    def debit(self, address, amount):
+        if self.balance(address) < amount:
+            raise TealError(f"overspend: {address_string(address)} balance "
+                            f"{self.balance(address)} < {amount}")
+        self.balance_deltas[address] = self.balance_deltas.get(address, 0) - amount
+
+    def credit(self, address, amount):
+        self.balance_deltas[address] = self.balance_deltas.get(address, 0) + amount
+
+    def min_balance(self, address):
+        total = MIN_BALANCE
+        apps = set(self.ledger.apps) | set(self.created_apps) | {app_id for _, app_id in self.optins}
+        for app_id in apps:
+            if self.is_opted_in(address, app_id):
+                total += _optin_cost(self.app(app_id))
+        for app_id in set(self.ledger.boxes) | {a for a, _ in self.box_writes}:
+            if application_address(app_id) != address:
+                continue
+            names = set(self.ledger.boxes.get(app_id, {}))
+            names |= {n for a, n in self.box_writes if a == app_id}
+            for name in names:
+                value = self.get_box(app_id, name)
+                if value is not None:
+                    total += box_min_balance(name, len(value))
+        return total
+
+    # -- results -------------------------------------------------------------
+
+    def summary(self):
+        """Delta in a plain-dict form (None marks deleted keys)"""
+        def plain(value):
+            return None if value is _DELETED else value
+
+        global_delta = {}
+        for (app_id, key), value in self.global_writes.items():
+            global_delta.setdefault(app_id, {})[key] = plain(value)
+        local_delta = {}
+        for (address, app_id, key), value in self.local_writes.items():
+            local_delta.setdefault((address, app_id), {})[key] = plain(value)
+        box_delta = {}
+        for (app_id, name), value in self.box_writes.items():
+            box_delta.setdefault(app_id, {})[name] = plain(value)
+        return {
+            "global": global_delta,
+            "local": local_delta,
+            "boxes": box_delta,
+            "balances": {a: d for a, d in self.balance_deltas.items() if d},
+            "opted_in": sorted(self.optins),
+            "closed_out": sorted(self.closeouts),
+        }
+
+    def commit(self):
+        """Apply staged writes to the ledger"""
+        ledger = self.ledger
+        for app_id, record in self.created_apps.items():
+            ledger.apps[app_id] = record
+            ledger.globals.setdefault(app_id, {})
+            ledger.next_app_id = max(ledger.next_app_id, app_id + 1)
+        for pair in self.closeouts:
+            ledger.locals.pop(pair, None)
+        for pair in self.optins:
+            ledger.locals[pair] = {}
+        for (app_id, key), value in self.global_writes.items():
+            if value is _DELETED:
+                ledger.globals.setdefault(app_id, {}).pop(key, None)
+            else:
+                ledger.globals.setdefault(app_id, {})[key] = value
+        for (address, app_id, key), value in self.local_writes.items():
+            if (address, app_id) not in ledger.locals:
+                continue
+            if value is _DELETED:
+                ledger.locals[(address, app_id)].pop(key, None)
+            else:
+                ledger.locals[(address, app_id)][key] = value
+        for (app_id, name), value in self.box_writes.items():
+            if value is _DELETED:
+                ledger.boxes.setdefault(app_id, {}).pop(name, None)
+            else:
+                ledger.boxes.setdefault(app_id, {})[name] = value
+        for address, delta in self.balance_deltas.items():
+            ledger.balances[address] = ledger.balances.get(address, 0) + delta
+        for app_id in self.deleted_apps:
+            ledger.apps.pop(app_id, None)
+            ledger.globals.pop(app_id, None)
+
+
+def _check_schema(current, schema, value, scope):
+    num_uints, num_bytes = schema
+    uints = sum(1 for v in current.values() if isinstance(v, int))
+    slices = len(current) - uints
+    if isinstance(value, int) and uints + 1 > num_uints:
+        raise TealError(f"store integer count {uints + 1} exceeds {scope} schema {num_uints}")
+    if not isinstance(value, int) and slices + 1 > num_bytes:
+        raise TealError(f"store bytes count {slices + 1} exceeds {scope} schema {num_bytes}")
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+class EvalResult:
+    """Outcome of running one program"""
+
+    def __init__(self):
+        self.approved = False
+        self.error = None
+        self.error_line = None
+        self.logs = []
+        self.cost = 0
+        self.inner_txns = []
+        self.line_hits = {}
+
+    def __repr__(self):
+        status = "approved" if self.approved else f"rejected ({self.error})"
+        return f"EvalResult({status}, cost={self.cost}, logs={len(self.logs)})"
+
+
+class GroupResult:
+    """Outcome of evaluating a transaction group"""
+
+    def __init__(self):
+        self.ok = False
+        self.error = None
+        self.error_line = None
+        self.failed_index = None
+        self.txn_results = []
+        self.delta = {}
+        self.cost = 0
+        self.fee_paid = 0
+        self.fee_required = 0
+        self.inner_count = 0
+        self.created_apps = []
+
+    @property
+    def logs(self):
+        return [log for result in self.txn_results if result for log in result.logs]
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"failed at {self.failed_index}: {self.error}"
+        return f"GroupResult({status}, cost={self.cost})"
+
+
+# ============================================================================
+# INTERPRETER
+# ============================================================================
+
+def _itob(value):
+    return value.to_bytes(8, "big")
+
+
+def _btoi(value):
+    if len(value) > 8:
+        raise TealError("btoi arg too long")
+    return int.from_bytes(value, "big")
+
+
+def _check_uint(value):
+    if value < 0:
+        raise TealError("- would result negative")
+    if value > MAX_UINT64:
+        raise TealError("+ overflowed")
+    return value
+
+
+def _shift_count(count):
+    if count > 63:
+        raise TealError(f"shift count {count} is larger than 63")
+    return count
+
+
+def _exp(base, power):
+    # Bound the power first: 2 ** 64 already overflows, and a huge power would hang the evaluator
+    if base == 0 and power == 0:
+        raise TealError("0^0 is undefined")
+    if base > 1 and power > 63:
+        raise TealError("exp overflowed")
+    return _check_uint(base ** power)
+
+
+_BINARY_INT_OPS = {
+    "+": lambda a, b: _check_uint(a + b),
+    "-": lambda a, b: _check_uint(a - b),
+    "*": lambda a, b: _check_uint(a * b),
+    "<": lambda a, b: int(a < b),
+    ">": lambda a, b: int(a > b),
+    "<=": lambda a, b: int(a <= b),
+    ">=": lambda a, b: int(a >= b),
+    "&&": lambda a, b: int(bool(a) and bool(b)),
+    "||": lambda a, b: int(bool(a) or bool(b)),
+    "&": lambda a, b: a & b,
+    "|": lambda a, b: a | b,
+    "^": lambda a, b: a ^ b,
+    "shl": lambda a, b: (a << _shift_count(b)) & MAX_UINT64,
+    "shr": lambda a, b: a >> _shift_count(b),
+    "exp": lambda a, b: _exp(a, b),
+}
+
+
+class _Machine:
+    """Executes a single program for one transaction of a group"""
+
+    def __init__(self, run, program, txn_index, app_id, budget, trace=False):
+        self.run = run
+        self.program = program
+        self.txn_index = txn_index
+        self.txn = run.group[txn_index]
+        self.app_id = app_id
+        self.budget = budget
+        self.trace = trace
+        self.stack = []
+        self.scratch = [0] * 256
+        self.frames = []
+        self.intc = []
+        self.bytec = []
+        self.result = EvalResult()
+        self.pending_inner = None
+        self.last_inner_group = []
+
+    # -- stack helpers -------------------------------------------------------
+
+    def push(self, value):
+        if isinstance(value, (bytes, bytearray)):
+            if len(value) > MAX_BYTES_LENGTH:
+                raise TealError("byte slice too long")
+            value = bytes(value)
+        if len(self.stack) >= MAX_STACK_DEPTH:
+            raise TealError("stack overflow")
+        self.stack.append(value)
+
+    def pop(self):
+        if not self.stack:
+            raise TealError("stack underflow")
+        return self.stack.pop()
+
+    def pop_int(self):
+        value = self.pop()
+        if not isinstance(value, int):
+            raise TealError("expected uint64, got bytes")
+        return value
+
+    def pop_bytes(self):
+        value = self.pop()
+        if not isinstance(value, bytes):
+            raise TealError("expected bytes, got uint64")
+        return value
+
+    # -- main loop -----------------------------------------------------------
+
+    def execute(self):
+        """Run the program; failures are recorded on the result, not raised"""
+        try:
+            return self._execute()
+        except TealError as error:
+            self.result.approved = False
+            self.result.error = error.message
+            self.result.error_line = error.line
+            return self.result
+
+    def _execute(self):
+        instructions = self.program.instructions
+        labels = self.program.labels
+        result = self.result
+        pc = 0
+        hits = result.line_hits
+        while True:
+            if pc >= len(instructions):
+                break
+            instr = instructions[pc]
+            cost = OPCODE_COSTS.get(instr.op, 1)
+            self.run.budget -= cost
+            result.cost += cost
+            if self.trace:
+                hits[instr.line] = hits.get(instr.line, 0) + 1
+            if self.run.budget < 0:
+                raise TealError("dynamic cost budget exceeded", instr.line)
+            try:
+                jump = self.step(instr, pc)
+            except TealError as error:
+                if error.line is None:
+                    error.line = instr.line
+                raise
+            except (IndexError, KeyError, ValueError, OverflowError) as error:
+                raise TealError(f"{instr.op} failed: {error}", instr.line)
+            if jump is None:
+                pc += 1
+            elif jump is _HALT:
+                break
+            elif isinstance(jump, str):
+                pc = labels[jump]
+            else:
+                pc = jump
+        if self.frames:
+            raise TealError("program ended inside a subroutine")
+        if len(self.stack) != 1:
+            raise TealError(f"stack finished with {len(self.stack)} values")
+        final = self.stack[0]
+        if not isinstance(final, int):
+            raise TealError("stack finished with bytes not int")
+        result.approved = final != 0
+        return result
+
+    def step(self, instr, pc):
+        op = instr.op
+        handler = _HANDLERS.get(op)
+        if handler is not None:
+            return handler(self, instr, pc)
+        if op in _BINARY_INT_OPS:
+            b = self.pop_int()
+            a = self.pop_int()
+            self.push(_BINARY_INT_OPS[op](a, b))
+            return None
+        raise TealError(f"unsupported opcode {op}")
+
+
+_HALT = object()
+_HANDLERS = {}
+
+
+def _handles(*names):
+    def register(func):
+        for name in names:
+            _HANDLERS[name] = func
+        return func
+    return register
+
+
+# -- constants ----------------------------------------------------------------
+
+@_handles("int", "pushint", "byte", "pushbytes", "addr", "method")
+def _op_const(m, instr, pc):
+    m.push(instr.imm)
+
+
+@_handles("intcblock")
+def _op_intcblock(m, instr, pc):
+    m.intc = [parse_int(a) for a in instr.args]
+
+
+@_handles("bytecblock")
+def _op_bytecblock(m, instr, pc):
+    m.bytec = [parse_bytes([a]) for a in instr.args]
+
+
+@_handles("intc", "intc_0", "intc_1", "intc_2", "intc_3")
+def _op_intc(m, instr, pc):
+    index = int(instr.args[0]) if instr.op == "intc" else int(instr.op[-1])
+    m.push(m.intc[index])
+
+
+@_handles("bytec", "bytec_0", "bytec_1", "bytec_2", "bytec_3")
+def _op_bytec(m, instr, pc):
+    index = int(instr.args[0]) if instr.op == "bytec" else int(instr.op[-1])
+    m.push(m.bytec[index])
+
+
+# -- arithmetic and logic -----------------------------------------------------
+
+@_handles("/")
+def _op_div(m, instr, pc):
+    b = m.pop_int()
+    a = m.pop_int()
+    if b == 0:
+        raise TealError("/ 0")
+    m.push(a // b)
+
+
+@_handles("%")
+def _op_mod(m, instr, pc):
+    b = m.pop_int()
+    a = m.pop_int()
+    if b == 0:
+        raise TealError("% 0")
+    m.push(a % b)
+
+
+@_handles("==", "!=")
+def _op_eq(m, instr, pc):
+    b = m.pop()
+    a = m.pop()
+    if type(a) is not type(b):
+        raise TealError(f"cannot compare ({type(a).__name__} to {type(b).__name__})")
+    equal = a == b
+    m.push(int(equal if instr.op == "==" else not equal))
+
+
+@_handles("!")
+def _op_not(m, instr, pc):
+    m.push(int(m.pop_int() == 0))
+
+
+@_handles("~")
+def _op_bitnot(m, instr, pc):
+    m.push(MAX_UINT64 ^ m.pop_int())
+
+
+@_handles("sqrt")
+def _op_sqrt(m, instr, pc):
+    import math
+    m.push(math.isqrt(m.pop_int()))
+
+
+@_handles("mulw")
+def _op_mulw(m, instr, pc):
+    b = m.pop_int()
+    a = m.pop_int()
+    product = a * b
+    m.push(product >> 64)
+    m.push(product & MAX_UINT64)
+
+
+@_handles("addw")
+def _op_addw(m, instr, pc):
+    b = m.pop_int()
+    a = m.pop_int()
+    total = a + b
+    m.push(total >> 64)
+    m.push(total & MAX_UINT64)
+
+
+@_handles("btoi")
+def _op_btoi(m, instr, pc):
+    m.push(_btoi(m.pop_bytes()))
+
+
+@_handles("itob")
+def _op_itob(m, instr, pc):
+    m.push(_itob(m.pop_int()))
+
+
+@_handles("len")
+def _op_len(m, instr, pc):
+    m.push(len(m.pop_bytes()))
+
+
+@_handles("concat")
+def _op_concat(m, instr, pc):
+    b = m.pop_bytes()
+    a = m.pop_bytes()
+    m.push(a + b)
+
+
+@_handles("substring")
+def _op_substring(m, instr, pc):
+    start, end = int(instr.args[0]), int(instr.args[1])
+    value = m.pop_bytes()
+    if end < start or end > len(value):
+        raise TealError("substring range beyond length of string")
+    m.push(value[start:end])
+
+
+@_handles("substring3")
+def _op_substring3(m, instr, pc):
+    end = m.pop_int()
+    start = m.pop_int()
+    value = m.pop_bytes()
+    if end < start or end > len(value):
+        raise TealError("substring range beyond length of string")
+    m.push(value[start:end])
+
+
+@_handles("extract")
+def _op_extract(m, instr, pc):
+    start, length = int(instr.args[0]), int(instr.args[1])
+    value = m.pop_bytes()
+    if length == 0:
+        length = len(value) - start
+    if start + length > len(value) or start > len(value):
+        raise TealError("extraction end beyond length of string")
+    m.push(value[start:start + length])
+
+
+@_handles("extract3")
+def _op_extract3(m, instr, pc):
+    length = m.pop_int()
+    start = m.pop_int()
+    value = m.pop_bytes()
+    if start + length > len(value):
+        raise TealError("extraction end beyond length of string")
+    m.push(value[start:start + length])
+
+
+def _extract_uint(m, size):
+    start = m.pop_int()
+    value = m.pop_bytes()
+    if start + size > len(value):
+        raise TealError("extraction end beyond length of string")
+    m.push(int.from_bytes(value[start:start + size], "big"))
+
+
+@_handles("extract_uint16")
+def _op_extract_uint16(m, instr, pc):
+    _extract_uint(m, 2)
+
+
+@_handles("extract_uint32")
+def _op_extract_uint32(m, instr, pc):
+    _extract_uint(m, 4)
+
+
+@_handles("extract_uint64")
+def _op_extract_uint64(m, instr, pc):
+    _extract_uint(m, 8)
+
+
+@_handles("replace2")
+def _op_replace2(m, instr, pc):
+    start = int(instr.args[0])
+    new = m.pop_bytes()
+    value = m.pop_bytes()
+    if start + len(new) > len(value):
+        raise TealError("replacement end beyond length of string")
+    m.push(value[:start] + new + value[start + len(new):])
+
+
+@_handles("replace3")
+def _op_replace3(m, instr, pc):
+    new = m.pop_bytes()
+    start = m.pop_int()
+    value = m.pop_bytes()
+    if start + len(new) > len(value):
+        raise TealError("replacement end beyond length of string")
+    m.push(value[:start] + new + value[start + len(new):])
+
+
+@_handles("getbit")
+def _op_getbit(m, instr, pc):
+    index = m.pop_int()
+    value = m.pop()
+    if isinstance(value, int):
+        if index > 63:
+            raise TealError("getbit index beyond uint64")
+        m.push((value >> index) & 1)
+    else:
+        if index >= len(value) * 8:
+            raise TealError("getbit index beyond byteslice")
+        m.push((value[index // 8] >> (7 - index % 8)) & 1)
+
+
+@_handles("setbit")
+def _op_setbit(m, instr, pc):
+    bit = m.pop_int()
+    index = m.pop_int()
+    value = m.pop()
+    if bit > 1:
+        raise TealError("setbit value > 1")
+    if isinstance(value, int):
+        if index > 63:
+            raise TealError("setbit index beyond uint64")
+        m.push((value & ~(1 << index)) | (bit << index))
+    else:
+        if index >= len(value) * 8:
+            raise TealError("setbit index beyond byteslice")
+        data = bytearray(value)
+        mask = 1 << (7 - index % 8)
+        data[index // 8] = (data[index // 8] & ~mask) | (mask if bit else 0)
+        m.push(bytes(data))
+
+
+@_handles("getbyte")
+def _op_getbyte(m, instr, pc):
+    index = m.pop_int()
+    value = m.pop_bytes()
+    m.push(value[index])
+
+
+@_handles("setbyte")
+def _op_setbyte(m, instr, pc):
+    byte = m.pop_int()
+    index = m.pop_int()
+    value = bytearray(m.pop_bytes())
+    value[index] = byte
+    m.push(bytes(value))
+
+
+@_handles("bzero")
+def _op_bzero(m, instr, pc):
+    m.push(bytes(m.pop_int()))
+
+
+@_handles("sha256")
+def _op_sha256(m, instr, pc):
+    m.push(hashlib.sha256(m.pop_bytes()).digest())
+
+
+@_handles("sha512_256")
+def _op_sha512_256(m, instr, pc):
+    m.push(encoding.checksum(m.pop_bytes()))
+
+
+@_handles("keccak256")
+def _op_keccak256(m, instr, pc):
+    from Cryptodome.Hash import keccak
+    m.push(keccak.new(data=m.pop_bytes(), digest_bits=256).digest())
+
+
+# -- stack manipulation -------------------------------------------------------
+
+@_handles("pop")
+def _op_pop(m, instr, pc):
+    m.pop()
+
+
+@_handles("popn")
+def _op_popn(m, instr, pc):
+    for _ in range(int(instr.args[0])):
+        m.pop()
+
+
+@_handles("dup")
+def _op_dup(m, instr, pc):
+    value = m.pop()
+    m.push(value)
+    m.push(value)
+
+
+@_handles("dup2")
+def _op_dup2(m, instr, pc):
+    b = m.pop()
+    a = m.pop()
+    for value in (a, b, a, b):
+        m.push(value)
+
+
+@_handles("dupn")
+def _op_dupn(m, instr, pc):
+    value = m.pop()
+    for _ in range(int(instr.args[0]) + 1):
+        m.push(value)
+
+
+@_handles("dig")
+def _op_dig(m, instr, pc):
+    depth = int(instr.args[0])
+    if depth >= len(m.stack):
+        raise TealError("dig beyond stack")
+    m.push(m.stack[-1 - depth])
+
+
+@_handles("bury")
+def _op_bury(m, instr, pc):
+    depth = int(instr.args[0])
+    value = m.pop()
+    if depth == 0 or depth > len(m.stack):
+        raise TealError("bury beyond stack")
+    m.stack[-depth] = value
+
+
+@_handles("swap")
+def _op_swap(m, instr, pc):
+    b = m.pop()
+    a = m.pop()
+    m.push(b)
+    m.push(a)
+
+
+@_handles("select")
+def _op_select(m, instr, pc):
+    condition = m.pop_int()
+    b = m.pop()
+    a = m.pop()
+    m.push(b if condition else a)
+
+
+@_handles("cover")
+def _op_cover(m, instr, pc):
+    depth = int(instr.args[0])
+    if depth >= len(m.stack):
+        raise TealError("cover beyond stack")
+    value = m.pop()
+    m.stack.insert(len(m.stack) - depth, value)
+
+
+@_handles("uncover")
+def _op_uncover(m, instr, pc):
+    depth = int(instr.args[0])
+    if depth >= len(m.stack):
+        raise TealError("uncover beyond stack")
+    value = m.stack.pop(-1 - depth)
+    m.push(value)
+
+
+# -- scratch space ------------------------------------------------------------
+
+@_handles("load")
+def _op_load(m, instr, pc):
+    m.push(m.scratch[int(instr.args[0])])
+
+
+@_handles("store")
+def _op_store(m, instr, pc):
+    m.scratch[int(instr.args[0])] = m.pop()
+
+
+@_handles("loads")
+def _op_loads(m, instr, pc):
+    m.push(m.scratch[m.pop_int()])
+
+
+@_handles("stores")
+def _op_stores(m, instr, pc):
+    value = m.pop()
+    m.scratch[m.pop_int()] = value
+
+
+# -- flow control -------------------------------------------------------------
+
+@_handles("b")
+def _op_b(m, instr, pc):
+    return instr.args[0]
+
+
+@_handles("bz")
+def _op_bz(m, instr, pc):
+    if m.pop_int() == 0:
+        return instr.args[0]
+
+
+@_handles("bnz")
+def _op_bnz(m, instr, pc):
+    if m.pop_int() != 0:
+        return instr.args[0]
+
+
+@_handles("return")
+def _op_return(m, instr, pc):
+    value = m.pop_int()
+    m.stack = [value]
+    m.frames = []
+    return _HALT
+
+
+@_handles("err")
+def _op_err(m, instr, pc):
+    raise TealError("err opcode executed")
+
+
+@_handles("assert")
+def _op_assert(m, instr, pc):
+    if m.pop_int() == 0:
+        raise TealError("assert failed")
+
+
+@_handles("callsub")
+def _op_callsub(m, instr, pc):
+    if len(m.frames) >= 1024:
+        raise TealError("call stack too deep")
+    m.frames.append({"return": pc + 1, "height": len(m.stack), "proto": None})
+    return instr.args[0]
+
+
+@_handles("proto")
+def _op_proto(m, instr, pc):
+    if not m.frames:
+        raise TealError("proto outside of subroutine")
+    args, rets = int(instr.args[0]), int(instr.args[1])
+    frame = m.frames[-1]
+    if len(m.stack) < args:
+        raise TealError("callsub to proto that requires more args than stack")
+    frame["proto"] = (args, rets)
+    frame["height"] = len(m.stack)
+
+
+@_handles("frame_dig")
+def _op_frame_dig(m, instr, pc):
+    frame = m.frames[-1]
+    index = frame["height"] + int(instr.args[0])
+    if index < 0 or index >= len(m.stack):
+        raise TealError("frame_dig out of range")
+    m.push(m.stack[index])
+
+
+@_handles("frame_bury")
+def _op_frame_bury(m, instr, pc):
+    frame = m.frames[-1]
+    value = m.pop()
+    index = frame["height"] + int(instr.args[0])
+    if index < 0 or index >= len(m.stack):
+        raise TealError("frame_bury out of range")
+    m.stack[index] = value
+
+
+@_handles("retsub")
+def _op_retsub(m, instr, pc):
+    if not m.frames:
+        raise TealError("retsub with empty callstack")
+    frame = m.frames.pop()
+    if frame["proto"] is not None:
+        args, rets = frame["proto"]
+        if len(m.stack) < frame["height"] + rets:
+            raise TealError("retsub executed with stack below frame")
+        returned = m.stack[len(m.stack) - rets:] if rets else []
+        del m.stack[frame["height"] - args:]
+        m.stack.extend(returned)
+    return frame["return"]
+
+
+@_handles("switch")
+def _op_switch(m, instr, pc):
+    index = m.pop_int()
+    if index < len(instr.args):
+        return instr.args[index]
+
+
+@_handles("match")
+def _op_match(m, instr, pc):
+    count = len(instr.args)
+    target = m.pop()
+    candidates = [m.pop() for _ in range(count)][::-1]
+    for position, candidate in enumerate(candidates):
+        if type(candidate) is type(target) and candidate == target:
+            return instr.args[position]
+
+
+# -- transaction and global fields --------------------------------------------
+
+def _txn_field(m, txn, field, index, array_index=None):
+    if field in ARRAY_FIELDS:
+        values = txn.get(field, [])
+        if field == "Accounts":
+            values = [txn["Sender"]] + list(values)
+        elif field == "Applications":
+            values = [txn.get("ApplicationID", 0)] + list(values)
+        if array_index is None:
+            raise TealError(f"{field} requires an array index")
+        if array_index >= len(values):
+            raise TealError(f"invalid {field} index {array_index}")
+        value = values[array_index]
+        if field in ("Accounts",):
+            return address_bytes(value)
+        if field in ("Applications", "Assets"):
+            return int(value)
+        return _arg_bytes(value)
+    for array, count_field in ARRAY_FIELDS.items():
+        if field == count_field:
+            return len(txn.get(array, []))
+    if field == "GroupIndex":
+        return index
+    if field == "TxID":
+        return hashlib.sha256(repr(sorted(txn.items(), key=lambda kv: kv[0])).encode()).digest()
+    if field == "Type":
+        return TXN_TYPE_NAMES.get(txn.get("TypeEnum", 0), "unknown").encode()
+    if field == "ApplicationID" and txn.get("TypeEnum") == TXN_TYPES["appl"]:
+        return txn.get("ApplicationID", 0)
+    if field in txn:
+        return txn[field]
+    if field in ADDRESS_FIELDS:
+        return ZERO_ADDRESS
+    if field in BYTES_FIELDS:
+        return b""
+    return 0
+
+
+@_handles("txn")
+def _op_txn(m, instr, pc):
+    array_index = int(instr.args[1]) if len(instr.args) > 1 else None
+    m.push(_txn_field(m, m.txn, instr.args[0], m.txn_index, array_index))
+
+
+@_handles("txna")
+def _op_txna(m, instr, pc):
+    m.push(_txn_field(m, m.txn, instr.args[0], m.txn_index, int(instr.args[1])))
+
+
+@_handles("txnas")
+def _op_txnas(m, instr, pc):
+    m.push(_txn_field(m, m.txn, instr.args[0], m.txn_index, m.pop_int()))
+
+
+def _group_txn(m, position):
+    if position >= len(m.run.group):
+        raise TealError(f"gtxn lookup TxnGroup[{position}] but it only has {len(m.run.group)}")
+    return m.run.group[position]
+
+
+@_handles("gtxn")
+def _op_gtxn(m, instr, pc):
+    position = int(instr.args[0])
+    array_index = int(instr.args[2]) if len(instr.args) > 2 else None
+    m.push(_txn_field(m, _group_txn(m, position), instr.args[1], position, array_index))
+
+
+@_handles("gtxna")
+def _op_gtxna(m, instr, pc):
+    position = int(instr.args[0])
+    m.push(_txn_field(m, _group_txn(m, position), instr.args[1], position, int(instr.args[2])))
+
+
+@_handles("gtxns")
+def _op_gtxns(m, instr, pc):
+    position = m.pop_int()
+    array_index = int(instr.args[1]) if len(instr.args) > 1 else None
+    m.push(_txn_field(m, _group_txn(m, position), instr.args[0], position, array_index))
+
+
+@_handles("gtxnsa")
+def _op_gtxnsa(m, instr, pc):
+    position = m.pop_int()
+    m.push(_txn_field(m, _group_txn(m, position), instr.args[0], position, int(instr.args[1])))
+
+
+@_handles("gtxnas")
+def _op_gtxnas(m, instr, pc):
+    array_index = m.pop_int()
+    position = int(instr.args[0])
+    m.push(_txn_field(m, _group_txn(m, position), instr.args[1], position, array_index))
+
+
+@_handles("global")
+def _op_global(m, instr, pc):
+    field = instr.args[0]
+    ledger = m.run.ledger
+    values = {
+        "MinTxnFee": MIN_TXN_FEE,
+        "MinBalance": MIN_BALANCE,
+        "MaxTxnLife": 1000,
+        "ZeroAddress": ZERO_ADDRESS,
+        "GroupSize": len(m.run.group),
+        "LogicSigVersion": 8,
+        "Round": ledger.round,
+        "LatestTimestamp": ledger.timestamp,
+        "CurrentApplicationID": m.app_id,
+        "CurrentApplicationAddress": application_address(m.app_id),
+        "GroupID": m.txn.get("GroupID", ZERO_ADDRESS),
+        "OpcodeBudget": m.run.budget,
+        "CallerApplicationID": m.run.caller_app_id,
+        "CallerApplicationAddress": (application_address(m.run.caller_app_id)
+                                     if m.run.caller_app_id else ZERO_ADDRESS),
+    }
+    if field == "CreatorAddress":
+        record = m.run.delta.app(m.app_id)
+        m.push(record.creator if record else m.txn["Sender"])
+        return
+    if field not in values:
+        raise TealError(f"unsupported global field {field}")
+    m.push(values[field])
+
+
+# -- application state --------------------------------------------------------
+
+def _available_accounts(m, txn=None):
+    """Accounts a program may touch: the transaction's own references and app addresses, created apps included"""
+    txn = txn or m.txn
+    available = {address_bytes(txn["Sender"]), application_address(m.app_id)}
+    available.update(address_bytes(a) for a in txn.get("Accounts", []))
+    available.update(application_address(a) for a in txn.get("Applications", []))
+    available.update(application_address(a) for a in m.run.created_apps)
+    return available
+
+
+def _check_account(m, address):
+    if address not in _available_accounts(m):
+        raise TealError(f"unavailable Account {address_string(address)}")
+    return address
+
+
+def _resolve_account(m, ref):
+    if isinstance(ref, int):
+        accounts = [m.txn["Sender"]] + list(m.txn.get("Accounts", []))
+        if ref >= len(accounts):
+            raise TealError(f"invalid Accounts index {ref}")
+        return address_bytes(accounts[ref])
+    if len(ref) != 32:
+        raise TealError("invalid account reference")
+    return _check_account(m, ref)
+
+
+def _resolve_app(m, ref):
+    if ref == 0:
+        return m.app_id
+    apps = list(m.txn.get("Applications", []))
+    if ref <= len(apps) and ref not in apps and ref != m.app_id:
+        return apps[ref - 1]
+    if ref != m.app_id and ref not in apps and ref not in m.run.created_apps:
+        raise TealError(f"unavailable App {ref}")
+    return ref
+
+
+@_handles("app_global_get")
+def _op_app_global_get(m, instr, pc):
+    key = m.pop_bytes()
+    value = m.run.delta.get_global(m.app_id, key)
+    m.push(0 if value is None else value)
+
+
+@_handles("app_global_get_ex")
+def _op_app_global_get_ex(m, instr, pc):
+    key = m.pop_bytes()
+    app_id = _resolve_app(m, m.pop_int())
+    value = m.run.delta.get_global(app_id, key)
+    m.push(0 if value is None else value)
+    m.push(int(value is not None))
+
+
+@_handles("app_global_put")
+def _op_app_global_put(m, instr, pc):
+    value = m.pop()
+    key = m.pop_bytes()
+    if len(key) > 64:
+        raise TealError("key too long")
+    if isinstance(value, bytes) and len(key) + len(value) > 128:
+        raise TealError("key/value total too long")
+    m.run.delta.put_global(m.app_id, key, value)
+
+
+@_handles("app_global_del")
+def _op_app_global_del(m, instr, pc):
+    m.run.delta.del_global(m.app_id, m.pop_bytes())
+
+
+@_handles("app_local_get")
+def _op_app_local_get(m, instr, pc):
+    key = m.pop_bytes()
+    account = _resolve_account(m, m.pop())
+    value = m.run.delta.get_local(account, m.app_id, key)
+    m.push(0 if value is None else value)
+
+
+@_handles("app_local_get_ex")
+def _op_app_local_get_ex(m, instr, pc):
+    key = m.pop_bytes()
+    app_id = _resolve_app(m, m.pop_int())
+    account = _resolve_account(m, m.pop())
+    value = None
+    if m.run.delta.is_opted_in(account, app_id):
+        value = m.run.delta.get_local(account, app_id, key)
+    m.push(0 if value is None else value)
+    m.push(int(value is not None))
+
+
+@_handles("app_local_put")
+def _op_app_local_put(m, instr, pc):
+    value = m.pop()
+    key = m.pop_bytes()
+    account = _resolve_account(m, m.pop())
+    if len(key) > 64:
+        raise TealError("key too long")
+    m.run.delta.put_local(account, m.app_id, key, value)
+
+
+@_handles("app_local_del")
+def _op_app_local_del(m, instr, pc):
+    key = m.pop_bytes()
+    account = _resolve_account(m, m.pop())
+    m.run.delta.del_local(account, m.app_id, key)
+
+
+@_handles("app_opted_in")
+def _op_app_opted_in(m, instr, pc):
+    app_id = _resolve_app(m, m.pop_int())
+    account = _resolve_account(m, m.pop())
+    m.push(int(m.run.delta.is_opted_in(account, app_id)))
+
+
+@_handles("balance")
+def _op_balance(m, instr, pc):
+    m.push(m.run.delta.balance(_resolve_account(m, m.pop())))
+
+
+@_handles("min_balance")
+def _op_min_balance(m, instr, pc):
+    m.push(m.run.delta.min_balance(_resolve_account(m, m.pop())))
+
+
+# -- boxes --------------------------------------------------------------------
+
+def _box_name(m, size=None):
+    """Pop a box name, check the group references it, and charge its bytes to the box quota"""
+    name = m.pop_bytes()
+    if not name or len(name) > 64:
+        raise TealError("box names must be 1-64 bytes")
+    m.run.touch_box(m.app_id, name, size)
+    return name
+
+
+@_handles("box_create")
+def _op_box_create(m, instr, pc):
+    size = m.pop_int()
+    name = _box_name(m, size)
+    if size > 32768:
+        raise TealError("box size too large")
+    existing = m.run.delta.get_box(m.app_id, name)
+    if existing is not None:
+        if len(existing) != size:
+            raise TealError("box size mismatch")
+        m.push(0)
+        return
+    m.run.delta.put_box(m.app_id, name, bytes(size))
+    m.push(1)
+
+
+@_handles("box_extract")
+def _op_box_extract(m, instr, pc):
+    length = m.pop_int()
+    start = m.pop_int()
+    name = _box_name(m)
+    value = m.run.delta.get_box(m.app_id, name)
+    if value is None:
+        raise TealError("no such box")
+    if start + length > len(value):
+        raise TealError("box read out of bounds")
+    m.push(value[start:start + length])
+
+
+@_handles("box_replace")
+def _op_box_replace(m, instr, pc):
+    new = m.pop_bytes()
+    start = m.pop_int()
+    name = _box_name(m)
+    value = m.run.delta.get_box(m.app_id, name)
+    if value is None:
+        raise TealError("no such box")
+    if start + len(new) > len(value):
+        raise TealError("box write out of bounds")
+    m.run.delta.put_box(m.app_id, name, value[:start] + new + value[start + len(new):])
+
+
+@_handles("box_del")
+def _op_box_del(m, instr, pc):
+    name = _box_name(m)
+    existed = m.run.delta.get_box(m.app_id, name) is not None
+    if existed:
+        m.run.delta.del_box(m.app_id, name)
+    m.push(int(existed))
+
+
+@_handles("box_len")
+def _op_box_len(m, instr, pc):
+    value = m.run.delta.get_box(m.app_id, _box_name(m))
+    m.push(0 if value is None else len(value))
+    m.push(int(value is not None))
+
+
+@_handles("box_get")
+def _op_box_get(m, instr, pc):
+    value = m.run.delta.get_box(m.app_id, _box_name(m))
+    m.push(b"" if value is None else value)
+    m.push(int(value is not None))
+
+
+@_handles("box_put")
+def _op_box_put(m, instr, pc):
+    value = m.pop_bytes()
+    name = _box_name(m)
+    existing = m.run.delta.get_box(m.app_id, name)
+    if existing is not None and len(existing) != len(value):
+        raise TealError("box_put wrong size")
+    m.run.delta.put_box(m.app_id, name, value)
+
+
+# -- logs and inner transactions ----------------------------------------------
+
+@_handles("log")
+def _op_log(m, instr, pc):
+    value = m.pop_bytes()
+    logs = m.result.logs
+    if len(logs) >= MAX_LOG_CALLS:
+        raise TealError("too many log calls")
+    if sum(len(entry) for entry in logs) + len(value) > MAX_LOG_SIZE:
+        raise TealError("program logs too large")
+    logs.append(value)
+
+
+def _new_inner(m):
+    return {
+        "Sender": application_address(m.app_id),
+        "Fee": MIN_TXN_FEE,
+        "TypeEnum": 0,
+        "ApplicationArgs": [],
+        "Accounts": [],
+        "Applications": [],
+        "Assets": [],
+    }
+
+
+@_handles("itxn_begin")
+def _op_itxn_begin(m, instr, pc):
+    if m.pending_inner is not None:
+        raise TealError("itxn_begin without itxn_submit")
+    m.pending_inner = [_new_inner(m)]
+
+
+@_handles("itxn_next")
+def _op_itxn_next(m, instr, pc):
+    if m.pending_inner is None:
+        raise TealError("itxn_next without itxn_begin")
+    m.pending_inner.append(_new_inner(m))
+
+
+@_handles("itxn_field")
+def _op_itxn_field(m, instr, pc):
+    if m.pending_inner is None:
+        raise TealError("itxn_field without itxn_begin")
+    field = instr.args[0]
+    value = m.pop()
+    current = m.pending_inner[-1]
+    if field == "Type":
+        current["TypeEnum"] = TXN_TYPES.get(value.decode(), 0)
+    elif field in ARRAY_FIELDS:
+        current.setdefault(field, []).append(value)
+    else:
+        if field in ("Receiver", "CloseRemainderTo"):
+            _check_account(m, value)
+        current[field] = value
+
+
+@_handles("itxn_submit")
+def _op_itxn_submit(m, instr, pc):
+    if not m.pending_inner:
+        raise TealError("itxn_submit without itxn_begin")
+    inners, m.pending_inner = m.pending_inner, None
+    for inner in inners:
+        m.run.execute_inner(m, inner)
+    m.last_inner_group = inners
+
+
+@_handles("itxn")
+def _op_itxn(m, instr, pc):
+    if not m.last_inner_group:
+        raise TealError("no inner transaction available")
+    inner = m.last_inner_group[-1]
+    array_index = int(instr.args[1]) if len(instr.args) > 1 else None
+    m.push(_txn_field(m, inner, instr.args[0], 0, array_index))
+
+
+@_handles("itxna")
+def _op_itxna(m, instr, pc):
+    inner = m.last_inner_group[-1]
+    m.push(_txn_field(m, inner, instr.args[0], 0, int(instr.args[1])))
+
+
+# ============================================================================
+# GROUP EVALUATION
+# ============================================================================
+
+class _GroupRun:
+    """Shared context for evaluating one group"""
+
+    def __init__(self, ledger, group, budget_per_call, trace):
+        self.ledger = ledger
+        self.group = group
+        self.delta = StateDelta(ledger)
+        app_calls = sum(1 for txn in group if txn.get("TypeEnum") == TXN_TYPES["appl"])
+        self.budget = budget_per_call * max(app_calls, 1)
+        self.budget_per_call = budget_per_call
+        self.trace = trace
+        self.fee_paid = 0
+        self.fee_required = 0
+        self.inner_count = 0
+        self.inner_depth = 0
+        self.caller_app_id = 0
+        self.created_apps = []
+        # Box references are pooled across the group, each adding to the I/O quota
+        self.box_refs = set()
+        for txn in group:
+            for app_index, name in txn.get("Boxes", []):
+                self.box_refs.add((_box_ref_app(txn, app_index), bytes(name)))
+        self.box_quota = BOX_IO_BUDGET * sum(len(txn.get("Boxes", [])) for txn in group)
+        self.box_sizes = {}  # (app, name) -> largest size touched
+
+    def touch_box(self, app_id, name, size=None):
+        if (app_id, name) not in self.box_refs and not (
+                (0, name) in self.box_refs and app_id in self.created_apps):
+            raise TealError(f"invalid Box reference {name!r}")
+        if size is None:
+            value = self.delta.get_box(app_id, name)
+            size = 0 if value is None else len(value)
+        key = (app_id, name)
+        self.box_sizes[key] = max(self.box_sizes.get(key, 0), size)
+        if sum(self.box_sizes.values()) > self.box_quota:
+            raise TealError(f"box I/O budget exceeded: {sum(self.box_sizes.values())} > {self.box_quota} bytes")
+
+    def charge_fee(self, sender, fee):
+        self.delta.debit(sender, fee)
+        self.fee_paid += fee
+        self.fee_required += MIN_TXN_FEE
+
+    def transfer(self, sender, receiver, amount, close_to=None):
+        self.delta.debit(sender, amount)
+        self.delta.credit(receiver, amount)
+        if close_to is not None and close_to != ZERO_ADDRESS:
+            remainder = self.delta.balance(sender)
+            self.delta.debit(sender, remainder)
+            self.delta.credit(close_to, remainder)
+
+    def execute_inner(self, machine, inner):
+        self.inner_count += 1
+        if self.inner_count > MAX_INNER_TXNS:
+            raise TealError("too many inner transactions")
+        if inner.get("Sender") != application_address(machine.app_id):
+            raise TealError("unauthorized inner transaction sender")
+        self.charge_fee(inner["Sender"], inner.get("Fee", 0))
+        kind = inner.get("TypeEnum")
+        if kind == TXN_TYPES["pay"]:
+            self.transfer(inner["Sender"], inner.get("Receiver", ZERO_ADDRESS),
+                          inner.get("Amount", 0), inner.get("CloseRemainderTo"))
+        elif kind == TXN_TYPES["appl"]:
+            self.execute_inner_app_call(machine, inner)
+        else:
+            raise TealError(f"unsupported inner transaction type {kind}")
+        machine.result.inner_txns.append(inner)
+
+    def execute_inner_app_call(self, machine, inner):
+        if self.inner_depth >= MAX_CALL_DEPTH:
+            raise TealError("inner application calls nested too deeply")
+        # Inner app calls add their own budget to the pool
+        self.budget += self.budget_per_call
+        caller = self.caller_app_id
+        self.caller_app_id = machine.app_id
+        self.inner_depth += 1
+        try:
+            result = self.apply_app_call(inner, None)
+        finally:
+            self.inner_depth -= 1
+            self.caller_app_id = caller
+        inner["Logs"] = list(result.logs)
+        if not result.approved:
+            raise TealError(f"inner application call rejected: {result.error or 'approval returned 0'}")
+
+    def apply_payment(self, txn):
+        self.transfer(txn["Sender"], txn.get("Receiver", ZERO_ADDRESS),
+                      txn.get("Amount", 0), txn.get("CloseRemainderTo"))
+
+    def apply_app_call(self, txn, index):
+        delta = self.delta
+        app_id = txn.get("ApplicationID", 0)
+        on_complete = txn.get("OnCompletion", 0)
+        sender = txn["Sender"]
+
+        if app_id == 0:
+            app_id = delta.new_app_id()
+            approval = self.ledger.resolve_program(_join_program(txn, "ApprovalProgram"))
+            clear = self.ledger.resolve_program(_join_program(txn, "ClearStateProgram"))
+            delta.created_apps[app_id] = AppRecord(
+                app_id, sender, approval, clear,
+                (txn.get("GlobalNumUint", 64), txn.get("GlobalNumByteSlice", 64)),
+                (txn.get("LocalNumUint", 16), txn.get("LocalNumByteSlice", 16)),
+            )
+            self.created_apps.append(app_id)
+            txn["CreatedApplicationID"] = app_id
+
+        record = delta.app(app_id)
+        if record is None:
+            raise TealError(f"application {app_id} does not exist")
+
+        if on_complete == ON_COMPLETE["OptIn"]:
+            delta.opt_in(sender, app_id)
+
+        if on_complete == ON_COMPLETE["ClearState"]:
+            if not delta.is_opted_in(sender, app_id):
+                raise TealError("account is not opted in to app")
+            result = self._run(record.clear, txn, index, app_id, self.budget_per_call)
+            delta.close_out(sender, app_id)
+            result.approved = True
+            return result
+
+        result = self._run(record.approval, txn, index, app_id, None)
+        if not result.approved:
+            return result
+
+        if on_complete == ON_COMPLETE["CloseOut"]:
+            delta.close_out(sender, app_id)
+        elif on_complete == ON_COMPLETE["DeleteApplication"]:
+            delta.deleted_apps.add(app_id)
+        elif on_complete == ON_COMPLETE["UpdateApplication"]:
+            record.approval = parse_teal(self.ledger.resolve_program(_join_program(txn, "ApprovalProgram")))
+            record.clear = parse_teal(self.ledger.resolve_program(_join_program(txn, "ClearStateProgram")))
+        return result
+
+    def _run(self, program, txn, index, app_id, budget_override):
+        position = index if index is not None else 0
+        group = self.group
+        if index is None:
+            # Inner calls see themselves as a single-transaction group
+            self.group = [txn]
+        saved_budget = self.budget
+        if budget_override is not None:
+            self.budget = budget_override
+        machine = _Machine(self, program, position, app_id, self.budget, self.trace)
+        try:
+            result = machine.execute()
+        finally:
+            self.group = group
+            if budget_override is not None:
+                self.budget = saved_budget
+        return result
+
+
+def _box_ref_app(txn, app_index):
+    """App id a box reference points at: 0 is the calling app, others index Applications"""
+    if app_index == 0:
+        return txn.get("ApplicationID", 0)
+    apps = list(txn.get("Applications", []))
+    return apps[app_index - 1] if app_index <= len(apps) else None
+
+
+def _join_program(txn, field):
+    pages = txn.get(field + "Pages")
+    if pages:
+        return b"".join(pages)
+    return txn.get(field, b"")
+
+
+def evaluate_group(ledger, group, commit=True, budget=DEFAULT_BUDGET, trace=False):
+    """Evaluate a group atomically; commit the delta when it succeeds"""
+    result = GroupResult()
+    if not group or len(group) > MAX_GROUP_SIZE:
+        result.error = f"group size {len(group)} is invalid"
+        return result
+    group = [dict(txn) for txn in group]
+    run = _GroupRun(ledger, group, budget, trace)
+    for index, txn in enumerate(group):
+        txn_result = None
+        try:
+            run.charge_fee(txn["Sender"], txn.get("Fee", 0))
+            kind = txn.get("TypeEnum")
+            if kind == TXN_TYPES["pay"]:
+                run.apply_payment(txn)
+            elif kind == TXN_TYPES["appl"]:
+                txn_result = run.apply_app_call(txn, index)
+                if not txn_result.approved:
+                    result.txn_results.append(txn_result)
+                    result.failed_index = index
+                    result.error = txn_result.error or "transaction rejected by ApprovalProgram"
+                    result.error_line = txn_result.error_line
+                    return _finish(result, run, commit=False)
+            else:
+                raise TealError(f"unsupported transaction type {kind}")
+        except TealError as error:
+            if txn_result is None:
+                txn_result = getattr(error, "result", None)
+            result.txn_results.append(txn_result)
+            result.failed_index = index
+            result.error = error.message
+            result.error_line = error.line
+            return _finish(result, run, commit=False)
+        result.txn_results.append(txn_result)
+
+    if run.fee_paid < run.fee_required:
+        result.error = (f"fee too small: group paid {run.fee_paid} "
+                        f"but {run.fee_required} is required")
+        result.failed_index = 0
+        return _finish(result, run, commit=False)
+
+    # Accounts that paid something, plus app accounts that gained box storage
+    checked = [address for address, change in run.delta.balance_deltas.items() if change < 0]
+    checked += [application_address(app_id) for app_id, _ in run.delta.box_writes]
+    for address in dict.fromkeys(checked):
+        balance = run.delta.balance(address)
+        if balance < run.delta.min_balance(address):
+            result.error = (f"account {address_string(address)} balance {balance} "
+                            f"below min {run.delta.min_balance(address)}")
+            result.failed_index = 0
+            return _finish(result, run, commit=False)
+
+    result.ok = True
+    return _finish(result, run, commit=commit)
+
+
+def _finish(result, run, commit):
+    result.delta = run.delta.summary()
+    result.cost = sum(r.cost for r in result.txn_results if r is not None)
+    result.fee_paid = run.fee_paid
+    result.fee_required = run.fee_required
+    result.inner_count = run.inner_count
+    result.created_apps = list(run.created_apps)
+    if commit:
+        run.delta.commit()
+        run.ledger.round += 1
+    return result
+
+
+def evaluate_program(program, group, index=0, ledger=None, app_id=1,
+                     budget=DEFAULT_BUDGET, trace=False):
+    """Run one approval program for group[index] without committing anything"""
+    program = parse_teal(program)
+    ledger = ledger if ledger is not None else LedgerState()
+    group = [dict(txn) for txn in group]
+    run = _GroupRun(ledger, group, budget, trace)
+    txn = group[index]
+    sender = txn["Sender"]
+    if txn.get("OnCompletion") == ON_COMPLETE["OptIn"] and not run.delta.is_opted_in(sender, app_id):
+        run.delta.opt_in(sender, app_id)
+    machine = _Machine(run, program, index, app_id, run.budget, trace)
+    result = machine.execute()
+    result.delta = run.delta.summary()
+    result.fee_paid = run.fee_paid
+    result.inner_count = run.inner_count
+    return result
@@ -0,0 +1,397 @@
+"""
+Local Network
+An algod client look-alike backed by the local TEAL evaluator
+
+LocalAlgodClient answers the algod v2 calls our scripts make (suggested
+params, send, pending info, status/status_after_block, account, application
+and box lookups, compile) from an in-memory LedgerState, so deploy, test and
+load scripts run unchanged against it with no node. Groups are evaluated
+when they are sent and rejected the way algod's pool rejects them; accepted
+ones confirm in the next block, which is produced whenever a caller waits
+for one. Produced blocks are served in algod's msgpack block encoding, with
+each transaction's ApplyData (state deltas, logs, inner transactions), so
+block readers run against it too. Signatures are not verified.
+
+LocalIndexerClient answers indexer account searches from the same ledger.
+"""
+
+import base64
+import threading
+
+import msgpack
+from algosdk import encoding, transaction
+from algosdk.error import AlgodHTTPError
+
+from local_evaluator import (
+    LedgerState,
+    address_bytes,
+    address_string,
+    application_address,
+    evaluate_group,
+    txn_from_algosdk,
+)
+
+GENESIS_ID = "localnet-v1"
+GENESIS_HASH = base64.b64encode(b"local-network-genesis-hash-00000").decode()
+BLOCK_SECONDS = 3  # Timestamp step per produced block
+MAX_TXN_LIFE = 1000
+
+
+def _b64(value):
+    return base64.b64encode(value).decode()
+
+
+def _teal_value(value):
+    if isinstance(value, int):
+        return {"type": 2, "uint": value, "bytes": ""}
+    return {"type": 1, "uint": 0, "bytes": _b64(value)}
+
+
+def encode_state(state):
+    """{key: value} -> algod key-value list"""
+    return [{"key": _b64(key), "value": _teal_value(value)} for key, value in state.items()]
+
+
+def _go_string(value):
+    """algod encodes TEAL keys, byte values and logs as msgpack str, whatever their bytes"""
+    return bytes(value).decode("utf-8", "surrogateescape")
+
+
+def _value_delta(value):
+    # Zero values are left out, as algod's encoder does
+    if value is None:
+        return {"at": 3}
+    if isinstance(value, int):
+        return {"at": 2, "ui": value} if value else {"at": 2}
+    return {"at": 1, "bs": _go_string(value)} if value else {"at": 1}
+
+
+def _changed(writes, before):
+    """Writes that change a value; algod leaves the others out of its deltas"""
+    return {key: value for key, value in writes.items() if before.get(key) != value}
+
+
+def _inner_entry(inner):
+    txn = {"type": "pay" if inner.get("TypeEnum") == 1 else "appl", "snd": inner["Sender"]}
+    if inner.get("Fee"):
+        txn["fee"] = inner["Fee"]
+    if "Receiver" in inner:
+        txn["rcv"] = inner["Receiver"]
+        if inner.get("Amount"):
+            txn["amt"] = inner["Amount"]
+    entry = {"txn": txn}
+    if inner.get("Logs"):
+        entry["dt"] = {"lg": [_go_string(log) for log in inner["Logs"]]}
+    return entry
+
+
+def _touched_state(ledger, txns):
+    """Globals and local state of the apps a group calls, before it runs"""
+    global_before, local_before = {}, {}
+    for txn in txns:
+        if txn.type == "appl" and txn.index:
+            global_before[txn.index] = dict(ledger.globals.get(txn.index, {}))
+            for address in [txn.sender] + list(txn.accounts or []):
+                pair = (address_bytes(address), txn.index)
+                local_before[pair] = dict(ledger.locals.get(pair, {}))
+    return global_before, local_before
+
+
+def _eval_deltas(txns, result, before):
+    """txn index -> EvalDelta; the group's changes to each app go on its last call"""
+    global_before, local_before = before
+    created = list(result.created_apps)
+    last = {}
+    for index, txn in enumerate(txns):
+        if txn.type == "appl":
+            last[txn.index or (created[0] if created else 0)] = index
+
+    deltas = {}
+    for app_id, index in last.items():
+        txn = txns[index]
+        delta = {}
+        changed = _changed(result.delta["global"].get(app_id, {}), global_before.get(app_id, {}))
+        if changed:
+            delta["gd"] = {_go_string(key): _value_delta(value) for key, value in changed.items()}
+        # Local deltas point into [sender] + accounts, then into "sa" for anyone else
+        accounts = [address_bytes(txn.sender)] + [address_bytes(a) for a in txn.accounts or []]
+        shared = []
+        for (address, app), writes in result.delta["local"].items():
+            changed = _changed(writes, local_before.get((address, app), {}))
+            if app != app_id or not changed:
+                continue
+            if address not in accounts + shared:
+                shared.append(address)
+            position = (accounts + shared).index(address)
+            delta.setdefault("ld", {})[position] = {
+                _go_string(key): _value_delta(value) for key, value in changed.items()}
+        if shared:
+            delta["sa"] = shared
+        deltas[index] = delta
+    return deltas
+
+
+def _inner_info(inner):
+    txn = {"type": "pay" if inner.get("TypeEnum") == 1 else "appl"}
+    if "Receiver" in inner:
+        txn.update(rcv=address_string(inner["Receiver"]), amt=inner.get("Amount", 0))
+    return {"txn": {"txn": txn}}
+
+
+class LocalAlgodClient:
+    """Enough of algod.AlgodClient for our scripts, over a LedgerState"""
+
+    def __init__(self, ledger=None, genesis_id=GENESIS_ID):
+        self.ledger = ledger or LedgerState()
+        self.genesis_id = genesis_id
+        self.pending = {}  # txid -> pending transaction info
+        self.unconfirmed = []  # txids waiting for the next block
+        self.block_txns = []  # their block entries, in order
+        self.blocks = {self.ledger.round: (self.ledger.timestamp, [])}  # round -> (timestamp, entries)
+        self.lock = threading.RLock()
+
+    # -- blocks ---------------------------------------------------------------
+
+    def produce_block(self):
+        """Close the current round; everything sent so far confirms in it"""
+        with self.lock:
+            self.ledger.round += 1
+            self.ledger.timestamp += BLOCK_SECONDS
+            for txid in self.unconfirmed:
+                self.pending[txid]["confirmed-round"] = self.ledger.round
+            self.unconfirmed = []
+            self.blocks[self.ledger.round] = (self.ledger.timestamp, self.block_txns)
+            self.block_txns = []
+            return self.ledger.round
+
+    def block_info(self, block=None, response_format="json", round_num=None, header_only=None):
+        """A produced block as algod's msgpack; transactions carry their ApplyData"""
+        round_num = block if block is not None else round_num
+        if response_format != "msgpack":
+            raise AlgodHTTPError("the local network only serves msgpack blocks", 400)
+        with self.lock:
+            if round_num not in self.blocks:
+                raise AlgodHTTPError(f"failed to retrieve information from the ledger: round {round_num}", 404)
+            timestamp, txns = self.blocks[round_num]
+        header = {"rnd": round_num, "ts": timestamp, "gen": self.genesis_id,
+                  "gh": base64.b64decode(GENESIS_HASH)}
+        if not header_only and txns:
+            header["txns"] = txns
+        return msgpack.packb({"block": header, "cert": {}}, use_bin_type=True, unicode_errors="surrogateescape")
+
+    def status(self):
+        with self.lock:
+            return {"last-round": self.ledger.round, "time-since-last-round": 0}
+
+    def status_after_block(self, block_num):
+        """Produce blocks until one after block_num exists"""
+        with self.lock:
+            while self.ledger.round <= block_num:
+                self.produce_block()
+            return self.status()
+
+    def suggested_params(self):
+        with self.lock:
+            first = self.ledger.round + 1
+        return transaction.SuggestedParams(
+            0, first, first + MAX_TXN_LIFE, GENESIS_HASH, self.genesis_id, min_fee=1000
+        )
+
+    def fund(self, address, amount):
+        """Credit an account without a transaction (a local faucet)"""
+        with self.lock:
+            self.ledger.fund(address, amount)
+
+    # -- sending --------------------------------------------------------------
+
+    def compile(self, source, source_map=False):
+        """Register TEAL with the ledger; the result resolves back to it"""
+        with self.lock:
+            blob = self.ledger.register_program(source)
+        return {"hash": encoding.encode_address(encoding.checksum(b"Program" + blob)), "result": _b64(blob)}
+
+    def _reject(self, txid, message):
+        raise AlgodHTTPError(f"TransactionPool.Remember: transaction {txid}: {message}", 400)
+
+    def send_transactions(self, txns):
+        """Evaluate and apply a signed group; returns the first txid"""
+        txns = list(txns)
+        txids = [txn.get_txid() for txn in txns]
+        with self.lock:
+            for txid, txn in zip(txids, txns):
+                if txid in self.pending:
+                    self._reject(txid, "transaction already in ledger")
+                unsigned = getattr(txn, "transaction", txn)
+                next_round = self.ledger.round + 1
+                if not unsigned.first_valid_round <= next_round <= unsigned.last_valid_round:
+                    self._reject(txid, f"txn dead: round {next_round} outside of "
+                                       f"{unsigned.first_valid_round}--{unsigned.last_valid_round}")
+
+            # evaluate_group closes a round per group; here rounds only move with produce_block
+            current_round = self.ledger.round
+            unsigned_txns = [getattr(txn, "transaction", txn) for txn in txns]
+            before = _touched_state(self.ledger, unsigned_txns)
+            result = evaluate_group(self.ledger, [txn_from_algosdk(txn) for txn in txns])
+            self.ledger.round = current_round
+            if not result.ok:
+                index = result.failed_index or 0
+                self._reject(txids[index], f"logic eval error: {result.error}")
+
+            created = list(result.created_apps)
+            deltas = _eval_deltas(unsigned_txns, result, before)
+            for index, (txid, txn, txn_result) in enumerate(zip(txids, txns, result.txn_results)):
+                unsigned = unsigned_txns[index]
+                info = {"txn": unsigned, "pool-error": "", "confirmed-round": 0}
+                entry = self._block_entry(txn, deltas.get(index, {}))
+                if txn_result is not None:
+                    info["logs"] = [_b64(log) for log in txn_result.logs]
+                    info["inner-txns"] = [_inner_info(inner) for inner in txn_result.inner_txns]
+                    if txn_result.logs:
+                        entry.setdefault("dt", {})["lg"] = [_go_string(log) for log in txn_result.logs]
+                    if txn_result.inner_txns:
+                        entry.setdefault("dt", {})["itx"] = [_inner_entry(inner) for inner in txn_result.inner_txns]
+                    if getattr(unsigned, "index", None) == 0 and created:
+                        info["application-index"] = entry["apid"] = created.pop(0)
+                self.pending[txid] = info
+                self.unconfirmed.append(txid)
+                self.block_txns.append(entry)
+        return txids[0]
+
+    def _block_entry(self, txn, delta):
+        """SignedTxnInBlock: the genesis fields are elided, as algod does"""
+        entry = txn.dictify() if hasattr(txn, "transaction") else {"txn": txn.dictify()}
+        entry = dict(entry, txn=dict(entry["txn"]))
+        entry["txn"].pop("gh", None)
+        if entry["txn"].pop("gen", None):
+            entry["hgi"] = True
+        if delta:
+            entry["dt"] = dict(delta)
+        return entry
+
+    def send_transaction(self, txn):
+        return self.send_transactions([txn])
+
+    def send_raw_transaction(self, txn):
+        """Send base64 of concatenated signed msgpack (see parallel_signer.send_signed)"""
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(base64.b64decode(txn))
+        return self.send_transactions([encoding.msgpack_decode(item) for item in unpacker])
+
+    def pending_transaction_info(self, transaction_id):
+        with self.lock:
+            if transaction_id not in self.pending:
+                raise AlgodHTTPError("txn does not exist", 404)
+            info = dict(self.pending[transaction_id])
+        info["txn"] = {"txn": info["txn"].dictify()}  # Encoded only when asked for
+        if not info["confirmed-round"]:
+            del info["confirmed-round"]
+        return info
+
+    # -- lookups --------------------------------------------------------------
+
+    def account_info(self, address):
+        with self.lock:
+            raw = address_bytes(address)
+            apps = [
+                {"id": app_id, "key-value": encode_state(state)}
+                for (holder, app_id), state in self.ledger.locals.items() if holder == raw
+            ]
+            boxes = {}
+            for app_id in self.ledger.apps:
+                if application_address(app_id) == raw:
+                    boxes = self.ledger.boxes.get(app_id, {})
+            return {
+                "address": address_string(raw),
+                "amount": self.ledger.balances.get(raw, 0),
+                "min-balance": self.ledger.min_balance(raw),
+                "apps-local-state": apps,
+                "total-apps-opted-in": len(apps),
+                "total-boxes": len(boxes),
+                "total-box-bytes": sum(len(name) + len(value) for name, value in boxes.items()),
+                "round": self.ledger.round,
+            }
+
+    def application_info(self, application_id):
+        with self.lock:
+            record = self.ledger.apps.get(application_id)
+            if record is None:
+                raise AlgodHTTPError("application does not exist", 404)
+            params = {
+                "creator": address_string(record.creator),
+                "global-state": encode_state(self.ledger.global_state(application_id)),
+            }
+            for field, schema in (("global-state-schema", record.global_schema),
+                                  ("local-state-schema", record.local_schema)):
+                if schema:
+                    params[field] = {"num-uint": schema[0], "num-byte-slice": schema[1]}
+            return {"id": application_id, "params": params}
+
+    def application_boxes(self, application_id, limit=0):
+        with self.lock:
+            names = list(self.ledger.boxes.get(application_id, {}))
+        if limit:
+            names = names[:limit]
+        return {"boxes": [{"name": _b64(name)} for name in names]}
+
+    def application_box_by_name(self, application_id, box_name):
+        with self.lock:
+            value = self.ledger.boxes.get(application_id, {}).get(bytes(box_name))
+        if value is None:
+            raise AlgodHTTPError("box not found", 404)
+        return {"name": _b64(box_name), "round": self.ledger.round, "value": _b64(value)}
+
+
+class LocalIndexerClient:
+    """Enough of indexer.IndexerClient for account searches, over a LocalAlgodClient"""
+
+    def __init__(self, algod_client):
+        self.algod_client = algod_client
+
+    def accounts(self, limit=None, next_page=None, application_id=None, **kwargs):
+        """Accounts (opted in to application_id, if given) in address order, a page at a time"""
+        algod_client = self.algod_client
+        with algod_client.lock:
+            ledger = algod_client.ledger
+            if application_id is None:
+                holders = set(ledger.balances)
+            else:
+                holders = {holder for holder, app_id in ledger.locals if app_id == application_id}
+            addresses = sorted(address_string(holder) for holder in holders)
+            current_round = ledger.round
+        if next_page:
+            addresses = [address for address in addresses if address > next_page]
+        page = addresses[:limit] if limit else addresses
+        response = {"accounts": [algod_client.account_info(address) for address in page],
+                    "current-round": current_round}
+        if len(page) < len(addresses):
+            response["next-token"] = page[-1]
+        return response
+
+
+def deploy_game(algod_client, private_key, funding=10_000_000, programs=None):
+    """Create, fund and bootstrap the enhanced contract (or a given TEAL pair of it) on any algod; returns the app id"""
+    from algosdk import account
+
+    from enhanced_contract import EnhancedGameContract
+    from enhanced_contract_client import EnhancedGameClient
+    from game_factory import SHARD_GLOBAL_BYTES, SHARD_GLOBAL_UINTS, SHARD_LOCAL_BYTES, SHARD_LOCAL_UINTS
+
+    creator = account.address_from_private_key(private_key)
+    approval, clear = programs or EnhancedGameContract().compile()
+    programs = [base64.b64decode(algod_client.compile(teal)["result"]) for teal in (approval, clear)]
+
+    sp = algod_client.suggested_params()
+    create = transaction.ApplicationCreateTxn(
+        creator, sp, transaction.OnComplete.NoOpOC, programs[0], programs[1],
+        transaction.StateSchema(SHARD_GLOBAL_UINTS, SHARD_GLOBAL_BYTES),
+        transaction.StateSchema(SHARD_LOCAL_UINTS, SHARD_LOCAL_BYTES),
+    )
+    txid = algod_client.send_transaction(create.sign(private_key))
+    app_id = transaction.wait_for_confirmation(algod_client, txid, 4)["application-index"]
+
+    sp = algod_client.suggested_params()
+    fund = transaction.PaymentTxn(creator, sp, address_string(application_address(app_id)), funding)
+    group = transaction.assign_group_id([fund] + EnhancedGameClient(app_id).bootstrap(sp, creator))
+    txid = algod_client.send_transactions([txn.sign(private_key) for txn in group])
+    transaction.wait_for_confirmation(algod_client, txid, 4)
+    return app_id
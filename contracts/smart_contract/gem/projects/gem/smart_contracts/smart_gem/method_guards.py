@@ -0,0 +1,43 @@
+"""
+Method Guards
+Admin, pause and opt-in checks shared by the game contracts' methods
+
+Each guard is compiled once as a subroutine and reached with callsub, instead
+of being inlined into every method. A contract passes its own checks and its
+METHOD_GUARDS table, which says which guards each method runs; set a flag to
+False to opt that method out.
+"""
+
+from pyteal import Seq, Subroutine, TealType
+
+# Guards run in this order ahead of the method body
+GUARD_ORDER = ("admin", "not_paused", "opted_in")
+
+
+class MethodGuards:
+    """A contract's guard checks and the methods that run them"""
+
+    def __init__(self, method_guards, admin, not_paused, opted_in):
+        self.method_guards = method_guards
+        checks = {"admin": admin, "not_paused": not_paused, "opted_in": opted_in}
+        # flag -> (inline check, shared subroutine)
+        self.guards = {
+            name: (check, Subroutine(TealType.none, name=f"require_{name}")(check))
+            for name, check in checks.items()
+        }
+
+    def flags(self, method):
+        """Guard flags METHOD_GUARDS sets for a method"""
+        return self.method_guards.get(method, {})
+
+    def wrap(self, method, body, shared_guards=True):
+        """Prefix a method body with the guards METHOD_GUARDS enables for it"""
+        flags = self.flags(method)
+        checks = []
+        for name in GUARD_ORDER:
+            if flags.get(name):
+                inline, shared = self.guards[name]
+                checks.append(shared() if shared_guards else inline())
+        if not checks:
+            return body
+        return Seq(*checks, body)
@@ -0,0 +1,413 @@
+"""
+Oracle Service
+Settles finished games on chain as the contract's oracle, a block window at a time
+
+process_result only accepts calls from ORACLE_ADDRESS, and until now
+nothing played that role. The service takes finished-game results from the
+game server over a local HTTP API (POST /results) and queues them. Once
+per round it cuts the queue into a micro-batch: up to 16 process_result
+calls per atomic group, rendered from a settlement template (see
+txn_templates.py), signed with the oracle key by a ParallelSigner and
+handed to a SubmissionEngine, which simulates each group through Preflight,
+keeps the groups in flight and follows their confirmations. Several windows can be settling at once, so a slow
+confirmation never holds up the next round's batch.
+
+Each player has at most one result queued or in flight. A list of results
+is accepted or refused as a whole. A group fails as a whole when any call
+in it fails, so a failed batch group is split and its results are retried
+one per group in the next window; only a result that fails alone is
+rejected. When a window's submission breaks off (algod unreachable), the
+groups that already confirmed are settled and only the rest go back on
+the queue. GET /metrics reports queue depth, results in
+flight, settlement latency (result received to confirmed) and throughput.
+
+Run `python oracle_service.py [port]` with ORACLE_MNEMONIC set to serve testnet.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from algosdk import account, constants, encoding, mnemonic
+
+from parallel_signer import ParallelSigner
+from scenario_runner import StepStats
+from preflight import preflight_for
+from submission_engine import DEFAULT_WINDOW, SubmissionEngine, signed_txid
+from trace_recorder import ALGOD_ADDRESS
+from txn_templates import render_settlements, settlement_template
+
+DEFAULT_PORT = 8790
+DEFAULT_PIPELINE = 4  # Windows settling at once
+DEFAULT_BATCH_LIMIT = 16 * constants.TX_GROUP_LIMIT  # Results per window
+DEFAULT_SIGNERS = 2  # Signing worker processes
+RESULT_HISTORY = 10_000  # Finished results kept for status lookups
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+class GameResult:
+    """One finished game waiting to be settled"""
+
+    def __init__(self, result_id, player, room_id, win, seed):
+        self.id = result_id
+        self.player = player
+        self.room_id = room_id
+        self.win = win
+        self.seed = seed
+        self.received_at = time.time()
+        self.status = "queued"  # queued, in_flight, settled, rejected
+        self.alone = False  # Retried in a group of its own after its batch failed
+        self.error = None
+        self.confirmed_round = None
+
+    @classmethod
+    def from_json(cls, number, data):
+        """Result from the game server's JSON: player, room_id, win and an optional game_id
+
+        The id is the game_id, or "r<number>" (the number-th result received)
+        without one, so automatic ids never take a game id the server may send later.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("a result must be a JSON object")
+        try:
+            player, room_id, win = data["player"], int(data["room_id"]), bool(data["win"])
+            game_id = int(data.get("game_id", number))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("a result needs player, room_id and win, and a numeric game_id if any")
+        if not isinstance(player, str) or not encoding.is_valid_address(player):
+            raise ValueError(f"{player!r} is not a valid address")
+        if not 0 <= game_id < 2 ** 64 or not 0 <= room_id < 2 ** 64:
+            raise ValueError("room_id and game_id must fit in a uint64")
+        result_id = game_id if "game_id" in data else f"r{number}"
+        return cls(result_id, player, room_id, win, game_id.to_bytes(8, "big"))
+
+    def __repr__(self):
+        return f"GameResult({self.id}, {self.player[:8]}…, {'win' if self.win else 'loss'}, {self.status})"
+
+
+def batch_groups(results):
+    """Split a window's results into process_result groups: retried ones alone, the rest 16 at a time"""
+    alone = [[result] for result in results if result.alone]
+    batched = [result for result in results if not result.alone]
+    size = constants.TX_GROUP_LIMIT
+    return alone + [batched[i:i + size] for i in range(0, len(batched), size)]
+
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+class OracleService:
+    """Queues results and settles them once per round through pipelined submission"""
+
+    def __init__(self, algod_client, app_id, oracle_key, window=DEFAULT_WINDOW,
+                 pipeline=DEFAULT_PIPELINE, batch_limit=DEFAULT_BATCH_LIMIT, signers=DEFAULT_SIGNERS):
+        self.algod_client = algod_client
+        self.app_id = app_id
+        self.oracle_key = oracle_key
+        self.oracle = account.address_from_private_key(oracle_key)
+        self.signers = signers
+        self.signer = None  # ParallelSigner, started with the first window
+        self.preflight = preflight_for(algod_client)  # A doomed group fails before it is sent
+        self.templates = {}  # suggested params that shape the call -> SettlementTemplate
+        self.window = window  # Groups in flight per window
+        self.pipeline = pipeline
+        self.batch_limit = batch_limit
+        self.queue = deque()
+        self.players = {}  # player -> their result, while queued or in flight
+        self.results = {}  # id -> result, pending or among the last RESULT_HISTORY finished
+        self.finished = deque()
+        self.received = 0
+        self.settled = 0
+        self.rejected = 0
+        self.lock = threading.Lock()  # The HTTP API submits from its own threads
+        self.latency = StepStats("settle")
+        self.windows = 0
+        self.groups = 0
+        self.splits = 0
+        self.started = time.time()
+
+    # -- intake ---------------------------------------------------------------
+
+    def submit(self, data):
+        """Queue one result (a dict); returns it, or raises ValueError"""
+        return self.submit_many([data])[0]
+
+    def submit_many(self, items):
+        """Queue every result or none of them; returns them, or raises ValueError"""
+        with self.lock:
+            results, players, ids = [], set(), set()
+            for data in items:
+                result = GameResult.from_json(self.received + len(results), data)
+                if result.player in self.players or result.player in players:
+                    raise ValueError(f"a result for {result.player} is already pending")
+                if result.id in self.results or result.id in ids:
+                    raise ValueError(f"game {result.id} was already submitted")
+                players.add(result.player)
+                ids.add(result.id)
+                results.append(result)
+            for result in results:
+                self.players[result.player] = result
+                self.results[result.id] = result
+                self.queue.append(result)
+            self.received += len(results)
+            return results
+
+    def _take_window(self):
+        with self.lock:
+            count = min(len(self.queue), self.batch_limit)
+            return [self.queue.popleft() for _ in range(count)]
+
+    def _done(self, result, status, error=None):
+        with self.lock:
+            result.status = status
+            result.error = error
+            self.players.pop(result.player, None)
+            if status == "settled":
+                self.settled += 1
+            else:
+                self.rejected += 1
+            self.finished.append(result.id)
+            if len(self.finished) > RESULT_HISTORY:
+                self.results.pop(self.finished.popleft(), None)
+
+    # -- settlement -----------------------------------------------------------
+
+    def _template(self, sp):
+        """Settlement template for these params; only the fee and genesis shape it beyond the rounds"""
+        key = (sp.fee, sp.flat_fee, sp.min_fee, sp.gh, sp.gen)
+        if key not in self.templates:
+            self.templates = {key: settlement_template(sp, self.app_id, self.oracle)}
+        return self.templates[key]
+
+    def _group(self, template, sp, results):
+        """Unsigned bytes of one group settling results"""
+        return render_settlements(template, [(result.player, result.room_id, result.win, result.seed)
+                                             for result in results], sp.first, sp.last)
+
+    def _sign(self, groups):
+        """Sign every group of a window in one pass through the signer's workers"""
+        with self.lock:
+            if self.signer is None:
+                self.signer = ParallelSigner({self.oracle: self.oracle_key}, workers=self.signers)
+        flat = self.signer.sign_bytes((self.oracle, txn) for group in groups for txn in group)
+        signed, offset = [], 0
+        for group in groups:
+            signed.append(flat[offset:offset + len(group)])
+            offset += len(group)
+        return signed
+
+    def close(self):
+        """Stop the signing workers"""
+        if self.signer is not None:
+            self.signer.close()
+            self.signer = None
+
+    def _requeue(self, results, alone=False):
+        """Put results back at the front of the queue for the next window"""
+        with self.lock:
+            for result in results:
+                result.alone = result.alone or alone
+                result.status = "queued"
+            self.queue.extendleft(reversed(results))
+
+    def _confirmed_round(self, txid):
+        """Round txid confirmed in, or None when it did not (or algod cannot say)"""
+        try:
+            return self.algod_client.pending_transaction_info(txid).get("confirmed-round") or None
+        except Exception:
+            return None
+
+    def _settled(self, batch, confirmed_round, fee):
+        for result in batch:
+            result.confirmed_round = confirmed_round
+            self.latency.record(time.time() - result.received_at, fee)
+            self._done(result, "settled")
+
+    def _settle(self, results):
+        """Submit one window's groups and wait for all of them (runs in a worker thread)"""
+        with self.lock:
+            for result in results:
+                result.status = "in_flight"
+        try:
+            sp = self.algod_client.suggested_params()
+            template = self._template(sp)
+        except Exception:
+            self._requeue(results)
+            return
+        batches, groups = [], []
+        for batch in batch_groups(results):
+            try:
+                groups.append(self._group(template, sp, batch))
+                batches.append(batch)
+            except Exception as e:
+                # Building is deterministic, so a batch that cannot be built never will be
+                for result in batch:
+                    self.latency.fail(str(e))
+                    self._done(result, "rejected", str(e))
+        try:
+            groups = self._sign(groups)
+        except Exception:
+            self._requeue([result for batch in batches for result in batch])
+            return
+        engine = SubmissionEngine(self.algod_client, self.oracle_key, window=self.window,
+                                  preflight=self.preflight)
+        try:
+            tickets = engine.run(groups)
+        except Exception:
+            for group, batch in zip(groups, batches):
+                confirmed_round = self._confirmed_round(signed_txid(group[0]))
+                if confirmed_round:
+                    self._settled(batch, confirmed_round, template.fee)
+                else:
+                    self._requeue(batch)
+            self.groups += len(batches)
+            return
+        for ticket, batch in zip(tickets, batches):
+            if ticket.status == "confirmed":
+                self._settled(batch, ticket.confirmed_round, template.fee)
+            elif len(batch) > 1:
+                # One bad result sinks its whole group; the others get a group each next window
+                with self.lock:
+                    self.splits += 1
+                self._requeue(batch, alone=True)
+            else:
+                self.latency.fail(ticket.error)
+                self._done(batch[0], "rejected", ticket.error)
+        self.groups += len(batches)
+        del self.latency.latencies[:-RESULT_HISTORY]  # Percentiles over the recent results
+
+    async def run(self, stop_round=None, until_idle=False):
+        """Cut a window every round until stop_round, or until nothing is left to settle"""
+        slots = asyncio.Semaphore(self.pipeline)
+        settling = set()
+
+        async def settle(results):
+            try:
+                await asyncio.to_thread(self._settle, results)
+            finally:
+                slots.release()
+
+        round_num = (await asyncio.to_thread(self.algod_client.status))["last-round"]
+        while stop_round is None or round_num < stop_round:
+            results = self._take_window()
+            if results:
+                await slots.acquire()
+                self.windows += 1
+                task = asyncio.ensure_future(settle(results))
+                settling.add(task)
+                task.add_done_callback(settling.discard)
+            elif until_idle and not settling:
+                break
+            status = await asyncio.to_thread(self.algod_client.status_after_block, round_num)
+            round_num = status["last-round"]
+        await asyncio.gather(*settling)
+
+    # -- metrics --------------------------------------------------------------
+
+    def metrics(self):
+        with self.lock:
+            queued, pending = len(self.queue), len(self.players)
+        elapsed = time.time() - self.started
+        return {
+            "queue_depth": queued,
+            "in_flight": pending - queued,
+            "settled": self.settled,
+            "rejected": self.rejected,
+            "windows": self.windows,
+            "groups": self.groups,
+            "splits": self.splits,
+            "settled_per_second": round(self.settled / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency": self.latency.summary(),
+        }
+
+
+# ============================================================================
+# LOCAL API
+# ============================================================================
+
+def make_handler(service):
+    """HTTP handler class for POST /results and GET /metrics (or /results/<id>)"""
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path != "/results":
+                return self._reply(404, {"error": "not found"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                items = body if isinstance(body, list) else [body]
+                if not items or not all(isinstance(data, dict) for data in items):
+                    raise ValueError("send a result object or a non-empty list of them")
+                accepted = [result.id for result in service.submit_many(items)]
+            except ValueError as e:
+                return self._reply(400, {"error": str(e)})
+            self._reply(202, {"accepted": accepted, "queue_depth": service.metrics()["queue_depth"]})
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                return self._reply(200, service.metrics())
+            if self.path.startswith("/results/"):
+                result = service.results.get(_result_id(self.path[len("/results/"):]))
+                if result is not None:
+                    return self._reply(200, {"id": result.id, "status": result.status,
+                                             "confirmed_round": result.confirmed_round, "error": result.error})
+            self._reply(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass  # Keep the console for settlement output
+
+    return Handler
+
+
+def _result_id(text):
+    return int(text) if text.isdigit() else text
+
+
+def serve_api(service, host="127.0.0.1", port=DEFAULT_PORT):
+    """Start the local API in a background thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from algosdk.v2client import algod
+
+    try:
+        port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+        if not os.environ.get("ORACLE_MNEMONIC"):
+            raise ValueError("set ORACLE_MNEMONIC to the oracle account's mnemonic")
+        with open("application_info.json") as f:
+            app_id = json.load(f)["application_id"]
+        service = OracleService(algod.AlgodClient("", ALGOD_ADDRESS), app_id,
+                                mnemonic.to_private_key(os.environ["ORACLE_MNEMONIC"]))
+        serve_api(service, port=port)
+        print(f"🔮 Oracle {service.oracle[:8]}… settling app {app_id}; results on http://127.0.0.1:{port}/results")
+        try:
+            asyncio.run(service.run())
+        finally:
+            service.close()
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"❌ Oracle failed: {e}")
+        sys.exit(1)
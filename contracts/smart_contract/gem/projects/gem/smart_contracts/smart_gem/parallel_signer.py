@@ -0,0 +1,158 @@
+"""
+Parallel Signer
+Signs transactions across worker processes, each loading its keys once
+
+Transactions are handed to the workers as canonical msgpack bytes and come
+back as signed msgpack bytes, so nothing but bytes crosses the process
+boundary. A signed transaction is just {"sig": ed25519(b"TX" + txn), "txn":
+txn}, which the workers assemble directly around the unsigned bytes. The
+results can be concatenated per group and sent with send_raw_transaction.
+
+Run `python parallel_signer.py [count] [workers]` for a signatures/second
+benchmark against serial txn.sign().
+"""
+
+import base64
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from algosdk import account, encoding, transaction
+from nacl.signing import SigningKey
+
+DEFAULT_CHUNK = 256  # Transactions per task sent to a worker
+
+# msgpack for {"sig": <64-byte bin>, "txn": ...} with canonical key order
+_SIGNED_PREFIX = b"\x82\xa3sig\xc4\x40"
+_TXN_KEY = b"\xa3txn"
+
+# Per-worker signing keys, loaded once by the pool initializer
+_WORKER_KEYS = {}
+
+
+def _signing_key(private_key):
+    return SigningKey(base64.b64decode(private_key)[:32])
+
+
+def _load_keys(keys):
+    global _WORKER_KEYS
+    _WORKER_KEYS = {address: _signing_key(key) for address, key in keys.items()}
+
+
+def sign_with(signing_key, txn_bytes):
+    """Signed msgpack bytes for unsigned canonical txn_bytes"""
+    signature = signing_key.sign(b"TX" + txn_bytes).signature
+    return _SIGNED_PREFIX + signature + _TXN_KEY + txn_bytes
+
+
+def _sign_chunk(chunk):
+    return [sign_with(_WORKER_KEYS[address], txn_bytes) for address, txn_bytes in chunk]
+
+
+def encode_unsigned(txn):
+    """Canonical msgpack bytes of an unsigned transaction"""
+    return base64.b64decode(encoding.msgpack_encode(txn))
+
+
+def send_signed(algod_client, signed_group):
+    """Send one group of signed msgpack bytes; returns the txid"""
+    return algod_client.send_raw_transaction(base64.b64encode(b"".join(signed_group)))
+
+
+class ParallelSigner:
+    """Process pool that signs for a fixed set of accounts"""
+
+    def __init__(self, keys, workers=None, chunk_size=DEFAULT_CHUNK):
+        self.keys = dict(keys)  # address -> private key
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_load_keys, initargs=(self.keys,)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown()
+
+    def sign_bytes(self, items):
+        """[(sender address, unsigned txn bytes)] -> [signed bytes], in order"""
+        items = list(items)
+        missing = {address for address, _ in items} - set(self.keys)
+        if missing:
+            raise KeyError(f"No key loaded for {sorted(missing)[0]}")
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        return [signed for chunk in self.pool.map(_sign_chunk, chunks) for signed in chunk]
+
+    def sign_groups(self, groups):
+        """[[Transaction]] -> [[signed bytes]] with the same grouping"""
+        groups = [list(group) for group in groups]
+        flat = self.sign_bytes(
+            (txn.sender, encode_unsigned(txn)) for group in groups for txn in group
+        )
+        signed, offset = [], 0
+        for group in groups:
+            signed.append(flat[offset:offset + len(group)])
+            offset += len(group)
+        return signed
+
+
+def _benchmark_txns(count, accounts):
+    sp = transaction.SuggestedParams(1000, 1, 1000, "A" * 43 + "=", "testnet", flat_fee=True)
+    keys = {}
+    for _ in range(accounts):
+        private_key, address = account.generate_account()
+        keys[address] = private_key
+    senders = list(keys)
+    txns = [
+        transaction.PaymentTxn(senders[i % accounts], sp, senders[(i + 1) % accounts], i)
+        for i in range(count)
+    ]
+    return keys, txns
+
+
+def benchmark(count=4000, workers=None, accounts=100):
+    """Signatures/second: serial txn.sign() vs the process pool"""
+    keys, txns = _benchmark_txns(count, accounts)
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    for txn in txns:
+        encoding.msgpack_encode(txn.sign(keys[txn.sender]))
+    serial = count / (time.perf_counter() - started)
+
+    with ParallelSigner(keys, workers=workers) as signer:
+        signer.sign_bytes([(txns[0].sender, encode_unsigned(txns[0]))])  # Start the workers
+        started = time.perf_counter()
+        signer.sign_groups([[txn] for txn in txns])
+        parallel = count / (time.perf_counter() - started)
+
+    return {
+        "transactions": count,
+        "workers": workers,
+        "serial_per_second": round(serial),
+        "parallel_per_second": round(parallel),
+        "parallel_per_core": round(parallel / workers),
+        "speedup": round(parallel / serial, 2),
+    }
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(f"✍️  Signing benchmark ({count} transactions)...")
+    try:
+        report = benchmark(count, workers)
+        print(f"   Serial txn.sign():  {report['serial_per_second']} sig/s")
+        print(f"   {report['workers']} worker(s):        {report['parallel_per_second']} sig/s "
+              f"({report['parallel_per_core']} per core, {report['speedup']}x)")
+    except Exception as e:
+        print(f"❌ Error: {e}")
@@ -0,0 +1,257 @@
+"""
+Preflight
+Simulate every transaction group before it is sent, and drop the ones that would fail
+
+A group is run either through algod's simulate endpoint or through a
+LedgerState on the local TEAL evaluator. Either way the result carries the
+logs, opcode cost, predicted state deltas and, on failure, the TEAL line
+that rejected it, so a doomed group never reaches the network. Senders can
+act on the predicted deltas right away instead of waiting for confirmation.
+
+With algod, the failing app's TEAL is fetched and disassembled the first time
+it is needed unless it was passed in, so every failure names its line.
+preflight_for() picks the backend for a client: the LocalAlgodClient's own
+ledger, or algod simulate for a real node.
+"""
+
+import base64
+import contextlib
+import re
+
+from algosdk import transaction
+from algosdk.source_map import SourceMap
+from algosdk.v2client import models
+
+from local_evaluator import address_string, evaluate_group, txn_from_algosdk
+
+_PC_RE = re.compile(r"pc=(\d+)")
+
+
+class PreflightResult:
+    """Outcome of simulating one group"""
+
+    def __init__(self):
+        self.ok = False
+        self.error = None
+        self.failed_index = None
+        self.failed_app = None
+        self.failed_pc = None
+        self.failed_line = None  # TEAL line number in the failing app's program
+        self.failed_source = None  # TEAL text (and PyTeal location when mapped)
+        self.logs = []
+        self.cost = 0
+        self.deltas = {"global": {}, "local": {}, "boxes": {}, "balances": {}}
+
+    def __bool__(self):
+        return self.ok
+
+    def reason(self):
+        """The error, followed by the failing TEAL line when it is known"""
+        if self.failed_line is None:
+            return self.error
+        return f"{self.error} (line {self.failed_line}: {self.failed_source})"
+
+    def __repr__(self):
+        if self.ok:
+            return f"PreflightResult(ok, cost={self.cost}, logs={len(self.logs)})"
+        where = f" line {self.failed_line}" if self.failed_line else ""
+        return f"PreflightResult(failed at {self.failed_index}{where}: {self.error})"
+
+
+def _unsigned(txn):
+    return getattr(txn, "transaction", txn)
+
+
+def _app_id(txn):
+    txn = _unsigned(txn)
+    return getattr(txn, "index", None) if txn.type == "appl" else None
+
+
+def _decode_state_delta(entries):
+    """algod EvalDelta list -> {key: value or None when deleted}"""
+    delta = {}
+    for entry in entries or []:
+        value = entry["value"]
+        key = base64.b64decode(entry["key"])
+        if value.get("action") == 3:
+            delta[key] = None
+        elif value.get("action") == 1:
+            delta[key] = base64.b64decode(value.get("bytes", ""))
+        else:
+            delta[key] = value.get("uint", 0)
+    return delta
+
+
+class Preflight:
+    """Runs groups through a local ledger (ledger) or else algod simulate; sends through algod_client"""
+
+    def __init__(self, algod_client=None, ledger=None, teal_sources=None, sourcemaps=None,
+                 load_sources=True, lock=None):
+        if algod_client is None and ledger is None:
+            raise ValueError("Preflight needs an algod_client, a ledger or both")
+        self.algod_client = algod_client
+        self.ledger = ledger
+        self.lock = lock or contextlib.nullcontext()  # Held while checking against a ledger others write to
+        self.teal_sources = dict(teal_sources or {})  # app id -> approval TEAL
+        self.sourcemaps = dict(sourcemaps or {})  # app id -> teal_sourcemap.load_sourcemap()
+        self.load_sources = load_sources
+        self._pc_maps = {}
+
+    # -- failing line ---------------------------------------------------------
+
+    def _load_source(self, app_id):
+        """Disassemble the app's approval program from algod; None if it cannot be read"""
+        try:
+            info = self.algod_client.application_info(app_id)
+            program = base64.b64decode(info["params"]["approval-program"])
+            return self.algod_client.disassemble(program)["result"]
+        except Exception:
+            return None
+
+    def _line_for_pc(self, app_id, pc):
+        if app_id not in self.teal_sources and self.load_sources:
+            source = self._load_source(app_id)
+            if source is not None:
+                self.teal_sources[app_id] = source
+        if app_id not in self.teal_sources:
+            return None
+        if app_id not in self._pc_maps:
+            response = self.algod_client.compile(self.teal_sources[app_id], source_map=True)
+            self._pc_maps[app_id] = SourceMap(response["sourcemap"])
+        line = self._pc_maps[app_id].get_line_for_pc(pc)
+        return None if line is None else line + 1
+
+    def _describe_line(self, result, text=None):
+        if result.failed_line is None:
+            return
+        if text is None and result.failed_app in self.teal_sources:
+            lines = self.teal_sources[result.failed_app].splitlines()
+            if result.failed_line <= len(lines):
+                text = lines[result.failed_line - 1].strip()
+        entry = self.sourcemaps.get(result.failed_app, {}).get(result.failed_line)
+        if entry:
+            text = f"{text}  <- {entry['file']}:{entry['line']}"
+        result.failed_source = text
+
+    # -- backends -------------------------------------------------------------
+
+    def _check_local(self, group):
+        txns = [txn if isinstance(txn, dict) else txn_from_algosdk(txn) for txn in group]
+        with self.lock:
+            outcome = evaluate_group(self.ledger, txns, commit=False)
+
+        result = PreflightResult()
+        result.ok = outcome.ok
+        result.error = outcome.error
+        result.logs = outcome.logs
+        result.cost = outcome.cost
+        # Same shape as the algod backend: addresses as strings
+        delta = outcome.delta
+        result.deltas = {
+            "global": delta.get("global", {}),
+            "local": {(address_string(a), app): v for (a, app), v in delta.get("local", {}).items()},
+            "boxes": delta.get("boxes", {}),
+            "balances": {address_string(a): v for a, v in delta.get("balances", {}).items()},
+        }
+        if outcome.ok:
+            return result
+
+        result.failed_index = outcome.failed_index
+        result.failed_line = outcome.error_line
+        failed = txns[outcome.failed_index]
+        result.failed_app = failed.get("ApplicationID") or None
+        text = None
+        record = self.ledger.apps.get(result.failed_app)
+        if record is not None and result.failed_line is not None:
+            for instr in record.approval.instructions:
+                if instr.line == result.failed_line:
+                    text = instr.text
+                    break
+        self._describe_line(result, text)
+        return result
+
+    def _check_algod(self, group):
+        signed = [
+            txn if isinstance(txn, transaction.GenericSignedTransaction) else transaction.SignedTransaction(txn, None)
+            for txn in group
+        ]
+        request = models.SimulateRequest(
+            txn_groups=[models.SimulateRequestTransactionGroup(txns=signed)],
+            allow_empty_signatures=True,
+            exec_trace_config=models.SimulateTraceConfig(enable=True),
+        )
+        response = self.algod_client.simulate_transactions(request)
+        outcome = response["txn-groups"][0]
+
+        # simulate reports app state deltas; box and balance deltas are local-only
+        result = PreflightResult()
+        result.cost = outcome.get("app-budget-consumed", 0)
+        for index, txn_result in enumerate(outcome.get("txn-results", [])):
+            applied = txn_result.get("txn-result", {})
+            result.logs += [base64.b64decode(log) for log in applied.get("logs", [])]
+            app_id = _app_id(group[index]) or applied.get("application-index")
+            if applied.get("global-state-delta"):
+                result.deltas["global"].setdefault(app_id, {}).update(
+                    _decode_state_delta(applied["global-state-delta"]))
+            for local in applied.get("local-state-delta", []):
+                result.deltas["local"].setdefault((local["address"], app_id), {}).update(
+                    _decode_state_delta(local["delta"]))
+
+        if not outcome.get("failure-message"):
+            result.ok = True
+            return result
+
+        result.error = outcome["failure-message"]
+        failed_at = outcome.get("failed-at") or [0]
+        result.failed_index = failed_at[0]
+        result.failed_app = _app_id(group[result.failed_index])
+        trace = outcome.get("txn-results", [{}] * (result.failed_index + 1))[result.failed_index]
+        steps = trace.get("exec-trace", {}).get("approval-program-trace", [])
+        if steps:
+            result.failed_pc = steps[-1]["pc"]
+        else:
+            match = _PC_RE.search(result.error)
+            result.failed_pc = int(match.group(1)) if match else None
+        if result.failed_pc is not None and result.failed_app is not None:
+            result.failed_line = self._line_for_pc(result.failed_app, result.failed_pc)
+        self._describe_line(result)
+        return result
+
+    # -- public API -----------------------------------------------------------
+
+    def check(self, group):
+        """Simulate a group (signed or unsigned) without sending it"""
+        if self.ledger is not None:
+            return self._check_local(group)
+        return self._check_algod(group)
+
+    def send(self, signed_group, wait_rounds=0):
+        """Send a signed group only if it simulates cleanly; (txid or None, PreflightResult)"""
+        result = self.check(signed_group)
+        if not result.ok:
+            print(f"🛑 Preflight rejected group: {result.error}")
+            if result.failed_source:
+                print(f"   ↳ line {result.failed_line}: {result.failed_source}")
+            return None, result
+
+        try:
+            if self.algod_client is None:
+                outcome = evaluate_group(self.ledger, [txn_from_algosdk(txn) for txn in signed_group])
+                return (_unsigned(signed_group[0]).get_txid() if outcome.ok else None), result
+
+            txid = self.algod_client.send_transactions(signed_group)
+            if wait_rounds:
+                transaction.wait_for_confirmation(self.algod_client, txid, wait_rounds)
+            return txid, result
+
+        except Exception as e:
+            print(f"❌ Error sending group: {e}")
+            return None, result
+
+
+def preflight_for(algod_client, **options):
+    """Preflight for a client: checks on a LocalAlgodClient's ledger, else through algod simulate"""
+    ledger = getattr(algod_client, "ledger", None)
+    if ledger is not None:
+        return Preflight(algod_client=algod_client, ledger=ledger, lock=algod_client.lock, **options)
+    return Preflight(algod_client=algod_client, **options)
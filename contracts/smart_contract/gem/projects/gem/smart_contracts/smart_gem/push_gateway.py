@@ -0,0 +1,357 @@
+"""
+Push Gateway
+Pushes each player's balances and game state to the front end as blocks land
+
+The front end polls getBalance, getLedgerCoins, getUserRelics and
+getNetworkStatus for every open tab. The gateway replaces those loops: it
+follows blocks once through a BlockFollower, works out which subscribed
+players a round touched (senders, receivers, app call accounts and inner
+transactions), reads only those accounts, and pushes what changed.
+
+Clients send {"subscribe": [address, ...]} (or "unsubscribe") and get a
+snapshot of those players back. After that each client receives one
+message per round, with every change of that round coalesced in it:
+balance, stake, room, wins/losses, Ledger Coins and other ASA amounts,
+newly received NFTs, and the game's changed global state. Quiet rounds
+still get their message, whose round and timestamp stand in for
+getNetworkStatus. Each client has a bounded send queue; one that falls
+that far behind is dropped, and its connection closed, rather than
+slowing everyone else down. A player whose account cannot be read in a
+round is skipped for that round; the next change picks it up again.
+
+The gateway core only needs an async send callable per client (and an
+optional async close), so it can sit behind any transport; serve() puts
+it behind a WebSocket server (needs `pip install websockets`).
+
+Run `python push_gateway.py [port] [ledger coin asset id]` to serve testnet.
+"""
+
+import asyncio
+import base64
+import json
+import sys
+
+from algosdk import encoding
+
+from block_follower import BlockFollower, CursorStore
+from trace_recorder import ALGOD_ADDRESS, decode_key_values
+
+GATEWAY_NAME = "push-gateway"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 64
+
+# View field -> local state key of the game contract
+LOCAL_FIELDS = {
+    "stake": b"PLAYER_STAKE",
+    "room": b"PLAYER_ROOM",
+    "wins": b"PLAYER_WINS",
+    "losses": b"PLAYER_LOSSES",
+    "score": b"PLAYER_SCORE",
+    "earned": b"PLAYER_EARNED",
+    "reward_stake": b"PLAYER_STAKE_AMOUNT",
+}
+
+
+# ============================================================================
+# PLAYER VIEWS
+# ============================================================================
+
+def player_view(account_info, app_id, ledger_coin_id=None):
+    """What the front end shows for one player, from an algod account_info"""
+    state, opted_in = {}, False
+    for app in account_info.get("apps-local-state", []):
+        if app["id"] == app_id:
+            state, opted_in = decode_key_values(app.get("key-value", [])), True
+    assets = {str(holding["asset-id"]): holding.get("amount", 0) for holding in account_info.get("assets", [])}
+    view = {"balance": account_info.get("amount", 0), "opted_in": opted_in, "assets": assets}
+    for field, key in LOCAL_FIELDS.items():
+        view[field] = json_value(state.get(key, 0))
+    if ledger_coin_id is not None:
+        view["ledger_coins"] = assets.get(str(ledger_coin_id), 0)
+    return view
+
+
+def diff_views(old, new):
+    """Fields that changed between two views; assets only list the changed amounts"""
+    changes = {field: value for field, value in new.items() if field != "assets" and old.get(field) != value}
+    assets = {asset_id: new["assets"].get(asset_id, 0)
+              for asset_id in set(old["assets"]) | set(new["assets"])
+              if old["assets"].get(asset_id, 0) != new["assets"].get(asset_id, 0)}
+    if assets:
+        changes["assets"] = assets
+        received = sorted(int(asset_id) for asset_id, amount in assets.items()
+                          if amount > 0 and not old["assets"].get(asset_id))
+        if received:
+            changes["received"] = received
+    return changes
+
+
+def is_nft(params):
+    """Pure or fractional NFT (ARC-3 style): the whole supply is one unit"""
+    return params.get("total") == 10 ** params.get("decimals", 0)
+
+
+def message_error(message):
+    """Why a client message is malformed, or None"""
+    if not isinstance(message, dict):
+        return "messages must be JSON objects"
+    for field in ("subscribe", "unsubscribe"):
+        if field in message:
+            addresses = message[field]
+            if not isinstance(addresses, list) or not all(isinstance(a, str) for a in addresses):
+                return f"{field} must be a list of addresses"
+            invalid = [address for address in addresses if not encoding.is_valid_address(address)]
+            if invalid:
+                return f"not an address: {invalid[0][:64]}"
+    return None
+
+
+def json_value(value):
+    """State values as JSON: ints stay, bytes become UTF-8 text or base64"""
+    if isinstance(value, bytes):
+        try:
+            return value.decode()
+        except UnicodeDecodeError:
+            return base64.b64encode(value).decode()
+    return value
+
+
+# ============================================================================
+# CLIENTS
+# ============================================================================
+
+class Client:
+    """One connected front end: its players and a bounded queue of messages to send"""
+
+    def __init__(self, send, queue_size=DEFAULT_QUEUE_SIZE, on_close=None):
+        self.send = send
+        self.on_close = on_close
+        self.addresses = set()
+        self.queue = asyncio.Queue(queue_size)
+        self.closed = False
+        self.sent = 0
+        self.task = asyncio.ensure_future(self._write())
+
+    async def _write(self):
+        while True:
+            message = await self.queue.get()
+            await self.send(json.dumps(message))
+            self.sent += 1
+
+    def push(self, message):
+        """Queue a message; False when the client is too far behind to take it"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def flush(self):
+        """Wait until everything queued has been sent"""
+        while not self.queue.empty() and not self.task.done():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.task.cancel()
+        if self.on_close is not None:
+            asyncio.ensure_future(self.on_close())
+
+
+# ============================================================================
+# GATEWAY
+# ============================================================================
+
+class PushGateway:
+    """Follows blocks once and pushes per-player changes to every connected client"""
+
+    def __init__(self, algod_client, app_id, ledger_coin_id=None, queue_size=DEFAULT_QUEUE_SIZE):
+        self.algod_client = algod_client
+        self.app_id = app_id
+        self.ledger_coin_id = ledger_coin_id
+        self.queue_size = queue_size
+        # Pushes are live only, so the gateway starts at the next round and keeps no cursor file
+        self.follower = BlockFollower(algod_client, [app_id], CursorStore())
+        self.follower.cursors.set(GATEWAY_NAME, algod_client.status()["last-round"] + 1)
+        self.subscription = self.follower.subscribe(GATEWAY_NAME, include_empty=True)
+        self.clients = []
+        self.views = {}  # address -> last view sent out
+        self.watchers = {}  # address -> number of clients subscribed to it
+        self.asset_params = {}  # asset id -> params, assets never change their NFT-ness
+        self.account_reads = 0
+        self.read_errors = 0
+        self.rounds = 0
+        self.dropped = 0
+
+    # -- clients --------------------------------------------------------------
+
+    def connect(self, send, close=None):
+        """Register a client by its async send(text) callable; close() is awaited when it is dropped"""
+        client = Client(send, self.queue_size, close)
+        self.clients.append(client)
+        return client
+
+    def disconnect(self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+        self._unwatch(client, list(client.addresses))
+        client.close()
+
+    def _unwatch(self, client, addresses):
+        for address in addresses:
+            if address in client.addresses:
+                client.addresses.discard(address)
+                self.watchers[address] -= 1
+                if not self.watchers[address]:
+                    del self.watchers[address]
+                    self.views.pop(address, None)
+
+    async def handle(self, client, text):
+        """Apply one message from a client"""
+        if client.closed:
+            return
+        try:
+            message = json.loads(text)
+        except ValueError:
+            client.push({"type": "error", "error": "messages must be JSON"})
+            return
+        error = message_error(message)
+        if error:
+            client.push({"type": "error", "error": error})
+            return
+        if "unsubscribe" in message:
+            self._unwatch(client, message["unsubscribe"])
+        if "subscribe" in message:
+            try:
+                await self.subscribe(client, message["subscribe"])
+            except Exception as e:
+                # The client stays connected and can ask again
+                self.read_errors += 1
+                client.push({"type": "error", "error": f"could not read the players: {e}"})
+
+    async def subscribe(self, client, addresses):
+        """Start pushing these players to the client; sends it their current views"""
+        new = [address for address in dict.fromkeys(addresses) if address not in client.addresses]
+        unread = [address for address in new if address not in self.views]
+        views = await asyncio.gather(*(self._read_view(a) for a in unread))
+        if client.closed:
+            return  # Dropped while the reads were in flight
+        for address, view in zip(unread, views):
+            self.views.setdefault(address, view)
+        for address in new:
+            client.addresses.add(address)
+            self.watchers[address] = self.watchers.get(address, 0) + 1
+        self._push(client, {
+            "type": "snapshot",
+            "round": self.follower.cursors.get(GATEWAY_NAME) - 1,
+            "players": {address: self.views[address] for address in client.addresses},
+        })
+
+    def _push(self, client, message):
+        if not client.push(message):
+            self.dropped += 1
+            self.disconnect(client)
+
+    # -- rounds ---------------------------------------------------------------
+
+    async def _read_view(self, address):
+        info = await asyncio.to_thread(self.algod_client.account_info, address)
+        self.account_reads += 1
+        return player_view(info, self.app_id, self.ledger_coin_id)
+
+    async def _nft(self, asset_id):
+        if asset_id not in self.asset_params:
+            info = await asyncio.to_thread(self.algod_client.asset_info, asset_id)
+            self.asset_params[asset_id] = info["params"]
+        params = self.asset_params[asset_id]
+        if is_nft(params):
+            return {"asset_id": asset_id, "name": params.get("name"),
+                    "unit_name": params.get("unit-name"), "url": params.get("url")}
+        return None
+
+    async def _player_changes(self, deltas):
+        """{address: changes} for the subscribed players this round touched"""
+        touched = set(deltas.addresses)
+        for call in deltas.calls:
+            touched.update(call.local_delta)
+        watched = [address for address in touched if address in self.watchers]
+        views = await asyncio.gather(*(self._read_view(address) for address in watched), return_exceptions=True)
+        updates = {}
+        for address, view in zip(watched, views):
+            if isinstance(view, Exception):
+                self.read_errors += 1  # Keep the last view; the player's next change catches up
+                continue
+            if address not in self.watchers:
+                continue  # Unsubscribed while the read was in flight
+            changes = diff_views(self.views[address], view)
+            self.views[address] = view
+            if changes.get("received"):
+                nfts = [await self._nft(asset_id) for asset_id in changes.pop("received")]
+                if any(nfts):
+                    changes["new_nfts"] = [nft for nft in nfts if nft]
+            if changes:
+                updates[address] = changes
+        return updates
+
+    async def publish(self, deltas):
+        """Push one round: a single coalesced message to each client, quiet rounds included"""
+        self.rounds += 1
+        updates = await self._player_changes(deltas)
+        game = {}
+        for call in deltas.calls:
+            for key, value in call.global_delta.items():
+                game[key.decode(errors="replace")] = json_value(value)
+        for client in list(self.clients):
+            mine = {address: changes for address, changes in updates.items() if address in client.addresses}
+            self._push(client, {"type": "round", "round": deltas.round, "timestamp": deltas.timestamp,
+                                "updates": mine, "game": game})
+
+    async def run(self, stop_round=None):
+        """Follow and push until stop_round (forever without one); later calls carry on"""
+        follow = asyncio.ensure_future(self.follower.run(stop_round))
+        async for deltas in self.subscription:
+            await self.publish(deltas)
+        await follow
+
+    async def serve(self, host="0.0.0.0", port=DEFAULT_PORT):
+        """Serve WebSocket clients while following blocks"""
+        try:
+            import websockets
+        except ImportError:
+            raise ImportError("websockets not found. Install with: pip install websockets")
+
+        async def connection(websocket):
+            client = self.connect(websocket.send, websocket.close)
+            try:
+                async for text in websocket:
+                    await self.handle(client, text)
+            finally:
+                self.disconnect(client)
+
+        async with websockets.serve(connection, host, port):
+            await self.run()
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from algosdk.v2client import algod
+
+    try:
+        port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+        ledger_coin_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        with open("application_info.json") as f:
+            app_id = json.load(f)["application_id"]
+        gateway = PushGateway(algod.AlgodClient("", ALGOD_ADDRESS), app_id, ledger_coin_id)
+        print(f"📡 Pushing app {app_id} updates on ws://0.0.0.0:{port} (Ctrl+C to stop)")
+        asyncio.run(gateway.serve(port=port))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"❌ Gateway failed: {e}")
+        sys.exit(1)
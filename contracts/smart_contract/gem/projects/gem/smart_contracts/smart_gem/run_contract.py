@@ -64,7 +64,7 @@ def approval_program():
             App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) + Gtxn[0].amount()),
             App.globalPut(GAME_STATE, GAME_STAKED),
             
-            Log(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount())),
+            Log(Concat(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount()))),
             Approve()
         ])
     
@@ -90,12 +90,13 @@ def approval_program():
             App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - App.localGet(Int(0), PLAYER_STAKE)),
             App.localPut(Int(0), PLAYER_STAKE, Int(0)),
             
-            Log(Bytes("GAME_WIN"), Itob(App.localGet(Int(0), PLAYER_STAKE))),
+            Log(Concat(Bytes("GAME_WIN"), Itob(App.localGet(Int(0), PLAYER_STAKE)))),
             Approve()
         ])
     
     # Lose function
     def lose():
+        commission = ScratchVar(TealType.uint64)
         return Seq([
             Assert(App.globalGet(PAUSED) == Int(0)),
             Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
@@ -104,55 +105,58 @@ def approval_program():
             App.localPut(Int(0), PLAYER_LOSSES, App.localGet(Int(0), PLAYER_LOSSES) + Int(1)),
             
             # Calculate commission
-            commission = App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)
+            commission.store(App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)),
             
-            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - commission),
-            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + commission),
+            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - commission.load()),
+            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + commission.load()),
             
             # Return remaining stake
             InnerTxnBuilder.Begin(),
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: App.localGet(Int(0), PLAYER_STAKE) - commission,
+                TxnField.amount: App.localGet(Int(0), PLAYER_STAKE) - commission.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
             App.localPut(Int(0), PLAYER_STAKE, Int(0)),
             
-            Log(Bytes("GAME_LOSS"), Itob(commission)),
+            Log(Concat(Bytes("GAME_LOSS"), Itob(commission.load()))),
             Approve()
         ])
     
     # Admin functions
     def toggle_pause():
+        current_pause = ScratchVar(TealType.uint64)
+        new_pause = ScratchVar(TealType.uint64)
         return Seq([
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
-            current_pause = App.globalGet(PAUSED),
-            new_pause = If(current_pause == Int(0), Int(1), Int(0)),
-            App.globalPut(PAUSED, new_pause),
-            Log(Bytes("PAUSE_TOGGLED"), Itob(new_pause)),
+            current_pause.store(App.globalGet(PAUSED)),
+            new_pause.store(If(current_pause.load() == Int(0), Int(1), Int(0))),
+            App.globalPut(PAUSED, new_pause.load()),
+            Log(Concat(Bytes("PAUSE_TOGGLED"), Itob(new_pause.load()))),
             Approve()
         ])
     
     def withdraw_commission():
+        commission_amount = ScratchVar(TealType.uint64)
         return Seq([
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
-            commission_amount = App.globalGet(COMMISSION_POOL),
-            Assert(commission_amount > Int(0)),
+            commission_amount.store(App.globalGet(COMMISSION_POOL)),
+            Assert(commission_amount.load() > Int(0)),
             App.globalPut(COMMISSION_POOL, Int(0)),
             
             InnerTxnBuilder.Begin(),
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: commission_amount,
+                TxnField.amount: commission_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
-            Log(Bytes("COMMISSION_WITHDRAWN"), Itob(commission_amount)),
+            Log(Concat(Bytes("COMMISSION_WITHDRAWN"), Itob(commission_amount.load()))),
             Approve()
         ])
     
@@ -64,7 +64,7 @@ def approval_program():
             App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) + Gtxn[0].amount()),
             App.globalPut(GAME_STATE, GAME_STAKED),
             
-            Log(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount())),
+            Log(Concat(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount()))),
             Approve()
         ])
     
@@ -90,7 +90,7 @@ def approval_program():
             App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - App.localGet(Int(0), PLAYER_STAKE)),
             App.localPut(Int(0), PLAYER_STAKE, Int(0)),
             
-            Log(Bytes("GAME_WIN"), Itob(App.localGet(Int(0), PLAYER_STAKE))),
+            Log(Concat(Bytes("GAME_WIN"), Itob(App.localGet(Int(0), PLAYER_STAKE)))),
             Approve()
         ])
     
@@ -119,7 +119,7 @@ def approval_program():
             
             App.localPut(Int(0), PLAYER_STAKE, Int(0)),
             
-            Log(Bytes("GAME_LOSS"), Itob(App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000))),
+            Log(Concat(Bytes("GAME_LOSS"), Itob(App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)))),
             Approve()
         ])
     
@@ -128,7 +128,7 @@ def approval_program():
         return Seq([
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
             App.globalPut(PAUSED, If(App.globalGet(PAUSED) == Int(0), Int(1), Int(0))),
-            Log(Bytes("PAUSE_TOGGLED"), Itob(App.globalGet(PAUSED))),
+            Log(Concat(Bytes("PAUSE_TOGGLED"), Itob(App.globalGet(PAUSED)))),
             Approve()
         ])
     
@@ -148,7 +148,7 @@ def approval_program():
             
             App.globalPut(COMMISSION_POOL, Int(0)),
             
-            Log(Bytes("COMMISSION_WITHDRAWN"), Itob(App.globalGet(COMMISSION_POOL))),
+            Log(Concat(Bytes("COMMISSION_WITHDRAWN"), Itob(App.globalGet(COMMISSION_POOL)))),
             Approve()
         ])
     
@@ -0,0 +1,515 @@
+"""
+Scenario Runner
+Runs declarative game flows for many accounts at once with asyncio
+
+A scenario lists the steps every player walks through (opt_in, stake,
+settle, stake_rewards, claim, unstake) plus setup/teardown steps run by the
+host account (create_room, close_room). Players run concurrently: each
+blocking algod call goes through asyncio.to_thread, and all players waiting
+for confirmation share one status_after_block call per round, so a full run
+takes a few blocks rather than a few blocks per player. Every step is timed
+into a latency histogram, and the effect of each confirmed step is tracked
+so the run ends with assertions on the final globals and room boxes. Each
+group is simulated through Preflight first, so a step that would fail is
+counted with its failing TEAL line and never sent.
+
+The enhanced contract no longer keeps a TOTAL_STAKED global: game stakes
+live in the room pots, so those are asserted instead, alongside
+COMMISSION_POOL and LIQUIDITY_POOL.
+
+Run `python scenario_runner.py [scenario.json] [players]` to run against a
+local stand-in network (local_network.py).
+"""
+
+import asyncio
+import base64
+import bisect
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from algosdk import account
+
+from box_layout import decode_room, room_box_min_balance, room_box_name
+from enhanced_contract import COMMISSION_RATE, MAX_PLAYERS_PER_ROUND
+from enhanced_contract_client import EnhancedGameClient, decode_logs
+from preflight import preflight_for
+
+PLAYER_STEPS = ("opt_in", "stake", "settle", "stake_rewards", "claim", "unstake")
+ROOM_STEPS = ("create_room", "close_room")  # Run once per room
+HOST_STEPS = ROOM_STEPS + ("fund_rewards",)
+
+DEFAULT_SCENARIO = {
+    "room_id": 1,             # First room; players fill rooms in order
+    "players_per_room": MAX_PLAYERS_PER_ROUND.value,
+    "stake": 1_000_000,
+    "reward_stake": 1_000_000,
+    "reward_funding": 10_000_000,  # Host's stake backing the rewards players claim
+    "win_rate": 0.5,
+    "seed": 0,
+    "concurrency": 64,        # Groups in flight at once
+    "wait_rounds": 10,
+    "setup": ["create_room", "fund_rewards"],
+    "steps": ["stake", "settle", "stake_rewards", "claim", "unstake"],
+    "teardown": ["close_room"],
+}
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def load_scenario(scenario=None):
+    """Scenario dict from a dict or a JSON file path, with defaults filled in"""
+    if isinstance(scenario, str):
+        with open(scenario, "r") as f:
+            scenario = json.load(f)
+    merged = dict(DEFAULT_SCENARIO, **(scenario or {}))
+    for step in merged["steps"]:
+        if step not in PLAYER_STEPS:
+            raise ValueError(f"Unknown player step: {step}")
+    for step in merged["setup"] + merged["teardown"]:
+        if step not in HOST_STEPS:
+            raise ValueError(f"Unknown host step: {step}")
+    return merged
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+class StepStats:
+    """Latencies and failures of one step across all accounts"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.failures = {}  # error message -> count
+        self.fees = 0  # microAlgos paid by confirmed groups
+
+    def record(self, latency, fee=0):
+        self.latencies.append(latency)
+        self.fees += fee
+
+    def fail(self, error):
+        message = str(error)
+        self.failures[message] = self.failures.get(message, 0) + 1
+
+    @property
+    def failed(self):
+        return sum(self.failures.values())
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def histogram(self):
+        """[(bucket upper bound, or None for the overflow bucket, count)]"""
+        counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        for latency in self.latencies:
+            counts[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        return list(zip(LATENCY_BUCKETS + (None,), counts))
+
+    def summary(self):
+        return {
+            "count": len(self.latencies),
+            "failed": self.failed,
+            "p50": round(self.percentile(50), 4),
+            "p95": round(self.percentile(95), 4),
+            "p99": round(self.percentile(99), 4),
+            "max": round(max(self.latencies, default=0.0), 4),
+            "fees": self.fees,
+        }
+
+
+class RoundWatcher:
+    """Shares one status_after_block call among everyone waiting for a round"""
+
+    def __init__(self, algod_client):
+        self.algod_client = algod_client
+        self.round = None
+        self.rounds_seen = 0
+        self._next = None
+
+    async def start(self):
+        status = await asyncio.to_thread(self.algod_client.status)
+        self.round = status["last-round"]
+
+    async def _advance(self):
+        try:
+            status = await asyncio.to_thread(self.algod_client.status_after_block, self.round)
+            self.round = status["last-round"]
+            self.rounds_seen += 1
+        finally:
+            self._next = None
+
+    async def next_round(self):
+        if self._next is None:
+            self._next = asyncio.ensure_future(self._advance())
+        await asyncio.shield(self._next)
+
+    async def wait_confirmed(self, txid, wait_rounds):
+        """Pending info once confirmed; raises on a pool error or timeout"""
+        start = self.round
+        while True:
+            # Rounds may pass while the lookup waits for a thread, so judge by the round before it
+            seen = self.round
+            info = await asyncio.to_thread(self.algod_client.pending_transaction_info, txid)
+            if info.get("confirmed-round"):
+                return info
+            if info.get("pool-error"):
+                raise RuntimeError(f"Transaction rejected: {info['pool-error']}")
+            if seen - start >= wait_rounds:
+                raise TimeoutError(f"{txid} not confirmed after {wait_rounds} rounds")
+            await self.next_round()
+
+
+# ============================================================================
+# EXPECTED STATE
+# ============================================================================
+
+class ExpectedState:
+    """What the globals and rooms should hold, from the steps that confirmed"""
+
+    def __init__(self, globals_, rooms):
+        self.commission_pool = globals_.get("COMMISSION_POOL", 0)
+        self.liquidity_pool = globals_.get("LIQUIDITY_POOL", 0)
+        self.rooms = {room_id: dict(room) for room_id, room in rooms.items()}
+
+    def room(self, room_id):
+        return self.rooms.setdefault(room_id, {"pot": 0, "players": 0, "commission": 0})
+
+    def staked(self, room_id, amount):
+        room = self.room(room_id)
+        room["pot"] += amount
+        room["players"] += 1
+
+    def settled(self, room_id, stake, won):
+        room = self.room(room_id)
+        room["pot"] -= stake
+        room["players"] -= 1
+        if not won:
+            room["commission"] += stake * COMMISSION_RATE.value // 1_000_000
+
+    def closed(self, room_id):
+        self.commission_pool += self.rooms.pop(room_id)["commission"]
+
+
+class Player:
+    """One account's place in the scenario"""
+
+    def __init__(self, index, address, private_key, room_id, wins):
+        self.index = index
+        self.address = address
+        self.private_key = private_key
+        self.room_id = room_id
+        self.wins = wins
+        self.opted_in = False
+        self.stake = 0
+        self.reward_stake = 0
+
+
+class ScenarioReport:
+    """Step statistics and final-state assertions of one run"""
+
+    def __init__(self, steps):
+        self.steps = {name: StepStats(name) for name in steps}
+        self.assertions = []  # (name, expected, actual)
+        self.rounds = 0
+        self.elapsed = 0.0
+
+    def check(self, name, expected, actual):
+        self.assertions.append((name, expected, actual))
+
+    @property
+    def failed_assertions(self):
+        return [a for a in self.assertions if a[1] != a[2]]
+
+    @property
+    def passed(self):
+        return not self.failed_assertions and not any(s.failed for s in self.steps.values())
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+class ScenarioRunner:
+    """Runs a scenario for a set of funded player accounts"""
+
+    def __init__(self, algod_client, app_id, oracle_key, players, scenario=None, host_key=None):
+        self.algod_client = algod_client
+        self.app_id = app_id
+        self.client = EnhancedGameClient(app_id)
+        self.oracle_key = oracle_key
+        self.oracle = account.address_from_private_key(oracle_key)
+        self.host_key = host_key or oracle_key
+        self.host = account.address_from_private_key(self.host_key)
+        self.scenario = load_scenario(scenario)
+
+        rng = random.Random(self.scenario["seed"])
+        per_room = self.scenario["players_per_room"]
+        self.players = [
+            Player(index, address, key, self.scenario["room_id"] + index // per_room,
+                   rng.random() < self.scenario["win_rate"])
+            for index, (address, key) in enumerate(players)
+        ]
+        self.room_ids = sorted({p.room_id for p in self.players}) or [self.scenario["room_id"]]
+        self.report = ScenarioReport(
+            self.scenario["setup"] + self.scenario["steps"] + self.scenario["teardown"])
+
+        self.watcher = RoundWatcher(algod_client)
+        self.preflight = preflight_for(algod_client)
+        self.semaphore = None
+        self._sp_lock = None
+        self.expected = None
+        self._sp = None
+        self._sp_round = None
+
+    # -- chain access ---------------------------------------------------------
+
+    async def _params(self):
+        """Suggested params, fetched once per round"""
+        async with self._sp_lock:
+            if self._sp_round != self.watcher.round:
+                self._sp = await asyncio.to_thread(self.algod_client.suggested_params)
+                self._sp_round = self.watcher.round
+        return self._sp
+
+    async def _submit(self, stats, group, private_key):
+        """Sign, send and confirm one group, timing it into stats"""
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                signed = [txn.sign(private_key) for txn in group]
+                result = await asyncio.to_thread(self.preflight.check, signed)
+                if not result.ok:
+                    stats.fail(result.reason())
+                    return None
+                txid = await asyncio.to_thread(self.algod_client.send_transactions, signed)
+                info = await self.watcher.wait_confirmed(txid, self.scenario["wait_rounds"])
+            except Exception as e:
+                stats.fail(e)
+                return None
+            stats.record(time.perf_counter() - started, sum(txn.fee for txn in group))
+            return info
+
+    async def read_state(self):
+        """(decoded globals, {room id: room fields}) as the chain has them now"""
+        globals_ = await asyncio.to_thread(self.client.global_state, self.algod_client)
+        rooms = {}
+        for room_id in self.room_ids:
+            try:
+                box = await asyncio.to_thread(
+                    self.algod_client.application_box_by_name, self.app_id, room_box_name(room_id))
+            except Exception:
+                continue  # Not created yet, or already closed
+            rooms[room_id] = decode_room(base64.b64decode(box["value"]))
+        return globals_, rooms
+
+    # -- steps ----------------------------------------------------------------
+
+    async def step_opt_in(self, stats, player):
+        sp = await self._params()
+        if await self._submit(stats, self.client.opt_in(sp, player.address), player.private_key) is None:
+            return False
+        player.opted_in = True
+        return True
+
+    async def step_stake(self, stats, player, amount=None):
+        """Stake into the player's room, opting in on the same call if needed"""
+        sp = await self._params()
+        amount = amount or self.scenario["stake"]
+        group = self.client.stake_game(sp, player.address, amount, player.room_id, opt_in=not player.opted_in)
+        if await self._submit(stats, group, player.private_key) is None:
+            return False
+        player.opted_in = True
+        player.stake = amount
+        self.expected.staked(player.room_id, amount)
+        return True
+
+    async def step_settle(self, stats, player):
+        """Oracle reports the player's (pre-drawn) result"""
+        sp = await self._params()
+        seed = player.index.to_bytes(8, "big")
+        group = self.client.process_result(
+            sp, self.oracle, int(player.wins), seed, player.address, player.room_id)
+        if await self._submit(stats, group, self.oracle_key) is None:
+            return False
+        self.expected.settled(player.room_id, player.stake, player.wins)
+        player.stake = 0
+        return True
+
+    async def step_stake_rewards(self, stats, player):
+        sp = await self._params()
+        amount = self.scenario["reward_stake"]
+        group = self.client.stake_rewards(sp, player.address, amount)
+        if await self._submit(stats, group, player.private_key) is None:
+            return False
+        player.reward_stake += amount
+        self.expected.liquidity_pool += amount
+        return True
+
+    async def step_claim(self, stats, player):
+        sp = await self._params()
+        info = await self._submit(stats, self.client.claim_rewards(sp, player.address), player.private_key)
+        if info is None:
+            return False
+        for name, fields in decode_logs(info.get("logs", [])):
+            if name == "CLAIM_REWARDS":
+                self.expected.liquidity_pool -= fields["amount"]
+        return True
+
+    async def step_unstake(self, stats, player):
+        sp = await self._params()
+        amount = player.reward_stake
+        group = self.client.unstake(sp, player.address, amount)
+        if await self._submit(stats, group, player.private_key) is None:
+            return False
+        player.reward_stake = 0
+        self.expected.liquidity_pool -= amount
+        return True
+
+    async def step_create_room(self, stats, room_id):
+        sp = await self._params()
+        group = self.client.create_room(sp, self.host, room_box_min_balance(), room_id)
+        if await self._submit(stats, group, self.host_key) is None:
+            return False
+        self.expected.room(room_id)
+        return True
+
+    async def step_close_room(self, stats, room_id):
+        sp = await self._params()
+        if await self._submit(stats, self.client.close_room(sp, self.host, room_id), self.host_key) is None:
+            return False
+        self.expected.closed(room_id)
+        return True
+
+    async def step_fund_rewards(self, stats):
+        """Host stakes into the rewards pool so claims are not paid from players' stakes"""
+        sp = await self._params()
+        info = await asyncio.to_thread(self.algod_client.account_info, self.host)
+        if not any(app["id"] == self.app_id for app in info.get("apps-local-state", [])):
+            if await self._submit(stats, self.client.opt_in(sp, self.host), self.host_key) is None:
+                return False
+        amount = self.scenario["reward_funding"]
+        if await self._submit(stats, self.client.stake_rewards(sp, self.host, amount), self.host_key) is None:
+            return False
+        self.expected.liquidity_pool += amount
+        return True
+
+    # -- flow -----------------------------------------------------------------
+
+    async def _host_steps(self, steps):
+        for step in steps:
+            stats = self.report.steps[step]
+            handler = getattr(self, f"step_{step}")
+            if step in ROOM_STEPS:
+                await asyncio.gather(*(handler(stats, room_id) for room_id in self.room_ids))
+            else:
+                await handler(stats)
+
+    async def _player_flow(self, player):
+        """Walk one player through the steps; stop at its first failure"""
+        for step in self.scenario["steps"]:
+            if not await getattr(self, f"step_{step}")(self.report.steps[step], player):
+                return False
+        return True
+
+    async def _assert_rooms(self):
+        """Room pots hold the game stakes (there is no TOTAL_STAKED global)"""
+        _, rooms = await self.read_state()
+        for room_id, room in rooms.items():
+            wanted = self.expected.room(room_id)
+            for field in ("pot", "players", "commission"):
+                self.report.check(f"room {room_id} {field}", wanted[field], room[field])
+
+    async def _assert_globals(self):
+        globals_, _ = await self.read_state()
+        self.report.check("COMMISSION_POOL", self.expected.commission_pool, globals_.get("COMMISSION_POOL"))
+        self.report.check("LIQUIDITY_POOL", self.expected.liquidity_pool, globals_.get("LIQUIDITY_POOL"))
+
+    async def run_async(self):
+        started = time.perf_counter()
+        self.semaphore = asyncio.Semaphore(self.scenario["concurrency"])
+        self._sp_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        # Every in-flight group holds a thread while it waits on algod
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.scenario["concurrency"] + 4))
+
+        await self.watcher.start()
+        globals_, rooms = await self.read_state()
+        self.expected = ExpectedState(globals_, rooms)
+
+        await self._host_steps(self.scenario["setup"])
+        await asyncio.gather(*(self._player_flow(player) for player in self.players))
+        await self._assert_rooms()
+        await self._host_steps(self.scenario["teardown"])
+        await self._assert_globals()
+
+        self.report.rounds = self.watcher.rounds_seen
+        self.report.elapsed = time.perf_counter() - started
+        return self.report
+
+    def run(self):
+        """Run the scenario to completion; returns the ScenarioReport"""
+        return asyncio.run(self.run_async())
+
+
+def print_report(report):
+    """Per-step latency histograms and the final-state assertions"""
+    print(f"📊 Scenario finished in {report.elapsed:.2f}s over {report.rounds} round(s)")
+    for name, stats in report.steps.items():
+        summary = stats.summary()
+        print(f"\n🔹 {name}: {summary['count']} ok, {summary['failed']} failed "
+              f"(p50 {summary['p50']}s, p95 {summary['p95']}s, p99 {summary['p99']}s)")
+        peak = max((count for _, count in stats.histogram()), default=0)
+        for bound, count in stats.histogram():
+            if count:
+                label = f"<= {bound}s" if bound is not None else f"> {LATENCY_BUCKETS[-1]}s"
+                print(f"   {label:>10} {'█' * max(1, count * 30 // peak)} {count}")
+        for message, count in stats.failures.items():
+            print(f"   ❌ {count}x {message}")
+
+    print("\n🔍 Final state:")
+    for name, expected, actual in report.assertions:
+        mark = "✅" if expected == actual else "❌"
+        print(f"   {mark} {name}: expected {expected}, got {actual}")
+    print("\n✅ Scenario passed" if report.passed else "\n❌ Scenario failed")
+
+
+def run_local(scenario=None, player_count=200, funding=20_000_000):
+    """Deploy the enhanced contract on a local stand-in and run a scenario there"""
+    from local_network import LocalAlgodClient, deploy_game
+
+    algod_client = LocalAlgodClient()
+    admin_key, admin = account.generate_account()
+    algod_client.fund(admin, 1_000_000_000)
+    app_id = deploy_game(algod_client, admin_key, funding=100_000_000)
+
+    players = []
+    for _ in range(player_count):
+        key, address = account.generate_account()
+        algod_client.fund(address, funding)
+        players.append((address, key))
+    return ScenarioRunner(algod_client, app_id, admin_key, players, scenario).run()
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    args = sys.argv[1:]
+    scenario = args.pop(0) if args and not args[0].isdigit() else None
+    count = int(args[0]) if args else 200
+    print(f"🎮 Running scenario for {count} players on a local network...")
+    try:
+        report = run_local(scenario, count)
+        print_report(report)
+        sys.exit(0 if report.passed else 1)
+    except Exception as e:
+        print(f"❌ Scenario error: {e}")
+        sys.exit(1)
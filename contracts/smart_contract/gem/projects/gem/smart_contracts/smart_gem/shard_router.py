@@ -0,0 +1,164 @@
+"""
+Shard Router
+Maps players onto game shards deployed by game_factory.py and aggregates their stats
+
+A player is routed by rendezvous hashing of their address over the shard app
+ids: every player stays on one shard, and adding a shard only moves the
+players that now hash highest to it.
+"""
+
+import base64
+
+from algosdk import encoding, transaction
+
+import box_layout
+from fee_pooling import FeePooler
+from game_factory import MAX_SHARDS, SHARD_ID_BYTES, GameFactoryContract
+from status_word import decode_global_state
+
+PROGRAM_CHUNK = 2000  # Program bytes per load_program call (app args cap 2048)
+BOX_REF_QUOTA = 1024  # Box bytes each box reference lets a transaction touch
+
+
+def _address_bytes(address):
+    if isinstance(address, (bytes, bytearray)):
+        return bytes(address)
+    return encoding.decode_address(address)
+
+
+def box_refs(name, size, app_id=0):
+    """Enough references to name for a transaction to read/write size bytes"""
+    return [(app_id, name)] * max(1, -(-size // BOX_REF_QUOTA))
+
+
+def registry_app_ids(registry, count):
+    """App ids from a factory "shards" box value"""
+    return [
+        int.from_bytes(registry[i * SHARD_ID_BYTES:(i + 1) * SHARD_ID_BYTES], "big")
+        for i in range(count)
+    ]
+
+
+class ShardRouter:
+    """Routes players and their transactions to one of N game apps"""
+
+    def __init__(self, app_ids):
+        if not app_ids:
+            raise ValueError("ShardRouter needs at least one shard")
+        self.app_ids = list(app_ids)
+
+    @classmethod
+    def from_factory(cls, algod_client, factory_app_id):
+        """Load the shard list from a factory's registry box"""
+        info = algod_client.application_info(factory_app_id)
+        state = decode_global_state(info["params"].get("global-state", []))
+        box = algod_client.application_box_by_name(factory_app_id, b"shards")
+        return cls(registry_app_ids(base64.b64decode(box["value"]), state.get("SHARD_COUNT", 0)))
+
+    def _score(self, address, app_id):
+        return encoding.checksum(address + app_id.to_bytes(8, "big"))
+
+    def app_for(self, player):
+        """Shard app id for a player address"""
+        address = _address_bytes(player)
+        return max(self.app_ids, key=lambda app_id: self._score(address, app_id))
+
+    def app_address_for(self, player):
+        """Shard app account a player pays stakes into"""
+        return encoding.encode_address(encoding.checksum(b"appID" + self.app_for(player).to_bytes(8, "big")))
+
+    def partition(self, players):
+        """{app id: [players]} for a batch of players"""
+        shards = {app_id: [] for app_id in self.app_ids}
+        for player in players:
+            shards[self.app_for(player)].append(player)
+        return shards
+
+    def app_call(self, sp, player, args, sender=None, **kwargs):
+        """NoOp call on the player's shard (sender defaults to the player)"""
+        return transaction.ApplicationNoOpTxn(
+            sender=sender or player, sp=sp, index=self.app_for(player),
+            app_args=args, **kwargs
+        )
+
+    def shard_stats(self, algod_client, app_id):
+        """Global counters and room totals of one shard"""
+        info = algod_client.application_info(app_id)
+        state = decode_global_state(info["params"].get("global-state", []))
+        stats = {
+            "commission_pool": state.get("COMMISSION_POOL", 0),
+            "liquidity_pool": state.get("LIQUIDITY_POOL", 0),
+            "rooms": 0,
+            "pot": 0,
+            "players": 0,
+            "rounds": 0,
+        }
+        for entry in algod_client.application_boxes(app_id).get("boxes", []):
+            name = base64.b64decode(entry["name"])
+            if not name.startswith(box_layout.ROOM_BOX_PREFIX):
+                continue
+            box = algod_client.application_box_by_name(app_id, name)
+            room = box_layout.decode_room(base64.b64decode(box["value"]))
+            stats["rooms"] += 1
+            stats["pot"] += room["pot"]
+            stats["players"] += room["players"]
+            stats["rounds"] += room["round"]
+            stats["commission_pool"] += room["commission"]
+        return stats
+
+    def aggregate_stats(self, algod_client):
+        """Per-shard stats plus totals across all shards"""
+        per_shard = {app_id: self.shard_stats(algod_client, app_id) for app_id in self.app_ids}
+        totals = {}
+        for stats in per_shard.values():
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return {"shards": len(self.app_ids), "per_shard": per_shard, "totals": totals}
+
+
+def _send(algod_client, txn, private_key):
+    txid = algod_client.send_transaction(txn.sign(private_key))
+    return transaction.wait_for_confirmation(algod_client, txid, 4)
+
+
+def deploy_shards(algod_client, factory_app_id, address, private_key, approval, clear, count):
+    """Upload shard programs to the factory and deploy/bootstrap count shards"""
+    try:
+        pooler = FeePooler(GameFactoryContract().compile()[0])
+
+        for name, program in ((b"approval", approval), (b"clear", clear)):
+            print(f"📤 Uploading {name.decode()} program ({len(program)} bytes)...")
+            for offset in range(0, len(program), PROGRAM_CHUNK):
+                sp = algod_client.suggested_params()
+                _send(algod_client, transaction.ApplicationNoOpTxn(
+                    address, sp, factory_app_id,
+                    app_args=[b"load_program", name, len(program), offset,
+                              program[offset:offset + PROGRAM_CHUNK]],
+                    boxes=box_refs(name, len(program)),
+                ), private_key)
+
+        app_ids = []
+        for _ in range(count):
+            sp = algod_client.suggested_params()
+            result = _send(algod_client, pooler.call(
+                sp, address, factory_app_id, "deploy_shard",
+                boxes=(box_refs(b"approval", len(approval)) + box_refs(b"clear", len(clear))
+                       + box_refs(b"shards", MAX_SHARDS * SHARD_ID_BYTES)),
+            ), private_key)
+            app_id = result["inner-txns"][0]["application-index"]
+            # SHARD_DEPLOYED log: registry index, then app id
+            index = int.from_bytes(base64.b64decode(result["logs"][0])[14:22], "big")
+            app_ids.append(app_id)
+            print(f"✅ Shard deployed: {app_id}")
+
+            # The shard is only known now, so its admin box can be referenced
+            _send(algod_client, pooler.call(
+                sp, address, factory_app_id, "bootstrap_shard", [index],
+                foreign_apps=[app_id],
+                boxes=[(0, b"shards"), box_layout.admin_box_ref(address, app_id)],
+            ), private_key)
+        return ShardRouter(app_ids)
+
+    except Exception as e:
+        print(f"❌ Shard deployment failed: {e}")
+        return None
@@ -8,6 +8,8 @@ import base64
 from algosdk import account, mnemonic, encoding
 from algosdk.v2client import algod
 
+from status_word import decode_global_state
+
 def check_contract_status():
     """Check your contract status"""
     
@@ -58,18 +60,10 @@ def check_contract_status():
         print(f"\n📊 Contract State Analysis:")
         print("=" * 30)
         
-        # Parse state
-        state_dict = {}
-        for state in global_state:
-            key = base64.b64decode(state['key']).decode('utf-8')
-            if state['value']['type'] == 2:  # uint
-                value = state['value']['uint']
-                state_dict[key] = value
-                print(f"   {key}: {value}")
-            else:  # bytes
-                value = state['value']['bytes']
-                state_dict[key] = value
-                print(f"   {key}: {value}")
+        # Parse state (a packed STATUS word is unpacked into its fields)
+        state_dict = decode_global_state(global_state)
+        for key, value in state_dict.items():
+            print(f"   {key}: {value}")
         
         # Analyze state
         print(f"\n🎮 Game Status:")
@@ -137,7 +131,7 @@ def check_contract_status():
         if game_state == 1 and total_staked > 0:
             print(f"   🎮 Game is active with stakes")
             print(f"   💡 You can test win/lose functions")
-            print(f"   ⚠️  Note: There's a bug in the win function (fee issue)")
+            print(f"   ⚠️  Note: win/lose pay out by inner payment; build them with fee_pooling.FeePooler")
         
         if game_state == 0:
             print(f"   🎮 Game is idle")
@@ -0,0 +1,71 @@
+"""
+Stake Groups
+Builds the [payment, app call] groups players stake into the enhanced contract with
+
+A player who has not opted in yet gets the opt-in and the stake in one
+atomic group: the app call carries OnComplete.OptIn with the stake_game
+arguments, so the contract initializes the player record and takes the
+stake in the same evaluation instead of needing a separate opt-in round.
+"""
+
+from algosdk import account, encoding, transaction
+
+import box_layout
+
+
+def app_address(app_id):
+    """Address of an application account"""
+    return encoding.encode_address(encoding.checksum(b"appID" + app_id.to_bytes(8, "big")))
+
+
+def needs_opt_in(algod_client, address, app_id):
+    """True if address has no local state in app_id yet"""
+    info = algod_client.account_info(address)
+    return all(app["id"] != app_id for app in info.get("apps-local-state", []))
+
+
+def stake_group(sp, player, app_id, amount, room_id, opt_in=False):
+    """Unsigned [payment, stake_game call] group; opt_in folds the OptIn into the call"""
+    payment = transaction.PaymentTxn(
+        sender=player,
+        sp=sp,
+        receiver=app_address(app_id),
+        amt=amount
+    )
+    app_call = transaction.ApplicationCallTxn(
+        sender=player,
+        sp=sp,
+        index=app_id,
+        on_complete=transaction.OnComplete.OptInOC if opt_in else transaction.OnComplete.NoOpOC,
+        app_args=[b"stake_game", room_id],
+        boxes=[box_layout.room_box_ref(room_id), box_layout.seat_box_ref(player)]
+    )
+    return transaction.assign_group_id([payment, app_call])
+
+
+def first_game_group(algod_client, player, app_id, amount, room_id):
+    """Stake group for player, opting in within the same group when needed"""
+    sp = algod_client.suggested_params()
+    opt_in = needs_opt_in(algod_client, player, app_id)
+    return stake_group(sp, player, app_id, amount, room_id, opt_in=opt_in)
+
+
+def send_stake(algod_client, private_key, app_id, amount, room_id):
+    """Sign and send a player's stake (with opt-in if needed) and wait for it"""
+    try:
+        player = account.address_from_private_key(private_key)
+
+        group = first_game_group(algod_client, player, app_id, amount, room_id)
+        if group[1].on_complete == transaction.OnComplete.OptInOC:
+            print("📝 Opting in and staking in one group...")
+        else:
+            print("📝 Sending stake...")
+
+        txid = algod_client.send_transactions([txn.sign(private_key) for txn in group])
+        transaction.wait_for_confirmation(algod_client, txid, 4)
+        print(f"✅ Staked {amount} microALGO in room {room_id}: {txid}")
+        return txid
+
+    except Exception as e:
+        print(f"❌ Stake failed: {e}")
+        return None
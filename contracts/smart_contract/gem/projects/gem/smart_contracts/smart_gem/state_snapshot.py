@@ -0,0 +1,274 @@
+"""
+State Snapshot
+Copies the app's full on-chain state into one file for offline what-if runs
+
+A snapshot holds the app's global state, every box, its balance, and the
+local state and balance of every opted-in account and every admin, all
+read at one round. Opted-in accounts are listed through the indexer (or
+given explicitly) and then read from algod; if the round moves while the
+reads are in flight, the snapshot is taken again. The file is
+zlib-compressed msgpack, like a trace, and loads straight into a
+LedgerState.
+
+DryRun runs admin actions against that ledger with no network calls:
+update_config, withdraw_commission, or a mass refund where every player
+still holding a stake closes out. Each run reports whether it was
+accepted, the cost, what moved, and the global changes, then puts the
+snapshot state back for the next one.
+
+Run `python state_snapshot.py take [file]` or
+`python state_snapshot.py dry-run <file> update_config <min> <max> | withdraw_commission | mass_refund`.
+"""
+
+import base64
+import json
+import sys
+
+from algosdk import transaction
+from algosdk.v2client import algod, indexer
+
+from block_follower import fetch_block
+from box_layout import ADMIN_BOX_PREFIX, room_box_name, seat_box_name
+from local_evaluator import (
+    LedgerState,
+    address_bytes,
+    address_string,
+    application_address,
+    evaluate_group,
+    txn_from_algosdk,
+)
+from trace_recorder import ALGOD_ADDRESS, decode_key_values, read_packed, schema_counts, write_packed
+
+SNAPSHOT_MAGIC = b"CHSNAP01"
+SNAPSHOT_VERSION = 1
+INDEXER_ADDRESS = "https://testnet-idx.algonode.cloud"
+DEFAULT_SNAPSHOT = "snapshot.bin"
+PAGE_SIZE = 1000
+
+
+# ============================================================================
+# TAKING SNAPSHOTS
+# ============================================================================
+
+def opted_in_accounts(indexer_client, app_id):
+    """Every address opted in to app_id, following the indexer's pages"""
+    addresses, token = [], None
+    while True:
+        response = indexer_client.accounts(limit=PAGE_SIZE, next_page=token, application_id=app_id)
+        addresses += [entry["address"] for entry in response.get("accounts", [])]
+        token = response.get("next-token")
+        if not token:
+            return addresses
+
+
+def _read_state(algod_client, app_id, addresses):
+    params = algod_client.application_info(app_id)["params"]
+    app_info = algod_client.account_info(address_string(application_address(app_id)))
+    boxes = {}
+    for box in algod_client.application_boxes(app_id)["boxes"]:
+        name = base64.b64decode(box["name"])
+        boxes[name] = base64.b64decode(algod_client.application_box_by_name(app_id, name)["value"])
+    # Admins (and the creator) sign the dry-run actions, so their balances are needed too
+    admins = [address_string(name[len(ADMIN_BOX_PREFIX):]) for name in boxes if name.startswith(ADMIN_BOX_PREFIX)]
+    locals_, balances = {}, {}
+    for address in dict.fromkeys(list(addresses) + admins + [params["creator"]]):
+        info = algod_client.account_info(address)
+        balances[address_bytes(address)] = info.get("amount", 0)
+        for app in info.get("apps-local-state", []):
+            if app["id"] == app_id:
+                locals_[address_bytes(address)] = decode_key_values(app.get("key-value", []))
+    return {
+        "creator": address_bytes(params["creator"]),
+        "global_schema": schema_counts(params.get("global-state-schema")),
+        "local_schema": schema_counts(params.get("local-state-schema")),
+        "globals": decode_key_values(params.get("global-state", [])),
+        "boxes": boxes,
+        "app_balance": app_info.get("amount", 0),
+        "locals": locals_,
+        "balances": balances,
+    }
+
+
+def take_snapshot(algod_client, app_id, indexer_client=None, accounts=None, attempts=3):
+    """Snapshot of app_id; accounts defaults to everyone the indexer lists as opted in"""
+    if accounts is None:
+        accounts = opted_in_accounts(indexer_client, app_id)
+    for _ in range(attempts):
+        round_num = algod_client.status()["last-round"]
+        state = _read_state(algod_client, app_id, accounts)
+        consistent = algod_client.status()["last-round"] == round_num
+        if consistent:
+            break
+    snapshot = {
+        "format": "chronicle-snapshot",
+        "version": SNAPSHOT_VERSION,
+        "app_id": app_id,
+        "round": round_num,
+        "timestamp": fetch_block(algod_client, round_num)["ts"],
+        "consistent": consistent,  # False when every attempt straddled a new round
+    }
+    snapshot.update(state)
+    return snapshot
+
+
+# ============================================================================
+# FILES AND LOADING
+# ============================================================================
+
+def write_snapshot(path, snapshot):
+    """Write a snapshot; returns its size in bytes"""
+    return write_packed(path, SNAPSHOT_MAGIC, snapshot)
+
+
+def read_snapshot(path):
+    return read_packed(path, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, "snapshot")
+
+
+def load_ledger(snapshot, programs=None):
+    """LedgerState holding the snapshot, with the app running the given (or current) TEAL"""
+    if programs is None:
+        from enhanced_contract import EnhancedGameContract
+        programs = EnhancedGameContract().compile()
+    app_id = snapshot["app_id"]
+    ledger = LedgerState(round=snapshot["round"], timestamp=snapshot["timestamp"])
+    ledger.install_app(
+        snapshot["creator"], programs[0], programs[1], app_id=app_id,
+        global_schema=tuple(snapshot["global_schema"]) if snapshot.get("global_schema") else None,
+        local_schema=tuple(snapshot["local_schema"]) if snapshot.get("local_schema") else None,
+    )
+    ledger.globals[app_id] = dict(snapshot["globals"])
+    ledger.boxes[app_id] = dict(snapshot["boxes"])
+    ledger.locals = {(address, app_id): dict(state) for address, state in snapshot["locals"].items()}
+    ledger.balances = dict(snapshot["balances"])
+    ledger.balances[application_address(app_id)] = snapshot["app_balance"]
+    return ledger
+
+
+# ============================================================================
+# DRY RUNS
+# ============================================================================
+
+class DryRun:
+    """Admin actions against a snapshot, each starting from the snapshot state"""
+
+    def __init__(self, snapshot, programs=None):
+        from enhanced_contract import EnhancedGameContract
+        from enhanced_contract_client import EnhancedGameClient
+
+        self.snapshot = snapshot
+        self.app_id = snapshot["app_id"]
+        self.app_address = application_address(self.app_id)
+        self.client = EnhancedGameClient(self.app_id)
+        self.programs = programs or EnhancedGameContract().compile()
+        first = snapshot["round"] + 1
+        self.sp = transaction.SuggestedParams(1000, first, first + 1000, "A" * 43 + "=",
+                                              "snapshot", flat_fee=True, min_fee=1000)
+        self.ledger = load_ledger(snapshot, programs)
+
+    @property
+    def admins(self):
+        """Admin addresses, from their admin boxes"""
+        return [address_string(name[len(ADMIN_BOX_PREFIX):]) for name in self.snapshot["boxes"]
+                if name.startswith(ADMIN_BOX_PREFIX)]
+
+    def reset(self):
+        self.ledger = load_ledger(self.snapshot, self.programs)
+
+    def _run(self, action, groups):
+        """Evaluate groups in order on the snapshot ledger, then restore it"""
+        app_before = self.ledger.balances.get(self.app_address, 0)
+        globals_before = self.ledger.global_state(self.app_id)
+        report = {"action": action, "groups": len(groups), "accepted": 0, "errors": [], "cost": 0, "payouts": {}}
+        for group in groups:
+            payouts_before = {txn["Sender"]: self.ledger.balances.get(txn["Sender"], 0) for txn in group}
+            result = evaluate_group(self.ledger, group)
+            report["cost"] += result.cost
+            if not result.ok:
+                report["errors"].append(result.error)
+                continue
+            report["accepted"] += 1
+            for address, before in payouts_before.items():
+                change = self.ledger.balances.get(address, 0) - before
+                if change:
+                    report["payouts"][address_string(address)] = change
+        after = self.ledger.global_state(self.app_id)
+        report["app_balance"] = (app_before, self.ledger.balances.get(self.app_address, 0))
+        report["global_changes"] = {key.decode(errors="replace"): (globals_before.get(key), after.get(key))
+                                    for key in set(globals_before) | set(after)
+                                    if globals_before.get(key) != after.get(key)}
+        report["ok"] = not report["errors"]
+        self.reset()
+        return report
+
+    def _group(self, txns):
+        return [txn_from_algosdk(txn) for txn in txns]
+
+    def update_config(self, min_stake, max_stake, admin=None):
+        admin = admin or self.admins[0]
+        return self._run("update_config", [self._group(self.client.update_config(self.sp, admin, min_stake, max_stake))])
+
+    def withdraw_commission(self, admin=None):
+        admin = admin or self.admins[0]
+        return self._run("withdraw_commission", [self._group(self.client.withdraw_commission(self.sp, admin))])
+
+    def mass_refund(self):
+        """Every player with an unsettled stake closes out, which refunds it"""
+        groups = []
+        for address, state in self.snapshot["locals"].items():
+            if state.get(b"PLAYER_STAKE", 0) > 0:
+                closeout = transaction.ApplicationCloseOutTxn(
+                    address_string(address), self.sp, self.app_id,
+                    boxes=[(0, room_box_name(state.get(b"PLAYER_ROOM", 0))), (0, seat_box_name(address))])
+                closeout.fee = 2 * self.sp.min_fee  # Covers the refund payment
+                groups.append(self._group([closeout]))
+        return self._run("mass_refund", groups)
+
+
+def print_dry_run(report):
+    icon = "✅" if report["ok"] else "❌"
+    print(f"{icon} {report['action']}: {report['accepted']}/{report['groups']} group(s) accepted, cost {report['cost']}")
+    before, after = report["app_balance"]
+    print(f"   🏦 App balance {before} -> {after} ({after - before:+})")
+    paid = sum(change for change in report["payouts"].values() if change > 0)
+    if paid:
+        print(f"   💸 {paid} microAlgos paid out to {len(report['payouts'])} account(s)")
+    for key, (old, new) in sorted(report["global_changes"].items()):
+        print(f"   {key}: {old} -> {new}")
+    for error in report["errors"][:3]:
+        print(f"   ❌ {error}")
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    args = sys.argv[1:]
+    try:
+        if args[:1] == ["take"]:
+            with open("application_info.json") as f:
+                app_id = json.load(f)["application_id"]
+            path = args[1] if len(args) > 1 else DEFAULT_SNAPSHOT
+            snapshot = take_snapshot(algod.AlgodClient("", ALGOD_ADDRESS), app_id,
+                                     indexer.IndexerClient("", INDEXER_ADDRESS))
+            size = write_snapshot(path, snapshot)
+            print(f"📸 App {app_id} at round {snapshot['round']}: {len(snapshot['locals'])} account(s), "
+                  f"{len(snapshot['boxes'])} box(es) -> {path} ({size} bytes)")
+            if not snapshot["consistent"]:
+                print("⚠️  The round moved during every attempt; the snapshot may mix two rounds")
+        elif args[:1] == ["dry-run"] and len(args) >= 3:
+            run = DryRun(read_snapshot(args[1]))
+            if args[2] == "update_config":
+                print_dry_run(run.update_config(int(args[3]), int(args[4])))
+            elif args[2] == "withdraw_commission":
+                print_dry_run(run.withdraw_commission())
+            elif args[2] == "mass_refund":
+                print_dry_run(run.mass_refund())
+            else:
+                raise ValueError(f"unknown action {args[2]}")
+        else:
+            print("Usage: python state_snapshot.py take [file]\n"
+                  "       python state_snapshot.py dry-run <file> "
+                  "update_config <min> <max> | withdraw_commission | mass_refund")
+    except Exception as e:
+        print(f"❌ Snapshot failed: {e}")
+        sys.exit(1)
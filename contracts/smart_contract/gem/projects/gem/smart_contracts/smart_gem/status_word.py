@@ -0,0 +1,78 @@
+"""
+Packed Status Word
+Bit layout of the STATUS global and helpers to pack/unpack it off-chain
+
+The enhanced contract keeps its pause flag, emergency flag and game state in
+one uint64 so guards need a single app_global_get:
+
+    bit  0      paused
+    bit  1      emergency stop
+    bits 8-15   game state (GAME_IDLE, GAME_PAUSED or GAME_EMERGENCY)
+
+Rounds and per-game states live in the room boxes, so the game state here is
+the contract-wide mode: Emergency once stopped, Paused while paused, else Idle.
+"""
+
+import base64
+
+STATUS_KEY = "STATUS"
+
+PAUSED_BIT = 1 << 0
+EMERGENCY_BIT = 1 << 1
+HALTED_MASK = PAUSED_BIT | EMERGENCY_BIT  # Either flag blocks player methods
+
+STATE_SHIFT = 8
+STATE_MASK = 0xFF << STATE_SHIFT
+
+GAME_STATE_NAMES = {
+    0: "Idle",
+    1: "Staked",
+    2: "Active",
+    3: "Completed",
+    4: "Paused",
+    5: "Emergency",
+}
+
+
+def pack_status(paused=0, emergency=0, game_state=0):
+    """Build a STATUS value from its fields"""
+    if not 0 <= game_state <= 0xFF:
+        raise ValueError(f"Game state out of range: {game_state}")
+    status = game_state << STATE_SHIFT
+    if paused:
+        status |= PAUSED_BIT
+    if emergency:
+        status |= EMERGENCY_BIT
+    return status
+
+
+def unpack_status(status):
+    """Split a STATUS value into the legacy global names"""
+    return {
+        "PAUSED": 1 if status & PAUSED_BIT else 0,
+        "EMERGENCY_STOP": 1 if status & EMERGENCY_BIT else 0,
+        "GAME_STATE": (status & STATE_MASK) >> STATE_SHIFT,
+    }
+
+
+def decode_global_state(global_state):
+    """algod 'global-state' list -> {key: value}, with STATUS unpacked"""
+    state = {}
+    for entry in global_state:
+        key = base64.b64decode(entry["key"]).decode("utf-8", errors="replace")
+        value = entry["value"]
+        if value["type"] == 2:  # uint
+            state[key] = value.get("uint", 0)
+        else:  # bytes
+            state[key] = value.get("bytes", "")
+    if STATUS_KEY in state:
+        state.update(unpack_status(state[STATUS_KEY]))
+    return state
+
+
+def describe_status(status):
+    """One-line human readable summary of a STATUS value"""
+    fields = unpack_status(status)
+    flags = [name for name in ("PAUSED", "EMERGENCY_STOP") if fields[name]]
+    state_name = GAME_STATE_NAMES.get(fields["GAME_STATE"], "Unknown")
+    return state_name + (f" [{', '.join(flags)}]" if flags else "")
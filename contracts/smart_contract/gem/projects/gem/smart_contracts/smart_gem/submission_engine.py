@@ -0,0 +1,314 @@
+"""
+Submission Engine
+Signs and submits a stream of transaction groups with a bounded number in flight
+
+Instead of build, sign, send, sleep for every group, the engine keeps up to
+`window` groups in the pool at once. It reads each new block once, like the
+block follower, and matches its transaction ids against the groups in
+flight instead of asking algod about every pending group each round; a
+group still missing once a block past its last valid round is out has
+expired. The window is topped back up as groups confirm. Only transient
+failures are retried: timeouts, dropped connections, 429/5xx responses
+and a full transaction pool. Retries are scheduled with a backoff and
+sent when due, while other groups keep going out. A group the network
+rejects is marked failed and never resent. A group algod already has
+(resent after a lost reply) is looked up rather than waited for, and so
+are the groups in flight when a block cannot be read.
+
+Groups are unsigned transactions, which the engine signs as it sends them,
+or signed msgpack bytes (say from parallel_signer.py), which it sends as
+they are.
+"""
+
+import base64
+import heapq
+import socket
+import time
+import urllib.error
+
+import msgpack
+from algosdk import constants, encoding
+from algosdk.error import AlgodHTTPError
+
+from block_follower import fetch_block
+from parallel_signer import send_signed
+
+DEFAULT_WINDOW = 16
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 0.5  # Seconds, doubled per attempt
+
+TRANSIENT_HTTP_CODES = (429, 500, 502, 503, 504)
+TRANSIENT_MESSAGES = ("pool is full", "timed out", "timeout")
+
+
+def is_transient(error):
+    """True for failures worth resending the same signed group for"""
+    if isinstance(error, (urllib.error.URLError, socket.timeout, ConnectionError, TimeoutError)):
+        return True
+    message = str(error).lower()
+    if isinstance(error, AlgodHTTPError) and error.code in TRANSIENT_HTTP_CODES:
+        return True
+    return any(text in message for text in TRANSIENT_MESSAGES)
+
+
+def _unsigned(txn):
+    return getattr(txn, "transaction", txn)
+
+
+def signed_fields(signed):
+    """Transaction fields (msgpack names) of signed msgpack bytes"""
+    return msgpack.unpackb(signed, raw=False)["txn"]
+
+
+def signed_txid(signed):
+    """Transaction id of signed msgpack bytes"""
+    txn_bytes = msgpack.packb(signed_fields(signed), use_bin_type=True)
+    return base64.b32encode(encoding.checksum(constants.txid_prefix + txn_bytes)).decode().rstrip("=")
+
+
+def decode_signed(signed):
+    """algosdk SignedTransaction from signed msgpack bytes"""
+    return encoding.msgpack_decode(base64.b64encode(signed).decode())
+
+
+class GroupTicket:
+    """One group's progress through the engine"""
+
+    def __init__(self, index, group):
+        self.index = index
+        self.group = group
+        self.raw = bool(group) and all(isinstance(txn, (bytes, bytearray)) for txn in group)
+        self.signed = group if self.raw else None
+        self.txid = None
+        self.status = "queued"  # queued, in_flight, confirmed, failed
+        self.error = None
+        self.attempts = 0
+        self.sent_at = None
+        self.confirmed_round = None
+        self.latency = None
+        self.retry_at = None
+
+    @property
+    def last_valid(self):
+        if self.raw:
+            return min(signed_fields(txn)["lv"] for txn in self.group)
+        return min(_unsigned(txn).last_valid_round for txn in self.group)
+
+    def first_txid(self):
+        if self.raw:
+            return signed_txid(self.signed[0])
+        return _unsigned(self.signed[0]).get_txid()
+
+    def __repr__(self):
+        return f"GroupTicket({self.index}, {self.status}, txid={self.txid})"
+
+
+class SubmissionStats:
+    """Throughput and outcome counters for one run"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.retries = 0
+        self.rounds = 0
+        self.started = time.time()
+        self.finished = None
+        self.latencies = []
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def groups_per_second(self):
+        return self.confirmed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        latency = sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+        return {
+            "submitted": self.submitted,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rounds": self.rounds,
+            "elapsed": round(self.elapsed, 3),
+            "groups_per_second": round(self.groups_per_second, 2),
+            "avg_latency": round(latency, 3),
+        }
+
+
+class SubmissionEngine:
+    """Pipelined submitter for prepared (unsigned) transaction groups"""
+
+    def __init__(self, algod_client, keys, window=DEFAULT_WINDOW, max_retries=DEFAULT_RETRIES, preflight=None):
+        self.algod_client = algod_client
+        self.keys = keys  # address -> private key, or a single private key
+        self.window = window
+        self.max_retries = max_retries
+        self.preflight = preflight  # Optional preflight.Preflight
+        self.stats = SubmissionStats()
+        self.seen = {}  # txid -> round, for the blocks read this run
+
+    def sign(self, group):
+        """Sign every transaction with its sender's key"""
+        if isinstance(self.keys, str):
+            return [txn.sign(self.keys) for txn in group]
+        return [txn.sign(self.keys[txn.sender]) for txn in group]
+
+    def _fail(self, ticket, error):
+        ticket.status = "failed"
+        ticket.error = str(error)
+        self.stats.failed += 1
+
+    def _send(self, ticket):
+        """Send a ticket's group; False if it must wait for a retry"""
+        if ticket.signed is None:
+            ticket.signed = self.sign(ticket.group)
+        if self.preflight is not None and not ticket.attempts:
+            result = self.preflight.check([decode_signed(txn) for txn in ticket.signed] if ticket.raw
+                                          else ticket.signed)
+            if not result.ok:
+                self._fail(ticket, result.reason())
+                return True
+
+        ticket.attempts += 1
+        try:
+            if ticket.raw:
+                ticket.txid = send_signed(self.algod_client, ticket.signed)
+            else:
+                ticket.txid = self.algod_client.send_transactions(ticket.signed)
+        except Exception as e:
+            if "already in ledger" in str(e):
+                ticket.txid = ticket.first_txid()
+                ticket.sent_at = ticket.sent_at or time.time()
+                self.stats.submitted += 1
+                self._look_up(ticket)
+                return True
+            elif is_transient(e) and ticket.attempts <= self.max_retries:
+                self.stats.retries += 1
+                ticket.retry_at = time.time() + RETRY_BACKOFF * 2 ** (ticket.attempts - 1)
+                return False
+            else:
+                self._fail(ticket, e)
+                return True
+
+        ticket.status = "in_flight"
+        ticket.sent_at = time.time()
+        self.stats.submitted += 1
+        return True
+
+    def _wait_for(self, round_num):
+        """Block until round_num is on chain (algod long-polls status_after_block)"""
+        if self.algod_client.status()["last-round"] < round_num:
+            self.algod_client.status_after_block(round_num - 1)
+
+    def _confirm(self, ticket, round_num):
+        ticket.status = "confirmed"
+        ticket.confirmed_round = round_num
+        ticket.latency = time.time() - ticket.sent_at
+        self.stats.confirmed += 1
+        self.stats.latencies.append(ticket.latency)
+
+    def _look_up(self, ticket):
+        """Settle a ticket algod may already have confirmed; in flight while it is still pending"""
+        if ticket.txid in self.seen:
+            return self._confirm(ticket, self.seen[ticket.txid])
+        try:
+            info = self.algod_client.pending_transaction_info(ticket.txid)
+        except Exception as e:
+            return self._fail(ticket, e)
+        if info.get("confirmed-round"):
+            self._confirm(ticket, info["confirmed-round"])
+        elif info.get("pool-error"):
+            self._fail(ticket, info["pool-error"])
+        else:
+            ticket.status = "in_flight"
+
+    def _follow(self, round_num, in_flight):
+        """Read block round_num and settle the in-flight tickets it decides; False if it could not be read"""
+        try:
+            self._wait_for(round_num)
+            block = fetch_block(self.algod_client, round_num)
+        except Exception as e:
+            if is_transient(e):
+                return False
+            # The block is lost to us: ask algod about each group instead, then carry on past it
+            for ticket in list(in_flight):
+                self._look_up(ticket)
+                if ticket.status != "in_flight":
+                    in_flight.remove(ticket)
+            return True
+        self.stats.rounds += 1
+        txids = {stxn.transaction.get_txid() for stxn, _ in block["txns"]}
+        self.seen.update(dict.fromkeys(txids, round_num))
+        for ticket in list(in_flight):
+            if ticket.txid in txids:
+                self._confirm(ticket, round_num)
+            elif round_num >= ticket.last_valid:
+                self._fail(ticket, f"expired after round {ticket.last_valid}")
+            else:
+                continue
+            in_flight.remove(ticket)
+        return True
+
+    def run(self, groups):
+        """Submit groups (any iterable); returns their tickets in input order"""
+        self.stats = SubmissionStats()
+        self.seen = {}
+        queue = (GroupTicket(index, list(group)) for index, group in enumerate(groups))
+        tickets = []
+        in_flight = []
+        retry = []  # Heap of (retry_at, index, ticket)
+        exhausted = False
+        next_round = self.algod_client.status()["last-round"] + 1
+
+        while True:
+            # Top up the window, due retries first
+            while len(in_flight) < self.window:
+                if retry and retry[0][0] <= time.time():
+                    ticket = heapq.heappop(retry)[2]
+                elif exhausted:
+                    break
+                else:
+                    ticket = next(queue, None)
+                    if ticket is None:
+                        exhausted = True
+                        break
+                    tickets.append(ticket)
+                if not self._send(ticket):
+                    heapq.heappush(retry, (ticket.retry_at, ticket.index, ticket))
+                elif ticket.status == "in_flight":
+                    in_flight.append(ticket)
+
+            if not in_flight and not retry and exhausted:
+                break
+
+            if in_flight:
+                if self._follow(next_round, in_flight):
+                    next_round += 1
+            elif len(in_flight) < self.window and retry:
+                # Nothing else to do until the next retry is due
+                time.sleep(max(0.0, retry[0][0] - time.time()))
+
+        self.stats.finished = time.time()
+        return tickets
+
+
+def submit_groups(algod_client, groups, keys, window=DEFAULT_WINDOW, preflight=None):
+    """Submit groups through a SubmissionEngine and print a summary"""
+    try:
+        engine = SubmissionEngine(algod_client, keys, window=window, preflight=preflight)
+        print(f"🚀 Submitting groups ({window} in flight)...")
+        tickets = engine.run(groups)
+        stats = engine.stats.summary()
+        print(f"✅ Confirmed {stats['confirmed']}/{len(tickets)} groups "
+              f"in {stats['elapsed']}s ({stats['groups_per_second']} groups/s)")
+        for ticket in tickets:
+            if ticket.status == "failed":
+                print(f"   ❌ Group {ticket.index}: {ticket.error}")
+        return tickets
+
+    except Exception as e:
+        print(f"❌ Submission failed: {e}")
+        return None
@@ -0,0 +1,157 @@
+"""
+TEAL Metrics
+Static size and cost estimates for compiled TEAL, without an algod node
+
+Sizes follow the assembler's layout: constants used more than once go into
+intcblock/bytecblock (most used first), single-use constants become
+pushint/pushbytes. Cost is the worst-case opcode budget over any path from
+the entry point, with loops counted once.
+"""
+
+from collections import Counter
+
+from local_evaluator import (
+    OPCODE_COSTS,
+    TERMINAL_OPS,
+    branch_targets,
+    parse_teal,
+)
+
+MAX_PROGRAM_SIZE = 2048  # Bytes per page before extra pages are needed
+
+# Opcodes whose immediates take a fixed number of bytes
+IMMEDIATE_BYTES = {
+    "b": 2, "bz": 2, "bnz": 2, "callsub": 2,
+    "txn": 1, "txna": 2, "gtxn": 2, "gtxna": 3, "gtxns": 1, "gtxnsa": 2,
+    "gtxnas": 2, "txnas": 1, "gtxnsas": 1,
+    "global": 1, "load": 1, "store": 1, "gload": 2, "gloads": 1,
+    "itxn_field": 1, "itxn": 1, "itxna": 2, "gitxn": 2, "gitxna": 3,
+    "substring": 2, "extract": 2, "replace2": 1,
+    "dig": 1, "bury": 1, "cover": 1, "uncover": 1, "popn": 1, "dupn": 1,
+    "frame_dig": 1, "frame_bury": 1, "proto": 2,
+    "asset_holding_get": 1, "asset_params_get": 1, "app_params_get": 1,
+    "acct_params_get": 1, "base64_decode": 1, "json_ref": 1,
+    "intc": 1, "bytec": 1, "arg": 1,
+}
+
+
+def _uvarint_size(value):
+    size = 1
+    while value >= 0x80:
+        value >>= 7
+        size += 1
+    return size
+
+
+def _constant_layout(values):
+    """Split constants into a constant block and single-use pushes"""
+    counts = Counter(values)
+    block = [value for value, count in counts.most_common() if count > 1]
+    return block, {value: index for index, value in enumerate(block)}
+
+
+def _const_size(value):
+    if isinstance(value, int):
+        return _uvarint_size(value)
+    return _uvarint_size(len(value)) + len(value)
+
+
+def estimate_program_size(teal):
+    """Estimated assembled size of a TEAL program in bytes"""
+    program = parse_teal(teal)
+    instructions = program.instructions
+    ints = [i.imm for i in instructions if i.op in ("int", "pushint")]
+    blobs = [i.imm for i in instructions if i.op in ("byte", "pushbytes", "addr", "method")]
+    int_block, int_index = _constant_layout(ints)
+    byte_block, byte_index = _constant_layout(blobs)
+
+    size = 1  # version byte
+    if int_block:
+        size += 1 + _uvarint_size(len(int_block)) + sum(_const_size(v) for v in int_block)
+    if byte_block:
+        size += 1 + _uvarint_size(len(byte_block)) + sum(_const_size(v) for v in byte_block)
+
+    for instr in instructions:
+        if instr.op in ("int", "pushint"):
+            index = int_index.get(instr.imm)
+            size += 1 + _const_size(instr.imm) if index is None else (1 if index < 4 else 2)
+        elif instr.op in ("byte", "pushbytes", "addr", "method"):
+            index = byte_index.get(instr.imm)
+            size += 1 + _const_size(instr.imm) if index is None else (1 if index < 4 else 2)
+        elif instr.op in ("switch", "match"):
+            size += 2 + 2 * len(instr.args)
+        elif instr.op in ("intcblock", "bytecblock"):
+            size += 1 + _uvarint_size(len(instr.args)) + 8 * len(instr.args)
+        else:
+            size += 1 + IMMEDIATE_BYTES.get(instr.op, 0)
+    return size
+
+
+def max_path_weight(teal, weight, start=0):
+    """Largest sum of weight(instr) over any path from start (loops and recursion counted once)"""
+    program = parse_teal(teal)
+    instructions = program.instructions
+    labels = program.labels
+    memo = {}
+
+    def successors(pc):
+        instr = instructions[pc]
+        targets = [labels[name] for name in branch_targets(instr) if instr.op != "callsub"]
+        if instr.op not in TERMINAL_OPS:
+            targets.append(pc + 1)
+        return targets
+
+    def subroutine_weight(pc, visiting):
+        # Weight of a subroutine body up to its retsub
+        return walk(labels[instructions[pc].args[0]], visiting, stop_at_retsub=True)
+
+    def walk(pc, visiting, stop_at_retsub=False):
+        key = (pc, stop_at_retsub)
+        if pc >= len(instructions) or key in visiting:
+            return 0
+        if key in memo:
+            return memo[key]
+        visiting = visiting | {key}
+        instr = instructions[pc]
+        total = weight(instr)
+        if instr.op == "callsub":
+            total += subroutine_weight(pc, visiting)
+        if instr.op == "retsub" and stop_at_retsub:
+            memo[key] = total
+            return total
+        best = max((walk(nxt, visiting, stop_at_retsub) for nxt in successors(pc)), default=0)
+        memo[key] = total + best
+        return memo[key]
+
+    return walk(start, frozenset()) if instructions else 0
+
+
+def estimate_max_cost(teal):
+    """Worst-case opcode cost over any path (loops and recursion counted once)"""
+    return max_path_weight(teal, lambda instr: OPCODE_COSTS.get(instr.op, 1))
+
+
+def program_metrics(teal):
+    """Size and cost summary for one program"""
+    program = parse_teal(teal)
+    size = estimate_program_size(program)
+    return {
+        "instructions": len(program.instructions),
+        "size": size,
+        "pages": max(1, -(-size // MAX_PROGRAM_SIZE)),
+        "max_cost": estimate_max_cost(program),
+    }
+
+
+def format_delta(before, after):
+    """Human-readable change between two program_metrics() results"""
+    parts = []
+    for key, unit in (("size", "B"), ("max_cost", " cost"), ("instructions", " ops")):
+        new = after[key]
+        if before is None:
+            parts.append(f"{new}{unit}")
+            continue
+        change = new - before[key]
+        sign = "+" if change > 0 else ""
+        parts.append(f"{new}{unit} ({sign}{change})" if change else f"{new}{unit}")
+    return ", ".join(parts)
@@ -0,0 +1,610 @@
+"""
+TEAL Peephole Optimizer
+Rewrites compiled TEAL and keeps only the rewrites the local evaluator proves safe
+
+Every pass produces a candidate program which is run side by side with the
+previous program over a set of randomized transaction groups and ledger
+states. A pass is accepted only when both programs approve/reject the same
+groups and produce identical logs, inner transactions and state deltas,
+without costing more opcode budget.
+"""
+
+import hashlib
+import random
+
+from local_evaluator import (
+    Instruction,
+    Label,
+    LedgerState,
+    TealProgram,
+    TERMINAL_OPS,
+    application_address,
+    branch_targets,
+    evaluate_program,
+    make_app_call,
+    make_payment,
+    parse_teal,
+    TealError,
+)
+
+# Large enough that budget never masks a behavioural difference
+VERIFY_BUDGET = 1_000_000
+DEFAULT_SCENARIOS = 300
+MAX_ROUNDS = 6
+SCENARIO_BOX_REFS = 8  # Box references per scenario call, algod's cap on references
+
+# (pops, pushes) for side-effect free opcodes the rewrites may reason about
+PURE_EFFECTS = {
+    "int": (0, 1), "pushint": (0, 1), "byte": (0, 1), "pushbytes": (0, 1),
+    "addr": (0, 1), "method": (0, 1),
+    "intc_0": (0, 1), "intc_1": (0, 1), "intc_2": (0, 1), "intc_3": (0, 1),
+    "bytec_0": (0, 1), "bytec_1": (0, 1), "bytec_2": (0, 1), "bytec_3": (0, 1),
+    "txn": (0, 1), "txna": (0, 1), "gtxn": (0, 1), "gtxna": (0, 1),
+    "global": (0, 1), "load": (0, 1),
+    "app_global_get": (1, 1), "app_local_get": (2, 1),
+    "btoi": (1, 1), "itob": (1, 1), "len": (1, 1), "!": (1, 1),
+    "+": (2, 1), "-": (2, 1), "*": (2, 1), "/": (2, 1), "%": (2, 1),
+    "<": (2, 1), ">": (2, 1), "<=": (2, 1), ">=": (2, 1),
+    "==": (2, 1), "!=": (2, 1), "&&": (2, 1), "||": (2, 1),
+    "concat": (2, 1),
+}
+
+CONSTANT_OPS = {"int", "pushint", "byte", "pushbytes"}
+
+FOLDABLE_BINARY = {
+    "+", "-", "*", "/", "%", "<", ">", "<=", ">=", "==", "!=", "&&", "||",
+    "&", "|", "^", "concat",
+}
+FOLDABLE_UNARY = {"!", "itob", "btoi", "len"}
+
+DUP_WINDOW = 4  # Longest repeated expression considered by the dup pass
+
+
+class OptimizationReport:
+    """What the optimizer did to one program"""
+
+    def __init__(self, original, optimized, accepted, rejected, scenarios):
+        self.original = original
+        self.optimized = optimized
+        self.accepted = accepted
+        self.rejected = rejected
+        self.scenarios = scenarios
+        self.instructions_before = len(parse_teal(original).instructions)
+        self.instructions_after = len(parse_teal(optimized).instructions)
+
+    @property
+    def saved(self):
+        return self.instructions_before - self.instructions_after
+
+    def summary(self):
+        lines = [
+            f"📉 Instructions: {self.instructions_before} -> {self.instructions_after} "
+            f"({self.saved} removed)",
+            f"🧪 Verified on {self.scenarios} scenarios",
+        ]
+        for name, count in self.accepted:
+            lines.append(f"   ✅ {name}: {count} rewrite(s)")
+        for name, reason in self.rejected:
+            lines.append(f"   ❌ {name}: rejected ({reason})")
+        return "\n".join(lines)
+
+
+# ============================================================================
+# PASSES
+# ============================================================================
+# Each pass takes a list of items (Label / Instruction) and returns a new list
+# plus the number of rewrites it made. Passes never mutate their input.
+
+def _fold_value(op, values):
+    """Evaluate a pure opcode on constants; None when it would fail"""
+    if op in FOLDABLE_UNARY:
+        (value,) = values
+        if op == "!" and isinstance(value, int):
+            return int(value == 0)
+        if op == "itob" and isinstance(value, int):
+            return value.to_bytes(8, "big")
+        if op == "btoi" and isinstance(value, bytes) and len(value) <= 8:
+            return int.from_bytes(value, "big")
+        if op == "len" and isinstance(value, bytes):
+            return len(value)
+        return None
+    a, b = values
+    if op == "concat":
+        if isinstance(a, bytes) and isinstance(b, bytes) and len(a) + len(b) <= 4096:
+            return a + b
+        return None
+    if op in ("==", "!="):
+        if type(a) is not type(b):
+            return None
+        return int((a == b) == (op == "=="))
+    if not (isinstance(a, int) and isinstance(b, int)):
+        return None
+    results = {
+        "+": a + b, "-": a - b, "*": a * b,
+        "/": a // b if b else None, "%": a % b if b else None,
+        "<": int(a < b), ">": int(a > b), "<=": int(a <= b), ">=": int(a >= b),
+        "&&": int(bool(a) and bool(b)), "||": int(bool(a) or bool(b)),
+        "&": a & b, "|": a | b, "^": a ^ b,
+    }
+    value = results[op]
+    if value is None or value < 0 or value > 2 ** 64 - 1:
+        return None
+    return value
+
+
+def _const_instruction(value, line):
+    if isinstance(value, int):
+        return Instruction.make("int", value, line=line)
+    return Instruction.make("byte", value, line=line)
+
+
+def _is_const(item):
+    return isinstance(item, Instruction) and item.op in CONSTANT_OPS
+
+
+def fold_constants(items):
+    """Replace operations on constant operands by their result"""
+    out = []
+    changes = 0
+    for item in items:
+        out.append(item)
+        while True:
+            last = out[-1]
+            if not isinstance(last, Instruction):
+                break
+            if last.op in FOLDABLE_BINARY and len(out) >= 3 \
+                    and _is_const(out[-2]) and _is_const(out[-3]):
+                value = _fold_value(last.op, [out[-3].imm, out[-2].imm])
+                if value is None:
+                    break
+                line = out[-3].line
+                del out[-3:]
+                out.append(_const_instruction(value, line))
+                changes += 1
+                continue
+            if last.op in FOLDABLE_UNARY and len(out) >= 2 and _is_const(out[-2]):
+                value = _fold_value(last.op, [out[-2].imm])
+                if value is None:
+                    break
+                line = out[-2].line
+                del out[-2:]
+                out.append(_const_instruction(value, line))
+                changes += 1
+                continue
+            break
+    return out, changes
+
+
+def fold_dead_branches(items):
+    """Resolve conditional branches and asserts on constant conditions"""
+    out = []
+    changes = 0
+    for item in items:
+        previous = out[-1] if out else None
+        if isinstance(item, Instruction) and previous is not None \
+                and isinstance(previous, Instruction) \
+                and previous.op in ("int", "pushint"):
+            taken = None
+            if item.op == "bnz":
+                taken = previous.imm != 0
+            elif item.op == "bz":
+                taken = previous.imm == 0
+            if taken is not None:
+                out.pop()
+                if taken:
+                    out.append(Instruction.make("b", item.args[0], line=item.line))
+                changes += 1
+                continue
+            if item.op == "assert" and previous.imm != 0:
+                out.pop()
+                changes += 1
+                continue
+        out.append(item)
+    return out, changes
+
+
+def _successors(instructions, labels, pc):
+    instr = instructions[pc]
+    targets = [labels[name] for name in branch_targets(instr)]
+    if instr.op not in TERMINAL_OPS:
+        targets.append(pc + 1)
+    return targets
+
+
+def remove_unreachable(items):
+    """Drop instructions no control path reaches and labels nothing targets"""
+    program = TealProgram(items)
+    instructions = program.instructions
+    reachable = set()
+    pending = [0] if instructions else []
+    while pending:
+        pc = pending.pop()
+        if pc in reachable or pc >= len(instructions):
+            continue
+        reachable.add(pc)
+        pending.extend(_successors(instructions, program.labels, pc))
+
+    referenced = set()
+    for pc in reachable:
+        referenced.update(branch_targets(instructions[pc]))
+
+    out = []
+    changes = 0
+    pc = 0
+    for item in items:
+        if isinstance(item, Label):
+            if item.name in referenced:
+                out.append(item)
+            else:
+                changes += 1
+            continue
+        if pc in reachable:
+            out.append(item)
+        else:
+            changes += 1
+        pc += 1
+    return out, changes
+
+
+def _label_positions(items):
+    return {item.name: index for index, item in enumerate(items) if isinstance(item, Label)}
+
+
+def _first_instruction_after(items, index):
+    for position in range(index, len(items)):
+        if isinstance(items[position], Instruction):
+            return position, items[position]
+    return None, None
+
+
+def thread_jumps(items):
+    """Retarget branches that land on an unconditional `b`, drop jumps to the next line"""
+    positions = _label_positions(items)
+    out = []
+    changes = 0
+    for index, item in enumerate(items):
+        if isinstance(item, Instruction) and item.op in ("b", "bz", "bnz"):
+            target = item.args[0]
+            seen = {target}
+            while True:
+                _, landing = _first_instruction_after(items, positions[target])
+                if landing is None or landing.op != "b" or landing.args[0] in seen:
+                    break
+                target = landing.args[0]
+                seen.add(target)
+            if target != item.args[0]:
+                item = Instruction.make(item.op, target, line=item.line)
+                changes += 1
+            # Branching to a label that directly follows is a no-op
+            following = index + 1
+            labels_between = set()
+            while following < len(items) and isinstance(items[following], Label):
+                labels_between.add(items[following].name)
+                following += 1
+            if target in labels_between:
+                if item.op != "b":
+                    out.append(Instruction.make("pop", line=item.line))
+                changes += 1
+                continue
+        out.append(item)
+    return out, changes
+
+
+def _pure_value_sequence(sequence):
+    """True when a straight-line sequence pushes exactly one value and pops nothing"""
+    depth = 0
+    for instr in sequence:
+        if not isinstance(instr, Instruction) or instr.op not in PURE_EFFECTS:
+            return False
+        pops, pushes = PURE_EFFECTS[instr.op]
+        if depth < pops:
+            return False
+        depth += pushes - pops
+    return depth == 1
+
+
+def reuse_with_dup(items):
+    """Replace an expression immediately repeated by `dup`"""
+    out = []
+    changes = 0
+    index = 0
+    while index < len(items):
+        matched = False
+        for width in range(DUP_WINDOW, 0, -1):
+            first = items[index:index + width]
+            second = items[index + width:index + 2 * width]
+            if len(second) < width:
+                continue
+            if not _pure_value_sequence(first):
+                continue
+            if [i.key() for i in first] != [i.key() for i in second if isinstance(i, Instruction)]:
+                continue
+            if any(isinstance(i, Label) for i in second):
+                continue
+            out.extend(first)
+            out.append(Instruction.make("dup", line=second[0].line))
+            index += 2 * width
+            changes += 1
+            matched = True
+            break
+        if not matched:
+            out.append(items[index])
+            index += 1
+    return out, changes
+
+
+def forward_scratch(items):
+    """Forward a stored value straight into the load that follows it with dup"""
+    out = []
+    changes = 0
+    index = 0
+    while index < len(items):
+        item = items[index]
+        following = items[index + 1] if index + 1 < len(items) else None
+        if isinstance(item, Instruction) and item.op == "store" \
+                and isinstance(following, Instruction) and following.op == "load" \
+                and following.args[0] == item.args[0]:
+            out.append(Instruction.make("dup", line=item.line))
+            out.append(item)
+            changes += 1
+            index += 2
+            continue
+        out.append(item)
+        index += 1
+    return out, changes
+
+
+def drop_dead_stores(items):
+    """Turn stores this program never loads into pops
+
+    Later transactions in a group can read any slot with gload/gloads, so
+    this is only sound for programs that are never called in a group; it
+    runs only when optimize_program() is told so (ungrouped=True).
+    """
+    instructions = [i for i in items if isinstance(i, Instruction)]
+    if any(i.op in ("loads", "stores", "gload", "gloads", "gloadss") for i in instructions):
+        return list(items), 0
+    loaded = {i.args[0] for i in instructions if i.op == "load"}
+    out = []
+    changes = 0
+    for item in items:
+        if isinstance(item, Instruction) and item.op == "store" and item.args[0] not in loaded:
+            out.append(Instruction.make("pop", line=item.line))
+            changes += 1
+            continue
+        out.append(item)
+    return out, changes
+
+
+def drop_useless_pops(items):
+    """Remove pure pushes that are immediately popped"""
+    out = []
+    changes = 0
+    for item in items:
+        previous = out[-1] if out else None
+        if isinstance(item, Instruction) and item.op == "pop" \
+                and isinstance(previous, Instruction) \
+                and (previous.op in CONSTANT_OPS or previous.op in ("dup", "txn", "global", "load")):
+            out.pop()
+            changes += 1
+            continue
+        out.append(item)
+    return out, changes
+
+
+PASSES = [
+    ("constant folding", fold_constants),
+    ("dead branch folding", fold_dead_branches),
+    ("unreachable code removal", remove_unreachable),
+    ("jump threading", thread_jumps),
+    ("dup reuse", reuse_with_dup),
+    ("scratch forwarding", forward_scratch),
+    ("pop elimination", drop_useless_pops),
+]
+
+# Passes that are unsound when another transaction of the group reads our scratch
+UNGROUPED_PASSES = [
+    ("dead store removal", drop_dead_stores),
+]
+
+
+# ============================================================================
+# VERIFICATION
+# ============================================================================
+
+def _account(rng):
+    return hashlib.sha256(rng.getrandbits(64).to_bytes(8, "big")).digest()
+
+
+class Scenario:
+    """A randomized ledger plus transaction group to run a program against"""
+
+    def __init__(self, ledger, group, index, app_id):
+        self.ledger = ledger
+        self.group = group
+        self.index = index
+        self.app_id = app_id
+
+
+def generate_scenarios(program, count=DEFAULT_SCENARIOS, seed=0):
+    """Build scenarios whose inputs are drawn from the program's own constants"""
+    program = parse_teal(program)
+    rng = random.Random(seed)
+    app_id = 1001
+    creator = hashlib.sha256(b"creator").digest()
+    players = [hashlib.sha256(f"player{n}".encode()).digest() for n in range(3)]
+    app_address = application_address(app_id)
+
+    byte_constants = [value for value in program.byte_constants() if 0 < len(value) <= 64]
+    int_constants = sorted(set(program.int_constants()) | {0, 1, 100000, 1000000})
+    uses_boxes = any(isinstance(item, Instruction) and item.op.startswith("box_") for item in program.items)
+
+    def random_int():
+        choice = rng.random()
+        if choice < 0.6 and int_constants:
+            return rng.choice(int_constants)
+        if choice < 0.8:
+            return rng.randrange(0, 10)
+        return rng.randrange(0, 10 ** 8)
+
+    def random_value(sender):
+        if rng.random() < 0.75:
+            return random_int()
+        return rng.choice([sender, creator, players[0]])
+
+    def random_arg():
+        roll = rng.random()
+        if roll < 0.75 and byte_constants:
+            return rng.choice(byte_constants)
+        if roll < 0.9:
+            return random_int().to_bytes(8, "big")
+        return bytes(rng.getrandbits(8) for _ in range(rng.randrange(0, 6)))
+
+    scenarios = []
+    for _ in range(count):
+        sender = rng.choice([creator] + players)
+        ledger = LedgerState()
+        ledger.install_app(creator, program.to_teal(), "#pragma version 8\nint 1", app_id=app_id)
+        for address in [creator] + players:
+            ledger.fund(address, rng.choice([10 ** 6, 10 ** 7, 10 ** 9]))
+        ledger.fund(app_address, rng.choice([0, 10 ** 5, 10 ** 7, 10 ** 9]))
+
+        state = ledger.globals[app_id]
+        for key in byte_constants:
+            if rng.random() < 0.7:
+                state[key] = random_value(sender)
+        if rng.random() < 0.8:
+            local = ledger.locals.setdefault((sender, app_id), {})
+            for key in byte_constants:
+                if rng.random() < 0.6:
+                    local[key] = random_value(sender)
+
+        on_complete = rng.choices([0, 1, 2, 3, 4, 5], weights=[12, 3, 2, 1, 1, 1])[0]
+        args = [random_arg() for _ in range(rng.choice([0, 1, 1, 1, 2, 3]))]
+        boxes = []
+        if uses_boxes and rng.random() < 0.8:
+            # Box names the program may build: a constant, alone or prefixing an arg or the sender
+            names = [name for name in dict.fromkeys(
+                byte_constants + [c + suffix for c in byte_constants for suffix in args + [sender]])
+                if len(name) <= 64]
+            boxes = rng.sample(names, min(len(names), SCENARIO_BOX_REFS))
+        call = make_app_call(
+            sender, 0 if rng.random() < 0.1 else app_id, args=args,
+            on_complete=on_complete,
+            accounts=[rng.choice(players)] if rng.random() < 0.3 else [],
+            Boxes=[(0, name) for name in boxes],
+        )
+        group = [call]
+        if rng.random() < 0.6:
+            receiver = app_address if rng.random() < 0.8 else _account(rng)
+            group.insert(0, make_payment(sender, receiver, random_int()))
+        scenarios.append(Scenario(ledger, group, len(group) - 1, app_id))
+    return scenarios
+
+
+def _outcome(program, scenario):
+    result = evaluate_program(
+        program, scenario.group, index=scenario.index, ledger=scenario.ledger,
+        app_id=scenario.app_id, budget=VERIFY_BUDGET,
+    )
+    if not result.approved:
+        return ("reject", result.error is not None), result.cost
+    inners = [sorted(inner.items()) for inner in result.inner_txns]
+    return ("approve", tuple(result.logs), repr(inners), repr(result.delta)), result.cost
+
+
+def find_divergence(reference, candidate, scenarios):
+    """Return the first scenario where two programs behave differently"""
+    reference = parse_teal(reference)
+    candidate = parse_teal(candidate)
+    for position, scenario in enumerate(scenarios):
+        expected, expected_cost = _outcome(reference, scenario)
+        actual, actual_cost = _outcome(candidate, scenario)
+        if expected != actual:
+            return position, f"scenario {position}: {expected[0]} vs {actual[0]}"
+        if actual_cost > expected_cost:
+            return position, f"scenario {position}: cost {expected_cost} -> {actual_cost}"
+    return None
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def optimize_program(teal, scenarios=DEFAULT_SCENARIOS, seed=0, passes=None, ungrouped=False):
+    """Run all passes to a fixpoint, verifying each one; return a report
+
+    ungrouped=True promises the program is never called in a group and
+    enables UNGROUPED_PASSES as well.
+    """
+    program = parse_teal(teal)
+    cases = generate_scenarios(program, scenarios, seed)
+    if passes is None:
+        passes = PASSES + UNGROUPED_PASSES if ungrouped else PASSES
+    accepted = {}
+    rejected = []
+    disabled = set()
+
+    for _ in range(MAX_ROUNDS):
+        progressed = False
+        for name, rewrite in passes:
+            if name in disabled:
+                continue
+            try:
+                items, changes = rewrite(program.items)
+                candidate = TealProgram(items, program.version)
+            except TealError as error:
+                rejected.append((name, str(error)))
+                disabled.add(name)
+                continue
+            if not changes:
+                continue
+            divergence = find_divergence(program, candidate, cases)
+            if divergence is not None:
+                rejected.append((name, divergence[1]))
+                disabled.add(name)
+                continue
+            program = candidate
+            accepted[name] = accepted.get(name, 0) + changes
+            progressed = True
+        if not progressed:
+            break
+
+    original = teal if isinstance(teal, str) else teal.to_teal()
+    return OptimizationReport(
+        original, program.to_teal(), sorted(accepted.items()), rejected, len(cases)
+    )
+
+
+def optimize_teal(teal, scenarios=DEFAULT_SCENARIOS, seed=0, ungrouped=False):
+    """Optimize TEAL text and return the verified result"""
+    return optimize_program(teal, scenarios, seed, ungrouped=ungrouped).optimized
+
+
+def optimize_compiled(approval_teal, clear_teal, scenarios=DEFAULT_SCENARIOS):
+    """Optimize the output of a contract's compile()"""
+    return (
+        optimize_teal(approval_teal, scenarios),
+        optimize_teal(clear_teal, scenarios),
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not paths:
+        print("Usage: python teal_optimizer.py <program.teal> [output.teal] [--ungrouped]")
+        sys.exit(1)
+
+    with open(paths[0]) as f:
+        source = f.read()
+
+    print(f"🔧 Optimizing {paths[0]}...")
+    report = optimize_program(source, ungrouped="--ungrouped" in sys.argv)
+    print(report.summary())
+
+    if len(paths) > 1:
+        with open(paths[1], "w") as f:
+            f.write(report.optimized)
+        print(f"📁 Optimized program: {paths[1]}")
@@ -0,0 +1,224 @@
+"""
+TEAL Source Maps
+Maps every compiled TEAL line back to the PyTeal line and function that produced it
+
+PyTeal only records source locations when its sourcemap feature gate is set
+before `pyteal` is first imported, and the gate slows every compile, so it is
+never set on import: call enable_sourcemaps() first thing in a process that
+wants maps (the watch worker does, and so does build_variant_sourcemap()).
+"""
+
+import ast
+import json
+import os
+import sys
+from collections import defaultdict
+
+from local_evaluator import OPCODE_COSTS, parse_teal
+
+
+def enable_sourcemaps():
+    """Turn on PyTeal source mapping; False if pyteal was imported too early"""
+    try:
+        from feature_gates import FeatureGates
+    except ImportError:
+        return False
+    if "pyteal" not in sys.modules:
+        FeatureGates.set_sourcemap_enabled(True)
+    return FeatureGates.sourcemap_enabled()
+
+
+# ============================================================================
+# BUILDING
+# ============================================================================
+
+def enclosing_functions(path):
+    """Map each line of a python file to the innermost function containing it"""
+    try:
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError):
+        return {}
+    spans = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            spans.append((node.lineno, node.end_lineno, node.name))
+    owners = {}
+    # Wider spans first so inner functions overwrite their parents
+    for start, end, name in sorted(spans, key=lambda span: span[0] - span[1]):
+        for line in range(start, end + 1):
+            owners[line] = name
+    return owners
+
+
+def compile_with_sourcemap(program, source_dir=None, version=8, mode=None, **options):
+    """Compile a PyTeal expression; returns (teal, [entry per TEAL line])
+
+    options are Compilation's own (assemble_constants, optimize, ...), so the
+    TEAL matches a compileTeal() call made with the same settings.
+    """
+    if not enable_sourcemaps():
+        raise RuntimeError(
+            "PyTeal sourcemaps are disabled; call enable_sourcemaps() before importing pyteal"
+        )
+    from pyteal import Compilation, Mode
+
+    results = Compilation(program, mode or Mode.Application, version=version,
+                          **options).compile(with_sourcemap=True)
+    teal_lines = results.teal.splitlines()
+    lines = [None] * len(teal_lines)
+    functions = {}
+    for (teal_line, _), mapping in results.sourcemap.r3_sourcemap.entries.items():
+        # Line 0 is the #pragma, which PyTeal attributes to the caller
+        if teal_line == 0 or teal_line >= len(lines) or mapping.source is None:
+            continue
+        path = os.path.abspath(mapping.source)
+        if path not in functions:
+            functions[path] = enclosing_functions(path)
+        source_line = mapping.source_line + 1  # PyTeal reports 0-based lines
+        lines[teal_line] = {
+            "file": os.path.relpath(path, source_dir) if source_dir else path,
+            "line": source_line,
+            "function": functions[path].get(source_line, "<module>"),
+        }
+    return results.teal, lines
+
+
+def build_variant_sourcemap(name):
+    """Build a registry variant once, mapped; returns (approval_teal, clear_teal, approval lines)
+
+    The variant's own compile() runs with compileTeal() swapped for a mapped
+    compile taking the same arguments, so its optimize options and the like
+    carry over and the map describes exactly the TEAL compile() returns.
+    """
+    if not enable_sourcemaps():
+        raise RuntimeError(
+            "PyTeal sourcemaps are disabled; build maps in a process that has not imported pyteal yet"
+        )
+    import pyteal
+    from contract_registry import build_variant, get_variant
+
+    source_dir = get_variant(name)["source_dir"]
+    maps = {}
+
+    def mapped_compile(ast, mode, *, version=2, assembleConstants=False, assembly_type_track=True, optimize=None):
+        teal, lines = compile_with_sourcemap(ast, source_dir=source_dir, version=version, mode=mode,
+                                             assemble_constants=assembleConstants,
+                                             assembly_type_track=assembly_type_track, optimize=optimize)
+        maps.setdefault(teal, lines)
+        return teal
+
+    compile_teal = pyteal.compileTeal
+    pyteal.compileTeal = mapped_compile
+    try:
+        approval_teal, clear_teal = build_variant(name)
+    finally:
+        pyteal.compileTeal = compile_teal
+    return approval_teal, clear_teal, maps.get(approval_teal)
+
+
+def sourcemap_path(approval_path):
+    return approval_path + ".map.json"
+
+
+def write_sourcemap(approval_path, teal, lines):
+    """Write <approval>.teal.map.json next to the TEAL artifact"""
+    document = {
+        "version": 1,
+        "teal": os.path.basename(approval_path),
+        "lines": [
+            dict(entry, teal_line=number) if entry else {"teal_line": number}
+            for number, entry in enumerate(lines, start=1)
+        ],
+    }
+    path = sourcemap_path(approval_path)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=1)
+    return path
+
+
+def load_sourcemap(approval_path):
+    """Read a source map written by write_sourcemap(); keyed by TEAL line"""
+    with open(sourcemap_path(approval_path)) as f:
+        document = json.load(f)
+    return {entry["teal_line"]: entry for entry in document["lines"] if "file" in entry}
+
+
+# ============================================================================
+# COST ATTRIBUTION
+# ============================================================================
+
+def static_line_costs(teal):
+    """Opcode cost of every TEAL line, each counted once"""
+    return {
+        instr.line: OPCODE_COSTS.get(instr.op, 1)
+        for instr in parse_teal(teal).instructions
+    }
+
+
+def traced_line_costs(teal, line_hits):
+    """Opcode cost actually spent per TEAL line, from evaluator line_hits"""
+    costs = static_line_costs(teal)
+    return {line: hits * costs.get(line, 1) for line, hits in line_hits.items()}
+
+
+def attribute_costs(sourcemap, line_costs):
+    """Roll TEAL line costs up to python lines and functions"""
+    by_line = defaultdict(int)
+    by_function = defaultdict(int)
+    unmapped = 0
+    for teal_line, cost in line_costs.items():
+        entry = sourcemap.get(teal_line)
+        if entry is None:
+            unmapped += cost
+            continue
+        by_line[(entry["file"], entry["line"])] += cost
+        by_function[entry["function"]] += cost
+    return {
+        "total": sum(line_costs.values()),
+        "by_line": dict(by_line),
+        "by_function": dict(by_function),
+        "unmapped": unmapped,
+    }
+
+
+def format_hot_spots(report, limit=10):
+    """Text table of the most expensive functions and python lines"""
+    total = report["total"] or 1
+    lines = [f"💰 Total cost: {report['total']}"]
+    lines.append("🔥 By function:")
+    for name, cost in sorted(report["by_function"].items(), key=lambda kv: -kv[1])[:limit]:
+        lines.append(f"   {cost:6d} ({cost * 100 // total:3d}%)  {name}")
+    lines.append("📍 By line:")
+    for (path, line), cost in sorted(report["by_line"].items(), key=lambda kv: -kv[1])[:limit]:
+        lines.append(f"   {cost:6d} ({cost * 100 // total:3d}%)  {path}:{line}")
+    if report["unmapped"]:
+        lines.append(f"   {report['unmapped']:6d} unmapped")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from contract_registry import artifact_paths
+
+    if len(sys.argv) < 2:
+        print("Usage: python teal_sourcemap.py <variant>")
+        sys.exit(1)
+
+    variant = sys.argv[1]
+    print(f"🗺️  Building source map for {variant}...")
+    try:
+        teal, _, lines = build_variant_sourcemap(variant)
+        if lines is None:
+            raise RuntimeError("the variant does not compile through compileTeal()")
+    except Exception as e:
+        print(f"❌ Build failed: {e}")
+        sys.exit(1)
+
+    approval_path, _ = artifact_paths(variant)
+    os.makedirs(os.path.dirname(approval_path), exist_ok=True)
+    with open(approval_path, "w") as f:
+        f.write(teal)
+    print(f"📁 Source map: {write_sourcemap(approval_path, teal, lines)}")
+
+    sourcemap = {number: entry for number, entry in enumerate(lines, start=1) if entry}
+    print(format_hot_spots(attribute_costs(sourcemap, static_line_costs(teal))))
@@ -0,0 +1,65 @@
+"""
+Tests for the batch account factory
+Runs against the local stand-in network
+"""
+
+import pytest
+from algosdk import account
+
+from account_factory import AccountFactory, derive_account
+from local_network import LocalAlgodClient, deploy_game
+
+
+@pytest.fixture
+def network(tmp_path):
+    """Local network with a funded faucet, the enhanced contract and a factory caching in tmp_path"""
+    algod_client = LocalAlgodClient()
+    faucet_key, faucet = account.generate_account()
+    algod_client.fund(faucet, 10 ** 12)
+    app_id = deploy_game(algod_client, faucet_key)
+    return algod_client, AccountFactory(algod_client, faucet_key, cache_dir=str(tmp_path)), app_id
+
+
+class TestAccountFactory:
+    """Test derivation, batching and the cache"""
+
+    def test_accounts_are_deterministic(self):
+        address, key = derive_account("seed", 3)
+        assert derive_account("seed", 3) == (address, key)
+        assert derive_account("seed", 4)[0] != address
+        assert account.address_from_private_key(key) == address
+
+    def test_prepare_funds_and_opts_in_in_batches(self, network):
+        algod_client, factory, app_id = network
+        accounts = factory.prepare(40, amount=2_000_000, app_id=app_id)
+        assert len(accounts) == 40
+        for address, _ in accounts[::13]:
+            info = algod_client.account_info(address)
+            assert info["amount"] == 2_000_000 - 1000
+            assert [app["id"] for app in info["apps-local-state"]] == [app_id]
+        # 40 payments and 40 opt-ins, 16 per group
+        groups = {info["txn"].group for info in algod_client.pending.values()}
+        assert len(groups) >= 6
+
+    def test_cached_set_is_reused(self, network):
+        algod_client, factory, app_id = network
+        factory.prepare(20, app_id=app_id)
+        sent = len(algod_client.pending)
+        assert len(factory.prepare(20, app_id=app_id)) == 20
+        assert len(algod_client.pending) == sent
+
+        # Growing the set only handles the new accounts
+        factory.prepare(25, app_id=app_id)
+        assert len(algod_client.pending) == sent + 10
+
+    def test_stale_cache_is_rebuilt(self, network, tmp_path):
+        algod_client, factory, app_id = network
+        factory.prepare(5, app_id=app_id)
+
+        # Same network id and app id, but a fresh ledger where nothing exists yet
+        fresh = LocalAlgodClient()
+        fresh.fund(factory.faucet, 10 ** 12)
+        assert deploy_game(fresh, factory.faucet_key) == app_id
+        rebuilt = AccountFactory(fresh, factory.faucet_key, cache_dir=str(tmp_path))
+        assert len(rebuilt.prepare(5, app_id=app_id)) == 5
+        assert fresh.account_info(rebuilt.accounts(1)[0][0])["apps-local-state"]
@@ -0,0 +1,87 @@
+"""
+Tests for admin boxes in the enhanced contract
+Bootstraps, adds and removes admins on the local TEAL evaluator
+"""
+
+import pytest
+from algosdk import account, transaction
+
+from box_layout import ADMIN_BOX_PREFIX, admin_box_min_balance, admin_box_name
+from enhanced_contract import EnhancedGameContract
+from enhanced_contract_client import EnhancedGameClient
+from game_factory import SHARD_GLOBAL_BYTES, SHARD_GLOBAL_UINTS, SHARD_LOCAL_BYTES, SHARD_LOCAL_UINTS
+from local_evaluator import LedgerState, application_address, evaluate_group, txn_from_algosdk
+
+SP = transaction.SuggestedParams(1000, 1, 1000, "A" * 43 + "=", "localnet-v1", flat_fee=True, min_fee=1000)
+
+
+@pytest.fixture
+def app():
+    """A created, funded but not yet bootstrapped enhanced contract, plus a few other accounts"""
+    ledger = LedgerState()
+    _, creator = account.generate_account()
+    others = [account.generate_account()[1] for _ in range(4)]
+    for address in [creator] + others:
+        ledger.fund(address, 10_000_000)
+    approval, clear = EnhancedGameContract().compile()
+    app_id = ledger.create_app(creator, approval, clear,
+                               global_schema=(SHARD_GLOBAL_UINTS, SHARD_GLOBAL_BYTES),
+                               local_schema=(SHARD_LOCAL_UINTS, SHARD_LOCAL_BYTES))
+    ledger.fund(application_address(app_id), 1_000_000)
+    return ledger, app_id, EnhancedGameClient(app_id), creator, others
+
+
+def call(ledger, txns):
+    return evaluate_group(ledger, [txn_from_algosdk(txn) for txn in txns])
+
+
+def admins(ledger, app_id):
+    return {name[len(ADMIN_BOX_PREFIX):] for name in ledger.boxes.get(app_id, {}) if name.startswith(ADMIN_BOX_PREFIX)}
+
+
+class TestAdminBoxes:
+    """Test bootstrap, adding and removing admins, and admin-only methods"""
+
+    def test_bootstrap_creates_the_first_admin_box(self, app):
+        ledger, app_id, client, creator, others = app
+        assert not call(ledger, client.bootstrap(SP, others[0])).ok  # Only the creator bootstraps
+        assert call(ledger, client.bootstrap(SP, creator)).ok
+        assert list(ledger.boxes[app_id]) == [admin_box_name(creator)]
+        assert ledger.global_state(app_id)[b"ADMIN_COUNT"] == 1
+        assert not call(ledger, client.bootstrap(SP, creator)).ok  # Once
+
+    def test_add_and_remove_admins(self, app):
+        ledger, app_id, client, creator, others = app
+        assert call(ledger, client.bootstrap(SP, creator)).ok
+        base = ledger.min_balance(application_address(app_id))
+        assert call(ledger, client.add_admin(SP, creator, others[0])).ok
+        assert not call(ledger, client.add_admin(SP, creator, others[0])).ok  # Already an admin
+        assert call(ledger, client.add_admin(SP, others[0], others[1])).ok  # New admins can add too
+        assert not call(ledger, client.add_admin(SP, creator, others[2])).ok  # MAX_ADMINS is 3
+        assert ledger.min_balance(application_address(app_id)) == base + 2 * admin_box_min_balance()
+
+        assert call(ledger, client.remove_admin(SP, others[1], creator)).ok
+        assert not call(ledger, client.remove_admin(SP, others[0], creator)).ok  # No longer has a box
+        assert admins(ledger, app_id) == {admin_box_name(a)[len(ADMIN_BOX_PREFIX):] for a in others[:2]}
+        assert ledger.global_state(app_id)[b"ADMIN_COUNT"] == 2
+
+    def test_last_admin_stays(self, app):
+        ledger, app_id, client, creator, others = app
+        assert call(ledger, client.bootstrap(SP, creator)).ok
+        assert not call(ledger, client.remove_admin(SP, creator, creator)).ok
+        assert call(ledger, client.add_admin(SP, creator, others[0])).ok
+        assert call(ledger, client.remove_admin(SP, others[0], creator)).ok
+        assert not call(ledger, client.remove_admin(SP, others[0], others[0])).ok
+        assert ledger.global_state(app_id)[b"ADMIN_COUNT"] == 1 and len(admins(ledger, app_id)) == 1
+
+    def test_non_admins_are_rejected(self, app):
+        ledger, app_id, client, creator, others = app
+        assert call(ledger, client.bootstrap(SP, creator)).ok
+        stranger = others[0]
+        for txns in (client.add_admin(SP, stranger, stranger), client.remove_admin(SP, stranger, creator),
+                     client.toggle_pause(SP, stranger), client.emergency_stop(SP, stranger),
+                     client.withdraw_commission(SP, stranger), client.update_config(SP, stranger, 1, 2),
+                     client.set_oracle(SP, stranger, stranger)):
+            result = call(ledger, txns)
+            assert not result.ok and "assert" in result.error
+        assert admins(ledger, app_id) == {admin_box_name(creator)[len(ADMIN_BOX_PREFIX):]}
@@ -0,0 +1,114 @@
+"""
+Tests for the block follower
+Follows blocks of the local stand-in network after a scenario has run
+"""
+
+import asyncio
+
+import pytest
+from algosdk import account
+
+from block_follower import BlockFollower, CursorStore
+from local_network import LocalAlgodClient, deploy_game
+from scenario_runner import ScenarioRunner
+
+
+@pytest.fixture(scope="module")
+def network():
+    """A full scenario for 8 players; returns the round it started after and the globals then"""
+    algod_client = LocalAlgodClient()
+    admin_key, admin = account.generate_account()
+    algod_client.fund(admin, 1_000_000_000)
+    app_id = deploy_game(algod_client, admin_key, funding=100_000_000)
+    start = algod_client.status()["last-round"] + 1
+    initial = algod_client.ledger.global_state(app_id)
+    players = []
+    for _ in range(8):
+        key, address = account.generate_account()
+        algod_client.fund(address, 20_000_000)
+        players.append((address, key))
+    report = ScenarioRunner(algod_client, app_id, admin_key, players, {"concurrency": 4}).run()
+    assert report.passed, report.failed_assertions
+    return algod_client, app_id, start, initial, players
+
+
+def follow(algod_client, app_id, cursors, names, stop_after=None):
+    """{name: [RoundDeltas]} for subscribers that read to the tip (or stop after stop_after rounds)"""
+    follower = BlockFollower(algod_client, [app_id], cursors)
+    subscriptions = {name: follower.subscribe(name) for name in names}
+    received = {name: [] for name in names}
+
+    async def consume(name):
+        async for deltas in subscriptions[name]:
+            received[name].append(deltas)
+            if stop_after and len(received[name]) == stop_after.get(name, -1):
+                subscriptions[name].close()
+                break
+
+    async def main():
+        tip = algod_client.status()["last-round"]
+        await asyncio.gather(follower.run(stop_round=tip), *(consume(name) for name in names))
+
+    asyncio.run(main())
+    return follower, received
+
+
+class TestBlockFollower:
+    """Test delta extraction, fan-out and cursor resumption"""
+
+    def test_global_deltas_rebuild_the_final_state(self, network):
+        algod_client, app_id, start, initial, players = network
+        cursors = CursorStore()
+        cursors.set("ui", start)
+        follower, received = follow(algod_client, app_id, cursors, ["ui"])
+        state = dict(initial)
+        for deltas in received["ui"]:
+            for call in deltas.calls:
+                for key, value in call.global_delta.items():
+                    state[key] = value
+        assert state == algod_client.ledger.global_state(app_id)
+
+        calls = [call for deltas in received["ui"] for call in deltas.calls]
+        methods = [call.method for call in calls]
+        assert methods.count("stake_game") == methods.count("process_result") == 8
+        stake = next(call for call in calls if call.method == "stake_game")
+        assert stake.events[0][0] == "GAME_STAKE"
+        assert any(inner["type"] == "pay" for call in calls for inner in call.inner_txns)
+
+    def test_local_deltas_follow_each_player(self, network):
+        algod_client, app_id, start, initial, players = network
+        cursors = CursorStore()
+        cursors.set("leaderboard", start)
+        _, received = follow(algod_client, app_id, cursors, ["leaderboard"])
+        local = {}
+        for deltas in received["leaderboard"]:
+            for call in deltas.calls:
+                for address, changes in call.local_delta.items():
+                    local.setdefault(address, {}).update(changes)
+        for address, _ in players:
+            final = algod_client.ledger.local_state(address, app_id)
+            assert {key: value for key, value in local[address].items() if key in final} == final
+
+    def test_stopped_consumer_resumes_from_its_cursor(self, network, tmp_path):
+        algod_client, app_id, start, initial, players = network
+        path = str(tmp_path / "cursors.json")
+        cursors = CursorStore(path)
+        for name in ("ui", "reconciliation"):
+            cursors.set(name, start)
+        follower, first = follow(algod_client, app_id, cursors, ["ui", "reconciliation"], stop_after={"ui": 3})
+        # Both subscribers were fed from one read of each block
+        tip = algod_client.status()["last-round"]
+        assert follower.blocks_read == tip - start + 1
+        assert len(first["ui"]) == 3
+        assert CursorStore(path).get("ui") == first["ui"][2].round
+
+        # A new process picks up "ui" at the round it had not finished
+        _, rest = follow(algod_client, app_id, CursorStore(path), ["ui"])
+        rounds = [d.round for d in first["ui"][:2] + rest["ui"]]
+        assert rounds == [d.round for d in first["reconciliation"]]
+        assert CursorStore(path).get("reconciliation") == tip + 1
+
+    def test_new_subscriber_starts_at_the_tip(self, network):
+        algod_client, app_id, start, initial, players = network
+        follower, received = follow(algod_client, app_id, CursorStore(), ["late"])
+        assert received["late"] == [] and follower.blocks_read == 0
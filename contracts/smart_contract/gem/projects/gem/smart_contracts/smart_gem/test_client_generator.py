@@ -0,0 +1,65 @@
+"""
+Tests for the generated enhanced contract client
+Groups built by the client run on the local TEAL evaluator
+"""
+
+import pytest
+from algosdk import account, transaction
+
+from box_layout import admin_box_min_balance, admin_box_name, room_box_min_balance
+from client_generator import client_path, generate_client
+from enhanced_contract import EnhancedGameContract
+from enhanced_contract_client import EnhancedGameClient, decode_logs
+from local_evaluator import LedgerState, evaluate_group, make_payment, txn_from_algosdk
+
+SP = transaction.SuggestedParams(0, 1, 1000, "A" * 43 + "=", "testnet", min_fee=1000)
+
+
+def run(ledger, group):
+    return evaluate_group(ledger, [txn_from_algosdk(txn) for txn in group])
+
+
+@pytest.fixture
+def game():
+    """Enhanced contract bootstrapped through the client"""
+    ledger = LedgerState()
+    _, admin = account.generate_account()
+    _, player = account.generate_account()
+    for address in (admin, player):
+        ledger.fund(address, 100_000_000)
+    approval, clear = EnhancedGameContract().compile()
+    app_id = ledger.create_app(admin, approval, clear, global_schema=(10, 10), local_schema=(11, 8))
+    client = EnhancedGameClient(app_id)
+    funding = make_payment(admin, client.app_address, 100_000 + admin_box_min_balance() + 2_000_000)
+    assert evaluate_group(ledger, [funding] + [txn_from_algosdk(t) for t in client.bootstrap(SP, admin)]).ok
+    return ledger, client, admin, player
+
+
+class TestGeneratedClient:
+    """Test the committed client against its generator and the contract"""
+
+    def test_client_is_up_to_date(self):
+        with open(client_path("enhanced_contract")) as f:
+            assert f.read() == generate_client("enhanced_contract")
+
+    def test_game_round_with_events(self, game):
+        ledger, client, admin, player = game
+        result = run(ledger, client.create_room(SP, player, room_box_min_balance(), 3))
+        assert decode_logs(result.logs) == [("ROOM_CREATED", {"room_id": 3})]
+
+        result = run(ledger, client.stake_game(SP, player, 1_000_000, 3, opt_in=True))
+        assert decode_logs(result.logs) == [("GAME_STAKE", {"amount": 1_000_000, "round": 0, "room_id": 3})]
+
+        group = client.process_result(SP, admin, 1, b"seed", player, 3)
+        assert group[0].fee == 2000  # One inner payout
+        result = run(ledger, group)
+        assert result.ok, result.error
+        assert decode_logs(result.logs) == [("GAME_WIN", {})]
+
+    def test_admin_calls_reference_admin_boxes(self, game):
+        ledger, client, admin, player = game
+        result = run(ledger, client.add_admin(SP, admin, player))
+        assert decode_logs(result.logs) == [("ADMIN_ADDED", {"admin": player})]
+        group = client.toggle_pause(SP, player)
+        assert [ref.name for ref in group[0].boxes] == [admin_box_name(player)]
+        assert run(ledger, group).ok
@@ -0,0 +1,80 @@
+"""
+Tests for the contract fuzzer
+Fuzzes the enhanced contract and deliberately broken builds of it
+"""
+
+import re
+
+from contract_fuzzer import ContractFuzzer, Step, format_reproduction
+from enhanced_contract import EnhancedGameContract
+
+# Rewriting these lines of the approval TEAL plants a bug (pattern, replacement)
+ADMIN_GUARD = [(r"callsub requireadmin_\d+\n", "")]
+SINGLE_STAKE_CHECK = [
+    (r'int 0\nbyte "PLAYER_STAKE"\napp_local_get\nint 0\n==\nassert\n', ""),
+    # The seat box would refuse a second stake too
+    (r"(byte 0x73656174\ntxn Sender\nconcat\nint 16\nbox_create\n)assert\n", r"\1pop\n"),
+]
+# Back to reading Gtxn[0] from any group, whoever sent it
+PAYMENT_PAIRING = [
+    (r"global GroupSize\nint 2\n==\nassert\n", ""),
+    (r"txn GroupIndex\nint 1\n-\ngtxns Sender\ntxn Sender\n==\nassert\n", ""),
+    (r"txn GroupIndex\nint 1\n-\ngtxns", "int 0\ngtxns"),
+]
+
+
+def mutant(rewrites, invariants=None):
+    """ContractFuzzer over the enhanced contract with every match of each rewrite replaced"""
+    approval, clear = EnhancedGameContract().compile()
+    for pattern, replacement in rewrites:
+        approval, count = re.subn(pattern, replacement, approval)
+        assert count
+    return ContractFuzzer(invariants=invariants, programs=(approval, clear))
+
+
+class TestContractFuzzer:
+    """Test invariant checks, shrinking and replay"""
+
+    def test_enhanced_contract_keeps_invariants(self):
+        fuzzer = ContractFuzzer()
+        assert fuzzer.fuzz(runs=30, steps=40, seed=3) is None
+        accepted = {method: counts[0] for method, counts in fuzzer.stats.items()}
+        assert accepted["stake"] and accepted["result"] and accepted["create_room"] and accepted["settle_batch"]
+        assert not accepted["reused_payment"] and not accepted["stake_pair"]
+
+    def test_missing_admin_guard_shrinks_to_one_call(self):
+        failure = mutant(ADMIN_GUARD).fuzz(runs=50, steps=40, seed=1)
+        assert failure.invariant == "only_admins_change_config"
+        assert len(failure.steps) == 1
+        assert failure.steps[0].actor != 0
+        assert failure.steps[0].method in ("toggle_pause", "update_config", "set_oracle",
+                                           "add_admin", "remove_admin", "emergency_stop")
+
+    def test_double_stake_is_reproduced(self):
+        fuzzer = mutant(SINGLE_STAKE_CHECK)
+        failure = fuzzer.fuzz(runs=100, steps=60, seed=1)
+        assert failure.invariant == "room_pots_match_stakes"
+        assert [step.method for step in failure.steps] == ["create_room", "stake", "stake"]
+
+        replayed = fuzzer.run_sequence(failure.steps)
+        assert replayed.invariant == failure.invariant and replayed.index == 2
+        assert ContractFuzzer().run_sequence(failure.steps) is None
+        assert "Step('stake'" in format_reproduction(failure)
+
+    def test_unpaired_payments_are_caught(self):
+        failure = mutant(PAYMENT_PAIRING).fuzz(runs=100, steps=40, seed=0)
+        assert failure.invariant == "stakes_paid_by_staker"
+        assert failure.steps[-1].method in ("reused_payment", "foreign_payment")
+
+    def test_reused_deposit_leaves_the_app_short(self):
+        # One 20 ALGO rewards deposit counted twice is more than the app's house funds
+        steps = [Step("opt_in", 1), Step("reused_payment", 1, target=1, call="stake_rewards", room=1,
+                                         amount=20_000_000)]
+        failure = mutant(PAYMENT_PAIRING, invariants=["app_covers_obligations"]).run_sequence(steps)
+        assert failure.invariant == "app_covers_obligations" and failure.index == 1
+        assert ContractFuzzer().run_sequence(steps) is None
+
+    def test_wait_only_moves_time(self):
+        fuzzer = ContractFuzzer(invariants=["no_negative_balances"])
+        assert fuzzer.run_sequence([Step("wait", 1, seconds=86400), Step("claim", 1)]) is None
+        assert fuzzer.stats == {"claim": [0, 1]}
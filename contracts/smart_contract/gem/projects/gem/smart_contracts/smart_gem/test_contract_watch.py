@@ -0,0 +1,119 @@
+"""
+Tests for watch mode and the contract registry
+Builds throwaway variants written to a temporary source directory
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import contract_registry
+from contract_registry import build_variant
+from contract_watch import ContractWatcher, ImportGraph
+
+PROGRAM = '''from pyteal import *
+{imports}
+
+def approval_program():
+    return {approval}
+
+def clear_state_program():
+    return Approve()
+'''
+
+
+def write_module(directory, name, text):
+    path = directory / f"{name}.py"
+    stamp = os.stat(path).st_mtime_ns + 1_000_000 if path.exists() else None
+    path.write_text(text)
+    if stamp is not None:
+        os.utime(path, ns=(stamp, stamp))  # Same-tick rewrites must still look edited
+
+
+@pytest.fixture
+def variant(tmp_path, monkeypatch):
+    """A module-level variant living outside smart_gem/, like game_contract"""
+    name = f"watched_{tmp_path.name}"
+    write_module(tmp_path, name, PROGRAM.format(imports="", approval="Approve()"))
+    monkeypatch.setitem(contract_registry.VARIANTS, name, {
+        "module": name, "class": None, "prefix": name,
+        "source_dir": str(tmp_path), "artifacts_dir": str(tmp_path),
+    })
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    return tmp_path, name
+
+
+class RecordingWorker:
+    """Stands in for BuildWorker, which runs in a fresh process that cannot see test-only variants"""
+
+    def __init__(self, result=None):
+        self.result = result or {"error": "not built"}
+        self.builds = []
+
+    def build(self, names, stale=(), peephole=False):
+        self.builds.append((list(names), set(stale)))
+        return {name: dict(self.result) for name in names}
+
+    def close(self):
+        pass
+
+
+class TestContractWatch:
+    """Test source directories, import graph rescans and the watch command"""
+
+    def test_build_variant_uses_source_dir(self, variant):
+        _, name = variant
+        approval_teal, clear_teal = build_variant(name)
+        assert approval_teal.startswith("#pragma version 8") and clear_teal.endswith("return")
+
+    def test_new_modules_join_the_graph(self, variant):
+        directory, name = variant
+        graph = ImportGraph([name])
+        write_module(directory, "rules", "from pyteal import *\n\nLIMIT = Int(7)\n")
+        write_module(directory, name, PROGRAM.format(imports="from rules import LIMIT",
+                                                      approval="Return(Txn.fee() <= LIMIT)"))
+        assert graph.scan() == {"rules"}
+        graph.refresh()
+        assert graph.affected(["rules"]) == [name]
+
+    def test_poll_rebuilds_after_adding_a_module(self, variant):
+        directory, name = variant
+        watcher = ContractWatcher([name], write_artifacts=False)
+        watcher.worker.close()
+        watcher.worker = RecordingWorker()
+        write_module(directory, "rules", "from pyteal import *\n\nLIMIT = Int(7)\n")
+        write_module(directory, name, PROGRAM.format(imports="from rules import LIMIT",
+                                                      approval="Return(Txn.fee() <= LIMIT)"))
+        assert watcher.poll() == [name]
+        # The new module is watched from now on: its edits rebuild and reload the variant
+        write_module(directory, "rules", "from pyteal import *\n\nLIMIT = Int(9)\n")
+        assert watcher.poll() == [name]
+        assert watcher.worker.builds[-1] == ([name], {"rules", name})
+        assert watcher.poll() == []
+
+    def test_delta_comes_before_the_source_map(self, variant, capsys):
+        _, name = variant
+        teal = "#pragma version 8\nint 1\nreturn"
+        watcher = ContractWatcher([name], write_artifacts=False)
+        watcher.worker.close()
+        watcher.worker = RecordingWorker({"approval": teal, "clear": teal})
+        watcher.mapper = RecordingWorker({"approval": teal, "clear": teal, "sourcemap": [None] * 3})
+        watcher.rebuild([name], stale={name})
+        assert watcher.mapper.builds == [([name], {name})]
+        output = capsys.readouterr().out
+        assert output.index(f"✅ {name}") < output.index("🗺️  Mapped 1 variant(s)")
+        # Failed builds are not mapped, and neither is anything once maps are off
+        watcher.worker = RecordingWorker()
+        watcher.rebuild([name])
+        watcher.sourcemaps = False
+        watcher.worker = RecordingWorker({"approval": teal, "clear": teal})
+        watcher.rebuild([name])
+        assert len(watcher.mapper.builds) == 1
+
+    def test_watch_command_runs_as_a_package(self):
+        projects_dir = os.path.dirname(os.path.dirname(contract_registry.SMART_GEM_DIR))
+        output = subprocess.run([sys.executable, "-m", "smart_contracts", "watch", "no_such_variant"],
+                                cwd=projects_dir, capture_output=True, text=True, timeout=60)
+        assert "Unknown contract variant(s): no_such_variant" in output.stdout, output.stderr
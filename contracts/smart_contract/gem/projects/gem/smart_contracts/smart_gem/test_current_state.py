@@ -10,6 +10,8 @@ from algosdk import account, mnemonic, encoding
 from algosdk.v2client import algod
 from algosdk.transaction import ApplicationCallTxn
 
+from status_word import decode_global_state
+
 def test_current_state():
     """Test contract functions based on current state"""
     
@@ -67,19 +69,11 @@ def test_current_state():
                 value = state['value']['bytes']
                 print(f"   {key}: {value}")
         
-        # Analyze current state
-        game_state = None
-        total_staked = None
-        paused = None
-        
-        for state in global_state:
-            key = base64.b64decode(state['key']).decode('utf-8')
-            if key == "GAME_STATE":
-                game_state = state['value']['uint']
-            elif key == "TOTAL_STAKED":
-                total_staked = state['value']['uint']
-            elif key == "PAUSED":
-                paused = state['value']['uint']
+        # Analyze current state (a packed STATUS word is unpacked into its fields)
+        state_dict = decode_global_state(global_state)
+        game_state = state_dict.get("GAME_STATE")
+        total_staked = state_dict.get("TOTAL_STAKED")
+        paused = state_dict.get("PAUSED")
         
         print(f"\n🎮 Current Game Status:")
         print(f"   Game State: {game_state} ({'Staked' if game_state == 1 else 'Idle'})")
@@ -0,0 +1,76 @@
+"""
+Tests for the differential harness
+Runs the buildable contract variants side by side on the local evaluator
+"""
+
+import sys
+
+import contract_registry
+import differential_harness
+from differential_harness import METHODS, random_games, run_differential
+
+WIN = (0, 1_000_000, True)
+LOSS = (1, 1_000_000, False)
+
+
+class TestDifferentialHarness:
+    """Test method mapping, divergence detection and build failures"""
+
+    def test_reference_agrees_with_itself(self):
+        report = run_differential(random_games(40, 3, seed=5), ["enhanced_contract"])
+        assert report.divergences == {}
+        outcomes = report.outcomes["enhanced_contract"]
+        assert any(o["result_ok"] for o in outcomes)
+        # Every settled stake leaves its room pot
+        assert all(o["staked"] == 0 for o in outcomes)
+
+    def test_loss_payout_drift_is_reported(self):
+        report = run_differential([WIN, LOSS], ["final_working", "final_contract"])
+        reference = report.outcomes["enhanced_contract"]
+        assert [o["payout"] for o in reference] == [1_100_000, 949_000]
+
+        # final_working keeps no transaction fee on a loss
+        assert (1, "payout", 949_000, 950_000) in report.divergences["final_working"]
+        # final_contract pays the same, but leaves the refunded part of a lost stake in TOTAL_STAKED
+        found = report.divergences["final_contract"]
+        assert [field for _, field, _, _ in found] == ["staked"]
+        assert found[0][0] == 1
+
+    def test_stake_limit_drift_is_reported(self):
+        report = run_differential([(0, 10_000_001, True)], ["final_working"])
+        # final_working has no MAX_STAKE, so it takes (and pays out on) a stake the others reject
+        assert (0, "stake_ok", False, True) in report.divergences["final_working"]
+        assert report.fields_diverging("final_working")["payout"] == 1
+
+    def test_unbuildable_variants_are_listed(self, tmp_path, monkeypatch):
+        # Every registered variant builds now, so register one that does not
+        (tmp_path / "broken_contract.py").write_text("from pyteal import *\n\nstake = Seq([\n    x = Int(1)\n])\n")
+        monkeypatch.setitem(contract_registry.VARIANTS, "broken_contract", {
+            "module": "broken_contract", "class": None, "prefix": "broken_contract",
+            "source_dir": str(tmp_path), "artifacts_dir": str(tmp_path),
+        })
+        monkeypatch.setitem(differential_harness.METHODS, "broken_contract", METHODS["contract"])
+        monkeypatch.setattr(sys, "path", list(sys.path))
+        report = run_differential([WIN], ["broken_contract", "final_working"])
+        assert "SyntaxError" in report.build_errors["broken_contract"]
+        assert "broken_contract" not in report.outcomes
+        assert "final_working" in report.divergences
+
+    def test_legacy_variants_are_compared(self):
+        report = run_differential([WIN, LOSS], ["contract", "runnable_contract", "game_contract"])
+        assert report.build_errors == {}
+        # contract.py pays like the reference, but a lost stake's refund stays in TOTAL_STAKED
+        assert [field for _, field, _, _ in report.divergences["contract"]] == ["staked"]
+        # runnable_contract keeps only the commission on a loss, no transaction fee
+        assert (1, "payout", 949_000, 950_000) in report.divergences["runnable_contract"]
+
+    def test_copies_of_the_legacy_variants_match_them(self):
+        report = run_differential([WIN, LOSS], ["contract", "contract_simple", "runnable_contract", "run_contract",
+                                                "working_simple", "final_contract", "working_contract"])
+        assert report.build_errors == {}
+        # contract_simple is contract.py; run_contract and working_simple are runnable_contract.py
+        assert report.divergences["contract_simple"] == report.divergences["contract"]
+        for name in ("run_contract", "working_simple"):
+            assert report.divergences[name] == report.divergences["runnable_contract"]
+        # working_contract charges the fee on a loss but, like final_contract, leaves the refund staked
+        assert [field for _, field, _, _ in report.divergences["working_contract"]] == ["staked"]
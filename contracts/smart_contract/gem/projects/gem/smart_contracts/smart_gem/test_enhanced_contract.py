@@ -14,13 +14,74 @@ This test suite covers:
 import pytest
 import json
 import os
-from algosdk import account, mnemonic
-from algosdk.transaction import ApplicationCallTxn, PaymentTxn
-from algosdk.v2client import algod
-from pyteal import compileTeal, Mode
+from algosdk import account, mnemonic, transaction
 
 # Import our enhanced contract
-from enhanced_contract import EnhancedGameContract
+from box_layout import decode_room, room_box_min_balance, room_box_name, seat_box_name
+from enhanced_contract import GAME_EMERGENCY, GAME_IDLE, GAME_PAUSED, EnhancedGameContract
+from enhanced_contract_client import EnhancedGameClient, decode_logs
+from game_factory import SHARD_GLOBAL_BYTES, SHARD_GLOBAL_UINTS, SHARD_LOCAL_BYTES, SHARD_LOCAL_UINTS
+from local_evaluator import LedgerState, address_bytes, application_address, evaluate_group, txn_from_algosdk
+from status_word import unpack_status
+
+SP = transaction.SuggestedParams(1000, 1, 1000, "A" * 43 + "=", "localnet-v1", flat_fee=True, min_fee=1000)
+ROOM_ID = 1
+
+
+class LocalGame:
+    """The enhanced contract created, bootstrapped and given one room on the local evaluator"""
+
+    def __init__(self, players=3):
+        self.ledger = LedgerState()
+        _, self.admin = account.generate_account()
+        self.players = [account.generate_account()[1] for _ in range(players)]
+        for address in [self.admin] + self.players:
+            self.ledger.fund(address, 100_000_000)
+        approval, clear = EnhancedGameContract().compile()
+        self.app_id = self.ledger.create_app(self.admin, approval, clear,
+                                             global_schema=(SHARD_GLOBAL_UINTS, SHARD_GLOBAL_BYTES),
+                                             local_schema=(SHARD_LOCAL_UINTS, SHARD_LOCAL_BYTES))
+        self.app_address = application_address(self.app_id)
+        self.ledger.fund(self.app_address, 10_000_000)
+        self.client = EnhancedGameClient(self.app_id)
+        self.require(self.client.bootstrap(SP, self.admin))
+        self.require(self.client.create_room(SP, self.admin, room_box_min_balance(), ROOM_ID))
+
+    def call(self, txns):
+        return evaluate_group(self.ledger, [txn_from_algosdk(txn) for txn in txns])
+
+    def require(self, txns):
+        result = self.call(txns)
+        assert result.ok, result.error
+        return result
+
+    def regroup(self, *txns):
+        """Run txns (taken from other groups) as a new group"""
+        for txn in txns:
+            txn.group = None
+        return self.call(transaction.assign_group_id(list(txns)))
+
+    def stake(self, player, amount=1_000_000):
+        opt_in = not self.ledger.opted_in(player, self.app_id)
+        return self.call(self.client.stake_game(SP, player, amount, ROOM_ID, opt_in=opt_in))
+
+    def settle(self, player, win, sender=None):
+        return self.call(self.client.process_result(SP, sender or self.admin, win, b"seed", player, ROOM_ID))
+
+    def balance(self, address):
+        return self.ledger.balances[address_bytes(address)]
+
+    def status(self):
+        return unpack_status(self.ledger.global_state(self.app_id)[b"STATUS"])
+
+    def room(self):
+        return decode_room(self.ledger.boxes[self.app_id][room_box_name(ROOM_ID)])
+
+
+@pytest.fixture
+def game():
+    return LocalGame()
+
 
 class TestEnhancedContract:
     """Test suite for the enhanced game contract"""
@@ -78,36 +139,37 @@ class TestEnhancedContract:
         assert 'claim_rewards' in method_names
         assert 'toggle_pause' in method_names
     
-    def test_contract_creation(self, compiled_contract):
+    def test_contract_creation(self, game):
         """Test contract creation logic"""
-        approval_teal, clear_teal = compiled_contract
+        state = game.ledger.global_state(game.app_id)
         
-        # Verify creation logic exists
-        assert "global GAME_STATE" in approval_teal
-        assert "global TOTAL_STAKED" in approval_teal
-        assert "global ADMIN_COUNT" in approval_teal
-        assert "global PAUSED" in approval_teal
+        # Pause, emergency and game state start cleared in the STATUS word
+        assert game.status() == {"PAUSED": 0, "EMERGENCY_STOP": 0, "GAME_STATE": 0}
+        assert state[b"COMMISSION_POOL"] == 0 and state[b"LIQUIDITY_POOL"] == 0
+        assert state[b"ADMIN_COUNT"] == 1  # Set by bootstrap
+        assert state[b"ORACLE_ADDR"] == game.ledger.apps[game.app_id].creator
     
-    def test_security_features(self, compiled_contract):
+    def test_security_features(self, game):
         """Test security features are implemented"""
-        approval_teal, clear_teal = compiled_contract
-        
-        # Check for security patterns
-        assert "EMERGENCY_STOP" in approval_teal
-        assert "ADMIN_COUNT" in approval_teal
-        assert "PAUSED" in approval_teal
-        assert "require_admin" in approval_teal or "ADMIN_" in approval_teal
+        # Admin methods are refused to anyone without an admin box
+        assert not game.call(game.client.toggle_pause(SP, game.players[0])).ok
+        assert not game.call(game.client.bootstrap(SP, game.players[0])).ok
+        game.require(game.client.toggle_pause(SP, game.admin))
+        assert game.status()["PAUSED"] == 1
     
-    def test_gaming_functions(self, compiled_contract):
+    def test_gaming_functions(self, game):
         """Test gaming functions are present"""
-        approval_teal, clear_teal = compiled_contract
+        winner, loser = game.players[:2]
+        assert game.stake(winner).ok and game.stake(loser).ok
+        assert (game.room()["players"], game.room()["pot"]) == (2, 2_000_000)
         
-        # Check for gaming logic
-        assert "stake_game" in approval_teal
-        assert "process_result" in approval_teal
-        assert "PLAYER_WINS" in approval_teal
-        assert "PLAYER_LOSSES" in approval_teal
-        assert "BONUS_RATE" in approval_teal
+        balance = game.balance(winner)
+        assert game.settle(winner, 1).ok and game.settle(loser, 0).ok
+        # Stake back plus the 10% bonus
+        assert game.balance(winner) - balance == 1_100_000
+        assert game.ledger.local_state(winner, game.app_id)[b"PLAYER_WINS"] == 1
+        assert game.ledger.local_state(loser, game.app_id)[b"PLAYER_LOSSES"] == 1
+        assert game.room()["players"] == 0 and game.room()["commission"] == 50_000
     
     def test_defi_functions(self, compiled_contract):
         """Test DeFi functions are present"""
@@ -120,14 +182,16 @@ class TestEnhancedContract:
         assert "LIQUIDITY_POOL" in approval_teal
         assert "REWARD_RATE" in approval_teal
     
-    def test_oracle_integration(self, compiled_contract):
+    def test_oracle_integration(self, game):
         """Test oracle integration"""
-        approval_teal, clear_teal = compiled_contract
+        player, oracle = game.players[:2]
+        assert game.stake(player).ok
         
-        # Check for oracle logic
-        assert "ORACLE_ADDRESS" in approval_teal
-        assert "set_oracle" in approval_teal
-        assert "random_seed" in approval_teal
+        # Only the oracle settles; set_oracle hands the role over
+        assert not game.settle(player, 1, sender=oracle).ok
+        game.require(game.client.set_oracle(SP, game.admin, oracle))
+        assert not game.settle(player, 1).ok
+        assert game.settle(player, 1, sender=oracle).ok
     
     def test_event_logging(self, compiled_contract):
         """Test event logging is implemented"""
@@ -149,38 +213,36 @@ class TestEnhancedContract:
         assert "toggle_pause" in approval_teal
         assert "emergency_stop" in approval_teal
     
-    def test_state_management(self, compiled_contract):
+    def test_state_management(self, game):
         """Test state management efficiency"""
-        approval_teal, clear_teal = compiled_contract
-        
-        # Check for efficient state usage
-        assert "global" in approval_teal
-        assert "local" in approval_teal
+        player = game.players[0]
+        assert game.stake(player).ok
         
-        # Verify state keys are properly defined
-        state_keys = [
-            "GAME_STATE", "TOTAL_STAKED", "COMMISSION_POOL",
-            "ADMIN_COUNT", "PAUSED", "LIQUIDITY_POOL"
-        ]
-        for key in state_keys:
-            assert key in approval_teal
+        # Opting in sets every local key; the stake lands in the room box, not in globals
+        local = game.ledger.local_state(player, game.app_id)
+        assert (local[b"PLAYER_STAKE"], local[b"PLAYER_ROOM"], local[b"PLAYER_OPTED_IN"]) == (1_000_000, ROOM_ID, 1)
+        assert b"TOTAL_STAKED" not in game.ledger.global_state(game.app_id)
+        assert game.room()["state"] == 1  # GAME_STAKED
 
 class TestContractIntegration:
     """Integration tests for contract functionality"""
     
-    def test_game_flow(self):
+    def test_game_flow(self, game):
         """Test complete game flow"""
-        # This would test the full game flow in a real environment
-        # For now, we'll test the contract structure
-        contract = EnhancedGameContract()
-        approval_teal, clear_teal = contract.compile()
+        player = game.players[0]
         
-        # Verify game flow components exist
-        assert "stake_game" in approval_teal
-        assert "process_result" in approval_teal
-        assert "GAME_IDLE" in approval_teal
-        assert "GAME_STAKED" in approval_teal
-        assert "GAME_ACTIVE" in approval_teal
+        # Stake, settle, then the creator closes the emptied room and gets the deposit back
+        staked = game.stake(player)
+        assert [name for name, _ in decode_logs(staked.logs)] == ["GAME_STAKE"]
+        settled = game.settle(player, 0)
+        assert [name for name, _ in decode_logs(settled.logs)] == ["GAME_LOSS"]
+        assert game.room()["round"] == 1
+        
+        balance = game.balance(game.admin)
+        game.require(game.client.close_room(SP, game.admin, ROOM_ID))
+        assert room_box_name(ROOM_ID) not in game.ledger.boxes[game.app_id]
+        assert game.balance(game.admin) > balance
+        assert game.ledger.global_state(game.app_id)[b"COMMISSION_POOL"] == 50_000
     
     def test_defi_flow(self):
         """Test DeFi staking and rewards flow"""
@@ -194,30 +256,39 @@ class TestContractIntegration:
         assert "STAKING_PERIOD" in approval_teal
         assert "REWARD_RATE" in approval_teal
     
-    def test_admin_flow(self):
+    def test_admin_flow(self, game):
         """Test admin management flow"""
-        contract = EnhancedGameContract()
-        approval_teal, clear_teal = contract.compile()
+        helper = game.players[0]
         
-        # Verify admin flow components
-        assert "add_admin" in approval_teal
-        assert "remove_admin" in approval_teal
-        assert "MAX_ADMINS" in approval_teal
-        assert "ADMIN_COUNT" in approval_teal
+        game.require(game.client.add_admin(SP, game.admin, helper))
+        assert game.ledger.global_state(game.app_id)[b"ADMIN_COUNT"] == 2
+        game.require(game.client.toggle_pause(SP, helper))
+        game.require(game.client.remove_admin(SP, helper, game.admin))
+        assert not game.call(game.client.toggle_pause(SP, game.admin)).ok
 
 class TestSecurityFeatures:
     """Security-focused tests"""
     
-    def test_emergency_controls(self):
+    def test_emergency_controls(self, game):
         """Test emergency control mechanisms"""
-        contract = EnhancedGameContract()
-        approval_teal, clear_teal = contract.compile()
+        player = game.players[0]
         
-        # Check emergency features
-        assert "EMERGENCY_STOP" in approval_teal
-        assert "emergency_stop" in approval_teal
-        assert "PAUSED" in approval_teal
-        assert "toggle_pause" in approval_teal
+        # A pause blocks player methods until it is toggled back
+        game.require(game.client.toggle_pause(SP, game.admin))
+        assert game.status()["GAME_STATE"] == GAME_PAUSED.value
+        assert not game.stake(player).ok
+        game.require(game.client.toggle_pause(SP, game.admin))
+        assert game.status()["GAME_STATE"] == GAME_IDLE.value
+        assert game.stake(player).ok
+        
+        # An emergency stop is permanent and also closes opt-ins
+        game.require(game.client.emergency_stop(SP, game.admin))
+        assert game.status()["EMERGENCY_STOP"] == 1
+        assert not game.stake(game.players[1]).ok
+        # Pausing and unpausing leaves the emergency state in place
+        game.require(game.client.toggle_pause(SP, game.admin))
+        game.require(game.client.toggle_pause(SP, game.admin))
+        assert game.status() == {"PAUSED": 0, "EMERGENCY_STOP": 1, "GAME_STATE": GAME_EMERGENCY.value}
     
     def test_access_control_security(self):
         """Test access control security"""
@@ -233,16 +304,79 @@ class TestSecurityFeatures:
         for func in admin_functions:
             assert func in approval_teal
     
-    def test_input_validation(self):
+    def test_input_validation(self, game):
         """Test input validation mechanisms"""
-        contract = EnhancedGameContract()
-        approval_teal, clear_teal = contract.compile()
+        player = game.players[0]
         
-        # Check for validation patterns
-        assert "Assert" in approval_teal
-        assert "MIN_STAKE" in approval_teal
-        assert "MAX_STAKE" in approval_teal
-        assert "MAX_PLAYERS_PER_ROUND" in approval_teal
+        # Stakes outside MIN_STAKE..MAX_STAKE, and a second stake, are refused
+        assert not game.stake(player, 100_000 - 1).ok
+        assert not game.stake(player, 10_000_000 + 1).ok
+        assert game.stake(player, 100_000).ok
+        assert not game.stake(player, 100_000).ok
+        # A room id that is already taken cannot be opened again
+        assert not game.call(game.client.create_room(SP, player, room_box_min_balance(), ROOM_ID)).ok
+
+    def test_payments_pair_with_their_call(self, game):
+        """Test that one payment cannot be reused or paid by someone else"""
+        player, other = game.players[:2]
+        deposit, open_two = game.client.create_room(SP, player, room_box_min_balance(), 2)
+        _, open_three = game.client.create_room(SP, player, room_box_min_balance(), 3)
+        assert not game.regroup(deposit, open_two, open_three).ok
+        assert not game.regroup(open_two, deposit).ok
+        
+        # Someone else's payment is not the caller's deposit or stake
+        game.require(game.client.opt_in(SP, player))
+        foreign_deposit, _ = game.client.create_room(SP, other, room_box_min_balance(), 2)
+        foreign_stake, _ = game.client.stake_game(SP, other, 1_000_000, ROOM_ID)
+        _, stake_call = game.client.stake_game(SP, player, 1_000_000, ROOM_ID)
+        _, rewards_call = game.client.stake_rewards(SP, player, 1_000_000)
+        assert not game.regroup(foreign_deposit, open_two).ok
+        assert not game.regroup(foreign_stake, stake_call).ok
+        assert not game.regroup(foreign_stake, rewards_call).ok
+        
+        # Each stake with its own payment, in one group, credits only the first
+        stake_one = game.client.stake_game(SP, player, 1_000_000, ROOM_ID)
+        stake_two = game.client.stake_game(SP, other, 1_000_000, ROOM_ID, opt_in=True)
+        assert not game.regroup(*stake_one, *stake_two).ok
+        assert game.room()["players"] == 0
+    
+    def test_cleared_seat_is_reclaimed(self, game):
+        """Test that a clear-state call whose program fails leaves a seat anyone can reclaim"""
+        player = game.players[0]
+        game.require(game.client.stake_game(SP, player, 1_000_000, ROOM_ID, opt_in=True))
+        
+        # Without box references the clear program fails, but local state is gone regardless
+        game.require([transaction.ApplicationClearStateTxn(player, SP, game.app_id)])
+        assert not game.ledger.opted_in(player, game.app_id)
+        assert (game.room()["players"], game.room()["pot"]) == (1, 1_000_000)
+        assert not game.call(game.client.close_room(SP, game.admin, ROOM_ID)).ok
+        
+        # Rejoining does not hide the old seat: a new stake waits until it is reclaimed
+        game.require(game.client.opt_in(SP, player))
+        assert not game.stake(player).ok
+        
+        balance = game.balance(player)
+        reclaimed = game.require(game.client.reclaim_seat(SP, game.admin, player, ROOM_ID))
+        assert decode_logs(reclaimed.logs) == [("SEAT_RECLAIMED", {"room_id": ROOM_ID, "stake": 1_000_000})]
+        assert game.balance(player) == balance + 1_000_000
+        assert (game.room()["players"], game.room()["pot"]) == (0, 0)
+        assert seat_box_name(player) not in game.ledger.boxes[game.app_id]
+        assert not game.call(game.client.reclaim_seat(SP, game.admin, player, ROOM_ID)).ok
+        game.require(game.client.close_room(SP, game.admin, ROOM_ID))
+    
+    def test_seated_players_keep_their_seat(self, game):
+        """Test that reclaim_seat refuses seats local state still records"""
+        player = game.players[0]
+        assert game.stake(player).ok
+        assert not game.call(game.client.reclaim_seat(SP, game.admin, player, ROOM_ID)).ok
+        
+        # A clear-state call with its box references runs the clear program, which frees the seat
+        clear = transaction.ApplicationClearStateTxn(
+            player, SP, game.app_id, boxes=[(0, room_box_name(ROOM_ID)), (0, seat_box_name(player))])
+        clear.fee = 2 * SP.min_fee  # Covers the refund payment
+        game.require([clear])
+        assert game.room()["players"] == 0
+        assert seat_box_name(player) not in game.ledger.boxes[game.app_id]
 
 class TestGasOptimization:
     """Test gas optimization features"""
@@ -255,23 +389,17 @@ class TestGasOptimization:
         # Check for optimization patterns
         assert "scratch_slots" in str(contract.compile.__code__.co_consts)
         
-        # Verify state keys are efficiently organized
-        state_keys = [
-            "GAME_STATE", "TOTAL_STAKED", "COMMISSION_POOL",
-            "TOTAL_PLAYERS", "GAME_ROUND", "ADMIN_COUNT"
-        ]
-        
-        for key in state_keys:
-            assert key in approval_teal
+        # Guards are shared subroutines, so the program is smaller than with them inlined
+        inlined_teal, _ = EnhancedGameContract(shared_guards=False).compile()
+        assert approval_teal.count("callsub require") > 0
+        assert len(approval_teal.splitlines()) < len(inlined_teal.splitlines())
     
-    def test_minimal_computations(self):
+    def test_minimal_computations(self, game):
         """Test that computations are minimized"""
-        contract = EnhancedGameContract()
-        approval_teal, clear_teal = contract.compile()
-        
-        # Check for efficient patterns
-        assert "Int(" in approval_teal  # Efficient integer operations
-        assert "Bytes(" in approval_teal  # Efficient byte operations
+        # Every player call fits one app call's opcode budget, with room to spare
+        player = game.players[0]
+        for result in (game.stake(player), game.settle(player, 1)):
+            assert result.ok and result.cost < 700
 
 def run_performance_tests():
     """Run performance tests"""
@@ -313,14 +441,14 @@ def run_security_audit():
     approval_teal, clear_teal = contract.compile()
     
     security_checks = {
-        'emergency_stop': 'EMERGENCY_STOP' in approval_teal,
+        'emergency_stop': 'emergency_stop' in approval_teal,
         'admin_controls': 'ADMIN_COUNT' in approval_teal,
-        'pause_mechanism': 'PAUSED' in approval_teal,
-        'input_validation': 'Assert' in approval_teal,
-        'access_control': 'require_admin' in approval_teal or 'ADMIN_' in approval_teal,
+        'pause_mechanism': 'STATUS' in approval_teal,
+        'input_validation': 'assert' in approval_teal,
+        'access_control': 'require_admin' in approval_teal,
         'event_logging': 'log' in approval_teal.lower(),
         'state_management': 'global' in approval_teal and 'local' in approval_teal,
-        'oracle_integration': 'ORACLE_ADDRESS' in approval_teal
+        'oracle_integration': 'ORACLE_ADDR' in approval_teal
     }
     
     passed_checks = sum(security_checks.values())
@@ -0,0 +1,87 @@
+"""
+Tests for pooled inner-transaction fees
+Counts come from the compiled programs; fees are checked on the local TEAL evaluator
+"""
+
+import pytest
+from algosdk import account, transaction
+
+from enhanced_contract import EnhancedGameContract
+from fee_pooling import FeePooler, inner_txn_counts
+from game_factory import MAX_SHARDS, SHARD_ID_BYTES, GameFactoryContract
+from local_evaluator import (
+    LedgerState,
+    application_address,
+    evaluate_group,
+    make_app_call,
+)
+from shard_router import box_refs
+
+
+def suggested_params(fee_per_byte=0):
+    return transaction.SuggestedParams(
+        fee_per_byte, 1, 1000, "A" * 43 + "=", "testnet", flat_fee=False, min_fee=1000
+    )
+
+
+@pytest.fixture(scope="module")
+def factory_pooler():
+    return FeePooler(GameFactoryContract().compile()[0])
+
+
+class TestInnerTxnCounts:
+    """Test worst-case inner transaction counts per method"""
+
+    def test_enhanced_contract(self):
+        counts = inner_txn_counts(EnhancedGameContract().compile()[0])
+        assert counts["stake_game"] == 0
+        assert counts["OptIn"] == 0
+        # Win bonus and loss commission are exclusive paths
+        assert counts["process_result"] == 1
+        assert counts["CloseOut"] == 1
+        assert counts["withdraw_commission"] == 1
+
+    def test_game_factory(self, factory_pooler):
+        assert factory_pooler.inner_count("deploy_shard") == 2
+        assert factory_pooler.inner_count("bootstrap_shard") == 1
+        assert factory_pooler.inner_count("load_program") == 0
+
+
+class TestPooledFees:
+    """Test fees set by FeePooler"""
+
+    def test_pooled_fee_is_exact(self, factory_pooler):
+        ledger = LedgerState()
+        _, operator = account.generate_account()
+        ledger.fund(operator, 100_000_000)
+        approval, clear = GameFactoryContract().compile()
+        app_id = ledger.create_app(operator, approval, clear, global_schema=(1, 1), local_schema=(0, 0))
+        ledger.fund(application_address(app_id), 10_000_000)
+        for name, teal in (("approval", approval), ("clear", clear)):
+            blob = ledger.register_program(teal)
+            load = make_app_call(operator, app_id, ["load_program", name, len(blob), 0, blob],
+                                 Boxes=box_refs(name.encode(), len(blob)))
+            assert evaluate_group(ledger, [load]).ok
+        boxes = ledger.boxes[app_id]
+        refs = (box_refs(b"approval", len(boxes[b"approval"])) + box_refs(b"clear", len(boxes[b"clear"]))
+                + box_refs(b"shards", MAX_SHARDS * SHARD_ID_BYTES))
+
+        fee = factory_pooler.call(suggested_params(), operator, app_id, "deploy_shard").fee
+        assert fee == 3000
+        short = make_app_call(operator, app_id, ["deploy_shard"], fee=fee - 1, Boxes=refs)
+        assert not evaluate_group(ledger, [short]).ok
+        assert evaluate_group(ledger, [make_app_call(operator, app_id, ["deploy_shard"], fee=fee, Boxes=refs)]).ok
+
+    def test_congestion_raises_only_the_outer_share(self, factory_pooler):
+        _, sender = account.generate_account()
+        txn = factory_pooler.call(suggested_params(fee_per_byte=20), sender, 1, "deploy_shard")
+        assert txn.fee == 20 * txn.estimate_size() + 2 * 1000
+
+    def test_group_payer_covers_inner_transactions(self, factory_pooler):
+        _, sender = account.generate_account()
+        sp = suggested_params()
+        payment = transaction.PaymentTxn(sender, sp, sender, 1)
+        call = transaction.ApplicationCallTxn(sender, sp, 1, 0, app_args=[b"deploy_shard"])
+        group = factory_pooler.group(sp, [payment, call], "deploy_shard")
+        assert [txn.fee for txn in group] == [1000, 3000]
+        assert group[0].group == group[1].group
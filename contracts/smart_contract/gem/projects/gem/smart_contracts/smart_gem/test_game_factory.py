@@ -0,0 +1,156 @@
+"""
+Tests for the game factory, sharded enhanced contracts and the shard router
+Runs entirely offline on the local TEAL evaluator
+"""
+
+import pytest
+from algosdk import account
+
+from box_layout import (admin_box_name, admin_box_ref, decode_room, room_box_min_balance, room_box_name,
+                        seat_box_name)
+from enhanced_contract import EnhancedGameContract
+from game_factory import GameFactoryContract
+from local_evaluator import (
+    LedgerState,
+    address_string,
+    application_address,
+    evaluate_group,
+    make_app_call,
+    make_payment,
+)
+from game_factory import MAX_SHARDS, SHARD_ID_BYTES
+from shard_router import ShardRouter, box_refs
+
+
+def call(ledger, *group):
+    return evaluate_group(ledger, list(group))
+
+
+def room_refs(room_id, player=None):
+    return [(0, room_box_name(room_id))] + ([(0, seat_box_name(player))] if player else [])
+
+
+@pytest.fixture
+def factory():
+    """Ledger with a funded factory holding the enhanced contract's programs"""
+    ledger = LedgerState()
+    _, operator = account.generate_account()
+    ledger.fund(operator, 100_000_000)
+    approval, clear = GameFactoryContract().compile()
+    app_id = ledger.create_app(operator, approval, clear, global_schema=(1, 1), local_schema=(0, 0))
+    ledger.fund(application_address(app_id), 10_000_000)
+
+    game_approval, game_clear = EnhancedGameContract().compile()
+    for name, teal in (("approval", game_approval), ("clear", game_clear)):
+        blob = ledger.register_program(teal)
+        result = call(ledger, make_app_call(operator, app_id, ["load_program", name, len(blob), 0, blob],
+                                            Boxes=box_refs(name.encode(), len(blob))))
+        assert result.ok, result.error
+    boxes = ledger.boxes[app_id]
+    deploy_refs = (box_refs(b"approval", len(boxes[b"approval"])) + box_refs(b"clear", len(boxes[b"clear"]))
+                   + box_refs(b"shards", MAX_SHARDS * SHARD_ID_BYTES))
+    return ledger, operator, app_id, deploy_refs
+
+
+def bootstrap(operator, factory_id, shard):
+    return make_app_call(operator, factory_id, ["bootstrap_shard", 0], fee=2000, Applications=[shard],
+                         Boxes=[(0, b"shards"), (1, admin_box_name(operator))])
+
+
+def deploy(ledger, operator, factory_id, deploy_refs):
+    result = call(ledger, make_app_call(operator, factory_id, ["deploy_shard"], fee=3000, Boxes=deploy_refs))
+    assert result.ok, result.error
+    return result.created_apps[0]
+
+
+class TestGameFactory:
+    """Test shard deployment through inner app-create"""
+
+    def test_deploy_registers_shards(self, factory):
+        ledger, operator, factory_id, deploy_refs = factory
+        shards = [deploy(ledger, operator, factory_id, deploy_refs) for _ in range(3)]
+        registry = ledger.boxes[factory_id][b"shards"]
+        assert [int.from_bytes(registry[i * 8:i * 8 + 8], "big") for i in range(3)] == shards
+        assert ledger.global_state(factory_id)[b"SHARD_COUNT"] == 3
+        for shard in shards:
+            assert ledger.apps[shard].creator == application_address(factory_id)
+
+    def test_only_admin_deploys(self, factory):
+        ledger, _, factory_id, deploy_refs = factory
+        _, stranger = account.generate_account()
+        ledger.fund(stranger, 1_000_000)
+        assert not call(ledger, make_app_call(stranger, factory_id, ["deploy_shard"], fee=3000, Boxes=deploy_refs)).ok
+
+    def test_bootstrap_makes_operator_shard_admin(self, factory):
+        ledger, operator, factory_id, deploy_refs = factory
+        shard = deploy(ledger, operator, factory_id, deploy_refs)
+        assert call(ledger, bootstrap(operator, factory_id, shard)).ok
+        assert admin_box_name(operator) in ledger.boxes[shard]
+        assert call(ledger, make_app_call(operator, shard, ["toggle_pause"], Boxes=[admin_box_ref(operator)])).ok
+        # A second bootstrap is rejected by the shard
+        assert not call(ledger, bootstrap(operator, factory_id, shard)).ok
+
+    def test_rooms_on_a_shard(self, factory):
+        ledger, operator, factory_id, deploy_refs = factory
+        shard = deploy(ledger, operator, factory_id, deploy_refs)
+        call(ledger, bootstrap(operator, factory_id, shard))
+        shard_address = application_address(shard)
+        _, player = account.generate_account()
+        ledger.fund(player, 10_000_000)
+
+        assert call(ledger, make_payment(player, shard_address, room_box_min_balance()),
+                    make_app_call(player, shard, ["create_room", 1], Boxes=room_refs(1))).ok
+        assert call(ledger, make_app_call(player, shard, on_complete=1)).ok
+        assert call(ledger, make_payment(player, shard_address, 1_000_000),
+                    make_app_call(player, shard, ["stake_game", 1], Boxes=room_refs(1, player))).ok
+        room = decode_room(ledger.boxes[shard][room_box_name(1)])
+        assert (room["players"], room["pot"]) == (1, 1_000_000)
+
+        # House funds for the win bonus, then the oracle (operator) settles
+        # the player named in accounts[1]
+        ledger.fund(shard_address, 1_000_000)
+        assert call(ledger, make_app_call(operator, shard, ["process_result", 1],
+                                          accounts=[player], fee=2000, Boxes=room_refs(1, player))).ok
+        room = decode_room(ledger.boxes[shard][room_box_name(1)])
+        assert (room["players"], room["pot"], room["round"]) == (0, 0, 1)
+
+    def test_opt_in_and_stake_in_one_group(self, factory):
+        ledger, operator, factory_id, deploy_refs = factory
+        shard = deploy(ledger, operator, factory_id, deploy_refs)
+        call(ledger, bootstrap(operator, factory_id, shard))
+        shard_address = application_address(shard)
+        _, player = account.generate_account()
+        ledger.fund(player, 10_000_000)
+        call(ledger, make_payment(player, shard_address, room_box_min_balance()),
+             make_app_call(player, shard, ["create_room", 1], Boxes=room_refs(1)))
+
+        _, newcomer = account.generate_account()
+        ledger.fund(newcomer, 10_000_000)
+        assert call(ledger, make_payment(newcomer, shard_address, 1_000_000),
+                    make_app_call(newcomer, shard, ["stake_game", 1], on_complete=1, Boxes=room_refs(1, newcomer))).ok
+        assert ledger.local_state(newcomer, shard)[b"PLAYER_STAKE"] == 1_000_000
+        assert decode_room(ledger.boxes[shard][room_box_name(1)])["players"] == 1
+
+
+class TestShardRouter:
+    """Test address-hash routing"""
+
+    def test_routing_is_stable_and_spread(self):
+        players = [account.generate_account()[1] for _ in range(600)]
+        router = ShardRouter([1001, 1002, 1003])
+        assert [router.app_for(p) for p in players] == [router.app_for(p) for p in players]
+        counts = {app_id: len(batch) for app_id, batch in router.partition(players).items()}
+        assert min(counts.values()) > 120
+
+    def test_adding_a_shard_only_moves_players_onto_it(self):
+        players = [account.generate_account()[1] for _ in range(300)]
+        before = ShardRouter([1001, 1002, 1003])
+        after = ShardRouter([1001, 1002, 1003, 1004])
+        for player in players:
+            if before.app_for(player) != after.app_for(player):
+                assert after.app_for(player) == 1004
+
+    def test_app_address_matches_ledger(self):
+        _, player = account.generate_account()
+        router = ShardRouter([1001, 1002])
+        assert router.app_address_for(player) == address_string(application_address(router.app_for(player)))
@@ -0,0 +1,69 @@
+"""
+Tests for the load generator
+Drives small profiles at the local stand-in network
+"""
+
+from algosdk import account
+
+from load_generator import LoadGenerator, _programs, load_profile
+from local_network import LocalAlgodClient, deploy_game
+
+PROFILE = {
+    "players": 24,
+    "games_per_player": 2,
+    "play_rounds": {"min": 0, "max": 2},
+    "claim_probability": 0.5,
+    "concurrency": 8,
+    "sample_seconds": 0.05,
+}
+
+
+def run(profile, variant=None):
+    """LoadGenerator summary of profile against a freshly deployed variant"""
+    profile = load_profile(profile)
+    algod_client = LocalAlgodClient()
+    admin_key, admin = account.generate_account()
+    algod_client.fund(admin, 10 ** 10)
+    app_id = deploy_game(algod_client, admin_key, funding=100_000_000,
+                         programs=_programs(variant) if variant else None)
+    players = []
+    for _ in range(profile["players"]):
+        key, address = account.generate_account()
+        algod_client.fund(address, profile["player_funding"])
+        players.append((address, key))
+    generator = LoadGenerator(algod_client, app_id, admin_key, players, profile)
+    generator.run()
+    return generator.summary()
+
+
+class TestLoadGenerator:
+    """Test the behaviour model, the per-method report and variant runs"""
+
+    def test_every_game_is_staked_and_settled(self):
+        summary = run(PROFILE)
+        methods = summary["methods"]
+        assert summary["assertions_passed"]
+        assert summary["failed"] == 0
+        assert methods["stake_game"]["count"] == methods["process_result"]["count"] == 48
+        assert methods["unstake"]["count"] == 24
+        assert 0 < methods["claim_rewards"]["count"] <= 48
+        assert summary["fees"] == sum(m["fees"] for m in methods.values()) > 0
+        # Rooms are open at the pre-teardown sample and gone by the end
+        assert summary["peak"]["boxes"] > summary["growth"]["boxes"]
+        assert len(summary["samples"]) >= 3
+
+    def test_assert_failures_are_counted_per_method(self):
+        # Below MIN_STAKE: the contract rejects every stake
+        summary = run(dict(PROFILE, stake={"min": 10, "max": 10}, claim_probability=0))
+        stakes = summary["methods"]["stake_game"]
+        assert stakes["count"] == 0
+        assert stakes["failed_asserts"] == stakes["failed"] == 24
+        assert stakes["assert_rate"] == 1.0
+        assert summary["methods"]["process_result"]["count"] == 0
+
+    def test_same_profile_runs_on_each_variant(self):
+        shared = run(PROFILE, {"shared_guards": True})
+        inline = run(PROFILE, {"shared_guards": False, "peephole": True})
+        for method in ("stake_game", "process_result", "claim_rewards"):
+            assert shared["methods"][method]["count"] == inline["methods"][method]["count"]
+        assert shared["fees"] == inline["fees"]
@@ -0,0 +1,173 @@
+"""
+Tests for the oracle service
+Settles staked games on the local stand-in network through micro-batches
+"""
+
+import asyncio
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+from algosdk import account
+
+from local_network import LocalAlgodClient, deploy_game
+from oracle_service import OracleService, serve_api
+from parallel_signer import send_signed
+from submission_engine import SubmissionEngine
+from scenario_runner import ScenarioRunner
+
+
+def staked_network(count):
+    """(network, app id, oracle key, player addresses) with count players staked in room 1"""
+    algod_client = LocalAlgodClient()
+    admin_key, admin = account.generate_account()
+    algod_client.fund(admin, 1_000_000_000)
+    app_id = deploy_game(algod_client, admin_key, funding=100_000_000)
+    players = []
+    for _ in range(count):
+        key, address = account.generate_account()
+        algod_client.fund(address, 20_000_000)
+        players.append((address, key))
+    report = ScenarioRunner(algod_client, app_id, admin_key, players,
+                            {"steps": ["stake"], "setup": ["create_room"], "teardown": []}).run()
+    assert report.steps["stake"].summary()["count"] == count
+    return algod_client, app_id, admin_key, [address for address, _ in players]
+
+
+@pytest.fixture
+def network():
+    return staked_network(40)
+
+
+def settle(service):
+    try:
+        asyncio.run(service.run(until_idle=True))
+    finally:
+        service.close()
+
+
+class TestOracleService:
+    """Test batching, splitting failed groups, intake checks and the local API"""
+
+    def test_window_settles_in_full_groups(self, network):
+        algod_client, app_id, oracle_key, players = network
+        service = OracleService(algod_client, app_id, oracle_key)
+        for index, player in enumerate(players):
+            service.submit({"player": player, "room_id": 1, "win": index % 2 == 0, "game_id": 1000 + index})
+        assert service.metrics()["queue_depth"] == 40
+        settle(service)
+        metrics = service.metrics()
+        assert metrics["settled"] == 40 and metrics["queue_depth"] == metrics["in_flight"] == 0
+        assert metrics["windows"] == 1 and metrics["groups"] == 3  # 16 + 16 + 8
+        assert len(service.templates) == 1  # Every call rendered from one settlement template
+        assert metrics["latency"]["count"] == 40 and metrics["latency"]["p95"] > 0
+        for index, player in enumerate(players):
+            state = algod_client.ledger.local_state(player, app_id)
+            assert state[b"PLAYER_STAKE"] == 0
+            assert state[b"PLAYER_WINS" if index % 2 == 0 else b"PLAYER_LOSSES"] == 1
+        assert service.results[1000].status == "settled" and service.results[1000].confirmed_round
+
+    def test_failed_group_is_split_and_retried(self, network):
+        algod_client, app_id, oracle_key, players = network
+        service = OracleService(algod_client, app_id, oracle_key)
+        for player in players[:10]:
+            service.submit({"player": player, "room_id": 1, "win": True})
+        stranger = account.generate_account()[1]  # Never staked, so process_result fails
+        bad = service.submit({"player": stranger, "room_id": 1, "win": False})
+        settle(service)
+        metrics = service.metrics()
+        assert metrics["splits"] == 1 and metrics["windows"] == 2
+        assert metrics["settled"] == 10 and metrics["rejected"] == 1
+        # Preflight catches it before it is sent, and names the failing TEAL line
+        assert bad.status == "rejected" and "(line " in bad.error
+        assert all(algod_client.ledger.local_state(player, app_id)[b"PLAYER_WINS"] == 1 for player in players[:10])
+
+    def test_intake_checks(self, network):
+        algod_client, app_id, oracle_key, players = network
+        service = OracleService(algod_client, app_id, oracle_key)
+        service.submit({"player": players[0], "room_id": 1, "win": True, "game_id": 7})
+        with pytest.raises(ValueError):
+            service.submit({"player": players[0], "room_id": 1, "win": False})
+        with pytest.raises(ValueError):
+            service.submit({"player": players[1], "room_id": 1, "win": False, "game_id": 7})
+        with pytest.raises(ValueError):
+            service.submit({"player": players[1], "win": False})
+        for bad in ({"player": "not-an-address", "room_id": 1, "win": True}, {"player": 5, "room_id": 1, "win": True},
+                    {"player": players[1], "room_id": 1, "win": True, "game_id": [1]}, ["player"]):
+            with pytest.raises(ValueError):
+                service.submit(bad)
+        # A list goes in whole or not at all
+        with pytest.raises(ValueError):
+            service.submit_many([{"player": players[1], "room_id": 1, "win": True},
+                                 {"player": players[1], "room_id": 1, "win": False}])
+        assert service.metrics()["queue_depth"] == 1 and players[1] not in service.players
+
+    def test_unsubmitted_window_is_requeued(self, network):
+        algod_client, app_id, oracle_key, players = network
+        service = OracleService(algod_client, app_id, oracle_key)
+        for player in players[:3]:
+            service.submit({"player": player, "room_id": 1, "win": True})
+        suggested_params = algod_client.suggested_params
+        calls = []
+
+        def unreachable_once():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ConnectionError("algod unreachable")
+            return suggested_params()
+
+        algod_client.suggested_params = unreachable_once
+        settle(service)
+        metrics = service.metrics()
+        assert metrics["windows"] == 2 and metrics["settled"] == 3 and metrics["rejected"] == 0
+
+    def test_landed_groups_are_not_resent(self, network, monkeypatch):
+        algod_client, app_id, oracle_key, players = network
+        service = OracleService(algod_client, app_id, oracle_key)
+        for player in players[:20]:
+            service.submit({"player": player, "room_id": 1, "win": True})
+        run = SubmissionEngine.run
+
+        def breaks_off(engine, groups):
+            # The first group lands, then the connection drops
+            monkeypatch.setattr(SubmissionEngine, "run", run)
+            send_signed(algod_client, groups[0])
+            algod_client.produce_block()
+            raise ConnectionError("connection reset")
+
+        monkeypatch.setattr(SubmissionEngine, "run", breaks_off)
+        settle(service)
+        metrics = service.metrics()
+        assert metrics["windows"] == 2 and metrics["settled"] == 20 and metrics["rejected"] == 0
+        assert all(algod_client.ledger.local_state(player, app_id)[b"PLAYER_WINS"] == 1 for player in players[:20])
+
+    def test_local_api(self, network):
+        algod_client, app_id, oracle_key, players = network
+        service = OracleService(algod_client, app_id, oracle_key)
+        server = serve_api(service, port=0)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            body = json.dumps([{"player": player, "room_id": 1, "win": False} for player in players[:5]]).encode()
+            with urllib.request.urlopen(urllib.request.Request(url + "/results", data=body)) as response:
+                assert response.status == 202
+                assert json.loads(response.read()) == {"accepted": ["r0", "r1", "r2", "r3", "r4"],
+                                                       "queue_depth": 5}
+            for bad in ({}, [1], "x", [], [{"player": players[5], "room_id": 1, "win": True}, {"player": "?"}]):
+                with pytest.raises(urllib.error.HTTPError) as error:
+                    urllib.request.urlopen(urllib.request.Request(url + "/results", data=json.dumps(bad).encode()))
+                assert error.value.code == 400
+            assert service.metrics()["queue_depth"] == 5
+            settle(service)
+            # Automatic ids leave every game id free; game ids sent as text are kept as numbers
+            body = json.dumps({"player": players[5], "room_id": 1, "win": True, "game_id": "3"}).encode()
+            with urllib.request.urlopen(urllib.request.Request(url + "/results", data=body)) as response:
+                assert json.loads(response.read())["accepted"] == [3]
+            settle(service)
+            for result_id in ("r3", "3"):
+                with urllib.request.urlopen(url + "/results/" + result_id) as response:
+                    assert json.loads(response.read())["status"] == "settled"
+            with urllib.request.urlopen(url + "/metrics") as response:
+                assert json.loads(response.read())["settled"] == 6
+        finally:
+            server.shutdown()
@@ -0,0 +1,75 @@
+"""
+Tests for the parallel signer
+Signed bytes from the worker pool must match algosdk's own signing exactly
+"""
+
+import base64
+
+import msgpack
+import pytest
+from algosdk import account, encoding, transaction
+from nacl.signing import VerifyKey
+
+from local_network import LocalAlgodClient
+from parallel_signer import ParallelSigner, encode_unsigned, send_signed
+
+
+def params():
+    return transaction.SuggestedParams(1000, 1, 1000, "A" * 43 + "=", "testnet", flat_fee=True)
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return dict(reversed(account.generate_account()) for _ in range(3))
+
+
+@pytest.fixture(scope="module")
+def signer(keys):
+    # Small chunks so a handful of transactions spans several workers' tasks
+    with ParallelSigner(keys, workers=2, chunk_size=2) as signer:
+        yield signer
+
+
+def expected_bytes(txn, keys):
+    return base64.b64decode(encoding.msgpack_encode(txn.sign(keys[txn.sender])))
+
+
+class TestParallelSigner:
+    """Test signing, grouping, missing keys and sending"""
+
+    def test_signatures_match_algosdk(self, keys, signer):
+        senders = list(keys)
+        txns = [transaction.PaymentTxn(senders[i % 3], params(), senders[(i + 1) % 3], i) for i in range(9)]
+        signed = signer.sign_bytes((txn.sender, encode_unsigned(txn)) for txn in txns)
+        assert signed == [expected_bytes(txn, keys) for txn in txns]
+        for txn, raw in zip(txns, signed):
+            verify = VerifyKey(encoding.decode_address(txn.sender))
+            verify.verify(b"TX" + encode_unsigned(txn), msgpack.unpackb(raw)["sig"])
+
+    def test_groups_keep_their_shape(self, keys, signer):
+        sender = next(iter(keys))
+        groups = [transaction.assign_group_id([transaction.PaymentTxn(sender, params(), sender, amount)
+                                               for amount in range(size)]) for size in (1, 3, 2)]
+        signed = signer.sign_groups(groups)
+        assert [len(group) for group in signed] == [1, 3, 2]
+        assert signed == [[expected_bytes(txn, keys) for txn in group] for group in groups]
+
+    def test_unknown_sender_is_refused(self, signer):
+        _, stranger = account.generate_account()
+        txn = transaction.PaymentTxn(stranger, params(), stranger, 1)
+        with pytest.raises(KeyError):
+            signer.sign_groups([[txn]])
+
+    def test_signed_groups_send(self, keys, signer):
+        algod_client = LocalAlgodClient()
+        sender, receiver = list(keys)[:2]
+        algod_client.fund(sender, 10_000_000)
+        group = transaction.assign_group_id([
+            transaction.PaymentTxn(sender, algod_client.suggested_params(), receiver, amount)
+            for amount in (100_000, 200_000)
+        ])
+        txid = send_signed(algod_client, signer.sign_groups([group])[0])
+        assert txid == group[0].get_txid()
+        algod_client.status_after_block(algod_client.status()["last-round"])
+        assert algod_client.pending_transaction_info(txid)["confirmed-round"]
+        assert algod_client.account_info(receiver)["amount"] == 300_000
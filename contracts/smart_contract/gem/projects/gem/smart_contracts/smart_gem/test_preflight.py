@@ -0,0 +1,127 @@
+"""
+Tests for simulate-first preflight
+Uses the local TEAL evaluator backend
+"""
+
+import base64
+
+import pytest
+from algosdk import account, transaction
+
+from box_layout import admin_box_ref, room_box_min_balance, room_box_name
+from enhanced_contract import EnhancedGameContract
+from local_evaluator import (
+    LedgerState,
+    application_address,
+    evaluate_group,
+    make_app_call,
+    make_payment,
+)
+from local_network import LocalAlgodClient
+from preflight import Preflight, preflight_for
+from stake_groups import stake_group
+
+SP = transaction.SuggestedParams(0, 1, 1000, "A" * 43 + "=", "testnet", min_fee=1000)
+
+
+class SimulatingAlgod:
+    """algod stand-in whose simulate rejects every group at pc 2 of app 5"""
+
+    TEAL = "#pragma version 8\nint 0\nassert\nint 1\nreturn"
+
+    def __init__(self):
+        self.disassembled = 0
+
+    def simulate_transactions(self, request):
+        return {"txn-groups": [{"failure-message": "logic eval error: assert failed pc=2",
+                                "failed-at": [0], "txn-results": [{"txn-result": {}}]}]}
+
+    def application_info(self, app_id):
+        return {"id": app_id, "params": {"approval-program": base64.b64encode(b"\x08\x81\x00\x44").decode()}}
+
+    def disassemble(self, program):
+        self.disassembled += 1
+        return {"result": self.TEAL}
+
+    def compile(self, source, source_map=False):
+        assert source == self.TEAL
+        return {"sourcemap": {"version": 3, "sources": [], "names": [], "mappings": "AAAA;AACA;AACA"}}
+
+
+@pytest.fixture
+def game():
+    """Bootstrapped enhanced contract with room 7 open and a funded player"""
+    ledger = LedgerState()
+    _, admin = account.generate_account()
+    player_key, player = account.generate_account()
+    for address in (admin, player):
+        ledger.fund(address, 100_000_000)
+    approval, clear = EnhancedGameContract().compile()
+    app_id = ledger.create_app(admin, approval, clear, global_schema=(10, 10), local_schema=(11, 8))
+    app_address = application_address(app_id)
+    assert evaluate_group(ledger, [make_payment(admin, app_address, 10_000_000),
+                                   make_app_call(admin, app_id, ["bootstrap"], Boxes=[admin_box_ref(admin)])]).ok
+    assert evaluate_group(ledger, [make_payment(player, app_address, room_box_min_balance()),
+                                   make_app_call(player, app_id, ["create_room", 7],
+                                                 Boxes=[(0, room_box_name(7))])]).ok
+    preflight = Preflight(ledger=ledger, teal_sources={app_id: approval})
+    return preflight, ledger, app_id, player, player_key
+
+
+class TestPreflight:
+    """Test predictions and dropped groups"""
+
+    def test_check_predicts_without_committing(self, game):
+        preflight, ledger, app_id, player, _ = game
+        result = preflight.check(stake_group(SP, player, app_id, 1_000_000, 7, opt_in=True))
+        assert result.ok
+        assert result.logs[0].startswith(b"GAME_STAKE")
+        assert result.deltas["local"][(player, app_id)][b"PLAYER_STAKE"] == 1_000_000
+        assert room_box_name(7) in result.deltas["boxes"][app_id]
+        assert not ledger.opted_in(player, app_id)
+
+    def test_failing_assert_is_located(self, game):
+        preflight, _, app_id, player, _ = game
+        result = preflight.check(stake_group(SP, player, app_id, 10, 7, opt_in=True))
+        assert not result.ok
+        assert result.failed_index == 1
+        assert result.failed_app == app_id
+        assert result.failed_source == "assert"
+
+    def test_send_drops_doomed_groups(self, game):
+        preflight, ledger, app_id, player, player_key = game
+        doomed = [txn.sign(player_key) for txn in stake_group(SP, player, app_id, 10, 7, opt_in=True)]
+        txid, result = preflight.send(doomed)
+        assert txid is None and not result.ok
+        assert not ledger.opted_in(player, app_id)
+
+        good = [txn.sign(player_key) for txn in stake_group(SP, player, app_id, 1_000_000, 7, opt_in=True)]
+        txid, result = preflight.send(good)
+        assert txid == good[0].get_txid()
+        assert ledger.local_state(player, app_id)[b"PLAYER_STAKE"] == 1_000_000
+
+    def test_local_network_checks_on_its_ledger(self, game):
+        _, ledger, app_id, player, player_key = game
+        algod_client = LocalAlgodClient(ledger)
+        preflight = preflight_for(algod_client)
+        assert preflight.ledger is ledger
+        doomed = preflight.check(stake_group(SP, player, app_id, 10, 7, opt_in=True))
+        assert not doomed.ok and doomed.reason().endswith(": assert)")
+
+        # Sends still go through the client, so they confirm like any other
+        good = [txn.sign(player_key) for txn in stake_group(SP, player, app_id, 1_000_000, 7, opt_in=True)]
+        txid, result = preflight.send(good)
+        assert result.ok and txid == good[0].get_txid()
+        assert txid in algod_client.pending
+
+    def test_algod_failures_load_the_program(self):
+        algod_client = SimulatingAlgod()
+        preflight = preflight_for(algod_client)
+        call = transaction.ApplicationCallTxn(account.generate_account()[1], SP, 5, transaction.OnComplete.NoOpOC)
+        for _ in range(2):
+            result = preflight.check([call])
+            assert (result.failed_app, result.failed_pc, result.failed_line) == (5, 2, 3)
+            assert result.failed_source == "assert"
+        # The program is fetched once and then kept
+        assert algod_client.disassembled == 1
+        assert not preflight_for(SimulatingAlgod(), load_sources=False).check([call]).failed_line
@@ -0,0 +1,199 @@
+"""
+Tests for the push gateway
+Pushes a scenario on the local stand-in network to fake front-end clients
+"""
+
+import asyncio
+import json
+
+import pytest
+from algosdk import account
+
+from block_follower import RoundDeltas, fetch_block, round_deltas
+from local_network import LocalAlgodClient, deploy_game
+from push_gateway import PushGateway, diff_views, is_nft, player_view
+from scenario_runner import ScenarioRunner
+
+
+@pytest.fixture(scope="module")
+def pushed():
+    """Two clients watching overlapping players, one that never reads, through a full scenario"""
+    algod_client = LocalAlgodClient()
+    admin_key, admin = account.generate_account()
+    algod_client.fund(admin, 1_000_000_000)
+    app_id = deploy_game(algod_client, admin_key, funding=100_000_000)
+    players = []
+    for _ in range(7):
+        key, address = account.generate_account()
+        algod_client.fund(address, 20_000_000)
+        players.append((address, key))
+    addresses = [address for address, _ in players]
+    idle = addresses[6]  # Watched, but sits the scenario out
+    received = {"a": [], "b": [], "stuck": []}
+
+    async def collect(name, text):
+        received[name].append(json.loads(text))
+
+    async def stuck(text):
+        await asyncio.Event().wait()
+
+    async def main():
+        gateway = PushGateway(algod_client, app_id, queue_size=2)
+        a = gateway.connect(lambda text: collect("a", text))
+        b = gateway.connect(lambda text: collect("b", text))
+        slow = gateway.connect(stuck)
+        await gateway.handle(a, json.dumps({"subscribe": addresses[:4] + [idle]}))
+        await gateway.handle(b, json.dumps({"subscribe": addresses[2:6]}))
+        await gateway.handle(slow, json.dumps({"subscribe": addresses}))
+        reads = gateway.account_reads
+        # The scenario runs in its own thread while the gateway keeps catching up with the tip
+        runner = ScenarioRunner(algod_client, app_id, admin_key, players[:6], {"concurrency": 4})
+        scenario = asyncio.ensure_future(asyncio.to_thread(runner.run))
+        while not scenario.done():
+            await gateway.run(stop_round=algod_client.status()["last-round"])
+            await asyncio.sleep(0.01)
+        report = await scenario
+        assert report.passed, report.failed_assertions
+        await gateway.run(stop_round=algod_client.status()["last-round"])
+        await a.flush()
+        await b.flush()
+        return gateway, reads
+
+    gateway, reads = asyncio.run(main())
+    return algod_client, app_id, addresses, idle, gateway, reads, received
+
+
+class TestPushGateway:
+    """Test coalescing, targeted reads, slow clients and player views"""
+
+    def test_updates_rebuild_each_players_view(self, pushed):
+        algod_client, app_id, addresses, idle, gateway, reads, received = pushed
+        for name, watched in (("a", addresses[:4] + [idle]), ("b", addresses[2:6])):
+            snapshot, *rounds = received[name]
+            assert snapshot["type"] == "snapshot" and set(snapshot["players"]) == set(watched)
+            # One message per round, each holding only this client's players
+            assert [m["round"] for m in rounds] == list(range(rounds[0]["round"], rounds[-1]["round"] + 1))
+            assert len(rounds) == gateway.rounds
+            views = snapshot["players"]
+            for message in rounds:
+                assert set(message["updates"]) <= set(watched)
+                for address, changes in message["updates"].items():
+                    views[address].update(changes)
+            for address in watched:
+                assert views[address] == player_view(algod_client.account_info(address), app_id)
+            assert views[addresses[2]]["wins"] + views[addresses[2]]["losses"] == 1
+
+    def test_only_touched_subscribers_are_read(self, pushed):
+        algod_client, app_id, addresses, idle, gateway, reads, received = pushed
+        assert reads == 7  # The initial snapshots, shared between clients
+        assert not any(idle in m.get("updates", {}) for m in received["a"][1:])
+        assert gateway.follower.blocks_read == gateway.rounds
+        # Each round reads only the watched players it touched, once however many clients watch them
+        expected = 0
+        for round_num in range(gateway.follower.round - gateway.rounds, gateway.follower.round):
+            deltas = round_deltas(fetch_block(algod_client, round_num), {app_id})
+            expected += len(deltas.addresses & set(addresses))
+        assert gateway.account_reads - reads == expected < gateway.rounds * len(addresses)
+        assert any(m["game"] for m in received["a"][1:])
+
+    def test_stuck_client_is_dropped(self, pushed):
+        algod_client, app_id, addresses, idle, gateway, reads, received = pushed
+        assert gateway.dropped == 1 and len(gateway.clients) == 2
+        assert received["stuck"] == []
+        assert set(gateway.watchers) == set(addresses)
+        assert gateway.watchers[addresses[2]] == 2
+
+    def test_bad_messages_and_dropped_clients(self):
+        algod_client = LocalAlgodClient()
+        admin_key, admin = account.generate_account()
+        algod_client.fund(admin, 100_000_000)
+        app_id = deploy_game(algod_client, admin_key)
+        _, player = account.generate_account()
+        replies, closed = [], []
+
+        async def reply(text):
+            replies.append(json.loads(text))
+
+        async def stuck(text):
+            await asyncio.Event().wait()
+
+        async def close():
+            closed.append(True)
+
+        async def main():
+            gateway = PushGateway(algod_client, app_id, queue_size=1)
+            client = gateway.connect(reply)
+            for text in ("[1, 2]", json.dumps({"subscribe": player}), json.dumps({"unsubscribe": [7]}),
+                         json.dumps({"subscribe": [player, "NOTANADDRESS"]})):
+                await gateway.handle(client, text)
+                await client.flush()
+
+            slow = gateway.connect(stuck, close)
+            await gateway.handle(slow, json.dumps({"subscribe": [player]}))  # Stuck sending this one
+            await asyncio.sleep(0)
+            await gateway.handle(slow, json.dumps({"subscribe": [admin]}))  # Fills its queue
+            assert not slow.closed
+            await gateway.handle(slow, json.dumps({"subscribe": [account.generate_account()[1]]}))
+            assert slow.closed
+            await gateway.handle(slow, json.dumps({"subscribe": [player]}))  # Ignored once dropped
+            await asyncio.sleep(0)
+            return gateway
+
+        gateway = asyncio.run(main())
+        assert [reply["error"] for reply in replies] == ["messages must be JSON objects",
+                                                          "subscribe must be a list of addresses",
+                                                          "unsubscribe must be a list of addresses",
+                                                          "not an address: NOTANADDRESS"]
+        assert gateway.dropped == 1 and closed == [True]
+        assert gateway.watchers == {} and gateway.views == {}
+
+    def test_account_read_errors_stay_with_their_player(self):
+        algod_client = LocalAlgodClient()
+        admin_key, admin = account.generate_account()
+        algod_client.fund(admin, 100_000_000)
+        app_id = deploy_game(algod_client, admin_key)
+        _, other = account.generate_account()
+        _, stranger = account.generate_account()
+        algod_client.fund(other, 1_000_000)
+        received = []
+
+        async def collect(text):
+            received.append(json.loads(text))
+
+        async def main():
+            gateway = PushGateway(algod_client, app_id)
+            client = gateway.connect(collect)
+            await gateway.handle(client, json.dumps({"subscribe": [admin, other]}))
+            account_info = algod_client.account_info
+
+            def flaky_account_info(address):
+                if address in (admin, stranger):
+                    raise TimeoutError("timed out")
+                return account_info(address)
+
+            algod_client.account_info = flaky_account_info
+            algod_client.fund(admin, 1)
+            algod_client.fund(other, 1)
+            await gateway.publish(RoundDeltas(5, 0, [], {admin, other}))
+            await client.flush()
+
+            # A failed read while subscribing is answered with an error, not raised
+            other_client = gateway.connect(collect)
+            await gateway.handle(other_client, json.dumps({"subscribe": [stranger]}))
+            await other_client.flush()
+            return gateway
+
+        gateway = asyncio.run(main())
+        assert received[-1]["type"] == "error" and "timed out" in received[-1]["error"]
+        assert received[-2]["updates"] == {other: {"balance": 1_000_001}}
+        assert gateway.read_errors == 2
+
+    def test_views_report_new_nfts(self):
+        before = player_view({"amount": 5_000_000, "assets": [{"asset-id": 10, "amount": 40}]}, 1, ledger_coin_id=10)
+        after = player_view({"amount": 4_998_000, "assets": [{"asset-id": 10, "amount": 45},
+                                                             {"asset-id": 77, "amount": 1}]}, 1, ledger_coin_id=10)
+        assert not before["opted_in"] and before["stake"] == 0
+        changes = diff_views(before, after)
+        assert changes == {"balance": 4_998_000, "ledger_coins": 45, "assets": {"10": 45, "77": 1}, "received": [77]}
+        assert is_nft({"total": 1, "decimals": 0}) and is_nft({"total": 100, "decimals": 2})
+        assert not is_nft({"total": 10_000_000, "decimals": 6 - 1})
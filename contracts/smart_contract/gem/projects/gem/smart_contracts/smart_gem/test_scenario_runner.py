@@ -0,0 +1,54 @@
+"""
+Tests for the async scenario runner
+Runs scenarios against the local stand-in network
+"""
+
+import pytest
+from algosdk import account
+
+from local_network import LocalAlgodClient, deploy_game
+from scenario_runner import ScenarioRunner, load_scenario
+
+
+@pytest.fixture
+def network():
+    """Local network with the enhanced contract deployed and 30 funded players"""
+    algod_client = LocalAlgodClient()
+    admin_key, admin = account.generate_account()
+    algod_client.fund(admin, 1_000_000_000)
+    app_id = deploy_game(algod_client, admin_key, funding=100_000_000)
+    players = []
+    for _ in range(30):
+        key, address = account.generate_account()
+        algod_client.fund(address, 20_000_000)
+        players.append((address, key))
+    return algod_client, app_id, admin_key, players
+
+
+class TestScenarioRunner:
+    """Test full flows and the final-state assertions"""
+
+    def test_full_flow_across_rooms(self, network):
+        algod_client, app_id, admin_key, players = network
+        report = ScenarioRunner(algod_client, app_id, admin_key, players,
+                                {"players_per_room": 12, "concurrency": 8}).run()
+        assert report.passed, report.failed_assertions
+        assert report.steps["stake"].summary()["count"] == 30
+        assert report.steps["close_room"].summary()["count"] == 3
+        assert any(name == "COMMISSION_POOL" and actual > 0 for name, _, actual in report.assertions)
+
+    def test_failed_steps_are_reported(self, network):
+        algod_client, app_id, admin_key, players = network
+        # Below MIN_STAKE: every stake is rejected, so nothing reaches the rooms
+        report = ScenarioRunner(algod_client, app_id, admin_key, players,
+                                {"stake": 10, "steps": ["stake", "settle"]}).run()
+        assert not report.passed
+        assert report.steps["stake"].failed == 30
+        # Preflight turns the stakes away before they are sent, at the failing line
+        assert all("(line " in message for message in report.steps["stake"].failures)
+        assert report.steps["settle"].summary()["count"] == 0
+        assert not report.failed_assertions
+
+    def test_unknown_step_is_rejected(self):
+        with pytest.raises(ValueError):
+            load_scenario({"steps": ["stake", "withdraw"]})
@@ -0,0 +1,90 @@
+"""
+Tests for state snapshots
+Snapshots the local stand-in network and dry-runs admin actions on the copy
+"""
+
+import pytest
+from algosdk import account
+
+from local_evaluator import address_bytes
+from local_network import LocalAlgodClient, LocalIndexerClient, deploy_game
+from scenario_runner import ScenarioRunner
+from state_snapshot import DryRun, load_ledger, read_snapshot, take_snapshot, write_snapshot
+
+STAKE = 1_000_000
+
+
+def funded_players(algod_client, count):
+    players = []
+    for _ in range(count):
+        key, address = account.generate_account()
+        algod_client.fund(address, 20_000_000)
+        players.append((address, key))
+    return players
+
+
+@pytest.fixture(scope="module")
+def network():
+    """Six settled games in a closed room (commission in the pool) and four stakes still waiting"""
+    algod_client = LocalAlgodClient()
+    admin_key, admin = account.generate_account()
+    algod_client.fund(admin, 1_000_000_000)
+    app_id = deploy_game(algod_client, admin_key, funding=100_000_000)
+    settled = ScenarioRunner(algod_client, app_id, admin_key, funded_players(algod_client, 6),
+                             {"steps": ["stake", "settle"], "setup": ["create_room"]}).run()
+    waiting = funded_players(algod_client, 4)
+    staked = ScenarioRunner(algod_client, app_id, admin_key, waiting,
+                            {"room_id": 9, "steps": ["stake"], "setup": ["create_room"], "teardown": []}).run()
+    assert settled.passed and staked.steps["stake"].summary()["count"] == 4
+    snapshot = take_snapshot(algod_client, app_id, LocalIndexerClient(algod_client))
+    return algod_client, app_id, admin, waiting, snapshot
+
+
+class TestStateSnapshot:
+    """Test snapshot contents, the file format and dry runs"""
+
+    def test_snapshot_matches_the_network(self, network, tmp_path):
+        algod_client, app_id, admin, waiting, snapshot = network
+        assert snapshot["consistent"] and snapshot["round"] == algod_client.status()["last-round"]
+        assert len(snapshot["locals"]) == 10
+        assert [name[:4] for name in snapshot["boxes"]].count(b"room") == 1
+        assert snapshot["globals"][b"COMMISSION_POOL"] > 0
+
+        path = tmp_path / "snapshot.bin"
+        write_snapshot(path, snapshot)
+        assert read_snapshot(path) == snapshot
+        ledger = load_ledger(read_snapshot(path))
+        assert all(algod_client.ledger.balances[address] == amount for address, amount in ledger.balances.items())
+        assert address_bytes(admin) in ledger.balances
+        assert ledger.local_state(waiting[0][0], app_id)[b"PLAYER_STAKE"] == STAKE
+
+    def test_mass_refund_returns_every_stake(self, network):
+        algod_client, app_id, admin, waiting, snapshot = network
+        before = dict(algod_client.ledger.balances)
+        report = DryRun(snapshot).mass_refund()
+        assert report["ok"] and report["accepted"] == report["groups"] == 4
+        assert report["payouts"] == {address: STAKE - 2000 for address, _ in waiting}
+        assert report["app_balance"][0] - report["app_balance"][1] == 4 * STAKE
+        # Nothing reached the network
+        assert algod_client.ledger.balances == before
+
+    def test_admin_actions_run_offline(self, network):
+        algod_client, app_id, admin, waiting, snapshot = network
+        run = DryRun(snapshot)
+        assert run.admins == [admin]
+        commission = snapshot["globals"][b"COMMISSION_POOL"]
+        report = run.withdraw_commission()
+        assert report["ok"] and report["global_changes"]["COMMISSION_POOL"] == (commission, 0)
+        assert report["payouts"][admin] == commission - 2000
+
+        report = run.update_config(2_000_000, 5_000_000)
+        assert report["ok"]
+        assert report["global_changes"]["MIN_STAKE"][1] == 2_000_000
+        # Each run starts again from the snapshot
+        assert run.ledger.global_state(app_id)[b"COMMISSION_POOL"] == commission
+
+    def test_non_admin_is_rejected(self, network):
+        algod_client, app_id, admin, waiting, snapshot = network
+        report = DryRun(snapshot).update_config(2_000_000, 5_000_000, admin=waiting[0][0])
+        assert not report["ok"] and report["accepted"] == 0
+        assert address_bytes(waiting[0][0]) in snapshot["locals"]
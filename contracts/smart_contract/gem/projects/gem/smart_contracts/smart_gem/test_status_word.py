@@ -0,0 +1,69 @@
+"""
+Tests for the packed status word
+Checks the off-chain pack/unpack helpers against each other and against the contract's own
+"""
+
+import base64
+
+import pytest
+from pyteal import Approve, Int, Itob, Log, Mode, Seq, compileTeal
+
+import status_word
+from enhanced_contract import status_game_state, status_halted, status_with_game_state
+from local_evaluator import evaluate_program, make_app_call
+from status_word import describe_status, decode_global_state, pack_status, unpack_status
+
+
+def uint_entry(key, value):
+    return {"key": base64.b64encode(key.encode()).decode(), "value": {"type": 2, "uint": value}}
+
+
+def bytes_entry(key, value):
+    return {"key": base64.b64encode(key.encode()).decode(), "value": {"type": 1, "bytes": value}}
+
+
+class TestStatusWord:
+    """Test encoding, decoding and the contract-side field helpers"""
+
+    def test_pack_and_unpack_round_trip(self):
+        for paused, emergency, game_state in [(0, 0, 0), (1, 0, 4), (0, 1, 5), (1, 1, 0xFF)]:
+            status = pack_status(paused, emergency, game_state)
+            assert unpack_status(status) == {"PAUSED": paused, "EMERGENCY_STOP": emergency,
+                                             "GAME_STATE": game_state}
+            assert status < 2 ** 16
+        assert pack_status(paused=1) & status_word.HALTED_MASK == status_word.PAUSED_BIT
+        with pytest.raises(ValueError):
+            pack_status(game_state=0x100)
+
+    def test_decode_global_state_unpacks_status(self):
+        status = pack_status(paused=1, game_state=4)
+        state = decode_global_state([
+            uint_entry("STATUS", status),
+            uint_entry("COMMISSION_POOL", 50_000),
+            bytes_entry("ORACLE_ADDR", "AAAA"),
+            {"key": base64.b64encode(b"EMPTY").decode(), "value": {"type": 2}},
+        ])
+        assert state["STATUS"] == status and state["COMMISSION_POOL"] == 50_000
+        assert state["ORACLE_ADDR"] == "AAAA" and state["EMPTY"] == 0
+        assert (state["PAUSED"], state["EMERGENCY_STOP"], state["GAME_STATE"]) == (1, 0, 4)
+        # Old deployments without STATUS decode as they always did
+        assert decode_global_state([uint_entry("PAUSED", 1)]) == {"PAUSED": 1}
+
+    def test_describe_status(self):
+        assert describe_status(pack_status()) == "Idle"
+        assert describe_status(pack_status(paused=1, game_state=4)) == "Paused [PAUSED]"
+        assert describe_status(pack_status(1, 1, 9)) == "Unknown [PAUSED, EMERGENCY_STOP]"
+
+    def test_contract_helpers_match_the_layout(self):
+        status = pack_status(paused=1, emergency=1, game_state=5)
+        program = compileTeal(Seq(
+            Log(Itob(status_halted(Int(status)))),
+            Log(Itob(status_game_state(Int(status)))),
+            Log(Itob(status_with_game_state(Int(status), Int(4)))),
+            Approve(),
+        ), mode=Mode.Application, version=8)
+        result = evaluate_program(program, [make_app_call(bytes(32), 1)])
+        assert result.approved, result.error
+        halted, game_state, replaced = [int.from_bytes(log, "big") for log in result.logs]
+        assert halted == status_word.HALTED_MASK and game_state == 5
+        assert unpack_status(replaced) == dict(unpack_status(status), GAME_STATE=4)
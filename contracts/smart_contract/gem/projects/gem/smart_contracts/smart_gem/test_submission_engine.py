@@ -0,0 +1,146 @@
+"""
+Tests for the submission engine
+Submits payment groups to the local stand-in network, with failures injected
+"""
+
+import urllib.error
+
+import pytest
+from algosdk import account, transaction
+from algosdk.error import AlgodHTTPError
+
+import submission_engine
+from local_network import LocalAlgodClient
+from submission_engine import SubmissionEngine, is_transient
+
+
+class FlakyAlgod(LocalAlgodClient):
+    """Raises the queued errors from send_transactions before sending for real"""
+
+    def __init__(self, errors=()):
+        super().__init__()
+        self.errors = list(errors)
+        self.sends = 0
+
+    def send_transactions(self, txns):
+        self.sends += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().send_transactions(txns)
+
+
+class StallingAlgod(LocalAlgodClient):
+    """Accepts groups into the pool but never puts them in a block"""
+
+    def send_transactions(self, txns):
+        txid = super().send_transactions(txns)
+        self.unconfirmed, self.block_txns = [], []
+        return txid
+
+
+class LossyAlgod(LocalAlgodClient):
+    """Serves no blocks at all, as if they were pruned or corrupt"""
+
+    def block_info(self, *args, **kwargs):
+        raise AlgodHTTPError("failed to decode block", 400)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(submission_engine, "RETRY_BACKOFF", 0)
+
+
+def payments(algod_client, count, lifetime=None):
+    """(sender key, count single-payment groups) from a funded account"""
+    key, sender = account.generate_account()
+    algod_client.fund(sender, 100_000_000)
+    sp = algod_client.suggested_params()
+    if lifetime is not None:
+        sp.last = sp.first + lifetime
+    return key, [[transaction.PaymentTxn(sender, sp, sender, 0, note=bytes([i]))] for i in range(count)]
+
+
+class TestSubmissionEngine:
+    """Test retry classification, expiry and keeping the window full"""
+
+    def test_transient_errors_are_retried(self):
+        assert is_transient(AlgodHTTPError("busy", 503)) and is_transient(AlgodHTTPError("slow down", 429))
+        assert is_transient(urllib.error.URLError("connection refused"))
+        assert is_transient(AlgodHTTPError("TransactionPool.Remember: transaction pool is full", 400))
+        assert not is_transient(AlgodHTTPError("logic eval error: assert failed", 400))
+
+        algod_client = FlakyAlgod([AlgodHTTPError("busy", 503)])
+        key, groups = payments(algod_client, 1)
+        broke_key, broke = account.generate_account()  # Never funded, so the network rejects it
+        groups.append([transaction.PaymentTxn(broke, algod_client.suggested_params(), broke, 1)])
+        engine = SubmissionEngine(algod_client, {groups[0][0].sender: key, broke: broke_key}, window=1)
+        first, second = engine.run(groups)
+        assert (first.status, first.attempts) == ("confirmed", 2)
+        # A rejection is final: the group is never resent
+        assert (second.status, second.attempts) == ("failed", 1)
+        assert "overspend" in second.error
+        assert engine.stats.retries == 1 and algod_client.sends == 3
+
+    def test_backoff_does_not_hold_up_other_groups(self, monkeypatch):
+        monkeypatch.setattr(submission_engine, "RETRY_BACKOFF", 0.05)
+        algod_client = FlakyAlgod([AlgodHTTPError("busy", 503)])
+        key, groups = payments(algod_client, 2)
+        first, second = SubmissionEngine(algod_client, key, window=2).run(groups)
+        assert first.status == second.status == "confirmed"
+        # The second group went out and confirmed while the first waited for its retry
+        assert second.confirmed_round < first.confirmed_round
+
+    def test_retries_run_out(self):
+        algod_client = FlakyAlgod([TimeoutError("timed out")] * 5)
+        key, groups = payments(algod_client, 1)
+        ticket, = SubmissionEngine(algod_client, key, max_retries=2).run(groups)
+        assert (ticket.status, ticket.attempts) == ("failed", 3)
+        assert algod_client.sends == 3
+
+    def test_groups_expire_after_last_valid(self):
+        algod_client = StallingAlgod()
+        key, groups = payments(algod_client, 2, lifetime=3)
+        engine = SubmissionEngine(algod_client, key)
+        tickets = engine.run(groups)
+        last_valid = groups[0][0].last_valid_round
+        assert [ticket.status for ticket in tickets] == ["failed", "failed"]
+        assert tickets[0].error == f"expired after round {last_valid}"
+        # Block last_valid is the last one they could have landed in
+        assert algod_client.status()["last-round"] == last_valid
+        assert engine.stats.rounds == 4  # first_valid through last_valid
+
+    def test_groups_already_on_chain_are_confirmed(self):
+        algod_client = LocalAlgodClient()
+        key, groups = payments(algod_client, 2)
+        # The first group went out earlier, but its reply was lost
+        algod_client.send_transactions([txn.sign(key) for txn in groups[0]])
+        landed = algod_client.produce_block()
+        first, second = SubmissionEngine(algod_client, key).run(groups)
+        assert (first.status, first.confirmed_round) == ("confirmed", landed)
+        assert second.status == "confirmed" and second.confirmed_round > landed
+
+    def test_unreadable_blocks_fall_back_to_lookups(self):
+        algod_client = LossyAlgod()
+        key, groups = payments(algod_client, 3)
+        tickets = SubmissionEngine(algod_client, key).run(groups)
+        assert [ticket.status for ticket in tickets] == ["confirmed"] * 3
+
+    def test_window_refills_as_groups_confirm(self):
+        algod_client = LocalAlgodClient()
+        in_pool = []
+        send = algod_client.send_transactions
+
+        def counting_send(txns):
+            txid = send(txns)
+            in_pool.append(len(algod_client.unconfirmed))
+            return txid
+
+        algod_client.send_transactions = counting_send
+        key, groups = payments(algod_client, 10)
+        engine = SubmissionEngine(algod_client, key, window=3)
+        tickets = engine.run(groups)
+        assert all(ticket.status == "confirmed" for ticket in tickets)
+        # Never more than the window in the pool, and a fresh window every round
+        assert max(in_pool) == 3
+        assert engine.stats.rounds == 4
+        assert [ticket.confirmed_round for ticket in tickets] == sorted(ticket.confirmed_round for ticket in tickets)
@@ -0,0 +1,194 @@
+"""
+Tests for the local TEAL evaluator and the verified peephole optimizer
+Runs entirely offline against the deployed contract's TEAL artifact
+"""
+
+import os
+
+import pytest
+from algosdk import account
+
+from local_evaluator import (
+    Instruction,
+    LedgerState,
+    application_address,
+    evaluate_group,
+    evaluate_program,
+    make_app_call,
+    make_payment,
+    parse_teal,
+)
+from teal_optimizer import (
+    PASSES,
+    find_divergence,
+    generate_scenarios,
+    optimize_program,
+)
+
+ARTIFACTS = os.path.join(os.path.dirname(__file__), "artifacts")
+
+
+def read_artifact(name):
+    with open(os.path.join(ARTIFACTS, name)) as f:
+        return f.read()
+
+
+class TestLocalEvaluator:
+    """Test the evaluator against the final working contract"""
+
+    @pytest.fixture
+    def deployed(self):
+        """Ledger with the contract created, funded and a player opted in"""
+        ledger = LedgerState()
+        _, admin = account.generate_account()
+        _, player = account.generate_account()
+        ledger.fund(admin, 10_000_000)
+        ledger.fund(player, 10_000_000)
+        app_id = ledger.create_app(
+            admin,
+            read_artifact("final_working_approval.teal"),
+            read_artifact("final_working_clear.teal"),
+            global_schema=(5, 1),
+            local_schema=(4, 0),
+        )
+        ledger.fund(application_address(app_id), 1_000_000)
+        result = evaluate_group(ledger, [make_app_call(player, app_id, on_complete=1)])
+        assert result.ok
+        return ledger, app_id, admin, player
+
+    def test_parse_round_trip(self):
+        """Parsing and rendering keeps every instruction"""
+        source = read_artifact("final_working_approval.teal")
+        program = parse_teal(source)
+        assert parse_teal(program.to_teal()).to_teal() == program.to_teal()
+        assert len(program.instructions) > 100
+
+    def test_stake_flow(self, deployed):
+        """Payment + stake call updates local and global state"""
+        ledger, app_id, _, player = deployed
+        group = [
+            make_payment(player, application_address(app_id), 1_000_000),
+            make_app_call(player, app_id, ["stake"]),
+        ]
+        result = evaluate_group(ledger, group)
+
+        assert result.ok
+        assert result.logs == [b"GAME_STAKE"]
+        assert ledger.local_state(player, app_id)[b"PLAYER_STAKE"] == 1_000_000
+        assert ledger.global_state(app_id)[b"TOTAL_STAKED"] == 1_000_000
+
+    def test_inner_payment_needs_pooled_fee(self, deployed):
+        """win() sends an inner payment with fee 0, so the caller must cover it"""
+        ledger, app_id, _, player = deployed
+        evaluate_group(ledger, [
+            make_payment(player, application_address(app_id), 1_000_000),
+            make_app_call(player, app_id, ["stake"]),
+        ])
+
+        underpaid = evaluate_group(ledger, [make_app_call(player, app_id, ["win"])])
+        assert not underpaid.ok
+        assert "fee too small" in underpaid.error
+
+        pooled = evaluate_group(ledger, [make_app_call(player, app_id, ["win"], fee=2000)])
+        assert pooled.ok
+        assert ledger.local_state(player, app_id)[b"PLAYER_WINS"] == 1
+
+    def test_failed_group_is_not_committed(self, deployed):
+        """A rejected call leaves the ledger untouched"""
+        ledger, app_id, _, player = deployed
+        before = ledger.global_state(app_id)
+        result = evaluate_group(ledger, [make_app_call(player, app_id, ["toggle_pause"])])
+
+        assert not result.ok
+        assert result.error == "assert failed"
+        assert ledger.global_state(app_id) == before
+
+    def test_int_ops_reject_out_of_range_operands(self):
+        """exp checks the power before computing, and shifts past 63 fail"""
+        def run(a, b, op):
+            teal = f"#pragma version 8\nint {a}\nint {b}\n{op}\npop\nint 1\nreturn"
+            return evaluate_program(teal, [make_app_call(bytes(32), 1)])
+
+        assert run(2, 63, "exp").approved and run(1, 2 ** 40, "exp").approved
+        assert run(2, 64, "exp").error == "exp overflowed"
+        assert run(3, 2 ** 63, "exp").error == "exp overflowed"  # would hang if computed
+        assert run(0, 0, "exp").error == "0^0 is undefined"
+        assert run(1, 63, "shl").approved
+        assert "larger than 63" in run(1, 64, "shl").error
+        assert "larger than 63" in run(1, 64, "shr").error
+
+    def test_dry_runs_do_not_use_up_app_ids(self):
+        """Only a committed creation moves the ledger's next app id"""
+        ledger = LedgerState()
+        _, creator = account.generate_account()
+        ledger.fund(creator, 10_000_000)
+        source = "#pragma version 8\nint 1\nreturn"
+        create = make_app_call(creator, 0, ApprovalProgram=source, ClearStateProgram=source)
+        first = ledger.next_app_id
+        assert evaluate_group(ledger, [dict(create)], commit=False).created_apps == [first]
+        assert ledger.next_app_id == first
+        assert evaluate_group(ledger, [dict(create), dict(create)]).created_apps == [first, first + 1]
+        assert ledger.next_app_id == first + 2
+
+
+class TestTealOptimizer:
+    """Test the verified peephole optimizer"""
+
+    @pytest.fixture
+    def approval_teal(self):
+        return read_artifact("final_working_approval.teal")
+
+    def test_optimizer_shrinks_program(self, approval_teal):
+        """Repeated loads become dup and the err tail disappears"""
+        report = optimize_program(approval_teal, scenarios=150)
+
+        assert report.instructions_after < report.instructions_before
+        assert not report.rejected
+        optimized = report.optimized.splitlines()
+        assert "dup" in optimized
+        assert "err" not in optimized
+
+    def test_optimized_program_is_equivalent(self, approval_teal):
+        """The result agrees with the original on fresh random scenarios"""
+        report = optimize_program(approval_teal, scenarios=100, seed=1)
+        scenarios = generate_scenarios(approval_teal, count=200, seed=99)
+
+        assert find_divergence(approval_teal, report.optimized, scenarios) is None
+
+    def test_unsound_pass_is_rejected(self, approval_teal):
+        """A rewrite that changes behaviour never reaches the output"""
+        def flip_first_assert(items):
+            rewritten = list(items)
+            for index, item in enumerate(rewritten):
+                if isinstance(item, Instruction) and item.op == "assert":
+                    rewritten[index] = Instruction.make("pop", line=item.line)
+                    return rewritten, 1
+            return rewritten, 0
+
+        report = optimize_program(
+            approval_teal, scenarios=150,
+            passes=[("broken", flip_first_assert)] + PASSES,
+        )
+
+        assert [name for name, _ in report.rejected] == ["broken"]
+        assert "broken" not in dict(report.accepted)
+
+    def test_dead_stores_are_kept_unless_ungrouped(self):
+        """Another group transaction may gload a slot this program never loads"""
+        teal = "#pragma version 8\nint 7\nstore 3\nint 1\nreturn"
+        grouped = optimize_program(teal, scenarios=20)
+        assert "store 3" in grouped.optimized.splitlines()
+        ungrouped = optimize_program(teal, scenarios=20, ungrouped=True)
+        assert dict(ungrouped.accepted).get("dead store removal") == 1
+        assert "store 3" not in ungrouped.optimized.splitlines()
+
+    def test_compile_with_peephole(self):
+        """build_variant(peephole=True) returns optimized TEAL"""
+        from contract_registry import build_variant
+
+        approval_teal, _ = build_variant("final_working")
+        optimized_teal, clear_teal = build_variant("final_working", peephole=True)
+
+        assert optimized_teal.startswith("#pragma version 8")
+        assert len(parse_teal(optimized_teal).instructions) < len(parse_teal(approval_teal).instructions)
+        assert "return" in clear_teal
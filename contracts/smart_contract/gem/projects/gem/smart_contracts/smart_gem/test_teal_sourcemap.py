@@ -0,0 +1,60 @@
+"""
+Tests for TEAL source maps
+Maps are built in the watch worker, where the sourcemap gate precedes pyteal
+"""
+
+import os
+import re
+
+import pytest
+
+from contract_registry import SMART_GEM_DIR
+from contract_watch import BuildWorker
+from enhanced_contract import EnhancedGameContract
+from teal_sourcemap import attribute_costs, load_sourcemap, static_line_costs, write_sourcemap
+
+
+def numbered_slots(teal):
+    """TEAL with scratch slots renumbered by first use; PyTeal's numbering depends on earlier compiles"""
+    slots = {}
+    return re.sub(r"^(load|store) (\d+)$",
+                  lambda match: f"{match[1]} {slots.setdefault(match[2], len(slots))}", teal, flags=re.M)
+
+
+@pytest.fixture(scope="module")
+def built():
+    """The enhanced contract as the watch worker builds it"""
+    worker = BuildWorker([SMART_GEM_DIR], sourcemaps=True)
+    try:
+        return worker.build(["enhanced_contract"])["enhanced_contract"]
+    finally:
+        worker.close()
+
+
+class TestTealSourcemap:
+    """Test that maps describe the TEAL compile() produces"""
+
+    def test_map_matches_compile_output(self, built):
+        # compile() uses OptimizeOptions(scratch_slots=True); the mapped build must too
+        approval_teal, clear_teal = EnhancedGameContract().compile()
+        assert numbered_slots(built["approval"]) == numbered_slots(approval_teal)
+        assert built["clear"] == clear_teal
+        assert len(built["sourcemap"]) == len(approval_teal.splitlines())
+
+    def test_lines_point_into_the_contract(self, built):
+        teal_lines = built["approval"].splitlines()
+        mapped = [(number, entry) for number, entry in enumerate(built["sourcemap"]) if entry]
+        assert len(mapped) > len(teal_lines) // 2
+        with open(os.path.join(SMART_GEM_DIR, "enhanced_contract.py")) as f:
+            source = f.read().splitlines()
+        entries = [entry for _, entry in mapped if entry["file"] == "enhanced_contract.py"]
+        assert entries and all(0 < entry["line"] <= len(source) for entry in entries)
+        assert "create_room" in {entry["function"] for entry in entries}
+
+    def test_written_map_attributes_costs(self, built, tmp_path):
+        approval_path = str(tmp_path / "enhanced_contract_approval.teal")
+        write_sourcemap(approval_path, built["approval"], built["sourcemap"])
+        sourcemap = load_sourcemap(approval_path)
+        report = attribute_costs(sourcemap, static_line_costs(built["approval"]))
+        assert report["total"] == sum(report["by_function"].values()) + report["unmapped"]
+        assert report["unmapped"] < report["total"] // 2
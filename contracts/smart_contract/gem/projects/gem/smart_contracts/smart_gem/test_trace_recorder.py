@@ -0,0 +1,81 @@
+"""
+Tests for the trace recorder
+Records scenario traffic from the local stand-in network and replays it
+"""
+
+import pytest
+from algosdk import account
+
+from enhanced_contract import EnhancedGameContract
+from local_network import LocalAlgodClient, deploy_game
+from scenario_runner import ScenarioRunner
+from trace_recorder import TraceRecorder, TraceReplayer, read_trace, write_trace
+
+
+class FollowedNetwork(LocalAlgodClient):
+    """Local network that hands each block to a recorder as it closes, like a follower at the tip"""
+
+    recorder = None
+
+    def produce_block(self):
+        round_num = super().produce_block()
+        if self.recorder is not None:
+            self.recorder.record_round(round_num)
+        return round_num
+
+
+@pytest.fixture(scope="module")
+def trace():
+    """Trace of a full scenario (rooms, stakes, results, teardown) for 12 players"""
+    algod_client = FollowedNetwork()
+    admin_key, admin = account.generate_account()
+    algod_client.fund(admin, 1_000_000_000)
+    app_id = deploy_game(algod_client, admin_key, funding=100_000_000)
+    algod_client.recorder = TraceRecorder(algod_client, app_id)
+    players = []
+    for _ in range(12):
+        key, address = account.generate_account()
+        algod_client.fund(address, 20_000_000)
+        players.append((address, key))
+    report = ScenarioRunner(algod_client, app_id, admin_key, players,
+                            {"players_per_room": 6, "concurrency": 4}).run()
+    assert report.passed, report.failed_assertions
+    return algod_client.recorder.trace()
+
+
+class TestTraceRecorder:
+    """Test recording, the trace file and replays against other builds"""
+
+    def test_recorded_groups_replay_identically(self, trace):
+        summary = TraceReplayer(trace).replay()
+        assert summary["groups"] == len(trace["groups"]) > 24
+        assert summary["matched"] == summary["groups"], summary["diverged"] + summary["rejected"]
+        assert summary["methods"]["stake_game"]["groups"] == 12
+        assert summary["methods"]["process_result"]["groups"] == 12
+
+    def test_pre_state_holds_touched_state(self, trace):
+        settle = next(g for g in trace["groups"] if b"process_result" in g["txns"][0].get("apaa", [b""])[0])
+        pre = settle["pre"]
+        player = settle["txns"][0]["apat"][0]
+        # The settled player's stake, its seat and the room it sits in, as they were before the call
+        assert pre["locals"][player][b"PLAYER_STAKE"] > 0
+        assert sorted(name[:4] for name in pre["boxes"]) == [b"room", b"seat"]
+        assert settle["local_delta"][player][b"PLAYER_STAKE"] == 0
+        assert settle["logs"][0]
+
+    def test_trace_file_round_trip(self, trace, tmp_path):
+        path = tmp_path / "trace.bin"
+        size = write_trace(path, trace)
+        assert size < 400 * len(trace["groups"])
+        assert read_trace(path) == trace
+        with pytest.raises(ValueError):
+            path.write_bytes(b"not a trace")
+            read_trace(path)
+
+    def test_changed_build_is_reported(self, trace):
+        approval, clear = EnhancedGameContract().compile()
+        assert 'byte "GAME_WIN"' in approval
+        summary = TraceReplayer(trace, (approval.replace('byte "GAME_WIN"', 'byte "GAME_WON"'), clear)).replay()
+        assert summary["diverged"]
+        assert {r.method for r in summary["diverged"]} == {"process_result"}
+        assert not summary["rejected"]
@@ -0,0 +1,95 @@
+"""
+Tests for pre-encoded transaction templates
+Rendered bytes must match algosdk's own canonical encoding exactly
+"""
+
+import base64
+
+import pytest
+from algosdk import account, encoding, transaction
+
+from enhanced_contract_client import EnhancedGameClient
+from parallel_signer import encode_unsigned, sign_with, _signing_key
+from stake_groups import stake_group
+from txn_templates import TxnTemplate, group_id, render_settlements, render_stakes, settlement_template, stake_template
+
+
+def params(first=1000, last=2000):
+    return transaction.SuggestedParams(1000, first, last, "A" * 43 + "=", "testnet", flat_fee=True)
+
+
+@pytest.fixture(scope="module")
+def players():
+    return [account.generate_account() for _ in range(3)]
+
+
+class TestTxnTemplate:
+    """Test single-transaction rendering"""
+
+    def test_payment_matches_algosdk(self, players):
+        _, sender = players[0]
+        _, receiver = players[1]
+        template = TxnTemplate(transaction.PaymentTxn(sender, params(), receiver, 5))
+        for amount in (1, 250, 70_000, 2**40):
+            expected = transaction.PaymentTxn(sender, params(1500, 2500), receiver, amount)
+            assert template.render(amount=amount, first_valid=1500, last_valid=2500) == encode_unsigned(expected)
+
+    def test_zero_amount_is_omitted(self, players):
+        _, sender = players[0]
+        template = TxnTemplate(transaction.PaymentTxn(sender, params(), sender, 5))
+        assert template.render(amount=0) == encode_unsigned(transaction.PaymentTxn(sender, params(), sender, 0))
+
+    def test_only_variable_fields_patch(self, players):
+        _, sender = players[0]
+        template = TxnTemplate(transaction.PaymentTxn(sender, params(), sender, 5))
+        with pytest.raises(KeyError):
+            template.render(receiver=sender)
+
+
+class TestStakeTemplate:
+    """Test grouped stake rendering"""
+
+    def test_stake_groups_match_algosdk(self, players):
+        template = stake_template(params(), app_id=1234, room_id=7)
+        addresses = [address for _, address in players]
+        groups = render_stakes(template, addresses, [1_000_000, 2_000_000, 3_000_000], 1200, 2200)
+        for address, amount, rendered in zip(addresses, [1_000_000, 2_000_000, 3_000_000], groups):
+            expected = stake_group(params(1200, 2200), address, 1234, amount, 7)
+            assert rendered == [encode_unsigned(txn) for txn in expected]
+
+    def test_group_id_over_raw_bytes(self, players):
+        _, sender = players[0]
+        txns = [transaction.PaymentTxn(sender, params(), sender, amount) for amount in (1, 2)]
+        expected = transaction.calculate_group_id(txns)
+        assert group_id([encode_unsigned(txn) for txn in txns]) == expected
+
+    def test_rendered_bytes_sign_like_algosdk(self, players):
+        private_key, address = players[0]
+        template = stake_template(params(), app_id=1234, room_id=7)
+        rendered = render_stakes(template, [address], 1_000_000, 1000, 2000)[0]
+        expected = stake_group(params(), address, 1234, 1_000_000, 7)
+        for raw, txn in zip(rendered, expected):
+            signed = base64.b64decode(encoding.msgpack_encode(txn.sign(private_key)))
+            assert sign_with(_signing_key(private_key), raw) == signed
+
+
+class TestSettlementTemplate:
+    """Test oracle settlement rendering"""
+
+    def test_settlement_groups_match_the_client(self, players):
+        _, oracle = players[0]
+        client = EnhancedGameClient(1234)
+        template = settlement_template(params(), app_id=1234, oracle=oracle)
+        results = [(address, 7, index % 2, index.to_bytes(8, "big")) for index, (_, address) in enumerate(players)]
+        expected = []
+        for player, room_id, win, seed in results:
+            expected += client.process_result(params(1200, 2200), oracle, win, seed, player, room_id)
+        expected = transaction.assign_group_id(expected)
+        assert render_settlements(template, results, 1200, 2200) == [encode_unsigned(txn) for txn in expected]
+
+    def test_single_settlement_has_no_group(self, players):
+        _, oracle = players[0]
+        _, player = players[1]
+        template = settlement_template(params(), app_id=1234, oracle=oracle)
+        expected = EnhancedGameClient(1234).process_result(params(), oracle, 1, b"seed", player, 3)
+        assert render_settlements(template, [(player, 3, True, b"seed")], 1000, 2000) == [encode_unsigned(expected[0])]
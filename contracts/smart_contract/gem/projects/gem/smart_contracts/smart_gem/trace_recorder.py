@@ -0,0 +1,473 @@
+"""
+Trace Recorder
+Records confirmed app-call groups with their pre-state and replays them locally
+
+The recorder reads confirmed blocks from algod and keeps every group that
+calls our app, together with the state it ran against: the app's globals,
+the local state and balance of every account the group names, and the
+boxes it references. That state is mirrored as the recorder goes. Globals
+and boxes are read when it starts and accounts when they are first
+touched, with the touching block's payments and opt-ins undone; after
+that everything is kept current from each block's ApplyData (global and
+local deltas, payments, inner transactions), and touched boxes are re-read
+after their round since boxes have no deltas. algod only serves current
+state, so the recorder has to follow the tip: an account read a round late
+shows that round's changes too.
+
+A trace is a zlib-compressed msgpack file. The replayer loads each group's
+pre-state into the local evaluator and runs it again with any build of the
+contract, checking that it is still accepted and still produces the logs
+and state changes recorded on chain. Replays are deterministic and run at
+evaluator speed, so a trace doubles as a regression suite and a benchmark
+of new builds against real traffic.
+
+Run `python trace_recorder.py record [last round] [file]` or
+`python trace_recorder.py replay <file> [--inline] [--peephole]`.
+"""
+
+import base64
+import json
+import sys
+import time
+import zlib
+
+import msgpack
+from algosdk import transaction
+from algosdk.error import AlgodHTTPError
+from algosdk.v2client import algod
+
+from block_follower import block_groups, decode_local_deltas, decode_state_delta, fetch_block, raw_bytes
+from local_evaluator import (
+    LedgerState,
+    address_bytes,
+    address_string,
+    application_address,
+    evaluate_group,
+    txn_from_algosdk,
+)
+
+TRACE_MAGIC = b"CHTRACE1"
+TRACE_VERSION = 1
+ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"
+DEFAULT_TRACE = "trace.bin"
+
+
+# ============================================================================
+# BLOCKS
+# ============================================================================
+
+def _calls(txn, app_id):
+    return txn.type == "appl" and txn.index == app_id
+
+
+def _box_names(txn, app_id):
+    for ref in txn.boxes or []:
+        # Box references index the foreign apps array, 0 being the called app
+        target = txn.index if ref.app_index == 0 else (txn.foreign_apps or [])[ref.app_index - 1]
+        if target == app_id:
+            yield bytes(ref.name)
+
+
+def balance_changes(stxn, entry):
+    """(address, microAlgo change) pairs of a confirmed transaction, inner payments included"""
+    txn = stxn.transaction
+    sender = address_bytes(txn.sender)
+    yield sender, -txn.fee
+    if txn.type == "pay":
+        yield sender, -(txn.amt or 0)
+        yield address_bytes(txn.receiver), txn.amt or 0
+        if entry.get("ca") and txn.close_remainder_to:
+            yield sender, -entry["ca"]
+            yield address_bytes(txn.close_remainder_to), entry["ca"]
+    for inner in entry.get("dt", {}).get("itx", []):
+        inner_txn = inner["txn"]
+        yield bytes(inner_txn["snd"]), -inner_txn.get("fee", 0) - inner_txn.get("amt", 0)
+        if "rcv" in inner_txn:
+            yield bytes(inner_txn["rcv"]), inner_txn.get("amt", 0)
+
+
+def _update(state, changes):
+    for key, value in changes.items():
+        if value is None:
+            state.pop(key, None)
+        else:
+            state[key] = value
+
+
+def decode_key_values(entries):
+    """algod key-value list (global-state, key-value) -> {key: value}"""
+    return {base64.b64decode(kv["key"]): base64.b64decode(kv["value"].get("bytes", ""))
+            if kv["value"]["type"] == 1 else kv["value"].get("uint", 0) for kv in entries}
+
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+class TraceRecorder:
+    """Follows confirmed blocks and records our app's groups with their pre-state"""
+
+    def __init__(self, algod_client, app_id):
+        self.algod_client = algod_client
+        self.app_id = app_id
+        self.app_address = application_address(app_id)
+        params = algod_client.application_info(app_id)["params"]
+        self.globals = decode_key_values(params.get("global-state", []))
+        self.locals = {}  # address -> local state, None when not opted in
+        self.balances = {}  # address -> microAlgos, for addresses touched so far
+        self.boxes = {}  # name -> value, None when it does not exist
+        self.header = {
+            "format": "chronicle-trace",
+            "version": TRACE_VERSION,
+            "app_id": app_id,
+            "creator": address_bytes(params["creator"]),
+            "global_schema": schema_counts(params.get("global-state-schema")),
+            "local_schema": schema_counts(params.get("local-state-schema")),
+            "first_round": None,
+            "last_round": None,
+        }
+        self.groups = []
+        # Mirrored from the tip: recording starts with the next round
+        self.next_round = algod_client.status()["last-round"] + 1
+        self.last_timestamp = fetch_block(algod_client, self.next_round - 1)["ts"]
+        self._load_boxes()
+
+    # -- mirrored state -------------------------------------------------------
+
+    def _load_boxes(self):
+        for box in self.algod_client.application_boxes(self.app_id)["boxes"]:
+            self._box(base64.b64decode(box["name"]))
+
+    def _box(self, name):
+        try:
+            value = self.algod_client.application_box_by_name(self.app_id, name)["value"]
+            self.boxes[name] = base64.b64decode(value)
+        except AlgodHTTPError:
+            self.boxes[name] = None
+
+    def _load_accounts(self, addresses, block):
+        """Read accounts first touched in block, then undo what the block did to them"""
+        for address in addresses:
+            info = self.algod_client.account_info(address_string(address))
+            self.balances[address] = info.get("amount", 0)
+            self.locals[address] = None
+            for app in info.get("apps-local-state", []):
+                if app["id"] == self.app_id:
+                    self.locals[address] = decode_key_values(app.get("key-value", []))
+        for stxn, entry in block["txns"]:
+            for address, change in balance_changes(stxn, entry):
+                if address in addresses:
+                    self.balances[address] -= change
+            txn = stxn.transaction
+            sender = address_bytes(txn.sender)
+            if sender in addresses and _calls(txn, self.app_id) and txn.on_complete == transaction.OnComplete.OptInOC:
+                self.locals[sender] = None
+
+    def _touched(self, members):
+        addresses, names = {self.app_address}, set()
+        for stxn, _ in members:
+            txn = stxn.transaction
+            addresses.add(address_bytes(txn.sender))
+            for field in ("receiver", "close_remainder_to"):
+                if getattr(txn, field, None):
+                    addresses.add(address_bytes(getattr(txn, field)))
+            if _calls(txn, self.app_id):
+                addresses.update(address_bytes(a) for a in txn.accounts or [])
+                names.update(_box_names(txn, self.app_id))
+        return addresses, names
+
+    def _pre_state(self, addresses, names):
+        return {
+            "globals": dict(self.globals),
+            "locals": {a: dict(self.locals[a]) for a in addresses if self.locals[a] is not None},
+            "balances": {a: self.balances[a] for a in addresses},
+            # Every box that existed at the start is mirrored, so an unknown name does not exist
+            "boxes": {name: self.boxes[name] for name in names if self.boxes.get(name) is not None},
+        }
+
+    def _apply(self, members):
+        """Advance the mirrored app state by a group's ApplyData; returns what it recorded"""
+        logs, global_delta, local_delta = [], {}, {}
+        for stxn, entry in members:
+            txn = stxn.transaction
+            delta = entry.get("dt", {})
+            logs.append([raw_bytes(log) for log in delta.get("lg", [])])
+            if not _calls(txn, self.app_id):
+                continue
+
+            sender = address_bytes(txn.sender)
+            if txn.on_complete == transaction.OnComplete.OptInOC:
+                self.locals[sender] = {}
+            changes = decode_state_delta(delta.get("gd"))
+            global_delta.update(changes)
+            _update(self.globals, changes)
+            for address, changes in decode_local_deltas(txn, delta).items():
+                local_delta.setdefault(address, {}).update(changes)
+                if self.locals.get(address) is not None:
+                    _update(self.locals[address], changes)
+            if txn.on_complete in (transaction.OnComplete.CloseOutOC, transaction.OnComplete.ClearStateOC):
+                self.locals[sender] = None
+        return {"logs": logs, "global_delta": global_delta, "local_delta": local_delta}
+
+    # -- following blocks -----------------------------------------------------
+
+    def record_round(self, round_num):
+        """Record the next confirmed round; returns how many of our groups it held"""
+        if round_num != self.next_round:
+            raise ValueError(f"round {round_num} is out of order, the mirror is at {self.next_round}")
+        block = fetch_block(self.algod_client, round_num)
+        groups = block_groups(block)
+        touched = [self._touched(members) if any(_calls(stxn.transaction, self.app_id) for stxn, _ in members)
+                   else None for members in groups]
+        first_seen = {a for found in touched if found for a in found[0]} - set(self.balances)
+        if first_seen:
+            self._load_accounts(first_seen, block)
+
+        recorded, touched_boxes = 0, set()
+        for members, found in zip(groups, touched):
+            if found:
+                group = {
+                    "round": round_num,
+                    "timestamp": self.last_timestamp,  # LatestTimestamp is the previous block's
+                    "txns": [entry["txn"] for _, entry in members],
+                    "pre": self._pre_state(*found),
+                }
+                group.update(self._apply(members))
+                self.groups.append(group)
+                touched_boxes |= found[1]
+                recorded += 1
+            # Balances of mirrored accounts move with every transaction in the block
+            for stxn, entry in members:
+                for address, change in balance_changes(stxn, entry):
+                    if address in self.balances:
+                        self.balances[address] += change
+        # Box changes are not part of ApplyData
+        for name in touched_boxes:
+            self._box(name)
+        self.last_timestamp = block["ts"]
+        if self.header["first_round"] is None:
+            self.header["first_round"] = round_num
+        self.header["last_round"] = round_num
+        self.next_round = round_num + 1
+        return recorded
+
+    def record(self, last_round=None, on_round=None):
+        """Follow the chain up to last_round, waiting for each block; forever without one"""
+        while last_round is None or self.next_round <= last_round:
+            round_num = self.next_round
+            if self.algod_client.status()["last-round"] < round_num:
+                self.algod_client.status_after_block(round_num - 1)
+            found = self.record_round(round_num)
+            if on_round:
+                on_round(round_num, found)
+        return self.trace()
+
+    def trace(self):
+        return dict(self.header, groups=list(self.groups))
+
+
+def schema_counts(schema):
+    """algod state schema -> [num uints, num byte slices], or None when there is none"""
+    if not schema:
+        return None
+    return [schema.get("num-uint", 0), schema.get("num-byte-slice", 0)]
+
+
+# ============================================================================
+# TRACE FILES
+# ============================================================================
+
+def write_packed(path, magic, record):
+    """Write record as magic + zlib-compressed msgpack; returns the size in bytes"""
+    data = magic + zlib.compress(msgpack.packb(record, use_bin_type=True), 9)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def read_packed(path, magic, version, kind):
+    """Read a file written by write_packed, checking its magic and version"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(magic):
+        raise ValueError(f"{path} is not a {kind} file")
+    record = msgpack.unpackb(zlib.decompress(data[len(magic):]), raw=False, strict_map_key=False)
+    if record.get("version") != version:
+        raise ValueError(f"unsupported {kind} version {record.get('version')}")
+    return record
+
+
+def write_trace(path, trace):
+    """Write a trace; returns its size in bytes"""
+    return write_packed(path, TRACE_MAGIC, trace)
+
+
+def read_trace(path):
+    return read_packed(path, TRACE_MAGIC, TRACE_VERSION, "trace")
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def _method(txns, app_id):
+    for txn in txns:
+        if _calls(txn, app_id):
+            if txn.on_complete == transaction.OnComplete.ClearStateOC:
+                return "clear_state"
+            if txn.app_args:
+                return bytes(txn.app_args[0]).decode(errors="replace")
+            return "opt_in" if txn.on_complete == transaction.OnComplete.OptInOC else "bare_call"
+    return "unknown"
+
+
+def _effective(writes, before):
+    """Drop writes that leave a value unchanged, which algod never reports"""
+    return {key: value for key, value in (writes or {}).items() if before.get(key) != value}
+
+
+class ReplayResult:
+    """One replayed group"""
+
+    def __init__(self, index, round_num, method, ok, error=None, mismatches=(), cost=0):
+        self.index = index
+        self.round = round_num
+        self.method = method
+        self.ok = ok
+        self.error = error
+        self.mismatches = list(mismatches)
+        self.cost = cost
+
+    @property
+    def matched(self):
+        return self.ok and not self.mismatches
+
+    def __repr__(self):
+        status = "matched" if self.matched else (self.error or "; ".join(self.mismatches))
+        return f"ReplayResult({self.index} {self.method} @{self.round}: {status})"
+
+
+class TraceReplayer:
+    """Re-executes a trace's groups on the local evaluator"""
+
+    def __init__(self, trace, programs=None):
+        if programs is None:
+            from enhanced_contract import EnhancedGameContract
+            programs = EnhancedGameContract().compile()
+        self.trace = trace
+        self.app_id = trace["app_id"]
+        self.ledger = LedgerState()
+        self.ledger.install_app(
+            trace["creator"], programs[0], programs[1], app_id=self.app_id,
+            global_schema=tuple(trace["global_schema"]) if trace.get("global_schema") else None,
+            local_schema=tuple(trace["local_schema"]) if trace.get("local_schema") else None,
+        )
+        # Decoded once so replays only pay for evaluation
+        self.groups = []
+        for group in trace["groups"]:
+            txns = [transaction.Transaction.undictify(fields) for fields in group["txns"]]
+            self.groups.append((group, [txn_from_algosdk(txn) for txn in txns], _method(txns, self.app_id)))
+
+    def _load(self, group):
+        pre, ledger = group["pre"], self.ledger
+        ledger.round = group["round"]
+        ledger.timestamp = group["timestamp"]
+        ledger.globals[self.app_id] = dict(pre["globals"])
+        ledger.locals = {(address, self.app_id): dict(state) for address, state in pre["locals"].items()}
+        ledger.boxes = {self.app_id: dict(pre["boxes"])}
+        ledger.balances = dict(pre["balances"])
+
+    def replay_group(self, index):
+        group, txns, method = self.groups[index]
+        self._load(group)
+        result = evaluate_group(self.ledger, txns)
+        if not result.ok:
+            return ReplayResult(index, group["round"], method, False, result.error, cost=result.cost)
+
+        pre, mismatches = group["pre"], []
+        logs = [list(r.logs) if r is not None else [] for r in result.txn_results]
+        if logs != group["logs"]:
+            mismatches.append(f"logs {logs} != recorded {group['logs']}")
+        changes = _effective(result.delta["global"].get(self.app_id), pre["globals"])
+        if changes != group["global_delta"]:
+            mismatches.append(f"global delta {changes} != recorded {group['global_delta']}")
+        local_delta = {}
+        for (address, app_id), writes in result.delta["local"].items():
+            changes = _effective(writes, pre["locals"].get(address, {}))
+            if app_id == self.app_id and changes:
+                local_delta[address] = changes
+        recorded = {address: changes for address, changes in group["local_delta"].items() if changes}
+        if local_delta != recorded:
+            mismatches.append(f"local delta {local_delta} != recorded {recorded}")
+        return ReplayResult(index, group["round"], method, True, mismatches=mismatches, cost=result.cost)
+
+    def replay(self):
+        """Replay every group; returns a summary with the per-group results"""
+        started = time.perf_counter()
+        results = [self.replay_group(index) for index in range(len(self.groups))]
+        elapsed = time.perf_counter() - started
+        methods = {}
+        for result in results:
+            counts = methods.setdefault(result.method, {"groups": 0, "matched": 0, "cost": 0})
+            counts["groups"] += 1
+            counts["matched"] += result.matched
+            counts["cost"] += result.cost
+        return {
+            "groups": len(results),
+            "matched": sum(r.matched for r in results),
+            "rejected": [r for r in results if not r.ok],
+            "diverged": [r for r in results if r.ok and r.mismatches],
+            "methods": methods,
+            "cost": sum(r.cost for r in results),
+            "elapsed": round(elapsed, 4),
+            "groups_per_second": round(len(results) / elapsed, 1) if elapsed else 0.0,
+            "results": results,
+        }
+
+
+def print_replay(summary, examples=3):
+    print(f"🔁 Replayed {summary['groups']} group(s) in {summary['elapsed']}s "
+          f"({summary['groups_per_second']} groups/s, total cost {summary['cost']})")
+    for method, counts in summary["methods"].items():
+        print(f"   {method:<20}{counts['matched']:>6}/{counts['groups']:<6} cost {counts['cost']}")
+    for result in summary["rejected"][:examples]:
+        print(f"   ❌ group {result.index} ({result.method}, round {result.round}) rejected: {result.error}")
+    for result in summary["diverged"][:examples]:
+        print(f"   ⚠️  group {result.index} ({result.method}, round {result.round}): {result.mismatches[0]}")
+    if summary["matched"] == summary["groups"]:
+        print("   ✅ Every group matched its recording")
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    try:
+        if args[:1] == ["record"]:
+            with open("application_info.json") as f:
+                app_id = json.load(f)["application_id"]
+            recorder = TraceRecorder(algod.AlgodClient("", ALGOD_ADDRESS), app_id)
+            last = int(args[1]) if len(args) > 1 else None
+            path = args[2] if len(args) > 2 else DEFAULT_TRACE
+            print(f"🎙️  Recording app {app_id} from round {recorder.next_round} (Ctrl+C to stop)")
+            try:
+                recorder.record(last, on_round=lambda r, found: found and print(f"   round {r}: {found} group(s)"))
+            except KeyboardInterrupt:
+                pass
+            size = write_trace(path, recorder.trace())
+            print(f"💾 {len(recorder.groups)} group(s) written to {path} ({size} bytes)")
+        elif args[:1] == ["replay"]:
+            from contract_registry import compile_contract
+            from enhanced_contract import EnhancedGameContract
+            contract = EnhancedGameContract(shared_guards="--inline" not in sys.argv)
+            replayer = TraceReplayer(read_trace(args[1]), compile_contract(contract, "--peephole" in sys.argv))
+            summary = replayer.replay()
+            print_replay(summary)
+            sys.exit(0 if summary["matched"] == summary["groups"] else 1)
+        else:
+            print("Usage: python trace_recorder.py record [last round] [file]\n"
+                  "       python trace_recorder.py replay <file> [--inline] [--peephole]")
+    except Exception as e:
+        print(f"❌ Trace failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,193 @@
+"""
+Transaction Templates
+Pre-encoded msgpack transactions with only the per-player fields patched in
+
+A template is built once from an example transaction: every field is
+packed into canonical msgpack up front, except the variable ones (sender,
+amount, first/last valid, group id by default). Rendering packs just those
+values and joins the segments, so a batch of stakes or settlements needs no
+Transaction objects and no full re-encode. Group ids are computed over the
+rendered bytes the same way algosdk does. The output is the unsigned
+canonical bytes parallel_signer.py signs.
+
+Box references can be variable too ("boxes", as (app index, name) pairs),
+for calls whose boxes are keyed by the player, like a stake's seat box.
+Settlement templates patch the oracle's process_result arguments, the
+player in the foreign accounts and their boxes, so a batch of settlements
+renders into atomic groups the same way.
+"""
+
+import msgpack
+from algosdk import constants, encoding
+from algosdk.box_reference import BoxReference
+
+import box_layout
+from enhanced_contract_client import SELECTORS, EnhancedGameClient
+from parallel_signer import encode_unsigned
+from stake_groups import stake_group
+
+# Friendly name -> msgpack field of the transaction
+FIELD_NAMES = {
+    "sender": "snd",
+    "receiver": "rcv",
+    "amount": "amt",
+    "fee": "fee",
+    "first_valid": "fv",
+    "last_valid": "lv",
+    "group": "grp",
+    "note": "note",
+    "app_args": "apaa",
+    "accounts": "apat",
+    "boxes": "apbx",
+}
+ADDRESS_FIELDS = ("snd", "rcv", "grp", "close")
+DEFAULT_VARIABLE = ("sender", "amount", "first_valid", "last_valid", "group")
+
+
+def _pack_value(field, value):
+    if field in ADDRESS_FIELDS and isinstance(value, str):
+        value = encoding.decode_address(value)
+    if field == "apat":
+        value = [encoding.decode_address(address) if isinstance(address, str) else address for address in value]
+    if field == "apbx":
+        value = [ref if isinstance(ref, dict) else BoxReference(*ref).dictify() for ref in value]
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def _map_header(count):
+    if count < 16:
+        return bytes([0x80 | count])
+    return b"\xde" + count.to_bytes(2, "big")
+
+
+def txid_bytes(txn_bytes):
+    """Raw 32-byte transaction id of unsigned canonical bytes"""
+    return encoding.checksum(constants.txid_prefix + txn_bytes)
+
+
+def group_id(txn_bytes_list):
+    """Group id over unsigned canonical bytes (each without a grp field)"""
+    if len(txn_bytes_list) > constants.tx_group_limit:
+        raise ValueError(f"Group of {len(txn_bytes_list)} exceeds {constants.tx_group_limit}")
+    encoded = msgpack.packb({"txlist": [txid_bytes(txn) for txn in txn_bytes_list]}, use_bin_type=True)
+    return encoding.checksum(constants.tgid_prefix + encoded)
+
+
+class TxnTemplate:
+    """Canonical encoding of one transaction with patchable fields"""
+
+    def __init__(self, txn, variable=DEFAULT_VARIABLE):
+        self.variable = {FIELD_NAMES.get(name, name) for name in variable}
+        # Canonical fields, as algosdk encodes them (zero values already left out)
+        fields = msgpack.unpackb(encode_unsigned(txn), raw=False)
+        self.defaults = {}
+        keys = sorted(set(fields) | self.variable)
+        # (field, packed key + value) for fixed fields, (field, packed key) for variable ones
+        self.segments = []
+        for key in keys:
+            packed_key = msgpack.packb(key)
+            if key in self.variable:
+                self.defaults[key] = fields.get(key)
+                self.segments.append((key, packed_key, None))
+            else:
+                self.segments.append((key, packed_key, packed_key + msgpack.packb(fields[key], use_bin_type=True)))
+
+    def render(self, **values):
+        """Unsigned canonical bytes with values (friendly or msgpack names) patched in"""
+        values = {FIELD_NAMES.get(name, name): value for name, value in values.items()}
+        unknown = set(values) - self.variable
+        if unknown:
+            raise KeyError(f"Not a variable field of this template: {sorted(unknown)[0]}")
+        parts = []
+        for key, packed_key, fixed in self.segments:
+            if fixed is not None:
+                parts.append(fixed)
+                continue
+            value = values.get(key, self.defaults[key])
+            if value:  # Canonical msgpack omits zero values
+                parts.append(packed_key + _pack_value(key, value))
+        return _map_header(len(parts)) + b"".join(parts)
+
+
+class GroupTemplate:
+    """Templates for every transaction of a group, rendered with a fresh group id"""
+
+    def __init__(self, txns, variable=DEFAULT_VARIABLE):
+        self.templates = [TxnTemplate(txn, variable) for txn in txns]
+
+    def render(self, shared=None, per_txn=None):
+        """Unsigned bytes for the group; shared values apply to every transaction"""
+        # Decode addresses once rather than on each of the two renders per transaction
+        shared = {
+            name: encoding.decode_address(value) if FIELD_NAMES.get(name, name) in ADDRESS_FIELDS
+            and isinstance(value, str) else value
+            for name, value in (shared or {}).items()
+        }
+        per_txn = per_txn or [{}] * len(self.templates)
+        values = [dict(shared, **extra) for extra in per_txn]
+        ungrouped = [t.render(**dict(v, group=None)) for t, v in zip(self.templates, values)]
+        gid = group_id(ungrouped)
+        return [t.render(**dict(v, group=gid)) for t, v in zip(self.templates, values)]
+
+
+class StakeTemplate(GroupTemplate):
+    """GroupTemplate for [payment, stake_game call] in one room"""
+
+    def __init__(self, sp, app_id, room_id, example_sender=None):
+        sender = example_sender or encoding.encode_address(bytes(32))
+        super().__init__(stake_group(sp, sender, app_id, 1, room_id), DEFAULT_VARIABLE + ("boxes",))
+        self.room_id = room_id
+
+    def render_stake(self, player, amount, first_valid, last_valid):
+        """Unsigned bytes of one player's stake group"""
+        shared = {"sender": player, "first_valid": first_valid, "last_valid": last_valid}
+        boxes = [box_layout.room_box_ref(self.room_id), box_layout.seat_box_ref(player)]
+        return self.render(shared, [{"amount": amount}, {"boxes": boxes}])
+
+
+def stake_template(sp, app_id, room_id, example_sender=None):
+    """StakeTemplate for [payment, stake_game call]; render with sender/amount/rounds"""
+    return StakeTemplate(sp, app_id, room_id, example_sender)
+
+
+def render_stakes(template, players, amounts, first_valid, last_valid):
+    """Unsigned stake groups for many players; amounts is one per player or a single int"""
+    if isinstance(amounts, int):
+        amounts = [amounts] * len(players)
+    groups = []
+    for player, amount in zip(players, amounts):
+        groups.append(template.render_stake(player, amount, first_valid, last_valid))
+    return groups
+
+
+class SettlementTemplate(TxnTemplate):
+    """TxnTemplate for the oracle's process_result call"""
+
+    def __init__(self, sp, app_id, oracle):
+        example = EnhancedGameClient(app_id).process_result(sp, oracle, 0, b"", oracle, 0)[0]
+        super().__init__(example, ("first_valid", "last_valid", "group", "app_args", "accounts", "boxes"))
+        self.fee = example.fee
+
+    def render_settlement(self, player, room_id, win, seed, first_valid, last_valid, group=None):
+        """Unsigned bytes of one process_result call for player"""
+        return self.render(
+            app_args=[SELECTORS["process_result"], int(win).to_bytes(8, "big"), seed],
+            accounts=[player],
+            boxes=[box_layout.room_box_ref(room_id), box_layout.seat_box_ref(player)],
+            first_valid=first_valid, last_valid=last_valid, group=group,
+        )
+
+
+def settlement_template(sp, app_id, oracle):
+    """SettlementTemplate for oracle's calls; render with player/room/result/seed/rounds"""
+    return SettlementTemplate(sp, app_id, oracle)
+
+
+def render_settlements(template, results, first_valid, last_valid):
+    """Unsigned bytes of one group settling results, each (player, room_id, win, seed)"""
+    results = list(results)
+    if len(results) == 1:
+        return [template.render_settlement(*results[0], first_valid, last_valid)]
+    ungrouped = [template.render_settlement(*result, first_valid, last_valid) for result in results]
+    gid = group_id(ungrouped)
+    return [template.render_settlement(*result, first_valid, last_valid, group=gid) for result in results]
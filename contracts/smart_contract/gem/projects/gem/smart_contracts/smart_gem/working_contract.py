@@ -167,13 +167,15 @@ def approval_program():
             App.globalPut(TOTAL_PLAYERS, App.globalGet(TOTAL_PLAYERS) + Int(1)),
             
             # Log event
-            Log(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount()), Itob(App.globalGet(GAME_ROUND))),
+            Log(Concat(Bytes("GAME_STAKE"), Itob(Gtxn[0].amount()), Itob(App.globalGet(GAME_ROUND)))),
             
             Approve()
         ])
     
     def process_win():
         """Process player win"""
+        bonus = ScratchVar(TealType.uint64)
+        reward_amount = ScratchVar(TealType.uint64)
         return Seq([
             # Security checks
             Assert(App.globalGet(PAUSED) == Int(0)),
@@ -185,10 +187,10 @@ def approval_program():
             App.localPut(Int(0), PLAYER_SCORE, App.localGet(Int(0), PLAYER_SCORE) + Int(1)),
             
             # Calculate reward
-            bonus = App.localGet(Int(0), PLAYER_STAKE) * BONUS_RATE / Int(1000000)
-            reward_amount = App.localGet(Int(0), PLAYER_STAKE) + bonus
+            bonus.store(App.localGet(Int(0), PLAYER_STAKE) * BONUS_RATE / Int(1000000)),
+            reward_amount.store(App.localGet(Int(0), PLAYER_STAKE) + bonus.load()),
             
-            App.localPut(Int(0), PLAYER_TOTAL_EARNED, App.localGet(Int(0), PLAYER_TOTAL_EARNED) + bonus),
+            App.localPut(Int(0), PLAYER_TOTAL_EARNED, App.localGet(Int(0), PLAYER_TOTAL_EARNED) + bonus.load()),
             
             # Update global state
             App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - App.localGet(Int(0), PLAYER_STAKE)),
@@ -199,13 +201,13 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: reward_amount,
+                TxnField.amount: reward_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
             # Log event
-            Log(Bytes("GAME_WIN"), Itob(reward_amount)),
+            Log(Concat(Bytes("GAME_WIN"), Itob(reward_amount.load()))),
             
             # Reset player stake
             App.localPut(Int(0), PLAYER_STAKE, Int(0)),
@@ -215,6 +217,8 @@ def approval_program():
     
     def process_loss():
         """Process player loss"""
+        commission = ScratchVar(TealType.uint64)
+        slash_amount = ScratchVar(TealType.uint64)
         return Seq([
             # Security checks
             Assert(App.globalGet(PAUSED) == Int(0)),
@@ -225,28 +229,28 @@ def approval_program():
             App.localPut(Int(0), PLAYER_LOSSES, App.localGet(Int(0), PLAYER_LOSSES) + Int(1)),
             
             # Calculate commission and slash amount
-            commission = App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)
-            slash_amount = TRANSACTION_FEE + commission
+            commission.store(App.localGet(Int(0), PLAYER_STAKE) * COMMISSION_RATE / Int(1000000)),
+            slash_amount.store(TRANSACTION_FEE + commission.load()),
             
             # Validate slash amount doesn't exceed stake
-            Assert(slash_amount <= App.localGet(Int(0), PLAYER_STAKE)),
+            Assert(slash_amount.load() <= App.localGet(Int(0), PLAYER_STAKE)),
             
             # Update global state
-            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - slash_amount),
-            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + commission),
+            App.globalPut(TOTAL_STAKED, App.globalGet(TOTAL_STAKED) - slash_amount.load()),
+            App.globalPut(COMMISSION_POOL, App.globalGet(COMMISSION_POOL) + commission.load()),
             
             # Return remaining stake to player
             InnerTxnBuilder.Begin(),
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: App.localGet(Int(0), PLAYER_STAKE) - slash_amount,
+                TxnField.amount: App.localGet(Int(0), PLAYER_STAKE) - slash_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
             # Log event
-            Log(Bytes("GAME_LOSS"), Itob(slash_amount)),
+            Log(Concat(Bytes("GAME_LOSS"), Itob(slash_amount.load()))),
             
             # Reset player stake
             App.localPut(Int(0), PLAYER_STAKE, Int(0)),
@@ -275,28 +279,27 @@ def approval_program():
             # Update liquidity pool
             App.globalPut(LIQUIDITY_POOL, App.globalGet(LIQUIDITY_POOL) + Gtxn[0].amount()),
             
-            Log(Bytes("STAKE_REWARDS"), Itob(Gtxn[0].amount())),
+            Log(Concat(Bytes("STAKE_REWARDS"), Itob(Gtxn[0].amount()))),
             
             Approve()
         ])
     
     def claim_rewards():
         """Claim accumulated staking rewards"""
+        total_rewards = ScratchVar(TealType.uint64)
         return Seq([
             Assert(App.globalGet(PAUSED) == Int(0)),
             Assert(App.localGet(Int(0), PLAYER_OPTED_IN) == Int(1)),
             Assert(App.localGet(Int(0), PLAYER_STAKE_AMOUNT) > Int(0)),
             
             # Calculate rewards (simplified)
-            stake_amount = App.localGet(Int(0), PLAYER_STAKE_AMOUNT)
-            reward_rate = App.globalGet(REWARD_RATE)
-            total_rewards = stake_amount * reward_rate / Int(1000000)
+            total_rewards.store(App.localGet(Int(0), PLAYER_STAKE_AMOUNT) * App.globalGet(REWARD_RATE) / Int(1000000)),
             
             # Ensure we have enough liquidity
-            Assert(total_rewards <= App.globalGet(LIQUIDITY_POOL)),
+            Assert(total_rewards.load() <= App.globalGet(LIQUIDITY_POOL)),
             
             # Update state
-            App.globalPut(LIQUIDITY_POOL, App.globalGet(LIQUIDITY_POOL) - total_rewards),
+            App.globalPut(LIQUIDITY_POOL, App.globalGet(LIQUIDITY_POOL) - total_rewards.load()),
             App.localPut(Int(0), PLAYER_STAKE_TIME, Global.latest_timestamp()),
             
             # Send rewards
@@ -304,12 +307,12 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: total_rewards,
+                TxnField.amount: total_rewards.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
-            Log(Bytes("CLAIM_REWARDS"), Itob(total_rewards)),
+            Log(Concat(Bytes("CLAIM_REWARDS"), Itob(total_rewards.load()))),
             
             Approve()
         ])
@@ -320,34 +323,35 @@ def approval_program():
     
     def toggle_pause():
         """Toggle contract pause state"""
+        new_pause = ScratchVar(TealType.uint64)
         return Seq([
             # Check if caller is admin
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
             
             # Toggle pause state
-            current_pause = App.globalGet(PAUSED)
-            new_pause = If(current_pause == Int(0), Int(1), Int(0))
-            App.globalPut(PAUSED, new_pause),
+            new_pause.store(If(App.globalGet(PAUSED) == Int(0), Int(1), Int(0))),
+            App.globalPut(PAUSED, new_pause.load()),
             
             # Update game state if pausing
-            If(new_pause == Int(1)).Then(
+            If(new_pause.load() == Int(1)).Then(
                 App.globalPut(GAME_STATE, GAME_PAUSED)
             ),
             
-            Log(Bytes("PAUSE_TOGGLED"), Itob(new_pause)),
+            Log(Concat(Bytes("PAUSE_TOGGLED"), Itob(new_pause.load()))),
             
             Approve()
         ])
     
     def withdraw_commission():
         """Withdraw accumulated commission"""
+        commission_amount = ScratchVar(TealType.uint64)
         return Seq([
             # Check if caller is admin
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
             
             # Check if there's commission to withdraw
-            commission_amount = App.globalGet(COMMISSION_POOL),
-            Assert(commission_amount > Int(0)),
+            commission_amount.store(App.globalGet(COMMISSION_POOL)),
+            Assert(commission_amount.load() > Int(0)),
             
             # Reset commission pool
             App.globalPut(COMMISSION_POOL, Int(0)),
@@ -357,37 +361,39 @@ def approval_program():
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
                 TxnField.receiver: Txn.sender(),
-                TxnField.amount: commission_amount,
+                TxnField.amount: commission_amount.load(),
                 TxnField.fee: Int(0)
             }),
             InnerTxnBuilder.Submit(),
             
-            Log(Bytes("COMMISSION_WITHDRAWN"), Itob(commission_amount)),
+            Log(Concat(Bytes("COMMISSION_WITHDRAWN"), Itob(commission_amount.load()))),
             
             Approve()
         ])
     
     def update_config():
         """Update contract configuration"""
+        new_min_stake = ScratchVar(TealType.uint64)
+        new_max_stake = ScratchVar(TealType.uint64)
         return Seq([
             # Check if caller is admin
             Assert(Txn.sender() == App.globalGet(ADMIN_ADDRESS)),
             
             # Update stake limits
-            new_min_stake = Btoi(Txn.application_args[1])
-            new_max_stake = Btoi(Txn.application_args[2])
+            new_min_stake.store(Btoi(Txn.application_args[1])),
+            new_max_stake.store(Btoi(Txn.application_args[2])),
             
             # Validate limits
             Assert(And(
-                new_min_stake > Int(0),
-                new_max_stake > new_min_stake,
-                new_max_stake <= Int(100000000)  # Max 100 ALGO
+                new_min_stake.load() > Int(0),
+                new_max_stake.load() > new_min_stake.load(),
+                new_max_stake.load() <= Int(100000000)  # Max 100 ALGO
             )),
             
-            App.globalPut(MIN_STAKE, new_min_stake),
-            App.globalPut(MAX_STAKE, new_max_stake),
+            App.globalPut(MIN_STAKE, new_min_stake.load()),
+            App.globalPut(MAX_STAKE, new_max_stake.load()),
             
-            Log(Bytes("CONFIG_UPDATED"), Itob(new_min_stake), Itob(new_max_stake)),
+            Log(Concat(Bytes("CONFIG_UPDATED"), Itob(new_min_stake.load()), Itob(new_max_stake.load()))),
             
             Approve()
         ])
@@ -21,6 +21,15 @@ try:
     # Compile clear state program
     clear_teal = compileTeal(clear_state_program(), mode=Mode.Application, version=8)
     
+    # Optional verified peephole pass
+    if "--peephole" in sys.argv:
+        sys.path.append(os.path.join(
+            os.path.dirname(__file__), '..', 'contracts', 'smart_contract', 'gem',
+            'projects', 'gem', 'smart_contracts', 'smart_gem'
+        ))
+        from teal_optimizer import optimize_compiled
+        approval_teal, clear_teal = optimize_compiled(approval_teal, clear_teal)
+    
     # Create contracts directory if it doesn't exist
     contracts_dir = os.path.join(os.path.dirname(__file__), '..', 'contracts')
     os.makedirs(contracts_dir, exist_ok=True)